@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - batch job runner
+    =========================
+
+    Run many independent jobs in a pool of worker processes. A job is
+    a guest routine with its input, e.g.:
+
+        from MC6809.batch import BatchJob, run_batch
+
+        jobs = [
+            BatchJob(
+                program=[(0x4000, code)], data=[(0x1000, input_data)],
+                registers={"X": 0x1000}, start=0x4000, end=0x4020,
+                read_ranges=[(0x2000, 0x2010)], job_id=no,
+            )
+            for no, input_data in enumerate(corpus)
+        ]
+        for result in run_batch(jobs):
+            print(result["job_id"], result["status"], result["registers"])
+
+    Every worker process creates one CPU at startup and reuses it for all
+    its jobs: The memory and the registers will be reset before a job runs.
+    The memory layout is the one of the workloads: RAM $0000-$7FFF and
+    ROM $8000-$FFFF, so the guest can't write into the upper half.
+
+    The results are yielded as soon as a job is completed, so the order
+    is not the order of the jobs. The timeout of a job is checked in the
+    run loop of the worker, every BURST_OPS ops.
+
+    If a worker process dies (e.g. killed by the OOM killer), all
+    unfinished jobs of its pool fail. They will be run again in a new
+    pool, and if this one breaks, too, every job alone: A job that kills
+    its worker gets a STATUS_ERROR result, the others are not lost.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import binascii
+import json
+import logging
+import sys
+import time
+
+from MC6809.components.MC6809data.MC6809_op_data_flat import REG_A, REG_B, \
+    REG_CC, REG_D, REG_DP, REG_PC, REG_S, REG_U, REG_X, REG_Y
+from MC6809.workloads import create_cpu
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+# The registers in the order they will be set:
+REGISTERS = (REG_X, REG_Y, REG_U, REG_S, REG_D, REG_A, REG_B, REG_DP, REG_CC, REG_PC)
+RESULT_REGISTERS = (REG_X, REG_Y, REG_U, REG_S, REG_A, REG_B, REG_DP, REG_CC, REG_PC)
+
+DEFAULT_TIMEOUT = 60 # sec.
+BURST_OPS = 1000 # ops between two timeout checks
+
+# Job result states:
+STATUS_END = "end" # PC reached the end address
+STATUS_CYCLES = "cycles" # max. cycles reached
+STATUS_MAX_OPS = "max_ops" # max. ops reached
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+
+class BatchJob(object):
+    """
+    program and data are lists of (address, bytes) tuples and will be
+    loaded in this order. registers is a dict with the register names
+    as keys. The run starts at start (default: PC in registers or the
+    reset vector) and stops if the PC is end, or max_cycles/max_ops are
+    reached. The memory of read_ranges (start, end exclusive) is
+    returned in the result.
+    """
+    def __init__(self, program=None, data=None, registers=None, start=None, end=None,
+            max_cycles=None, max_ops=None, read_ranges=None, timeout=DEFAULT_TIMEOUT, job_id=None):
+        self.program = list(program or [])
+        self.data = list(data or [])
+        self.registers = dict(registers or {})
+        unknown = set(self.registers) - set(REGISTERS)
+        if unknown:
+            raise ValueError("Unknown register(s): %s" % ", ".join(sorted(unknown)))
+        self.start = start
+        self.end = end
+        self.max_cycles = max_cycles
+        self.max_ops = max_ops
+        self.read_ranges = [tuple(read_range) for read_range in (read_ranges or [])]
+        self.timeout = timeout
+        self.job_id = job_id
+
+    def __repr__(self):
+        return "<BatchJob %r>" % self.job_id
+
+    @classmethod
+    def from_dict(cls, job_dict, job_id=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Create a job from the JSON representation, the bytes are hex strings:
+
+        >>> job = BatchJob.from_dict({
+        ...     "program": [[16384, "8601"]], "start": 16384, "end": 16386,
+        ...     "read": [[0, 16]],
+        ... }, job_id=1)
+        >>> job.job_id, list(job.program[0][1]), job.read_ranges
+        (1, [134, 1], [(0, 16)])
+        """
+        def load_list(key):
+            return [
+                (address, bytearray(binascii.unhexlify(hex_data)))
+                for address, hex_data in job_dict.get(key, [])
+            ]
+        return cls(
+            program=load_list("program"),
+            data=load_list("data"),
+            registers=job_dict.get("registers"),
+            start=job_dict.get("start"),
+            end=job_dict.get("end"),
+            max_cycles=job_dict.get("max_cycles"),
+            max_ops=job_dict.get("max_ops"),
+            read_ranges=job_dict.get("read"),
+            timeout=job_dict.get("timeout", timeout),
+            job_id=job_dict.get("id", job_id),
+        )
+
+
+def load_jobs(f, timeout=DEFAULT_TIMEOUT):
+    """
+    Load the jobs from a file with one JSON job dict per line.
+    The line number is the job ID, if the job has no "id".
+    """
+    jobs = []
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        jobs.append(BatchJob.from_dict(json.loads(line), job_id=line_no, timeout=timeout))
+    return jobs
+
+
+def result_to_dict(result):
+    """
+    Convert a job result into a JSON serializable dict:
+    the memory content will be a hex string.
+    """
+    result = dict(result)
+    result["memory"] = [
+        [start, end, binascii.hexlify(bytes(data)).decode("ascii")]
+        for start, end, data in result["memory"]
+    ]
+    return result
+
+
+def reset_cpu(cpu):
+    """
+    Bring a used CPU back into the state of a new one.
+    """
+    cpu.memory.reset()
+    for register in (REG_X, REG_Y, REG_U, REG_S, REG_PC, REG_A, REG_B, REG_DP, REG_CC):
+        cpu.register_str2object[register].set(0)
+    cpu.cycles = 0
+    cpu.instruction_count = 0
+    cpu.irq_count = 0
+    cpu.last_op_address = 0
+
+
+def _run_loop(cpu, end, max_cycles, max_ops, deadline):
+    get_and_call_next_op = cpu.get_and_call_next_op
+    program_counter = cpu.program_counter.get
+    burst = range(BURST_OPS)
+
+    op_count = 0
+    try:
+        while True:
+            for __ in burst:
+                if program_counter() == end:
+                    return STATUS_END
+                if cpu.cycles >= max_cycles:
+                    return STATUS_CYCLES
+                if op_count >= max_ops:
+                    return STATUS_MAX_OPS
+                get_and_call_next_op()
+                op_count += 1
+            if time.time() > deadline:
+                return STATUS_TIMEOUT
+    finally:
+        cpu.instruction_count += op_count
+
+
+def run_job(job, cpu=None):
+    """
+    Run one job and return the result as a dict.
+    The given CPU will be reset, a new one is created if cpu is None.
+    Errors in the emulation are returned as STATUS_ERROR result.
+    """
+    if cpu is None:
+        cpu = create_cpu()
+    else:
+        reset_cpu(cpu)
+
+    start_time = time.time()
+    error = None
+    try:
+        for address, data in job.program + job.data:
+            cpu.memory.load(address, data)
+
+        for register in REGISTERS:
+            if register in job.registers:
+                cpu.register_str2object[register].set(job.registers[register])
+
+        if job.start is not None:
+            cpu.program_counter.set(job.start)
+        elif REG_PC not in job.registers:
+            cpu.reset()
+
+        if job.max_cycles is None:
+            max_cycles = sys.maxsize
+        else:
+            max_cycles = job.max_cycles
+        if job.max_ops is None:
+            max_ops = sys.maxsize
+        else:
+            max_ops = job.max_ops
+        if job.timeout is None:
+            deadline = sys.maxsize
+        else:
+            deadline = start_time + job.timeout
+
+        status = _run_loop(cpu, job.end, max_cycles, max_ops, deadline)
+    except (Exception, SystemExit) as err: # a unknown op calls sys.exit()
+        status = STATUS_ERROR
+        error = "%s: %s" % (err.__class__.__name__, err)
+
+    return {
+        "job_id": job.job_id,
+        "status": status,
+        "error": error,
+        "registers": dict(
+            (register, cpu.register_str2object[register].get())
+            for register in RESULT_REGISTERS
+        ),
+        "cycles": cpu.cycles,
+        "instructions": cpu.instruction_count,
+        "duration": time.time() - start_time,
+        "memory": [
+            (start, end, cpu.memory.get_block(start, end))
+            for start, end in job.read_ranges
+        ],
+    }
+
+
+#------------------------------------------------------------------------------
+# worker process
+
+
+_worker_cpu = None
+
+
+def _init_worker():
+    """
+    Create the CPU of the worker process before the first job arrives.
+    """
+    global _worker_cpu
+    _worker_cpu = create_cpu()
+
+
+def _run_worker_job(job):
+    if _worker_cpu is None:
+        _init_worker()
+    return run_job(job, _worker_cpu)
+
+
+def _crashed_result(job):
+    return {
+        "job_id": job.job_id,
+        "status": STATUS_ERROR,
+        "error": "BrokenProcessPool: the worker process died",
+        "registers": None,
+        "cycles": None,
+        "instructions": None,
+        "duration": None,
+        "memory": [],
+    }
+
+
+def run_batch(jobs, max_workers=None):
+    """
+    Run the jobs in max_workers processes (default: number of CPUs)
+    and yield the results as they complete.
+    """
+    # import here, so the CLI doesn't load it on every start
+    try:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from concurrent.futures.process import BrokenProcessPool
+    except ImportError:
+        # Python 2 needs the "futures" backport
+        raise ImportError("concurrent.futures not found, please install 'futures'")
+
+    def run_pool(jobs, max_workers, broken):
+        """
+        yield the results, the jobs of a broken pool are appended to broken.
+        """
+        try:
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+        except TypeError:
+            # Python < 3.7 / "futures" backport: the CPU will be created on the first job
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+
+        with executor:
+            futures = dict((executor.submit(_run_worker_job, job), job) for job in jobs)
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken.append(futures[future])
+                else:
+                    yield result
+
+    broken = []
+    for result in run_pool(jobs, max_workers, broken):
+        yield result
+    if not broken:
+        return
+
+    log.error("A worker process died, run %i unfinished jobs again.", len(broken))
+    jobs, broken = broken, []
+    for result in run_pool(jobs, max_workers, broken):
+        yield result
+
+    # Still broken: Run every job alone, to find the one that kills its worker
+    for job in broken:
+        crashed = []
+        for result in run_pool([job], 1, crashed):
+            yield result
+        if crashed:
+            log.error("Job %r kills its worker process.", job.job_id)
+            yield _crashed_result(job)
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
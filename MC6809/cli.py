@@ -12,6 +12,7 @@
 from __future__ import absolute_import, division, print_function
 
 
+import json
 import sys
 import MC6809
 
@@ -24,7 +25,14 @@ except ImportError as err:
     print("more info: http://click.pocoo.org")
     sys.exit(-1)
 
-from MC6809.core.bechmark import run_benchmark
+from MC6809.core.bechmark import run_benchmark, run_hot_path_profile, run_construction_benchmark, \
+    run_import_benchmark, DEFAULT_IMPORT_MODULES, \
+    DEFAULT_THRESHOLD, DEFAULT_ALPHA, DEFAULT_WORKLOADS
+from MC6809.batch import run_batch, load_jobs, result_to_dict, DEFAULT_TIMEOUT, \
+    STATUS_ERROR, STATUS_TIMEOUT
+from MC6809.components.memory import Memory, SharedROMMemory
+from MC6809.core.microbench import run_microbench, ADDR_MODES
+from MC6809.workloads import WORKLOAD_NAMES, SCENARIO_NAMES
 
 
 @click.group()
@@ -42,15 +50,162 @@ def cli():
     pass
 
 
-DEFAULT_LOOPS = 5
-DEFAULT_MULTIPLY = 15
+DEFAULT_LOOPS = 1
+DEFAULT_WARMUP = 1
+DEFAULT_REPEAT = 5
 @cli.command(help="Run a 6809 Emulation benchmark")
 @click.option("--loops", default=DEFAULT_LOOPS,
-    help="How many benchmark loops should be run? (default: %i)" % DEFAULT_LOOPS)
-@click.option("--multiply", default=DEFAULT_MULTIPLY,
-    help="Test data multiplier (default: %i)" % DEFAULT_MULTIPLY)
-def benchmark(loops, multiply):
-    run_benchmark(loops, multiply)
+    help="How many benchmark loops per round should be run? (default: %i)" % DEFAULT_LOOPS)
+@click.option("--multiply", type=int,
+    help="Workload multiplier (default: workload specific)")
+@click.option("--workload", "workloads", multiple=True,
+    type=click.Choice(WORKLOAD_NAMES + ("all",)),
+    help="Workload to run, can be given multiple times (default: %s)" % ", ".join(DEFAULT_WORKLOADS))
+@click.option("--scenario", "scenarios", multiple=True,
+    type=click.Choice(SCENARIO_NAMES + ("all",)),
+    help="Run the workloads also with callbacks/middlewares/IRQs, can be given multiple times")
+@click.option("--warmup", default=DEFAULT_WARMUP,
+    help="Rounds to run before measuring (default: %i)" % DEFAULT_WARMUP)
+@click.option("--repeat", default=DEFAULT_REPEAT,
+    help="Measured rounds, at least 2 for a comparison (default: %i)" % DEFAULT_REPEAT)
+@click.option("--json", "json_file", type=click.Path(dir_okay=False, writable=True),
+    help="Save the results into this JSON file")
+@click.option("--compare", "compare_file", type=click.Path(exists=True, dir_okay=False),
+    help="Compare against this JSON baseline and exit with 1 on regressions")
+@click.option("--threshold", default=DEFAULT_THRESHOLD,
+    help="Min. relative slowdown for a regression (default: %s)" % DEFAULT_THRESHOLD)
+@click.option("--alpha", default=DEFAULT_ALPHA,
+    help="Significance level of the Welch's t-test (default: %s)" % DEFAULT_ALPHA)
+def benchmark(loops, multiply, workloads, scenarios, warmup, repeat, json_file, compare_file, threshold, alpha):
+    if repeat < 1:
+        raise click.BadParameter("must be at least 1", param_hint="--repeat")
+    if compare_file is not None and repeat < 2:
+        raise click.BadParameter(
+            "must be at least 2 with --compare: the t-test needs 2 samples", param_hint="--repeat"
+        )
+    comparison = run_benchmark(loops, multiply,
+        warmup=warmup, repeat=repeat,
+        json_file=json_file, compare_file=compare_file,
+        threshold=threshold, alpha=alpha,
+        workloads=workloads, scenarios=scenarios,
+    )
+    if comparison is not None:
+        regressions = [item for item in comparison if item[-1]]
+        if regressions:
+            click.echo("\n%i significant regression(s) found!" % len(regressions))
+            sys.exit(1)
+        click.echo("\nNo significant regression.")
+
+
+@cli.command(help="Attribute the host time to the emulator subsystems")
+@click.option("--loops", default=1,
+    help="How many workload loops should be profiled? (default: 1)")
+@click.option("--multiply", type=int,
+    help="Workload multiplier (default: workload specific)")
+@click.option("--workload", default="crc32", type=click.Choice(WORKLOAD_NAMES),
+    help="Workload to profile (default: crc32)")
+def hotpath(loops, multiply, workload):
+    run_hot_path_profile(loops, multiply, workload)
+
+
+@cli.command(help="Measure the creation of Memory/CPU instances")
+@click.option("--count", default=1000,
+    help="Instances per round (default: 1000)")
+@click.option("--repeat", default=DEFAULT_REPEAT,
+    help="Measured rounds (default: %i)" % DEFAULT_REPEAT)
+@click.option("--shared-rom", is_flag=True,
+    help="Use SharedROMMemory with a shared read-only ROM buffer")
+@click.option("--json", "json_file", type=click.Path(dir_okay=False, writable=True),
+    help="Save the results into this JSON file")
+def construct(count, repeat, shared_rom, json_file):
+    if shared_rom:
+        memory_class = SharedROMMemory
+    else:
+        memory_class = Memory
+    run_construction_benchmark(count, repeat, json_file, memory_class)
+
+
+@cli.command(help="Measure the import time in a new interpreter")
+@click.option("--module", "modules", multiple=True,
+    help="Module to import, can be given multiple times (default: %s)" % ", ".join(DEFAULT_IMPORT_MODULES))
+@click.option("--repeat", default=DEFAULT_REPEAT,
+    help="Imports per module (default: %i)" % DEFAULT_REPEAT)
+@click.option("--json", "json_file", type=click.Path(dir_okay=False, writable=True),
+    help="Save the results into this JSON file")
+def imports(modules, repeat, json_file):
+    run_import_benchmark(modules, repeat, json_file)
+
+
+@cli.command(help="CRC32 with the experimental NumPy lockstep engine")
+@click.option("--count", default=1000,
+    help="Number of buffers/CPU instances (default: 1000)")
+@click.option("--size", default=64,
+    help="Bytes per buffer (default: 64)")
+@click.option("--scalar-count", type=int,
+    help="Run only this number of buffers with the scalar CPU (default: all)")
+def lockstep(count, size, scalar_count):
+    # import here, because NumPy is optional
+    from MC6809.core.lockstep import run_lockstep_benchmark
+    run_lockstep_benchmark(count, size, scalar_count)
+
+
+@cli.command(help="Run emulator jobs from a JSON lines file in a process pool")
+@click.argument("jobs_file", type=click.File("r"))
+@click.option("--workers", type=int,
+    help="Number of worker processes (default: number of CPUs)")
+@click.option("--timeout", default=DEFAULT_TIMEOUT, type=float,
+    help="Default timeout per job in sec. (default: %i)" % DEFAULT_TIMEOUT)
+@click.option("--output", type=click.File("w"), default="-",
+    help="Write the results as JSON lines into this file (default: stdout)")
+def batch(jobs_file, workers, timeout, output):
+    jobs = load_jobs(jobs_file, timeout)
+    states = {}
+    for result in run_batch(jobs, max_workers=workers):
+        output.write(json.dumps(result_to_dict(result), sort_keys=True) + "\n")
+        output.flush()
+        states[result["status"]] = states.get(result["status"], 0) + 1
+    click.echo("%i jobs: %s" % (
+        len(jobs), ", ".join(["%s: %i" % item for item in sorted(states.items())])
+    ), err=True)
+    if STATUS_ERROR in states or STATUS_TIMEOUT in states:
+        sys.exit(1)
+
+
+@cli.command(help="Run the workloads in 1..N concurrent processes")
+@click.option("--processes", type=int,
+    help="Max. number of worker processes (default: number of CPUs)")
+@click.option("--loops", default=DEFAULT_LOOPS,
+    help="How many benchmark loops per worker should be run? (default: %i)" % DEFAULT_LOOPS)
+@click.option("--multiply", type=int,
+    help="Workload multiplier (default: workload specific)")
+@click.option("--workload", "workloads", multiple=True,
+    type=click.Choice(WORKLOAD_NAMES + ("all",)),
+    help="Workload to run, can be given multiple times (default: %s)" % ", ".join(DEFAULT_WORKLOADS))
+@click.option("--json", "json_file", type=click.Path(dir_okay=False, writable=True),
+    help="Save the results into this JSON file")
+def scaling(processes, loops, multiply, workloads, json_file):
+    if processes is not None and processes < 1:
+        raise click.BadParameter("must be at least 1", param_hint="--processes")
+
+    # import here, so multiprocessing is only loaded if really needed
+    from MC6809.core.scaling_benchmark import run_scaling_benchmark
+    run_scaling_benchmark(processes, loops, multiply, workloads, json_file)
+
+
+@cli.command(help="Time every opcode handler in every addressing mode")
+@click.option("--mnemonic", "mnemonics", multiple=True,
+    help="Only this mnemonic, e.g.: LDA, can be given multiple times (default: all)")
+@click.option("--mode", "addr_modes", multiple=True, type=click.Choice(ADDR_MODES),
+    help="Only this addressing mode, can be given multiple times (default: all)")
+@click.option("--iterations", type=int,
+    help="Instruction stream runs per round")
+@click.option("--limit", type=int,
+    help="Display only the most expensive variants")
+@click.option("--json", "json_file", type=click.Path(dir_okay=False, writable=True),
+    help="Save the results into this JSON file")
+def opbench(mnemonics, addr_modes, iterations, limit, json_file):
+    mnemonics = [mnemonic.upper() for mnemonic in mnemonics] or None
+    run_microbench(mnemonics, addr_modes or None, iterations, limit, json_file)
 
 
 
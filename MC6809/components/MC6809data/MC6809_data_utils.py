@@ -6,13 +6,22 @@
 
     Generate a flat dict
 
+    The flat data is precomputed in "MC6809_op_data_flat.py", so the big
+    nested OP_DATA must not be imported and flattened on every import.
+    Generate it new after changes in "MC6809_op_data.py" with:
+
+        python -m MC6809.components.MC6809data.MC6809_data_utils
+
     :copyleft: 2014 by Jens Diemer
     :license: GNU GPL v3 or above, see LICENSE for more details.
 """
 
 from __future__ import absolute_import, division, print_function
 
-from MC6809.components.MC6809data.MC6809_op_data import OP_DATA
+import os
+import sys
+
+from MC6809.components.MC6809data.MC6809_op_data_flat import FIELDS, OP_ROWS
 
 
 def get_flat_opdata(OP_DATA):
@@ -28,11 +37,61 @@ def get_flat_opdata(OP_DATA):
     return flat_opdata
 
 
-MC6809OP_DATA_DICT = get_flat_opdata(OP_DATA)
+def build_opdata_dict(fields, rows):
+    """
+    >>> op_data = build_opdata_dict(("mnemonic", "cycles"), ((0x12, "NOP", 2),))
+    >>> op_data[0x12]["mnemonic"], op_data[0x12]["cycles"]
+    ('NOP', 2)
+    """
+    return dict(
+        (row[0], dict(zip(fields, row[1:]))) for row in rows
+    )
 
-del OP_DATA
 
-if __name__ == '__main__':
-    import pprint
+MC6809OP_DATA_DICT = build_opdata_dict(FIELDS, OP_ROWS)
+
+
+def generate_flat_opdata(f):
+    # import here, because it's only needed to generate the file
+    from MC6809.components.MC6809data import MC6809_op_data
+    flat_opdata = get_flat_opdata(MC6809_op_data.OP_DATA)
+
+    f.write('"""\n')
+    f.write('    This file was generated with: "MC6809_data_utils.py"\n')
+    f.write('    Please doen\'t change it directly ;)\n')
+    f.write('\n')
+    f.write('    :copyleft: 2013-2015 by the MC6809 team, see AUTHORS for more details.\n')
+    f.write('    :license: GNU GPL v3 or above, see LICENSE for more details.\n')
+    f.write('"""\n\n')
 
-    pprint.pprint(MC6809OP_DATA_DICT)
\ No newline at end of file
+    f.write("# Registers:\n")
+    for name in sorted(dir(MC6809_op_data)):
+        if name.startswith("REG_"):
+            f.write("%s = %r\n" % (name, str(getattr(MC6809_op_data, name))))
+    f.write("\n")
+
+    fields = (
+        "mnemonic", "addr_mode", "bytes", "cycles",
+        "needs_ea", "read_from_memory", "write_to_memory", "register",
+    )
+    f.write("FIELDS = (\n")
+    for field in fields:
+        f.write("    %r,\n" % str(field))
+    f.write(")\n\n")
+
+    f.write("OP_ROWS = (\n")
+    f.write("    # op code, %s\n" % ", ".join(fields))
+    for op_code, op_data in sorted(flat_opdata.items()):
+        values = [repr(op_data[field]) for field in fields]
+        f.write("    (0x%02x, %s),\n" % (op_code, ", ".join(values)))
+    f.write(")\n")
+
+
+def generate(filename):
+    with open(filename, "w") as f:
+        generate_flat_opdata(f)
+    sys.stderr.write("New %r generated.\n" % filename)
+
+
+if __name__ == '__main__':
+    generate(os.path.join(os.path.dirname(os.path.abspath(__file__)), "MC6809_op_data_flat.py"))
@@ -0,0 +1,305 @@
+"""
+    This file was generated with: "MC6809_data_utils.py"
+    Please doen't change it directly ;)
+
+    :copyleft: 2013-2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+# Registers:
+REG_A = 'A'
+REG_B = 'B'
+REG_CC = 'CC'
+REG_D = 'D'
+REG_DP = 'DP'
+REG_PC = 'PC'
+REG_S = 'S'
+REG_U = 'U'
+REG_X = 'X'
+REG_Y = 'Y'
+
+FIELDS = (
+    'mnemonic',
+    'addr_mode',
+    'bytes',
+    'cycles',
+    'needs_ea',
+    'read_from_memory',
+    'write_to_memory',
+    'register',
+)
+
+OP_ROWS = (
+    # op code, mnemonic, addr_mode, bytes, cycles, needs_ea, read_from_memory, write_to_memory, register
+    (0x00, 'NEG', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x03, 'COM', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x04, 'LSR', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x06, 'ROR', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x07, 'ASR', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x08, 'LSL', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x09, 'ROL', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x0a, 'DEC', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x0c, 'INC', 'DIRECT', 2, 6, True, '8', '8', None),
+    (0x0d, 'TST', 'DIRECT', 2, 6, False, '8', None, None),
+    (0x0e, 'JMP', 'DIRECT', 2, 3, True, None, None, None),
+    (0x0f, 'CLR', 'DIRECT', 2, 6, True, None, '8', None),
+    (0x10, 'PAGE 1', None, 1, 1, False, None, None, None),
+    (0x11, 'PAGE 2', None, 1, 1, False, None, None, None),
+    (0x12, 'NOP', 'INHERENT', 1, 2, False, None, None, None),
+    (0x13, 'SYNC', 'INHERENT', 1, 2, False, None, None, None),
+    (0x16, 'LBRA', 'RELATIVE_WORD', 3, 5, True, None, None, None),
+    (0x17, 'LBSR', 'RELATIVE_WORD', 3, 9, True, None, None, None),
+    (0x19, 'DAA', 'INHERENT', 1, 2, False, None, None, None),
+    (0x1a, 'ORCC', 'IMMEDIATE', 2, 3, False, '8', None, 'CC'),
+    (0x1c, 'ANDCC', 'IMMEDIATE', 2, 3, False, '8', None, 'CC'),
+    (0x1d, 'SEX', 'INHERENT', 1, 2, False, None, None, None),
+    (0x1e, 'EXG', 'IMMEDIATE', 2, 8, False, '8', None, None),
+    (0x1f, 'TFR', 'IMMEDIATE', 2, 7, False, '8', None, None),
+    (0x20, 'BRA', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x21, 'BRN', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x22, 'BHI', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x23, 'BLS', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x24, 'BCC', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x25, 'BLO', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x26, 'BNE', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x27, 'BEQ', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x28, 'BVC', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x29, 'BVS', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2a, 'BPL', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2b, 'BMI', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2c, 'BGE', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2d, 'BLT', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2e, 'BGT', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x2f, 'BLE', 'RELATIVE', 2, 3, True, None, None, None),
+    (0x30, 'LEAX', 'INDEXED', 2, 4, True, None, None, 'X'),
+    (0x31, 'LEAY', 'INDEXED', 2, 4, True, None, None, 'Y'),
+    (0x32, 'LEAS', 'INDEXED', 2, 4, True, None, None, 'S'),
+    (0x33, 'LEAU', 'INDEXED', 2, 4, True, None, None, 'U'),
+    (0x34, 'PSHS', 'IMMEDIATE', 2, 5, False, '8', None, 'S'),
+    (0x35, 'PULS', 'IMMEDIATE', 2, 5, False, '8', None, 'S'),
+    (0x36, 'PSHU', 'IMMEDIATE', 2, 5, False, '8', None, 'U'),
+    (0x37, 'PULU', 'IMMEDIATE', 2, 5, False, '8', None, 'U'),
+    (0x39, 'RTS', 'INHERENT', 1, 5, False, None, None, None),
+    (0x3a, 'ABX', 'INHERENT', 1, 3, False, None, None, None),
+    (0x3b, 'RTI', 'INHERENT', 1, 6, False, None, None, None),
+    (0x3c, 'CWAI', 'IMMEDIATE', 2, 21, False, '8', None, None),
+    (0x3d, 'MUL', 'INHERENT', 1, 11, False, None, None, None),
+    (0x3e, 'RESET', None, 1, -1, False, None, None, None),
+    (0x3f, 'SWI', 'INHERENT', 1, 19, False, None, None, None),
+    (0x40, 'NEGA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x43, 'COMA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x44, 'LSRA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x46, 'RORA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x47, 'ASRA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x48, 'LSLA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x49, 'ROLA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x4a, 'DECA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x4c, 'INCA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x4d, 'TSTA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x4f, 'CLRA', 'INHERENT', 1, 2, False, None, None, 'A'),
+    (0x50, 'NEGB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x53, 'COMB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x54, 'LSRB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x56, 'RORB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x57, 'ASRB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x58, 'LSLB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x59, 'ROLB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x5a, 'DECB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x5c, 'INCB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x5d, 'TSTB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x5f, 'CLRB', 'INHERENT', 1, 2, False, None, None, 'B'),
+    (0x60, 'NEG', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x63, 'COM', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x64, 'LSR', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x66, 'ROR', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x67, 'ASR', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x68, 'LSL', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x69, 'ROL', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x6a, 'DEC', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x6c, 'INC', 'INDEXED', 2, 6, True, '8', '8', None),
+    (0x6d, 'TST', 'INDEXED', 2, 6, False, '8', None, None),
+    (0x6e, 'JMP', 'INDEXED', 2, 3, True, None, None, None),
+    (0x6f, 'CLR', 'INDEXED', 2, 6, True, None, '8', None),
+    (0x70, 'NEG', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x73, 'COM', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x74, 'LSR', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x76, 'ROR', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x77, 'ASR', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x78, 'LSL', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x79, 'ROL', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x7a, 'DEC', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x7c, 'INC', 'EXTENDED', 3, 7, True, '8', '8', None),
+    (0x7d, 'TST', 'EXTENDED', 3, 7, False, '8', None, None),
+    (0x7e, 'JMP', 'EXTENDED', 3, 3, True, None, None, None),
+    (0x7f, 'CLR', 'EXTENDED', 3, 7, True, None, '8', None),
+    (0x80, 'SUBA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x81, 'CMPA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x82, 'SBCA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x83, 'SUBD', 'IMMEDIATE_WORD', 3, 4, False, '16', None, 'D'),
+    (0x84, 'ANDA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x85, 'BITA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x86, 'LDA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x88, 'EORA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x89, 'ADCA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x8a, 'ORA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x8b, 'ADDA', 'IMMEDIATE', 2, 2, False, '8', None, 'A'),
+    (0x8c, 'CMPX', 'IMMEDIATE_WORD', 3, 4, False, '16', None, 'X'),
+    (0x8d, 'BSR', 'RELATIVE', 2, 7, True, None, None, None),
+    (0x8e, 'LDX', 'IMMEDIATE_WORD', 3, 3, False, '16', None, 'X'),
+    (0x90, 'SUBA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x91, 'CMPA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x92, 'SBCA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x93, 'SUBD', 'DIRECT_WORD', 2, 6, False, '16', None, 'D'),
+    (0x94, 'ANDA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x95, 'BITA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x96, 'LDA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x97, 'STA', 'DIRECT', 2, 4, True, None, '8', 'A'),
+    (0x98, 'EORA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x99, 'ADCA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x9a, 'ORA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x9b, 'ADDA', 'DIRECT', 2, 4, False, '8', None, 'A'),
+    (0x9c, 'CMPX', 'DIRECT_WORD', 2, 6, False, '16', None, 'X'),
+    (0x9d, 'JSR', 'DIRECT', 2, 7, True, None, None, None),
+    (0x9e, 'LDX', 'DIRECT_WORD', 2, 5, False, '16', None, 'X'),
+    (0x9f, 'STX', 'DIRECT', 2, 5, True, None, '16', 'X'),
+    (0xa0, 'SUBA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa1, 'CMPA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa2, 'SBCA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa3, 'SUBD', 'INDEXED_WORD', 2, 6, False, '16', None, 'D'),
+    (0xa4, 'ANDA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa5, 'BITA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa6, 'LDA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa7, 'STA', 'INDEXED', 2, 4, True, None, '8', 'A'),
+    (0xa8, 'EORA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xa9, 'ADCA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xaa, 'ORA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xab, 'ADDA', 'INDEXED', 2, 4, False, '8', None, 'A'),
+    (0xac, 'CMPX', 'INDEXED_WORD', 2, 6, False, '16', None, 'X'),
+    (0xad, 'JSR', 'INDEXED', 2, 7, True, None, None, None),
+    (0xae, 'LDX', 'INDEXED_WORD', 2, 5, False, '16', None, 'X'),
+    (0xaf, 'STX', 'INDEXED', 2, 5, True, None, '16', 'X'),
+    (0xb0, 'SUBA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb1, 'CMPA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb2, 'SBCA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb3, 'SUBD', 'EXTENDED_WORD', 3, 7, False, '16', None, 'D'),
+    (0xb4, 'ANDA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb5, 'BITA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb6, 'LDA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb7, 'STA', 'EXTENDED', 3, 5, True, None, '8', 'A'),
+    (0xb8, 'EORA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xb9, 'ADCA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xba, 'ORA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xbb, 'ADDA', 'EXTENDED', 3, 5, False, '8', None, 'A'),
+    (0xbc, 'CMPX', 'EXTENDED_WORD', 3, 7, False, '16', None, 'X'),
+    (0xbd, 'JSR', 'EXTENDED', 3, 8, True, None, None, None),
+    (0xbe, 'LDX', 'EXTENDED_WORD', 3, 6, False, '16', None, 'X'),
+    (0xbf, 'STX', 'EXTENDED', 3, 6, True, None, '16', 'X'),
+    (0xc0, 'SUBB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc1, 'CMPB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc2, 'SBCB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc3, 'ADDD', 'IMMEDIATE_WORD', 3, 4, False, '16', None, 'D'),
+    (0xc4, 'ANDB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc5, 'BITB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc6, 'LDB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc8, 'EORB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xc9, 'ADCB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xca, 'ORB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xcb, 'ADDB', 'IMMEDIATE', 2, 2, False, '8', None, 'B'),
+    (0xcc, 'LDD', 'IMMEDIATE_WORD', 3, 3, False, '16', None, 'D'),
+    (0xce, 'LDU', 'IMMEDIATE_WORD', 3, 3, False, '16', None, 'U'),
+    (0xd0, 'SUBB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd1, 'CMPB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd2, 'SBCB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd3, 'ADDD', 'DIRECT_WORD', 2, 6, False, '16', None, 'D'),
+    (0xd4, 'ANDB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd5, 'BITB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd6, 'LDB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd7, 'STB', 'DIRECT', 2, 4, True, None, '8', 'B'),
+    (0xd8, 'EORB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xd9, 'ADCB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xda, 'ORB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xdb, 'ADDB', 'DIRECT', 2, 4, False, '8', None, 'B'),
+    (0xdc, 'LDD', 'DIRECT_WORD', 2, 5, False, '16', None, 'D'),
+    (0xdd, 'STD', 'DIRECT', 2, 5, True, None, '16', 'D'),
+    (0xde, 'LDU', 'DIRECT_WORD', 2, 5, False, '16', None, 'U'),
+    (0xdf, 'STU', 'DIRECT', 2, 5, True, None, '16', 'U'),
+    (0xe0, 'SUBB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe1, 'CMPB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe2, 'SBCB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe3, 'ADDD', 'INDEXED_WORD', 2, 6, False, '16', None, 'D'),
+    (0xe4, 'ANDB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe5, 'BITB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe6, 'LDB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe7, 'STB', 'INDEXED', 2, 4, True, None, '8', 'B'),
+    (0xe8, 'EORB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xe9, 'ADCB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xea, 'ORB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xeb, 'ADDB', 'INDEXED', 2, 4, False, '8', None, 'B'),
+    (0xec, 'LDD', 'INDEXED_WORD', 2, 5, False, '16', None, 'D'),
+    (0xed, 'STD', 'INDEXED', 2, 5, True, None, '16', 'D'),
+    (0xee, 'LDU', 'INDEXED_WORD', 2, 5, False, '16', None, 'U'),
+    (0xef, 'STU', 'INDEXED', 2, 5, True, None, '16', 'U'),
+    (0xf0, 'SUBB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf1, 'CMPB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf2, 'SBCB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf3, 'ADDD', 'EXTENDED_WORD', 3, 7, False, '16', None, 'D'),
+    (0xf4, 'ANDB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf5, 'BITB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf6, 'LDB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf7, 'STB', 'EXTENDED', 3, 5, True, None, '8', 'B'),
+    (0xf8, 'EORB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xf9, 'ADCB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xfa, 'ORB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xfb, 'ADDB', 'EXTENDED', 3, 5, False, '8', None, 'B'),
+    (0xfc, 'LDD', 'EXTENDED_WORD', 3, 6, False, '16', None, 'D'),
+    (0xfd, 'STD', 'EXTENDED', 3, 6, True, None, '16', 'D'),
+    (0xfe, 'LDU', 'EXTENDED_WORD', 3, 6, False, '16', None, 'U'),
+    (0xff, 'STU', 'EXTENDED', 3, 6, True, None, '16', 'U'),
+    (0x1021, 'LBRN', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1022, 'LBHI', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1023, 'LBLS', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1024, 'LBCC', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1025, 'LBCS', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1026, 'LBNE', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1027, 'LBEQ', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1028, 'LBVC', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x1029, 'LBVS', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102a, 'LBPL', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102b, 'LBMI', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102c, 'LBGE', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102d, 'LBLT', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102e, 'LBGT', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x102f, 'LBLE', 'RELATIVE_WORD', 4, 5, True, None, None, None),
+    (0x103f, 'SWI2', 'INHERENT', 2, 20, False, None, None, None),
+    (0x1083, 'CMPD', 'IMMEDIATE_WORD', 4, 5, False, '16', None, 'D'),
+    (0x108c, 'CMPY', 'IMMEDIATE_WORD', 4, 5, False, '16', None, 'Y'),
+    (0x108e, 'LDY', 'IMMEDIATE_WORD', 4, 4, False, '16', None, 'Y'),
+    (0x1093, 'CMPD', 'DIRECT_WORD', 3, 7, False, '16', None, 'D'),
+    (0x109c, 'CMPY', 'DIRECT_WORD', 3, 7, False, '16', None, 'Y'),
+    (0x109e, 'LDY', 'DIRECT_WORD', 3, 6, False, '16', None, 'Y'),
+    (0x109f, 'STY', 'DIRECT', 3, 6, True, None, '16', 'Y'),
+    (0x10a3, 'CMPD', 'INDEXED_WORD', 3, 7, False, '16', None, 'D'),
+    (0x10ac, 'CMPY', 'INDEXED_WORD', 3, 7, False, '16', None, 'Y'),
+    (0x10ae, 'LDY', 'INDEXED_WORD', 3, 6, False, '16', None, 'Y'),
+    (0x10af, 'STY', 'INDEXED', 3, 6, True, None, '16', 'Y'),
+    (0x10b3, 'CMPD', 'EXTENDED_WORD', 4, 8, False, '16', None, 'D'),
+    (0x10bc, 'CMPY', 'EXTENDED_WORD', 4, 8, False, '16', None, 'Y'),
+    (0x10be, 'LDY', 'EXTENDED_WORD', 4, 7, False, '16', None, 'Y'),
+    (0x10bf, 'STY', 'EXTENDED', 4, 7, True, None, '16', 'Y'),
+    (0x10ce, 'LDS', 'IMMEDIATE_WORD', 4, 4, False, '16', None, 'S'),
+    (0x10de, 'LDS', 'DIRECT_WORD', 3, 6, False, '16', None, 'S'),
+    (0x10df, 'STS', 'DIRECT', 3, 6, True, None, '16', 'S'),
+    (0x10ee, 'LDS', 'INDEXED_WORD', 3, 6, False, '16', None, 'S'),
+    (0x10ef, 'STS', 'INDEXED', 3, 6, True, None, '16', 'S'),
+    (0x10fe, 'LDS', 'EXTENDED_WORD', 4, 7, False, '16', None, 'S'),
+    (0x10ff, 'STS', 'EXTENDED', 4, 7, True, None, '16', 'S'),
+    (0x113f, 'SWI3', 'INHERENT', 2, 20, False, None, None, None),
+    (0x1183, 'CMPU', 'IMMEDIATE_WORD', 4, 5, False, '16', None, 'U'),
+    (0x118c, 'CMPS', 'IMMEDIATE_WORD', 4, 5, False, '16', None, 'S'),
+    (0x1193, 'CMPU', 'DIRECT_WORD', 3, 7, False, '16', None, 'U'),
+    (0x119c, 'CMPS', 'DIRECT_WORD', 3, 7, False, '16', None, 'S'),
+    (0x11a3, 'CMPU', 'INDEXED_WORD', 3, 7, False, '16', None, 'U'),
+    (0x11ac, 'CMPS', 'INDEXED_WORD', 3, 7, False, '16', None, 'S'),
+    (0x11b3, 'CMPU', 'EXTENDED_WORD', 4, 8, False, '16', None, 'U'),
+    (0x11bc, 'CMPS', 'EXTENDED_WORD', 4, 8, False, '16', None, 'S'),
+)
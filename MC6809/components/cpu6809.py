@@ -25,15 +25,12 @@ from __future__ import absolute_import, division, print_function
 
 try:
     # Python 3
-    import queue
     import _thread
 except ImportError:
     # Python 2
-    import Queue as queue
     import thread as _thread
     range = xrange
 
-import inspect
 import logging
 import sys
 import threading
@@ -41,7 +38,7 @@ import time
 import warnings
 
 
-from MC6809.core.cpu_control_server import start_http_control_server
+from MC6809.core.cpu_metrics import CPUMetrics
 from MC6809.components.cpu_utils.MC6809_registers import (
     ValueStorage8Bit, ConcatenatedAccumulator,
     ValueStorage16Bit, ConditionCodeRegister, UndefinedRegister
@@ -49,7 +46,7 @@ from MC6809.components.cpu_utils.MC6809_registers import (
 from MC6809.components.cpu_utils.instruction_caller import OpCollection
 from MC6809.utils.bits import is_bit_set, get_bit
 from MC6809.utils.byte_word_values import signed8, signed16, signed5
-from MC6809.components.MC6809data.MC6809_op_data import (
+from MC6809.components.MC6809data.MC6809_op_data_flat import (
     REG_A, REG_B, REG_CC, REG_D, REG_DP, REG_PC,
     REG_S, REG_U, REG_X, REG_Y
 )
@@ -78,24 +75,48 @@ undefined_reg = UndefinedRegister()
 
 class CPUStatusThread(threading.Thread):
     """
-    Send cycles/sec information via cpu_status_queue to the GUi main thread.
-    Just ignore if the cpu_status_queue is full.
+    Send the cycles count via cpu_status_queue to the GUi main thread and
+    the CPU metrics snapshot dict via the optional cpu_metrics_queue.
+    Just ignore if a queue is full.
     """
-    def __init__(self, cpu, cpu_status_queue):
+    def __init__(self, cpu, cpu_status_queue=None, cpu_metrics_queue=None):
         super(CPUStatusThread, self).__init__(name="CPU-Status-Thread")
         self.cpu = cpu
         self.cpu_status_queue = cpu_status_queue
+        self.cpu_metrics_queue = cpu_metrics_queue
 
-        self.last_cpu_cycles = None
-        self.last_cpu_cycle_update = time.time()
+        self.below_realtime = False
 
     def _run(self):
+        # import here, so the queue module is only loaded if a status thread is used
+        try:
+            from queue import Full # Python 3
+        except ImportError:
+            from Queue import Full # Python 2
+
         while self.cpu.running:
-            try:
-                self.cpu_status_queue.put(self.cpu.cycles, block=False)
-            except queue.Full:
-#                 log.critical("Can't put CPU status: Queue is full.")
-                pass
+            metrics = self.cpu.get_metrics()
+
+            if metrics["below_realtime"] != self.below_realtime:
+                self.below_realtime = metrics["below_realtime"]
+                if self.below_realtime:
+                    log.warning("CPU below real-time: %.3f MHz (target: %.3f MHz)",
+                        metrics["emulated_mhz"], metrics["target_mhz"]
+                    )
+                else:
+                    log.warning("CPU runs in real-time again.")
+
+            if self.cpu_status_queue is not None:
+                try:
+                    self.cpu_status_queue.put(metrics["cycles"], block=False)
+                except Full:
+#                     log.critical("Can't put CPU status: Queue is full.")
+                    pass
+            if self.cpu_metrics_queue is not None:
+                try:
+                    self.cpu_metrics_queue.put(metrics, block=False)
+                except Full:
+                    pass
             time.sleep(0.5)
 
     def run(self):
@@ -119,7 +140,7 @@ class CPU(object):
 
     STARTUP_BURST_COUNT = 100
 
-    def __init__(self, memory, cfg, cpu_status_queue=None):
+    def __init__(self, memory, cfg, cpu_status_queue=None, cpu_metrics_queue=None):
         self.memory = memory
         self.memory.cpu = self # FIXME
         self.cfg = cfg
@@ -129,12 +150,21 @@ class CPU(object):
         self.last_op_address = 0 # Store the current run opcode memory address
         self.outer_burst_op_count = self.STARTUP_BURST_COUNT
 
-        if cpu_status_queue is not None:
-            status_thread = CPUStatusThread(self, cpu_status_queue)
-            status_thread.deamon = True
-            status_thread.start()
+        # Cheap counters for the CPU metrics, see: get_metrics()
+        self.instruction_count = 0 # Counted per burst, not per op call
+        self.irq_count = 0
+        self.metrics = CPUMetrics()
+
+        # CPU cycles triggered callbacks, see: add_sync_callback()
+        # Every CPU instance needs its own, otherwise all CPUs share the callbacks.
+        self.quickest_sync_callback_cycles = None
+        self.sync_callbacks_cyles = {}
+        self.sync_callbacks = []
 
-        start_http_control_server(self, cfg)
+        if cpu_status_queue is not None or cpu_metrics_queue is not None:
+            status_thread = CPUStatusThread(self, cpu_status_queue, cpu_metrics_queue)
+            status_thread.daemon = True
+            status_thread.start()
 
         self.index_x = ValueStorage16Bit(REG_X, 0) # X - 16 bit index register
         self.index_y = ValueStorage16Bit(REG_Y, 0) # Y - 16 bit index register
@@ -181,7 +211,17 @@ class CPU(object):
         }
 
 #         log.debug("Add opcode functions:")
-        self.opcode_dict = OpCollection(self).get_opcode_dict()
+        self.op_collection = OpCollection(self)
+        self.opcode_dict = self.op_collection.get_opcode_dict()
+
+        # Commands of the control server, executed in run(), see: CommandQueue
+        self.control_commands = None
+        if getattr(cfg, "CPU_CONTROL_SERVER", False):
+            # import here, so the http server is only loaded if really needed
+            from MC6809.core.cpu_control_server import start_http_control_server
+            self.control_server = start_http_control_server(self, cfg)
+        else:
+            self.control_server = None
 
 #         log.debug("illegal ops: %s" % ",".join(["$%x" % c for c in ILLEGAL_OPS]))
         # add illegal instruction
@@ -208,7 +248,7 @@ class CPU(object):
             REG_CC: self.cc.get(),
 
             "cycles": self.cycles,
-            "RAM": tuple(self.memory._mem) # copy of array.array() values,
+            "RAM": tuple(self.memory.get_block(0x0000, 0x10000)), # copy of the memory values
         }
 
     def set_state(self, state):
@@ -232,6 +272,29 @@ class CPU(object):
         self.cycles = state["cycles"]
         self.memory.load(address=0x0000, data=state["RAM"])
 
+    def save_state(self, fileobj, compression="zlib", device_state=None):
+        """
+        Write the complete CPU state in a compact binary format.
+        compression can be "zlib", "lzma" or None.
+        see: MC6809.core.save_state
+        """
+        from MC6809.core.save_state import save_state
+        save_state(self, fileobj, compression, device_state)
+
+    def load_state(self, fileobj):
+        """
+        Restore a state written by save_state(), returns the device state.
+        """
+        from MC6809.core.save_state import load_state
+        return load_state(self, fileobj)
+
+    def get_metrics(self):
+        """
+        Snapshot dict of the CPU performance metrics, e.g.:
+        cycles, instructions, emulated MHz vs. target MHz, burst durations.
+        """
+        return self.metrics.snapshot(self)
+
     ####
 
     def reset(self):
@@ -280,6 +343,22 @@ class CPU(object):
             exception = err.__class__ # Use origin Exception class, e.g.: KeyError
             raise exception(msg)
 
+    def activate_trace(self, trace_filter=None):
+        """
+        Activate the trace output while the CPU is running.
+        Optional limited by a cpu6809_trace.TraceFilter() instance.
+
+        The complete opcode dict will be build before it replaced the current
+        one, so a running CPU thread sees always a consistent dict.
+        """
+        self.opcode_dict = self.op_collection.get_trace_opcode_dict(trace_filter)
+
+    def deactivate_trace(self):
+        """
+        Switch back to the untraced opcode dict.
+        """
+        self.opcode_dict = self.op_collection.get_plain_opcode_dict()
+
     def quit(self):
         log.critical("CPU quit() called.")
         self.running = False
@@ -299,10 +378,6 @@ class CPU(object):
 
     ####
 
-    # TODO: Move to __init__
-    quickest_sync_callback_cycles = None
-    sync_callbacks_cyles = {}
-    sync_callbacks = []
     def add_sync_callback(self, callback_cycles, callback):
         """ Add a CPU cycle triggered callback """
         self.sync_callbacks_cyles[callback] = 0
@@ -340,11 +415,34 @@ class CPU(object):
 
             self.call_sync_callbacks()
 
+        self.instruction_count += self.outer_burst_op_count * self.inner_burst_op_count
+
+    def cycle_burst_run(self, cycles):
+        """
+        Run CPU until at least the given number of cycles are executed.
+        The sync callbacks are called after every inner_burst_op_count ops,
+        same as in burst_run()
+        """
+        end_cycles = self.cycles + cycles
+        get_and_call_next_op = self.get_and_call_next_op
+        burst_ops = range(self.inner_burst_op_count)
+
+        op_count = 0
+        while self.cycles < end_cycles and self.running:
+            for __ in burst_ops:
+                get_and_call_next_op()
+            op_count += self.inner_burst_op_count
+
+            self.call_sync_callbacks()
+
+        self.instruction_count += op_count
+
     # TODO: Move to __init__
     max_delay = 0.01 # maximum time.sleep() value per burst run
     delay = 0 # the current time.sleep() value per burst run
     def delayed_burst_run(self, target_cycles_per_sec):
         """ Run CPU not faster than given speedlimit """
+        self.delay = 0
         old_cycles = self.cycles
         start_time = time.time()
 
@@ -401,9 +499,16 @@ class CPU(object):
             return int(burst_count)
 
     def run(self, max_run_time=0.1, target_cycles_per_sec=None):
+        if self.control_commands is not None:
+            # Handle the control server requests between the bursts.
+            # Doesn't return while the CPU is paused via the control server.
+            self.control_commands.process(self)
+
         now = time.time
 
         start_time = now()
+        old_cycles = self.cycles
+        old_instruction_count = self.instruction_count
 
         if target_cycles_per_sec is not None:
             # Run CPU not faster than given speedlimit
@@ -413,12 +518,46 @@ class CPU(object):
             self.delay = 0
             self.burst_run()
 
+        end_time = now()
+        self.metrics.add_burst(start_time, end_time,
+            cycles=self.cycles - old_cycles,
+            instructions=self.instruction_count - old_instruction_count,
+            sleep_duration=self.delay,
+            target_cycles_per_sec=target_cycles_per_sec,
+        )
+
         # Calculate the outer_burst_count new, to hit max_run_time
         self.outer_burst_op_count = self.calc_new_count(self.outer_burst_op_count,
-            current_value=now() - start_time - self.delay,
+            current_value=end_time - start_time - self.delay,
             target_value=max_run_time,
         )
 
+        if not self.running and self.control_commands is not None:
+            # The CPU loop ends: The control server should not wait for it.
+            self.control_commands.close()
+
+    def run_async(self, cycles_per_slice=10000, target_hz=None, max_cycles=None):
+        """
+        Returns a coroutine that runs the CPU cooperative in a asyncio event loop:
+
+            await cpu.run_async(cycles_per_slice=10000, target_hz=895000)
+
+        Runs until cpu.quit() is called or max_cycles are executed.
+        Needs Python 3.5 or newer, see: MC6809.components.cpu_async
+        """
+        # import here, because the module can only be compiled with Python 3
+        from MC6809.components.cpu_async import run_async
+        return run_async(self, cycles_per_slice, target_hz, max_cycles)
+
+    def fork_children(self, n, fn, inputs=None, timeout=None, raise_errors=True):
+        """
+        Clone the CPU with os.fork() into n child processes, call
+        fn(cpu, inputs[i]) in every child and return the results.
+        Unix only, see: MC6809.core.fork
+        """
+        from MC6809.core.fork import fork_children
+        return fork_children(self, n, fn, inputs, timeout, raise_errors)
+
     def test_run(self, start, end, max_ops=1000000):
 #        log.warning("CPU test_run(): from $%x to $%x" % (start, end))
         self.program_counter.set(start)
@@ -428,10 +567,12 @@ class CPU(object):
         get_and_call_next_op = self.get_and_call_next_op
         program_counter = self.program_counter.get
 
-        for __ in range(max_ops):
+        for op_count in range(max_ops):
             if program_counter() == end:
+                self.instruction_count += op_count
                 return
             get_and_call_next_op()
+        self.instruction_count += max_ops
         log.critical("Max ops %i arrived!", max_ops)
         raise RuntimeError("Max ops %i arrived!" % max_ops)
 
@@ -2545,6 +2686,7 @@ class CPU(object):
             # ))
             return
 
+        self.irq_count += 1
         if self.cc.E:
             self.push_irq_registers()
         else:
@@ -2708,6 +2850,7 @@ class TypeAssert(CPU):
         )
 
     def __set_attr_dict(self):
+        import inspect # only used for debugging, so import it here
         for name, obj in inspect.getmembers(self, lambda x:not(inspect.isroutine(x))):
             if name.startswith("_") or name == "cfg":
                 continue
@@ -23,9 +23,51 @@ from MC6809.components.cpu_utils.instruction_call import PrepagedInstructions
 log = logging.getLogger("DragonPy.cpu6809.trace")
 
 
+class TraceFilter(object):
+    """
+    Limit the trace output, e.g.:
+
+        # trace only the IRQ handler between $a000 and $a0ff:
+        cpu.activate_trace(TraceFilter(address_ranges=((0xa000, 0xa0ff),)))
+
+        # trace only JSR/RTS after the first million cycles:
+        cpu.activate_trace(TraceFilter(mnemonics=("JSR", "RTS"), start_cycle=1000000))
+
+    The mnemonics are checked on trace activation, so all other ops run
+    without trace overhead. Address ranges and the cycle window are checked
+    on every traced op call.
+    """
+    def __init__(self, address_ranges=None, mnemonics=None, start_cycle=None, end_cycle=None):
+        self.address_ranges = address_ranges
+        if mnemonics is None:
+            self.mnemonics = None
+        else:
+            self.mnemonics = set([mnemonic.upper() for mnemonic in mnemonics])
+        self.start_cycle = start_cycle
+        self.end_cycle = end_cycle
+
+    def match_mnemonic(self, mnemonic):
+        if self.mnemonics is None:
+            return True
+        return mnemonic in self.mnemonics
+
+    def match(self, op_address, cycles):
+        if self.start_cycle is not None and cycles < self.start_cycle:
+            return False
+        if self.end_cycle is not None and cycles > self.end_cycle:
+            return False
+        if self.address_ranges is None:
+            return True
+        for start_addr, end_addr in self.address_ranges:
+            if start_addr <= op_address <= end_addr:
+                return True
+        return False
+
+
 class InstructionTrace(PrepagedInstructions):
-    def __init__(self, *args, **kwargs):
-        super(InstructionTrace, self).__init__(*args, **kwargs)
+    def __init__(self, cpu, instr_func, trace_filter=None):
+        super(InstructionTrace, self).__init__(cpu, instr_func)
+        self.trace_filter = trace_filter
         self.cfg = self.cpu.cfg
         self.get_mem_info = self.cpu.cfg.mem_info.get_shortest
 
@@ -50,16 +92,23 @@ class InstructionTrace(PrepagedInstructions):
             log.debug("Skip PAGE 2 and PAGE 3 instruction in trace")
             return
 
-        op_code_data = MC6809OP_DATA_DICT[opcode]
-
         op_address = self.cpu.last_op_address
 
+        if self.trace_filter is not None and not self.trace_filter.match(op_address, self.cpu.cycles):
+            return result
+
+        op_code_data = MC6809OP_DATA_DICT[opcode]
+
         ob_bytes = op_code_data["bytes"]
 
-        op_bytes = "".join([
-            "%02x" % value
-            for __, value in self.cpu.memory.iter_bytes(op_address, op_address + ob_bytes)
-        ])
+        # Don't use read_byte() here: The trace should not change the CPU cycles
+        # or trigger any memory callbacks. get_block() ends at $FFFF, so wrap
+        # around like the program counter:
+        op_end = op_address + ob_bytes
+        op_block = self.cpu.memory.get_block(op_address, op_end)
+        if op_end > 0x10000:
+            op_block += self.cpu.memory.get_block(0x0000, op_end - 0x10000)
+        op_bytes = "".join(["%02x" % value for value in op_block])
 
         kwargs_info = []
         if "register" in kwargs:
@@ -84,7 +133,7 @@ class InstructionTrace(PrepagedInstructions):
             self.cpu.memory.print_dump(op_address, op_address + ob_bytes)
             self.cpu.memory.print_dump(op_address - 10, op_address + ob_bytes + 10)
         assert op_bytes.startswith("%02x" % opcode), "%s doesn't start with %02x" % (
-            op_bytes, self.opcode
+            op_bytes, opcode
         )
 
         return result
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - asyncio CPU driver
+    ===========================
+
+    Run the CPU in a asyncio event loop: Execute a slice of CPU cycles
+    and yield to the event loop after every slice. So one event loop can
+    run many CPUs together with e.g. network I/O.
+
+    With target_hz, the speed is limited with asyncio.sleep() instead of
+    the blocking time.sleep() in CPU.delayed_burst_run(): After every
+    slice, the driver sleeps until the wall clock time matches the
+    emulated cycles.
+
+    Only usable with Python 3.5 or newer. Use CPU.run_async(), it imports
+    this module only if needed.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+import asyncio
+import logging
+import time
+
+
+log = logging.getLogger("MC6809")
+
+
+# If the CPU is behind the target speed more than this,
+# it will not try to catch up the lost time:
+MAX_LAG = 0.5 # sec.
+
+
+async def run_async(cpu, cycles_per_slice=10000, target_hz=None, max_cycles=None):
+    """
+    Run the CPU until cpu.quit() is called or max_cycles are executed.
+    Returns the number of executed CPU cycles.
+    """
+    if cycles_per_slice < 1:
+        raise ValueError("cycles_per_slice must be greater than 0")
+
+    now = time.time
+    start_cycles = cpu.cycles
+    if max_cycles is not None:
+        end_cycles = start_cycles + max_cycles
+
+    # reference point for the speed limit:
+    ref_time = now()
+    ref_cycles = cpu.cycles
+
+    while cpu.running:
+        slice_cycles = cycles_per_slice
+        if max_cycles is not None:
+            slice_cycles = min(slice_cycles, end_cycles - cpu.cycles)
+            if slice_cycles <= 0:
+                break
+
+        start_time = now()
+        old_cycles = cpu.cycles
+        old_instruction_count = cpu.instruction_count
+
+        cpu.cycle_burst_run(slice_cycles)
+
+        delay = 0
+        if target_hz is not None:
+            run_end_time = now()
+            target_time = ref_time + (cpu.cycles - ref_cycles) / target_hz
+            delay = target_time - run_end_time
+            if delay < -MAX_LAG:
+                # too slow: don't try to catch up
+                ref_time = run_end_time
+                ref_cycles = cpu.cycles
+                delay = 0
+
+        # Always yield to the event loop, also without a delay:
+        await asyncio.sleep(max(delay, 0))
+
+        # The burst duration includes the speed limit sleep, like in CPU.run():
+        cpu.metrics.add_burst(start_time, now(),
+            cycles=cpu.cycles - old_cycles,
+            instructions=cpu.instruction_count - old_instruction_count,
+            sleep_duration=max(delay, 0),
+            target_cycles_per_sec=target_hz,
+        )
+
+    return cpu.cycles - start_cycles
@@ -10,62 +10,131 @@
 
 from __future__ import absolute_import, division, print_function
 
-import inspect
-
 from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
-from MC6809.components.cpu_utils.Instruction_generator import func_name_from_op_code
 from MC6809.components.cpu_utils.instruction_call import PrepagedInstructions
-from MC6809.components.cpu6809_trace import InstructionTrace
 
 
-class OpCollection(object):
-    def __init__(self, cpu):
-        self.cpu = cpu
-        self.opcode_dict = {}
-        self.collect_ops()
+# CPU class -> dispatch description, see: get_dispatch_description()
+_DISPATCH_DESCRIPTIONS = {}
 
-    def get_opcode_dict(self):
-        return self.opcode_dict
 
-    def collect_ops(self):
-        # Get the members not from class instance, so that's possible to
-        # exclude properties without "activate" them.
-        cls = type(self.cpu)
-        for name, cls_method in inspect.getmembers(cls):
-            if name.startswith("_") or isinstance(cls_method, property):
-                continue
-
-            try:
-                opcodes = getattr(cls_method, "_opcodes")
-            except AttributeError:
-                continue
+def get_dispatch_description(cls):
+    """
+    Returns the dispatch description of a CPU class as a tuple of:
+        (instruction method name, ((op code, cycles, access method name), ...))
 
-            instr_func = getattr(self.cpu, name)
-            self._add_ops(opcodes, instr_func)
+    Collecting the ops with inspect and building the access method names
+    is expensive, so it will be done only one time per CPU class.
+    Creating a CPU instance only binds this description to the instance.
+    """
+    try:
+        return _DISPATCH_DESCRIPTIONS[cls]
+    except KeyError:
+        pass
+
+    # import here, both are expensive to import and only needed one time
+    import inspect
+    from MC6809.components.cpu_utils.Instruction_generator import func_name_from_op_code
+
+    instr_names = {} # op code -> CPU instruction method name
+
+    # Get the members not from class instance, so that's possible to
+    # exclude properties without "activate" them.
+    for name, cls_method in inspect.getmembers(cls):
+        if name.startswith("_") or isinstance(cls_method, property):
+            continue
+
+        try:
+            opcodes = getattr(cls_method, "_opcodes")
+        except AttributeError:
+            continue
 
-    def _add_ops(self, opcodes, instr_func):
-#         log.debug("%20s: %s" % (
-#             instr_func.__name__, ",".join(["$%x" % c for c in opcodes])
-#         ))
         for op_code in opcodes:
-            assert op_code not in self.opcode_dict, \
-                "Opcode $%x (%s) defined more then one time!" % (
-                    op_code, instr_func.__name__
-            )
+            assert op_code not in instr_names, \
+                "Opcode $%x (%s) defined more then one time!" % (op_code, name)
+            instr_names[op_code] = name
 
-            op_code_data = MC6809OP_DATA_DICT[op_code]
+    ops = {} # CPU instruction method name -> op code data
+    for op_code, name in sorted(instr_names.items()):
+        ops.setdefault(name, []).append((
+            op_code,
+            MC6809OP_DATA_DICT[op_code]["cycles"],
+            func_name_from_op_code(op_code),
+        ))
 
-            func_name = func_name_from_op_code(op_code)
+    description = tuple(
+        (name, tuple(ops[name])) for name in sorted(ops)
+    )
+    _DISPATCH_DESCRIPTIONS[cls] = description
+    return description
 
-            if self.cpu.cfg.trace:
-                InstructionClass = InstructionTrace
-            else:
-                InstructionClass = PrepagedInstructions
 
-            instrution_class = InstructionClass(self.cpu, instr_func)
-            func = getattr(instrution_class, func_name)
+class OpCollection(object):
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.dispatch_description = get_dispatch_description(type(cpu))
+        self.instr_funcs = {} # op code -> CPU instruction method
+        self.plain_opcode_dict = None
+        self.collect_ops()
+
+        if self.cpu.cfg.trace:
+            self.opcode_dict = self.get_trace_opcode_dict()
+        else:
+            self.opcode_dict = self.get_plain_opcode_dict()
 
-            self.opcode_dict[op_code] = (op_code_data["cycles"], func)
+    def get_opcode_dict(self):
+        return self.opcode_dict
+
+    def get_plain_opcode_dict(self):
+        """
+        opcode dict without any trace overhead.
+        Will be created only one time and reused on every trace deactivation.
+        """
+        if self.plain_opcode_dict is None:
+            self.plain_opcode_dict = self._build_opcode_dict(PrepagedInstructions)
+        return self.plain_opcode_dict
+
+    def get_trace_opcode_dict(self, trace_filter=None):
+        """
+        Create a new opcode dict with trace entries.
+
+        If the trace_filter limits the mnemonics, all other ops reuse the
+        untraced entries, so they doesn't pay any trace overhead.
+        """
+        # import here, so the trace code is only loaded if really needed
+        from MC6809.components.cpu6809_trace import InstructionTrace
+
+        plain_opcode_dict = self.get_plain_opcode_dict()
+        opcode_dict = {}
+        for name, ops in self.dispatch_description:
+            instrution_class = None
+            for op_code, cycles, func_name in ops:
+                mnemonic = MC6809OP_DATA_DICT[op_code]["mnemonic"]
+                if trace_filter is None or trace_filter.match_mnemonic(mnemonic):
+                    if instrution_class is None:
+                        instrution_class = InstructionTrace(self.cpu, self.instr_funcs[op_code], trace_filter)
+                    opcode_dict[op_code] = (cycles, getattr(instrution_class, func_name))
+                else:
+                    opcode_dict[op_code] = plain_opcode_dict[op_code]
+        return opcode_dict
+
+    def collect_ops(self):
+        for name, ops in self.dispatch_description:
+            instr_func = getattr(self.cpu, name)
+            for op_code, cycles, func_name in ops:
+                self.instr_funcs[op_code] = instr_func
+
+    def _build_opcode_dict(self, InstructionClass):
+        """
+        One InstructionClass instance per CPU instruction method,
+        shared by all op codes of this method.
+        """
+        opcode_dict = {}
+        for name, ops in self.dispatch_description:
+            instrution_class = InstructionClass(self.cpu, self.instr_funcs[ops[0][0]])
+            for op_code, cycles, func_name in ops:
+                opcode_dict[op_code] = (cycles, getattr(instrution_class, func_name))
+        return opcode_dict
 
 
 if __name__ == "__main__":
@@ -22,10 +22,16 @@
 from __future__ import absolute_import, division, print_function
 
 import array
+import hashlib
 import os
 import sys
 import logging
 
+try:
+    from queue import Empty # Python 3
+except ImportError:
+    from Queue import Empty # Python 2
+
 PY2 = sys.version_info[0] == 2
 if PY2:
     range = xrange
@@ -45,6 +51,11 @@ class Memory(object):
         self.read_bus_response_queue = read_bus_response_queue
         self.write_bus_queue = write_bus_queue
 
+        # Remote bus state, see: add_remote_bus_area()
+        self._write_bus_buffer = []
+        self._write_bus_seq = 0 # sequence number of the last buffered write
+        self._read_bus_seq = 0
+
         self.INTERNAL_SIZE = (0xFFFF + 1)
 
         self.RAM_SIZE = (self.cfg.RAM_END - self.cfg.RAM_START) + 1
@@ -69,18 +80,20 @@ class Memory(object):
         # Bytearray will be consume less RAM, but it's slower:
 #        self._mem = bytearray(self.cfg.MEMORY_SIZE)
 
-        # array consumes also less RAM than lists and it's a little bit faster:
-        self._mem = array.array("B", [0x00] * self.INTERNAL_SIZE) # unsigned char
-
-        if cfg and cfg.rom_cfg:
-            for romfile in cfg.rom_cfg:
-                self.load_file(romfile)
+        self._init_memory()
 
         self._read_byte_callbacks = {}
         self._read_word_callbacks = {}
         self._write_byte_callbacks = {}
         self._write_word_callbacks = {}
 
+        # Count the calls of memory callbacks and middlewares,
+        # see: get_callback_counts()
+        self.read_callback_count = 0
+        self.write_callback_count = 0
+        self.read_middleware_count = 0
+        self.write_middleware_count = 0
+
         # Memory middlewares are function that called on memory read or write
         # the function can change the value that is read/write
         #
@@ -120,7 +133,7 @@ class Memory(object):
 #         )
 
 
-        log.critical("init RAM $%04x (dez.:%s) Bytes RAM $%04x (dez.:%s) Bytes (total %s real: %s)",
+        log.info("init RAM $%04x (dez.:%s) Bytes RAM $%04x (dez.:%s) Bytes (total %s real: %s)",
             self.RAM_SIZE, self.RAM_SIZE,
             self.ROM_SIZE, self.ROM_SIZE,
             self.RAM_SIZE + self.ROM_SIZE,
@@ -128,6 +141,22 @@ class Memory(object):
         )
 
 
+    def _init_memory(self):
+        # array consumes also less RAM than lists and it's a little bit faster.
+        # Multiply a one element array, instead of creating a 64K list first:
+        self._mem = array.array("B", [0x00]) * self.INTERNAL_SIZE # unsigned char
+
+        if self.cfg and self.cfg.rom_cfg:
+            for romfile in self.cfg.rom_cfg:
+                self.load_file(romfile)
+
+    def reset(self):
+        """
+        Clear the RAM and load the ROM files again.
+        The callbacks and middlewares are not changed.
+        """
+        self._init_memory()
+
     #---------------------------------------------------------------------------
 
     def _map_address_range(self, callbacks_dict, callback_func, start_addr, end_addr=None):
@@ -166,15 +195,102 @@ class Memory(object):
         self._map_address_range(self._write_word_middleware, callback_func, start_addr, end_addr)
 
     #---------------------------------------------------------------------------
+    # Remote bus: The device pages are served by a other process via the
+    # bus queues, see: MC6809.components.remote_bus
+    #
+    # Writes are buffered and send as one batch, if the batch is full,
+    # before every remote read and in flush_write_bus().
+    # Reads are synchronous: A request contains the sequence number of
+    # the last write, so the device applies all previous writes first.
+
+    WRITE_BUS_BATCH_SIZE = 64 # writes per batch
+    BUS_TIMEOUT = 10 # sec. to wait for a remote read response
+
+    def add_remote_bus_area(self, start_addr, end_addr):
+        """
+        Serve the address range (inclusive end_addr) by the remote bus.
+        """
+        assert self.read_bus_request_queue is not None and \
+            self.read_bus_response_queue is not None and \
+            self.write_bus_queue is not None, "Remote bus needs the bus queues!"
+
+        self._map_address_range(self._read_byte_callbacks, self._remote_read_byte, start_addr, end_addr)
+        self._map_address_range(self._write_byte_callbacks, self._remote_write_byte, start_addr, end_addr)
+        if end_addr > start_addr:
+            # A word is one request, if both bytes are remote:
+            self._map_address_range(self._read_word_callbacks, self._remote_read_word, start_addr, end_addr - 1)
+            self._map_address_range(self._write_word_callbacks, self._remote_write_word, start_addr, end_addr - 1)
+
+    def _remote_read(self, cycles, address, width):
+        self.flush_write_bus()
+        self._read_bus_seq += 1
+        self.read_bus_request_queue.put(
+            (self._read_bus_seq, cycles, address, width, self._write_bus_seq)
+        )
+        try:
+            seq, value = self.read_bus_response_queue.get(timeout=self.BUS_TIMEOUT)
+        except Empty:
+            raise RuntimeError("Remote bus doesn't respond to the read from $%04x" % address)
+        if seq != self._read_bus_seq:
+            raise RuntimeError("Remote bus response %i for request %i" % (seq, self._read_bus_seq))
+        return value
+
+    def _remote_read_byte(self, cycles, last_op_address, address):
+        return self._remote_read(cycles, address, 1)
+
+    def _remote_read_word(self, cycles, last_op_address, address):
+        return self._remote_read(cycles, address, 2)
+
+    def _remote_write(self, cycles, address, width, value):
+        self._write_bus_seq += 1
+        self._write_bus_buffer.append((self._write_bus_seq, cycles, address, width, value))
+        if len(self._write_bus_buffer) >= self.WRITE_BUS_BATCH_SIZE:
+            self.flush_write_bus()
+
+    def _remote_write_byte(self, cycles, last_op_address, address, value):
+        self._remote_write(cycles, address, 1, value)
+
+    def _remote_write_word(self, cycles, last_op_address, address, word):
+        self._remote_write(cycles, address, 2, word)
+
+    def flush_write_bus(self):
+        """
+        Send the buffered writes to the remote bus, e.g. call it
+        from a sync callback, so the device sees the writes in time.
+        """
+        if self._write_bus_buffer:
+            self.write_bus_queue.put(self._write_bus_buffer)
+            self._write_bus_buffer = []
+
+    def close_remote_bus(self):
+        """
+        Send all writes and stop the remote device server:
+        A read request with width 0 is the stop request.
+        """
+        self._remote_read(0, 0x0000, 0)
+
+    #---------------------------------------------------------------------------
 
 
     def load(self, address, data):
         if isinstance(data, string_type):
             data = [ord(c) for c in data]
 
-        log.debug("ROM load at $%04x: %s", address,
-            ", ".join(["$%02x" % i for i in data])
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ROM load at $%04x: %s", address,
+                ", ".join(["$%02x" % i for i in data])
+            )
+
+        end = address + len(data)
+        if end <= len(self._mem):
+            # Fast path for big blocks, e.g. restoring a snapshot:
+            try:
+                self._mem[address:end] = array.array("B", data)
+            except (OverflowError, TypeError):
+                pass # a out of range byte: raise the error below
+            else:
+                return
+
         for ea, datum in enumerate(data, address):
             try:
                 self._mem[ea] = datum
@@ -195,6 +311,7 @@ class Memory(object):
         self.cpu.cycles += 1
 
         if address in self._read_byte_callbacks:
+            self.read_callback_count += 1
             byte = self._read_byte_callbacks[address](
                 self.cpu.cycles, self.cpu.last_op_address, address
             )
@@ -214,6 +331,7 @@ class Memory(object):
             byte = 0x0
 
         if address in self._read_byte_middleware:
+            self.read_middleware_count += 1
             byte = self._read_byte_middleware[address](
                 self.cpu.cycles, self.cpu.last_op_address, address, byte
             )
@@ -229,6 +347,7 @@ class Memory(object):
 
     def read_word(self, address):
         if address in self._read_word_callbacks:
+            self.read_callback_count += 1
             word = self._read_word_callbacks[address](
                 self.cpu.cycles, self.cpu.last_op_address, address
             )
@@ -253,6 +372,7 @@ class Memory(object):
 #             log.error(" ^^^^ wrap around to $%x", value)
 
         if address in self._write_byte_middleware:
+            self.write_middleware_count += 1
             value = self._write_byte_middleware[address](
                 self.cpu.cycles, self.cpu.last_op_address, address, value
             )
@@ -261,6 +381,7 @@ class Memory(object):
             )
 
         if address in self._write_byte_callbacks:
+            self.write_callback_count += 1
             return self._write_byte_callbacks[address](
                 self.cpu.cycles, self.cpu.last_op_address, address, value
             )
@@ -290,6 +411,7 @@ class Memory(object):
         assert word <= 0xffff, "Write out of range word hex:%04x dez:%i to $%04x" % (word, word, address)
 
         if address in self._write_word_middleware:
+            self.write_middleware_count += 1
             word = self._write_word_middleware[address](
                 self.cpu.cycles, self.cpu.last_op_address, address, word
             )
@@ -298,6 +420,7 @@ class Memory(object):
             )
 
         if address in self._write_word_callbacks:
+            self.write_callback_count += 1
             return self._write_word_callbacks[address](
                 self.cpu.cycles, self.cpu.last_op_address, address, word
             )
@@ -308,12 +431,34 @@ class Memory(object):
 
     #---------------------------------------------------------------------------
 
+    def get_callback_counts(self):
+        return {
+            "read_callback": self.read_callback_count,
+            "write_callback": self.write_callback_count,
+            "read_middleware": self.read_middleware_count,
+            "write_middleware": self.write_middleware_count,
+        }
+
+    #---------------------------------------------------------------------------
+
     def get(self, start, end):
         """
         used in unittests
         """
         return [self.read_byte(addr) for addr in range(start, end)]
 
+    def get_block(self, start, end):
+        """
+        Return the raw memory content from start to end (exclusive) as bytearray.
+        Doesn't count CPU cycles and doesn't call any callbacks/middlewares,
+        so it's usable for debug tools without changing the emulation.
+
+        Like a slice, the block doesn't wrap around at $FFFF: it ends there.
+        A caller that needs the wrap-around (e.g. the trace of a instruction
+        at $FFFF) must read the rest from $0000 itself.
+        """
+        return bytearray(self._mem[start:end])
+
     def iter_bytes(self, start, end):
         for addr in range(start, end):
             yield addr, self.read_byte(addr)
@@ -334,3 +479,182 @@ class Memory(object):
         print("\n".join(["\t%s" % line for line in dump_lines]))
 
 
+# Unique ROM images, key is the SHA1 hexdigest of the content.
+# The values are never changed, so all SharedROMMemory instances
+# with the same ROM image can use the same buffer.
+_SHARED_ROMS = {}
+
+if PY2:
+    # indexing a Py2 str returns a character, not the byte value
+    _ROM_BUFFER_TYPE = bytearray
+else:
+    _ROM_BUFFER_TYPE = bytes
+
+
+def get_shared_rom(image):
+    """
+    Returns the shared buffer for the given ROM image.
+
+    >>> rom1 = get_shared_rom(bytearray([0x01, 0x02, 0x03]))
+    >>> rom2 = get_shared_rom(bytearray([0x01, 0x02, 0x03]))
+    >>> rom1 is rom2
+    True
+    >>> list(rom1)
+    [1, 2, 3]
+    """
+    key = hashlib.sha1(image).hexdigest()
+    try:
+        return _SHARED_ROMS[key]
+    except KeyError:
+        rom = _SHARED_ROMS[key] = _ROM_BUFFER_TYPE(image)
+        return rom
+
+
+def clear_shared_roms():
+    """
+    Forget all shared ROM images. Existing SharedROMMemory instances
+    will keep their ROM buffer.
+    """
+    _SHARED_ROMS.clear()
+
+
+class SharedROMMemory(Memory):
+    """
+    Memory that stores only the RAM area in the instance. The ROM area
+    is a read-only buffer, that is shared with all other SharedROMMemory
+    instances with the same ROM content in this process.
+
+    The ROM can be a window below the end of the address space, e.g.:
+    ROM at $8000-$BFFF with cartridge, I/O and vectors above it. The
+    memory above cfg.ROM_END is private to the instance, like the RAM.
+
+    Writes into ROM are ignored, same as in Memory.
+    A load() into ROM (e.g. to set interrupt vectors) will make a private
+    copy of the ROM for this instance, but only if the content changed.
+    """
+    def _init_memory(self):
+        if not 0x0000 <= self.cfg.ROM_START <= self.cfg.ROM_END <= 0xFFFF:
+            raise ValueError("Bad ROM area $%04x-$%04x" % (self.cfg.ROM_START, self.cfg.ROM_END))
+        self._rom_start = self.cfg.ROM_START
+        self._high_start = self.cfg.ROM_END + 1
+
+        self._mem = array.array("B", [0x00]) * self._rom_start # unsigned char
+        # The private memory above the ROM, empty if the ROM ends at $FFFF:
+        self._high = array.array("B", [0x00]) * (self.INTERNAL_SIZE - self._high_start)
+
+        # Load the ROM files into a private image first:
+        self._rom = bytearray(self.ROM_SIZE)
+        self._rom_shared = False
+        if self.cfg and self.cfg.rom_cfg:
+            for romfile in self.cfg.rom_cfg:
+                self.load_file(romfile)
+
+        self._rom = get_shared_rom(self._rom)
+        self._rom_shared = True
+
+    def is_rom_shared(self):
+        return self._rom_shared
+
+    #---------------------------------------------------------------------------
+
+    def load(self, address, data):
+        if isinstance(data, string_type):
+            data = [ord(c) for c in data]
+
+        if address + len(data) > self.INTERNAL_SIZE:
+            raise OverflowError("load outside memory area: $%04x - data length: %iBytes" % (
+                address, len(data)
+            ))
+
+        if address < self._rom_start:
+            ram_data = data[:self._rom_start - address]
+            super(SharedROMMemory, self).load(address, ram_data)
+            data = data[len(ram_data):]
+            address = self._rom_start
+
+        if address < self._high_start:
+            rom_data = data[:self._high_start - address]
+            if len(rom_data) > 0:
+                self._load_rom(address, rom_data)
+            data = data[len(rom_data):]
+            address = self._high_start
+
+        if len(data) > 0:
+            offset = address - self._high_start
+            self._high[offset:offset + len(data)] = array.array("B", data)
+
+    def _load_rom(self, address, data):
+        offset = address - self._rom_start
+        data = bytearray(data)
+        if self._rom[offset:offset + len(data)] == data:
+            # e.g.: set_state() with the same ROM content
+            return
+
+        log.debug("ROM load at $%04x: %s", address,
+            ", ".join(["$%02x" % i for i in data])
+        )
+        if self._rom_shared:
+            log.info("ROM load at $%04x: Use a private ROM copy", address)
+            self._rom = bytearray(self._rom)
+            self._rom_shared = False
+        self._rom[offset:offset + len(data)] = data
+
+    #---------------------------------------------------------------------------
+
+    def read_byte(self, address):
+        if address < self._rom_start or address in self._read_byte_callbacks:
+            return super(SharedROMMemory, self).read_byte(address)
+
+        self.cpu.cycles += 1
+        if address < self._high_start:
+            byte = self._rom[address - self._rom_start]
+        else:
+            byte = self._high[address - self._high_start]
+
+        if address in self._read_byte_middleware:
+            self.read_middleware_count += 1
+            byte = self._read_byte_middleware[address](
+                self.cpu.cycles, self.cpu.last_op_address, address, byte
+            )
+            assert byte is not None, "Error: read byte middleware for $%04x func %r has return None!" % (
+                address, self._read_byte_middleware[address].__name__
+            )
+        return byte
+
+    def write_byte(self, address, value):
+        if address < self._high_start:
+            # write_byte() from Memory ignores all writes into the ROM area,
+            # so self._mem is never accessed with a ROM address.
+            return super(SharedROMMemory, self).write_byte(address, value)
+
+        self.cpu.cycles += 1
+
+        assert value >= 0, "Write negative byte hex:%00x dez:%i to $%04x" % (value, value, address)
+        assert value <= 0xff, "Write out of range byte hex:%02x dez:%i to $%04x" % (value, value, address)
+
+        if address in self._write_byte_middleware:
+            self.write_middleware_count += 1
+            value = self._write_byte_middleware[address](
+                self.cpu.cycles, self.cpu.last_op_address, address, value
+            )
+            assert value is not None, "Error: write byte middleware for $%04x func %r has return None!" % (
+                address, self._write_byte_middleware[address].__name__
+            )
+
+        if address in self._write_byte_callbacks:
+            self.write_callback_count += 1
+            return self._write_byte_callbacks[address](
+                self.cpu.cycles, self.cpu.last_op_address, address, value
+            )
+
+        self._high[address - self._high_start] = value
+
+    def get_block(self, start, end):
+        rom_start = self._rom_start
+        high_start = self._high_start
+        block = bytearray(self._mem[start:end])
+        if end > rom_start and start < high_start:
+            block += self._rom[max(start, rom_start) - rom_start:min(end, high_start) - rom_start]
+        if end > high_start:
+            block += bytearray(self._high[max(start, high_start) - high_start:end - high_start])
+        return block
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - remote bus
+    ===================
+
+    Emulate devices in a other process, e.g. video rendering or a disk,
+    in parallel to the CPU. Only the device pages are served remote,
+    the plain RAM stays in the CPU process:
+
+        bus = RemoteBus()
+        bus.start(VideoDevice) # the factory is called in the device process
+
+        memory = Memory(cfg, **bus.get_queues())
+        memory.add_remote_bus_area(0xFF00, 0xFF3F)
+        cpu = CPU(memory, cfg)
+        cpu.add_sync_callback(1000, lambda cycles: memory.flush_write_bus())
+        ...
+        bus.stop(memory)
+
+    The device is a object with the methods:
+
+        read_byte(cycles, address) -> byte
+        write_byte(cycles, address, value)
+
+    and optional read_word()/write_word(), otherwise words are split
+    into big-endian bytes.
+
+    The memory buffers the writes and sends them as batches via the
+    write_bus_queue, without waiting. A read request goes via the
+    read_bus_request_queue and the CPU waits for the value in the
+    read_bus_response_queue. Every write has a sequence number and
+    a read request contains the number of the last write: The device
+    server applies all writes up to this number, before it answers.
+
+    For the low latency of the reads, RemoteBus uses a SharedSlot for
+    the read request/response: One message in shared memory, signalled
+    with semaphores. A multiprocessing.Queue works, too, but every
+    message goes through a pipe and a feeder thread.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import ctypes
+import logging
+import multiprocessing
+import sys
+
+try:
+    from queue import Empty # Python 3
+except ImportError:
+    from Queue import Empty # Python 2
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+# Read request: seq, cycles, address, width, last write seq
+REQUEST_SIZE = 5
+# Read response: seq, value
+RESPONSE_SIZE = 2
+
+STOP_WIDTH = 0 # width of the stop request
+
+POLL_INTERVAL = 0.001 # sec. the device server applies writes while it waits for reads
+STOP_TIMEOUT = 10 # sec.
+
+SPIN = 100 # non-blocking tries before a SharedSlot.get() blocks
+
+
+def get_default_spin():
+    try:
+        cpu_count = multiprocessing.cpu_count()
+    except NotImplementedError:
+        cpu_count = 1
+    if cpu_count > 1:
+        return SPIN
+    return 0
+
+
+class SharedSlot(object):
+    """
+    A queue for one message of `size` integers in shared memory, for one
+    producer and one consumer process. Has the put()/get() API of a queue.
+    get() spins `spin` times before it blocks, because a blocked process
+    needs longer to wake up. Spinning makes only sense with more than one
+    CPU core, so spin=None spins only on multi core machines.
+    """
+    def __init__(self, size, spin=None):
+        if spin is None:
+            spin = get_default_spin()
+        self.size = size
+        self.spin = spin
+        self._values = multiprocessing.RawArray(ctypes.c_longlong, size)
+        self._empty = multiprocessing.Semaphore(1)
+        self._full = multiprocessing.Semaphore(0)
+
+    def put(self, values, block=True, timeout=None):
+        assert len(values) == self.size, "%i values for slot size %i" % (len(values), self.size)
+        if not self._empty.acquire(block, timeout):
+            raise RuntimeError("Slot is still full")
+        self._values[:] = values
+        self._full.release()
+
+    def get(self, block=True, timeout=None):
+        full = self._full
+        for __ in range(self.spin):
+            if full.acquire(False):
+                break
+        else:
+            if not full.acquire(block, timeout):
+                raise Empty
+        values = tuple(self._values)
+        self._empty.release()
+        return values
+
+
+def _apply_writes(device, batch, applied_seq):
+    for seq, cycles, address, width, value in batch:
+        if seq != applied_seq + 1:
+            raise RuntimeError("Remote bus: write %i after write %i" % (seq, applied_seq))
+        applied_seq = seq
+        if width == 1:
+            device.write_byte(cycles, address, value)
+        elif hasattr(device, "write_word"):
+            device.write_word(cycles, address, value)
+        else:
+            # 6809 is Big-Endian
+            device.write_byte(cycles, address, value >> 8)
+            device.write_byte(cycles, address + 1, value & 0xff)
+    return applied_seq
+
+
+def _read(device, cycles, address, width):
+    if width == 1:
+        return device.read_byte(cycles, address)
+    elif hasattr(device, "read_word"):
+        return device.read_word(cycles, address)
+    return (device.read_byte(cycles, address) << 8) + device.read_byte(cycles, address + 1)
+
+
+def serve_bus(device, read_bus_request_queue, read_bus_response_queue, write_bus_queue,
+        poll_interval=POLL_INTERVAL):
+    """
+    The loop of the device server, until the stop request is received.
+    """
+    applied_seq = 0
+    while True:
+        try:
+            request = read_bus_request_queue.get(timeout=poll_interval)
+        except Empty:
+            # No read: apply the writes that are already send
+            while True:
+                try:
+                    batch = write_bus_queue.get_nowait()
+                except Empty:
+                    break
+                applied_seq = _apply_writes(device, batch, applied_seq)
+            continue
+
+        seq, cycles, address, width, last_write_seq = request
+        while applied_seq < last_write_seq:
+            batch = write_bus_queue.get(timeout=STOP_TIMEOUT)
+            applied_seq = _apply_writes(device, batch, applied_seq)
+
+        if width == STOP_WIDTH:
+            read_bus_response_queue.put((seq, 0))
+            return
+        read_bus_response_queue.put((seq, _read(device, cycles, address, width)))
+
+
+def _device_process(device_factory, read_bus_request_queue, read_bus_response_queue, write_bus_queue):
+    device = device_factory()
+    serve_bus(device, read_bus_request_queue, read_bus_response_queue, write_bus_queue)
+
+
+class RemoteBus(object):
+    """
+    Creates the bus queues and runs the device server in a other process.
+    """
+    def __init__(self, shared_memory=True, spin=None):
+        if shared_memory:
+            self.read_bus_request_queue = SharedSlot(REQUEST_SIZE, spin)
+            self.read_bus_response_queue = SharedSlot(RESPONSE_SIZE, spin)
+        else:
+            self.read_bus_request_queue = multiprocessing.Queue()
+            self.read_bus_response_queue = multiprocessing.Queue()
+        self.write_bus_queue = multiprocessing.Queue()
+        self.process = None
+
+    def get_queues(self):
+        """
+        The keyword arguments for Memory()
+        """
+        return {
+            "read_bus_request_queue": self.read_bus_request_queue,
+            "read_bus_response_queue": self.read_bus_response_queue,
+            "write_bus_queue": self.write_bus_queue,
+        }
+
+    def start(self, device_factory):
+        """
+        Start the device process. device_factory() creates the device
+        in the new process, so it must be picklable on Windows.
+        """
+        assert self.process is None, "Device process is already started!"
+        self.process = multiprocessing.Process(
+            target=_device_process,
+            args=(
+                device_factory,
+                self.read_bus_request_queue, self.read_bus_response_queue,
+                self.write_bus_queue,
+            ),
+        )
+        self.process.daemon = True
+        self.process.start()
+
+    def stop(self, memory):
+        """
+        Send all pending writes of the memory and stop the device process.
+        """
+        memory.close_remote_bus()
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            log.error("Device process doesn't stop, terminate it.")
+            self.process.terminate()
+        self.process = None
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
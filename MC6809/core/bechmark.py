@@ -13,14 +13,23 @@
 from __future__ import absolute_import, division, print_function
 
 import sys
+import json
 import locale
-import string
+import os
+import platform
+import subprocess
 import time
 import logging
+from timeit import default_timer
 
-from MC6809.tests.test_6809_program import Test6809_Program, \
-    Test6809_Program_Division2
+import MC6809
+from MC6809.core.hot_path_profiler import HotPathProfiler
 from MC6809.utils.humanize import locale_format_number
+from MC6809.utils.stats import summary, welch_t_test
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.memory import Memory
+from MC6809.workloads import create_cpu, get_workloads, get_scenarios
+from MC6809.workloads.base import WorkloadCfg, CFG_DICT
 
 PY2 = sys.version_info[0] == 2
 if PY2:
@@ -30,69 +39,441 @@ if PY2:
 log = logging.getLogger("MC6809")
 
 
-class Test6809_Program2(Test6809_Program):
-    def runTest(self):
-        pass
+RESULT_FORMAT_VERSION = 1
+
+# The compared values of the benchmark results:
+METRICS = ("cycles_per_sec", "instructions_per_sec")
+
+# A regression must be slower than this relative threshold
+# *and* statistically significant:
+DEFAULT_THRESHOLD = 0.02 # 2%
+DEFAULT_ALPHA = 0.05 # p-value of the Welch's t-test
+
+
+# Workloads of the benchmark, if nothing else is given:
+DEFAULT_WORKLOADS = ("crc16", "crc32")
+
+# Modules for the import time benchmark:
+DEFAULT_IMPORT_MODULES = (
+    "MC6809.components.cpu6809",
+    "MC6809.components.memory",
+    "MC6809.cli",
+)
+# Optional modules, that should be only imported if really needed:
+LAZY_MODULES = (
+    "MC6809.core.cpu_control_server",
+    "MC6809.core.scaling_benchmark",
+    "MC6809.components.cpu6809_trace",
+    "MC6809.components.MC6809data.MC6809_op_data",
+    "MC6809.components.MC6809data.MC6809_op_docs",
+    "MC6809.components.MC6809data.CPU6809_HTML_export",
+    "MC6809.components.MC6809data.CPU6809csv_export",
+    "multiprocessing",
+)
+
+# Runs in a new interpreter: measure one import
+IMPORT_CODE = """
+import sys
+from timeit import default_timer
+start_time = default_timer()
+import %(module)s
+duration = default_timer() - start_time
+import json
+print(json.dumps({
+    "duration": duration,
+    "lazy_loaded": [name for name in %(lazy_modules)r if name in sys.modules],
+}))
+"""
 
-    def bench(self, loops, multiply, func, msg):
-        print("\n%s benchmark" % msg)
 
-        self.setUp()
-        self.cpu.cycles = 0
+def bench(workload, loops, scenario=None):
+    """
+    Run one benchmark round on a fresh CPU.
+    Only the execution will be timed: not the setup and not the check.
+    Returns the duration and the CPU cycles/instructions of this round.
+    With a scenario: the callback/IRQ counts are stored in scenario.counts
+    """
+    cpu = create_cpu()
+    if scenario is not None:
+        scenario.install(cpu, workload)
+    duration = 0
+    for __ in range(loops):
+        workload.setup(cpu)
+        start_time = default_timer()
+        if scenario is None:
+            workload.execute(cpu)
+        else:
+            scenario.execute(cpu, workload)
+        duration += default_timer() - start_time
+        workload.check(cpu)
+    if scenario is not None:
+        scenario.counts = scenario.get_counts(cpu)
+    return duration, cpu.cycles, cpu.instruction_count
+
+
+def run_rounds(workload, loops, warmup, repeat, scenario=None):
+    """
+    Run the warmup rounds (results are discarded) and the measured rounds.
+    Returns a dict with the samples and a summary of them.
+    """
+    if scenario is None:
+        print("\n%s benchmark" % workload.title)
+    else:
+        print("\n%s benchmark - scenario: %s (%s)" % (workload.title, scenario.title, scenario.description))
+    print("\nStart %i %s loops with multiply %i..." % (
+        loops, workload.title, workload.multiply
+    ))
+    print("(%s - %i warmup and %i measured rounds)" % (workload.description, warmup, repeat))
 
-        txt = string.printable
+    for __ in range(warmup):
+        bench(workload, loops, scenario)
 
-        if not PY2:
-            txt = bytes(txt, encoding="UTF-8")
+    samples = dict((metric, []) for metric in METRICS)
+    total_duration = 0
+    for round_no in range(1, repeat + 1):
+        duration, cycles, instructions = bench(workload, loops, scenario)
+        total_duration += duration
+        cycles_per_sec = cycles / duration
+        samples["cycles_per_sec"].append(cycles_per_sec)
+        samples["instructions_per_sec"].append(instructions / duration)
+        print("\tround %i: %.3f sec - %s CPU cycles/sec" % (
+            round_no, duration, locale_format_number(cycles_per_sec)
+        ))
 
-        txt = txt * multiply
+    result = {
+        "multiply": workload.multiply,
+        "cycles": cycles,
+        "instructions": instructions,
+        "total_duration": total_duration,
+        "samples": samples,
+    }
+    for metric in METRICS:
+        result[metric] = summary(samples[metric])
+    if scenario is not None:
+        result["scenario"] = scenario.name
+        result["scenario_counts"] = scenario.counts
+
+    print("%s benchmark runs %s CPU cycles per round" % (workload.title, locale_format_number(cycles)))
+    return result
+
+
+def print_summary(results):
+    print("\n%-20s %-20s %12s %12s %12s %8s" % (
+        "name", "metric", "median", "min", "max", "stdev"
+    ))
+    print("-" * 89)
+    for name, result in sorted(results["benchmarks"].items()):
+        for metric in METRICS:
+            data = result[metric]
+            if data["median"]:
+                stdev_percent = data["stdev"] / data["median"] * 100
+            else:
+                stdev_percent = 0
+            print("%-20s %-20s %12s %12s %12s %7.2f%%" % (
+                name, metric,
+                locale_format_number(data["median"]),
+                locale_format_number(data["min"]),
+                locale_format_number(data["max"]),
+                stdev_percent,
+            ))
+
+
+def get_benchmark_name(workload, scenario):
+    """
+    The bare scenario used the plain workload name,
+    so the results are comparable with results without scenarios.
+    """
+    if scenario is None or scenario.name == "bare":
+        return workload.name
+    return "%s+%s" % (workload.name, scenario.name)
+
+
+def print_scenario_penalty(results):
+    """
+    Print the throughput penalty of every scenario against the bare scenario.
+    """
+    benchmarks = results["benchmarks"]
+    print("\n%-22s %14s %9s  %s" % ("workload+scenario", "cycles/sec", "penalty", "callbacks/IRQs"))
+    print("-" * 79)
+    for name, result in sorted(benchmarks.items()):
+        if "scenario" not in result:
+            continue
+        workload_name = name.split("+")[0]
+        bare_median = benchmarks[workload_name]["cycles_per_sec"]["median"]
+        median = result["cycles_per_sec"]["median"]
+        counts = ", ".join([
+            "%s=%i" % (key, value) for key, value in sorted(result["scenario_counts"].items()) if value
+        ])
+        print("%-22s %14s %+8.2f%%  %s" % (
+            name, locale_format_number(median),
+            (bare_median - median) / bare_median * 100,
+            counts or "-"
+        ))
 
-        print("\nStart %i %s loops with %i Bytes test string..." % (
-            loops, msg, len(txt)
+
+def compare_results(baseline, results, threshold=DEFAULT_THRESHOLD, alpha=DEFAULT_ALPHA):
+    """
+    Compare the samples of two benchmark results.
+    Returns a list of:
+        (name, metric, baseline median, median, relative change, p-value, regression)
+    Only benchmarks that exists in both results will be compared.
+    """
+    comparison = []
+    for name, result in sorted(results["benchmarks"].items()):
+        try:
+            baseline_result = baseline["benchmarks"][name]
+        except KeyError:
+            log.warning("Benchmark %r not in baseline, skip.", name)
+            continue
+
+        for metric in METRICS:
+            baseline_samples = baseline_result["samples"][metric]
+            samples = result["samples"][metric]
+
+            baseline_median = baseline_result[metric]["median"]
+            median = result[metric]["median"]
+            change = (median - baseline_median) / baseline_median
+
+            t, df, p = welch_t_test(samples, baseline_samples)
+            regression = change < -threshold and p < alpha
+
+            comparison.append(
+                (name, metric, baseline_median, median, change, p, regression)
+            )
+    return comparison
+
+
+def print_comparison(comparison):
+    print("\n%-20s %-20s %12s %12s %8s %8s" % (
+        "name", "metric", "baseline", "current", "change", "p-value"
+    ))
+    print("-" * 79)
+    for name, metric, baseline_median, median, change, p, regression in comparison:
+        print("%-20s %-20s %12s %12s %+7.2f%% %8.4f%s" % (
+            name, metric,
+            locale_format_number(baseline_median),
+            locale_format_number(median),
+            change * 100, p,
+            " *** REGRESSION ***" if regression else "",
         ))
 
-        start_time = time.time()
-        for __ in range(loops):
-            self._crc32(txt)
-        duration = time.time() - start_time
 
-        print("%s benchmark runs %s CPU cycles in %.2f sec" % (
-            msg, locale_format_number(self.cpu.cycles), duration
+def load_results(filename):
+    with open(filename, "r") as f:
+        results = json.load(f)
+    if results.get("format_version") != RESULT_FORMAT_VERSION:
+        raise ValueError("%r is not a benchmark result file in format version %i" % (
+            filename, RESULT_FORMAT_VERSION
         ))
+    return results
+
+
+def save_results(filename, results):
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+
+def run_benchmark(loops, multiply=None, warmup=1, repeat=5, json_file=None, compare_file=None,
+                  threshold=DEFAULT_THRESHOLD, alpha=DEFAULT_ALPHA, workloads=None, scenarios=None):
+    """
+    Run the benchmark with the given workload names (default: CRC16 and CRC32)
+    multiply=None will use the default of every workload.
+    With scenario names: run every workload with the bare and the given scenarios.
+    Returns the comparison against the baseline, if compare_file is given.
+    """
+    # Load the baseline first: Don't run the benchmark on a invalid file
+    if compare_file is not None:
+        if repeat < 2:
+            # welch_t_test() needs 2 samples, otherwise p is always 1.0
+            raise ValueError("A comparison needs at least 2 measured rounds, not %i" % repeat)
+        baseline = load_results(compare_file)
+
+    if not workloads:
+        workloads = DEFAULT_WORKLOADS
+    workloads = get_workloads(workloads, multiply)
+
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "mc6809_version": MC6809.__version__,
+        "python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "loops": loops,
+        "multiply": multiply,
+        "warmup": warmup,
+        "repeat": repeat,
+        "scenarios": scenarios or None,
+        "benchmarks": {},
+    }
+    benchmarks = results["benchmarks"]
+
+    for workload in workloads:
+        if not scenarios:
+            benchmarks[workload.name] = run_rounds(workload, loops, warmup, repeat)
+            continue
+        for scenario in get_scenarios(scenarios):
+            name = get_benchmark_name(workload, scenario)
+            benchmarks[name] = run_rounds(workload, loops, warmup, repeat, scenario)
+
+    #--------------------------------------------------------------------------
+    print("-"*79)
+    total_duration = sum([result["total_duration"] for result in benchmarks.values()])
+    total_cycles = sum([result["cycles"] * repeat for result in benchmarks.values()])
+    print("\nTotal of %i benchmark loops run in %.2f sec %s CPU cycles." % (
+        loops * repeat, total_duration, locale_format_number(total_cycles)
+    ))
+    print("\tavg.: %s CPU cycles/sec" % locale_format_number(total_cycles / total_duration))
 
-        return duration, self.cpu.cycles
+    print_summary(results)
+    if scenarios:
+        print_scenario_penalty(results)
+
+    if json_file is not None:
+        save_results(json_file, results)
+        print("\nResults saved to %r" % json_file)
+
+    if compare_file is not None:
+        comparison = compare_results(baseline, results, threshold, alpha)
+        print_comparison(comparison)
+        return comparison
+
+
+def run_construction_benchmark(count=1000, repeat=5, json_file=None, memory_class=Memory):
+    """
+    Measure the creation of Memory and CPU instances.
+    Returns a dict with the microseconds per instance of every round.
+    """
+    cfg = WorkloadCfg(CFG_DICT)
+    create_cpu(memory_class=memory_class) # build the class-level dispatch description before measuring
+
+    print("\nCreate %i %s/CPU instances in %i rounds..." % (count, memory_class.__name__, repeat))
+    samples = {"memory": [], "cpu": [], "total": []}
+    for round_no in range(1, repeat + 1):
+        memory_duration = 0
+        cpu_duration = 0
+        for __ in range(count):
+            start_time = default_timer()
+            memory = memory_class(cfg)
+            memory_time = default_timer()
+            CPU(memory, cfg)
+            cpu_time = default_timer()
+            memory_duration += memory_time - start_time
+            cpu_duration += cpu_time - memory_time
+
+        samples["memory"].append(memory_duration / count * 1000000)
+        samples["cpu"].append(cpu_duration / count * 1000000)
+        samples["total"].append((memory_duration + cpu_duration) / count * 1000000)
+        print("\tround %i: %.1f usec per instance" % (round_no, samples["total"][-1]))
+
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "mc6809_version": MC6809.__version__,
+        "python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "count": count,
+        "repeat": repeat,
+        "memory_class": memory_class.__name__,
+        "samples": samples,
+    }
+    print("\n%-8s %13s %13s %13s" % ("", "median", "min", "max"))
+    print("-" * 50)
+    for name in ("memory", "cpu", "total"):
+        results[name] = data = summary(samples[name])
+        print("%-8s %9.1fusec %9.1fusec %9.1fusec" % (
+            name, data["median"], data["min"], data["max"]
+        ))
 
-    def crc32_benchmark(self, loops, multiply):
-        return self.bench(loops, multiply, self._crc32, "CRC32")
+    if json_file is not None:
+        save_results(json_file, results)
+        print("\nResults saved to %r" % json_file)
+    return results
 
-    def crc16_benchmark(self, loops, multiply):
-        return self.bench(loops, multiply, self._crc16, "CRC16")
 
+def measure_import(module, lazy_modules=LAZY_MODULES):
+    """
+    Import the module in a new Python interpreter.
+    Returns the import duration, the wall clock time of the process
+    (interpreter startup + import) and the loaded lazy modules.
+    """
+    code = IMPORT_CODE % {"module": module, "lazy_modules": tuple(lazy_modules)}
 
+    env = dict(os.environ)
+    package_path = os.path.dirname(os.path.dirname(os.path.abspath(MC6809.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        [package_path] + [path for path in [env.get("PYTHONPATH")] if path]
+    )
 
-def run_benchmark(loops, multiply):
-    total_duration = 0
-    total_cycles = 0
-    bench_class = Test6809_Program2()
+    start_time = default_timer()
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    process_duration = default_timer() - start_time
+
+    result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+    result["process_duration"] = process_duration
+    return result
+
+
+def run_import_benchmark(modules=None, repeat=5, json_file=None):
+    """
+    Measure the import time of the given modules (default: DEFAULT_IMPORT_MODULES)
+    Every import runs in a new interpreter.
+    """
+    if not modules:
+        modules = DEFAULT_IMPORT_MODULES
+
+    print("\nImport %i modules %i times in a new interpreter..." % (len(modules), repeat))
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "mc6809_version": MC6809.__version__,
+        "python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "repeat": repeat,
+        "imports": {},
+    }
+    print("\n%-35s %12s %12s %12s" % ("module", "import", "min", "process"))
+    print("-" * 79)
+    for module in modules:
+        samples = {"duration": [], "process_duration": []}
+        for __ in range(repeat):
+            result = measure_import(module)
+            samples["duration"].append(result["duration"] * 1000)
+            samples["process_duration"].append(result["process_duration"] * 1000)
+
+        results["imports"][module] = data = {
+            "samples": samples,
+            "duration": summary(samples["duration"]),
+            "process_duration": summary(samples["process_duration"]),
+            "lazy_loaded": result["lazy_loaded"],
+        }
+        print("%-35s %10.1fms %10.1fms %10.1fms" % (
+            module,
+            data["duration"]["median"], data["duration"]["min"],
+            data["process_duration"]["median"],
+        ))
+        if data["lazy_loaded"]:
+            print("\t*** loaded optional modules: %s" % ", ".join(data["lazy_loaded"]))
 
-    #--------------------------------------------------------------------------
+    if json_file is not None:
+        save_results(json_file, results)
+        print("\nResults saved to %r" % json_file)
+    return results
 
-    duration, cycles = bench_class.crc16_benchmark(loops, multiply)
-    total_duration += duration
-    total_cycles += cycles
 
-    #--------------------------------------------------------------------------
+def run_hot_path_profile(loops, multiply=None, workload="crc32"):
+    workload = get_workloads([workload], multiply)[0]
+    cpu = create_cpu()
 
-    duration, cycles = bench_class.crc32_benchmark(loops, multiply)
-    total_duration += duration
-    total_cycles += cycles
+    print("\nProfile %i %s loops with multiply %i..." % (loops, workload.title, workload.multiply))
 
-    #--------------------------------------------------------------------------
-    print("-"*79)
-    print("\nTotal of %i benchmak loops run in %.2f sec %s CPU cycles." % (
-        loops, total_duration, locale_format_number(total_cycles)
-    ))
-    print("\tavg.: %s CPU cycles/sec" % locale_format_number(total_cycles / total_duration))
+    profiler = HotPathProfiler(cpu)
+    with profiler:
+        for __ in range(loops):
+            workload.setup(cpu)
+            workload.execute(cpu)
+            workload.check(cpu)
+    print()
+    profiler.print_report()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - warm boot snapshot cache
+    =================================
+
+    A machine spends millions of CPU cycles in the ROM initialisation
+    (RAM test, clear screen etc.) before anything useful happens. The boot
+    cache stores the state after boot_cycles in a local directory and
+    restores it on the next boot, instead of emulating the boot again:
+
+        boot_cache = BootCache() # opt-in: nothing is cached without it
+        boot_cache.boot(cpu, boot_cycles=2000000)
+
+    The cache key is built from all inputs of the boot: The config class,
+    the memory layout, the hashes of the ROM files and of the memory
+    content before the boot, the boot cycles and the version of the
+    emulator and the save state format. If any of them changes, the old
+    snapshot is not used anymore.
+
+    The devices are not part of the CPU state: Use get_device_state and
+    set_device_state to store the device state in the snapshot, too.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+
+import MC6809
+from MC6809.core import save_state
+
+
+log = logging.getLogger("MC6809")
+
+
+ENV_NAME = "MC6809_BOOT_CACHE"
+FILE_EXTENSION = ".state"
+
+
+def get_default_directory():
+    """
+    The directory from the environment variable MC6809_BOOT_CACHE
+    or ~/.cache/MC6809/boot
+    """
+    directory = os.environ.get(ENV_NAME)
+    if not directory:
+        directory = os.path.join(os.path.expanduser("~"), ".cache", "MC6809", "boot")
+    return directory
+
+
+def get_rom_hashes(cfg):
+    rom_cfg = cfg.rom_cfg or ()
+    if isinstance(rom_cfg, dict):
+        rom_cfg = rom_cfg.values()
+    return sorted([
+        (romfile.address, hashlib.sha1(bytes(bytearray(romfile.get_data()))).hexdigest())
+        for romfile in rom_cfg
+    ])
+
+
+def get_boot_key(cpu, boot_cycles):
+    """
+    Returns the cache key for booting the CPU with the current memory.
+    """
+    cfg = cpu.cfg
+    cfg_class = cfg.__class__
+    inputs = {
+        "cfg": "%s.%s" % (cfg_class.__module__, cfg_class.__name__),
+        "memory_layout": [cfg.RAM_START, cfg.RAM_END, cfg.ROM_START, cfg.ROM_END],
+        "memory_class": cpu.memory.__class__.__name__,
+        "roms": get_rom_hashes(cfg),
+        "memory": hashlib.sha1(bytes(cpu.memory.get_block(0x0000, 0x10000))).hexdigest(),
+        "boot_cycles": boot_cycles,
+        "mc6809_version": MC6809.__version__,
+        "save_state_version": save_state.FORMAT_VERSION,
+    }
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class BootCache(object):
+    def __init__(self, directory=None, compression="zlib"):
+        if directory is None:
+            directory = get_default_directory()
+        self.directory = directory
+        self.compression = compression
+
+    def __repr__(self):
+        return "<BootCache %r>" % self.directory
+
+    def get_filepath(self, key):
+        return os.path.join(self.directory, key + FILE_EXTENSION)
+
+    def _write(self, filepath, data):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # Write a temp file first, so other processes never see a half written file:
+        fd, temp_filepath = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                os.replace(temp_filepath, filepath) # Python 3.3+
+            except AttributeError:
+                os.rename(temp_filepath, filepath)
+        except Exception:
+            os.remove(temp_filepath)
+            raise
+
+    def boot(self, cpu, boot_cycles, get_device_state=None, set_device_state=None):
+        """
+        Reset the CPU and run it boot_cycles or restore the cached state.
+        Returns True if the state came from the cache.
+        """
+        key = get_boot_key(cpu, boot_cycles)
+        filepath = self.get_filepath(key)
+        try:
+            with open(filepath, "rb") as f:
+                device_state = cpu.load_state(f)
+        except (IOError, OSError):
+            pass # not cached, yet
+        except save_state.SaveStateError as err:
+            log.error("Ignore broken boot snapshot %r: %s", filepath, err)
+        else:
+            log.info("Boot state restored from %r", filepath)
+            if set_device_state is not None:
+                set_device_state(device_state)
+            return True
+
+        cpu.reset()
+        end_cycles = cpu.cycles + boot_cycles
+        cpu.cycle_burst_run(boot_cycles)
+        if cpu.cycles < end_cycles:
+            raise RuntimeError("CPU stopped while booting at cycle %i" % cpu.cycles)
+
+        if get_device_state is None:
+            device_state = None
+        else:
+            device_state = get_device_state()
+        f = io.BytesIO()
+        cpu.save_state(f, compression=self.compression, device_state=device_state)
+        self._write(filepath, f.getvalue())
+        log.info("Boot state saved to %r", filepath)
+        return False
+
+    def clear(self):
+        """
+        Remove all cached boot snapshots.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith(FILE_EXTENSION):
+                os.remove(os.path.join(self.directory, filename))
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -15,6 +15,13 @@ import inspect
 import logging
 import sys
 
+try:
+    from collections.abc import Mapping # Python 3
+except ImportError:
+    from collections import Mapping # Python 2
+
+from MC6809.core.memory_info import AddressRegionIndex
+
 PY2 = sys.version_info[0] == 2
 if PY2:
     range = xrange
@@ -29,28 +36,59 @@ class DummyMemInfo(object):
         return ">>mem info not active<<"
 
 
-class AddressAreas(dict):
+class AddressAreas(Mapping):
     """
     Hold information about memory address areas which accessed via bus.
     e.g.:
         Interrupt vectors
         Text screen
         Serial/parallel devices
+
+    Usable like a dict with the address as key. The areas are stored
+    in a AddressRegionIndex, so there is no dict entry per address.
+    If areas overlap, the last added area wins.
     """
     def __init__(self, areas):
         super(AddressAreas, self).__init__()
+        self.region_index = AddressRegionIndex(prefer_shortest=False)
         for start_addr, end_addr, txt in areas:
             self.add_area(start_addr, end_addr, txt)
 
     def add_area(self, start_addr, end_addr, txt):
-        for addr in range(start_addr, end_addr + 1):
-            dict.__setitem__(self, addr, txt)
+        self.region_index.add_area(start_addr, end_addr, txt)
+
+    def __getitem__(self, addr):
+        try:
+            area = self.region_index.get(addr)
+        except IndexError:
+            area = None
+        if area is None:
+            raise KeyError(addr)
+        return area[2]
+
+    def __contains__(self, addr):
+        try:
+            return self.region_index.get_index(addr) != 0
+        except IndexError:
+            return False
+
+    def __iter__(self):
+        table = self.region_index.table
+        for addr in range(len(table)):
+            if table[addr]:
+                yield addr
+
+    def __len__(self):
+        return len(self.region_index.table) - self.region_index.table.count(0)
 
 
 class BaseConfig(object):
-#     # http address/port number for the CPU control server
-#     CPU_CONTROL_ADDR = "127.0.0.1"
-#     CPU_CONTROL_PORT = 6809
+    # Start the CPU control http server? (Only for local usage)
+    CPU_CONTROL_SERVER = False
+
+    # http address/port number for the CPU control server
+    CPU_CONTROL_ADDR = "127.0.0.1"
+    CPU_CONTROL_PORT = 6809
 
     # How many ops should be execute before make a control server update cycle?
     BURST_COUNT = 10000
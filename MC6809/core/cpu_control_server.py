@@ -5,9 +5,30 @@
     DragonPy - CPU control http server
     ==================================
 
-    TODO: Use bottle!
+    A asyncio HTTP + WebSocket server to control the CPU. Only the
+    standard library is used, see MC6809.core.websocket
 
-    :copyleft: 2013-2014 by the MC6809 team, see AUTHORS for more details.
+    The server never touches the CPU in the middle of a burst: Every request
+    puts a command in a CommandQueue and the CPU loop executes the commands
+    between two bursts. So the CPU never waits for network I/O.
+
+    There are two ways to run it:
+
+    * Activated via cfg.CPU_CONTROL_SERVER: The server runs in a own thread
+      with a own event loop and CPU.run() executes the commands.
+
+    * In the same event loop as the CPU:
+
+        server = ControlServer(cpu)
+        await server.start("127.0.0.1", 6809)
+        await server.run_cpu(cycles_per_slice=10000, target_hz=895000)
+
+    Connect a WebSocket to /ws/ to get a stream of the changed CPU state
+    as JSON, every state_interval seconds.
+
+    Only usable with Python 3.5 or newer.
+
+    :copyleft: 2013-2015 by the MC6809 team, see AUTHORS for more details.
     :license: GNU GPL v3 or above, see LICENSE for more details.
 
     Based on:
@@ -16,262 +37,899 @@
     more info, see README
 """
 
-from __future__ import absolute_import, division, print_function
-
-try:
-    from http.server import BaseHTTPRequestHandler # Python 3
-except ImportError:
-    from BaseHTTPServer import BaseHTTPRequestHandler # Python 2
-    range = xrange
-    
-
+import asyncio
+import collections
+import concurrent.futures
+import gzip
+import html
 import json
 import logging
 import os
 import re
-import select
 import sys
 import threading
 import traceback
+import zlib
+from urllib.parse import parse_qs, unquote, urlsplit
 
-import logging
+from MC6809.core import websocket
+from MC6809.core.cpu_metrics import prometheus_text
+from MC6809.core.cpu_registers import get_registers, set_registers
+from MC6809.core.disassembler import Disassembler
 
 log=logging.getLogger("MC6809")
 
 
-class ControlHandler(BaseHTTPRequestHandler):
+# The control server has no authentication, so only local usage is allowed:
+LOOPBACK_ADDRESSES = ("127.0.0.1", "localhost", "::1")
+
+STATE_INTERVAL = 0.5 # sec. between two WebSocket state updates
+COMMAND_TIMEOUT = 5 # sec. to wait for the CPU loop
+PAUSE_POLL_INTERVAL = 0.01 # sec.
+MAX_STEP_COUNT = 10000 # instructions per /step/ request: Don't block the CPU loop
+STOP_TIMEOUT = 5 # sec.
+
+MAX_HEADER_LINES = 100
+MAX_BODY_SIZE = 0x10000 * 4 # enough for the complete memory as JSON
+
+MEMORY_SIZE = 0x10000
+# Fast compression: The memory dumps are requested many times a second
+GZIP_LEVEL = 1
+
+HTTP_STATUS = {
+    101: "Switching Protocols",
+    200: "OK",
+    206: "Partial Content",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class CommandError(RuntimeError):
+    """
+    A command can't be executed, because no CPU loop processes the queue.
+    """
+    pass
+
+
+class CommandQueue(object):
+    """
+    The server puts commands (functions without arguments) into the queue
+    and the CPU loop executes them between two bursts. Thread safe.
 
-    def __init__(self, request, client_address, server, cpu):
-        log.error("ControlHandler %s %s %s", request, client_address, server)
+    As long as no CPU loop processes the queue, submit() executes the
+    commands directly, but only if the CPU is stopped: Otherwise the CPU
+    may be driven from a other thread, without run().
+    """
+    def __init__(self, cpu):
         self.cpu = cpu
+        self._commands = collections.deque()
+        self._condition = threading.Condition()
+        self.attached = False # True while a CPU loop processes the commands
+        self.closed = False # True after the CPU loop has ended, see: close()
+        self.paused = False
+
+    def _execute(self, func, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func()
+        except BaseException as err:
+            future.set_exception(err)
+        else:
+            future.set_result(result)
+
+    def submit(self, func):
+        """
+        Returns a concurrent.futures.Future with the result of func()
+        """
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self.attached and not self.cpu.running:
+                # The CPU loop ends, but hasn't called close() yet
+                self._close()
+            if self.closed:
+                future.set_exception(CommandError("CPU not running"))
+                return future
+            if self.attached:
+                self._commands.append((func, future))
+                self._condition.notify()
+                return future
+            if self.cpu.running:
+                future.set_exception(CommandError(
+                    "CPU is running, but no CPU loop executes the commands"
+                ))
+                return future
+            # Still holding the lock, so no CPU loop can start meanwhile:
+            self._execute(func, future)
+        return future
+
+    def _close(self):
+        self.attached = False
+        self.closed = True
+        commands = list(self._commands)
+        self._commands.clear()
+        for func, future in commands:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(CommandError("CPU not running"))
+
+    def process(self, cpu, block=True):
+        """
+        Called by the CPU loop between two bursts: Execute all queued commands.
+        With block=True, it doesn't return while the CPU is paused.
+        """
+        condition = self._condition
+        while True:
+            with condition:
+                self.attached = True
+                self.closed = False
+                if not self._commands:
+                    if not (block and self.paused and cpu.running):
+                        return
+                    condition.wait(PAUSE_POLL_INTERVAL)
+                    continue
+                commands = list(self._commands)
+                self._commands.clear()
+
+            for func, future in commands:
+                self._execute(func, future)
+
+    def detach(self):
+        """
+        The CPU loop ends in the same thread as the server: Execute the
+        remaining commands and all further commands directly.
+        """
+        with self._condition:
+            self.attached = False
+            self.closed = False
+            commands = list(self._commands)
+            self._commands.clear()
+            for func, future in commands:
+                self._execute(func, future)
+
+    def close(self):
+        """
+        The CPU loop in a other thread ends, because the CPU isn't running
+        anymore: Fail the remaining and all further commands, instead of
+        waiting for the timeout.
+        """
+        with self._condition:
+            self._close()
+
+
+class HttpError(Exception):
+    def __init__(self, status_code, msg, headers=None):
+        super(HttpError, self).__init__(msg)
+        self.status_code = status_code
+        self.headers = headers
+
+
+class Request(object):
+    def __init__(self, method, target, version, headers, body=b""):
+        self.method = method
+        self.target = target
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = parse_qs(url.query)
+        self.version = version
+        self.headers = headers # lower case header names
+        self.body = body
+
+    def __repr__(self):
+        return "<Request %s %s>" % (self.method, self.target)
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class Response(object):
+    def __init__(self, body=b"", status_code=200, content_type="text/html; charset=utf-8", headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        self.body = body
+        self.status_code = status_code
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    def encode(self, keep_alive=True):
+        lines = ["HTTP/1.1 %i %s" % (self.status_code, HTTP_STATUS.get(self.status_code, ""))]
+        if self.status_code != 101: # "Switching Protocols" has no content
+            lines.append("Content-Type: %s" % self.content_type)
+            lines.append("Content-Length: %i" % len(self.body))
+        if not keep_alive:
+            lines.append("Connection: close")
+        for name, value in sorted(self.headers.items()):
+            lines.append("%s: %s" % (name, value))
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        return head.encode("latin-1") + self.body
+
+
+def json_response(data, status_code=200):
+    return Response(json.dumps(data), status_code, content_type="application/json")
+
+
+def html_response(headline, text="", status_code=200):
+    """
+    The headline is escaped, the text must be HTML.
+    """
+    content = (
+        "<!DOCTYPE html><html><body>"
+        "<h1>%s</h1>"
+        "%s"
+        "</body></html>"
+    ) % (html.escape(headline), text)
+    return Response(content, status_code)
+
+
+def error_response(status_code, msg, tb_txt=""):
+    """
+    >>> b"<p>url /&lt;b&gt;&amp; not found</p>" in error_response(404, "url /<b>& not found").body
+    True
+    """
+    content = (
+        "<!DOCTYPE html><html><body>"
+        "<h1>DragonPy - 6809 CPU control server</h1>"
+        "<h2>%i - Error:</h2>"
+        "<p>%s</p>"
+    ) % (status_code, html.escape(str(msg)))
+    if tb_txt:
+        content += "<pre>%s</pre>" % html.escape(tb_txt)
+    content += "</body></html>"
+    return Response(content, status_code)
+
+
+async def read_request(reader):
+    """
+    Read the next HTTP request from the asyncio StreamReader.
+    Returns None if the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Bad request line: %r" % request_line)
+
+    headers = {}
+    for __ in range(MAX_HEADER_LINES):
+        line = (await reader.readline()).decode("latin-1")
+        if not line.strip():
+            break
+        name, __, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "Too many header lines")
+
+    try:
+        content_length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Bad Content-Length: %r" % headers["content-length"])
+    if content_length > MAX_BODY_SIZE:
+        raise HttpError(413, "Request body with %i bytes is too big" % content_length)
+    body = await reader.readexactly(content_length)
+    return Request(method, target, version, headers, body)
+
+
+def parse_byte_range(value, size):
+    """
+    Parse the value of a "Range" request header for a content with size bytes.
+    Returns (first, last) or None for multiple ranges or other units:
+    Then the complete content should be send.
+
+    >>> parse_byte_range("bytes=0-99", 0x10000)
+    (0, 99)
+    >>> parse_byte_range("bytes=65000-", 0x10000)
+    (65000, 65535)
+    >>> parse_byte_range("bytes=-16", 0x10000)
+    (65520, 65535)
+    >>> parse_byte_range("bytes=0-99999", 0x10000)
+    (0, 65535)
+    >>> parse_byte_range("bytes=0-1,5-6", 0x10000) is None
+    True
+    >>> parse_byte_range("bytes=70000-", 0x10000) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    HttpError: Range 'bytes=70000-' is not satisfiable for 65536 bytes
+    """
+    unit, __, byte_range = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        return None
+
+    first, __, last = byte_range.strip().partition("-")
+    try:
+        if not first:
+            # suffix range: the last n bytes
+            first = max(size - int(last), 0)
+            last = size - 1
+        else:
+            first = int(first)
+            last = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None # invalid header: ignore it
+
+    if first > last or first >= size:
+        raise HttpError(416, "Range %r is not satisfiable for %i bytes" % (value, size),
+            headers={"Content-Range": "bytes */%i" % size}
+        )
+    return first, last
+
+
+def parse_content_range(value):
+    """
+    Returns (first, last) of a "Content-Range" request header.
+
+    >>> parse_content_range("bytes 1024-2047/65536")
+    (1024, 2047)
+    >>> parse_content_range("bytes 1024-2047/*")
+    (1024, 2047)
+    """
+    m = re.match(r"bytes\s+(\d+)-(\d+)/(\d+|\*)$", value.strip())
+    if m is None:
+        raise HttpError(400, "Bad Content-Range: %r" % value)
+    return int(m.group(1)), int(m.group(2))
+
+
+def accepts_gzip(accept_encoding):
+    """
+    >>> accepts_gzip("gzip, deflate")
+    True
+    >>> accepts_gzip("deflate, gzip;q=0")
+    False
+    >>> accepts_gzip("")
+    False
+    """
+    for coding in accept_encoding.split(","):
+        name, __, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def decode_body(request, max_size=MEMORY_SIZE):
+    """
+    The request body, gzip decompressed if needed, but not more than max_size bytes.
+    """
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding == "identity":
+        data = request.body
+    elif encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # gzip header
+        try:
+            data = decompressor.decompress(request.body, max_size + 1)
+        except zlib.error as err:
+            raise HttpError(400, "Bad gzip body: %s" % err)
+    else:
+        raise HttpError(400, "Unsupported Content-Encoding: %r" % encoding)
+    if len(data) > max_size:
+        raise HttpError(413, "Body is bigger than %i bytes" % max_size)
+    return data
+
+
+def parse_range(m):
+    """
+    The start/end address of the url patterns /memory/<start>(-<end>)/
+
+    >>> parse_range(re.match(r"([0-9a-f]+)(-([0-9a-f]+))?$", "fff0-ffff"))
+    (65520, 65535)
+    >>> parse_range(re.match(r"([0-9a-f]+)(-([0-9a-f]+))?$", "fff0-1000f")) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    HttpError: $fff0-$1000f is outside the memory
+    """
+    start = int(m.group(1), 16)
+    e = m.group(3)
+    if e is not None:
+        end = int(e, 16)
+    else:
+        end = start
+    if end >= MEMORY_SIZE:
+        raise HttpError(400, "$%04x-$%04x is outside the memory" % (start, end))
+    if start > end:
+        raise HttpError(400, "Start $%04x is after the end $%04x" % (start, end))
+    return start, end
 
-        self.get_urls = {
-            r"/disassemble/(\s+)/$": self.get_disassemble,
-            r"/memory/(\s+)(-(\s+))?/$": self.get_memory,
-            r"/memory/(\s+)(-(\s+))?/raw/$": self.get_memory_raw,
+
+class ControlServer(object):
+    def __init__(self, cpu, commands=None, state_interval=STATE_INTERVAL):
+        self.cpu = cpu
+        if commands is None:
+            commands = CommandQueue(cpu)
+        self.commands = commands
+        self.state_interval = state_interval
+        self.disassembler = Disassembler(cpu.memory)
+
+        self.server = None
+        self.server_address = None
+        self.writers = set() # of the open connections
+        self.websocket_tasks = set()
+
+        # Only used in the thread mode, see: start_http_control_server()
+        self.loop = None
+        self.thread = None
+
+        self.get_urls = self._compile_urls({
+            r"/disassemble/([0-9a-fA-F]+)/$": self.get_disassemble,
+            r"/memory/([0-9a-fA-F]+)(-([0-9a-fA-F]+))?/$": self.get_memory,
+            r"/memory/([0-9a-fA-F]+)(-([0-9a-fA-F]+))?/raw/$": self.get_memory_raw,
+            r"/memory\.bin$": self.get_memory_bin,
+            r"/registers/$": self.get_registers,
             r"/status/$": self.get_status,
+            r"/metrics$": self.get_metrics,
+            r"/health/?$": self.get_health,
             r"/$": self.get_index,
-        }
-
-        self.post_urls = {
-            r"/memory/(\s+)(-(\s+))?/$": self.post_memory,
-            r"/memory/(\s+)(-(\s+))?/raw/$": self.post_memory_raw,
+        })
+
+        self.post_urls = self._compile_urls({
+            r"/memory/([0-9a-fA-F]+)(-([0-9a-fA-F]+))?/$": self.post_memory,
+            r"/memory/([0-9a-fA-F]+)(-([0-9a-fA-F]+))?/raw/$": self.post_memory_raw,
+            r"/registers/$": self.post_registers,
+            r"/pause/$": self.post_pause,
+            r"/resume/$": self.post_resume,
+            r"/step/$": self.post_step,
             r"/quit/$": self.post_quit,
             r"/reset/$": self.post_reset,
             r"/debug/$": self.post_debug,
-        }
-
-        BaseHTTPRequestHandler.__init__(self, request, client_address, server)
-
-    def log_message(self, format, *args):
-        msg = "%s - - [%s] %s\n" % (
-            self.client_address[0], self.log_date_time_string(), format % args
-        )
-        log.critical(msg)
+        })
+
+        self.put_urls = self._compile_urls({
+            r"/memory\.bin$": self.put_memory_bin,
+        })
+
+    def _compile_urls(self, urls):
+        return [(re.compile(r), f) for r, f in urls.items()]
+
+    def __repr__(self):
+        return "<ControlServer %s>" % (self.server_address,)
+
+    async def start(self, host, port):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.server_address = self.server.sockets[0].getsockname()
+        log.info("Start http control server on: http://%s:%s", *self.server_address[:2])
+
+    async def close(self):
+        if self.server is None:
+            return
+        self.server.close()
+        for task in list(self.websocket_tasks):
+            task.cancel()
+        if self.websocket_tasks:
+            await asyncio.wait(self.websocket_tasks)
+        # Close the keep-alive connections, wait_closed() waits for them:
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+        self.server = None
+
+    async def run_cpu(self, cycles_per_slice=10000, target_hz=None, max_cycles=None):
+        """
+        Run the CPU in the event loop, execute the commands between the slices.
+        Returns the number of executed CPU cycles, see: CPU.run_async()
+        """
+        cpu = self.cpu
+        commands = self.commands
+        start_cycles = cpu.cycles
+        try:
+            while cpu.running:
+                commands.process(cpu, block=False)
+                if commands.paused:
+                    await asyncio.sleep(PAUSE_POLL_INTERVAL)
+                    continue
+                slice_cycles = cycles_per_slice
+                if max_cycles is not None:
+                    slice_cycles = min(slice_cycles, start_cycles + max_cycles - cpu.cycles)
+                    if slice_cycles <= 0:
+                        break
+                await cpu.run_async(slice_cycles, target_hz, max_cycles=slice_cycles)
+        finally:
+            commands.detach()
+        return cpu.cycles - start_cycles
+
+    async def execute(self, func, *args):
+        """
+        Execute func(*args) between two bursts and returns the result.
+        """
+        future = self.commands.submit(lambda: func(*args))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), COMMAND_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HttpError(503, "CPU doesn't execute the command, is it running?")
+        except CommandError as err:
+            raise HttpError(503, str(err))
+
+    #---------------------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HttpError as err:
+                    writer.write(error_response(err.status_code, err).encode(keep_alive=False))
+                    break
+                if request is None:
+                    break
+                log.debug("%s from %s", request, writer.get_extra_info("peername"))
+
+                if request.headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(request, reader, writer)
+                    break
+
+                response = await self.dispatch(request)
+                keep_alive = request.keep_alive
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def dispatch(self, request):
+        if request.method == "GET":
+            urls = self.get_urls
+        elif request.method == "POST":
+            urls = self.post_urls
+        elif request.method == "PUT":
+            urls = self.put_urls
+        else:
+            return error_response(400, "Unsupported method %r" % request.method)
 
-    def dispatch(self, urls):
-        for r, f in list(urls.items()):
-            m = re.match(r, self.path)
+        for r, f in urls:
+            m = r.match(request.path)
             if m is not None:
-                log.critical("call %s", f.__name__)
+                log.debug("call %s", f.__name__)
                 try:
-                    f(m)
+                    return await f(request, m)
+                except HttpError as err:
+                    log.error("Error call %r: %s", f.__name__, err)
+                    response = error_response(err.status_code, err)
+                    if err.headers:
+                        response.headers.update(err.headers)
+                    return response
                 except Exception as err:
                     txt = traceback.format_exc()
-                    self.response_500("Error call %r: %s" % (f.__name__, err), txt)
-                return
-        else:
-            self.response_404("url %r doesn't match any urls" % self.path)
-
-    def response(self, s, status_code=200):
-        log.critical("send %s response", status_code)
-        self.send_response(status_code)
-        self.send_header("Content-Length", str(len(s)))
-        self.end_headers()
-        self.wfile.write(s)
-
-    def response_html(self, headline, text=""):
-        html = (
-            "<!DOCTYPE html><html><body>"
-            "<h1>%s</h1>"
-            "%s"
-            "</body></html>"
-        ) % (headline, text)
-        self.response(html)
-
-    def response_404(self, txt):
+                    log.error("Error call %r: %s\n%s", f.__name__, err, txt)
+                    return error_response(500, "Error call %r: %s" % (f.__name__, err), txt)
+        txt = "url %r doesn't match any urls" % request.path
         log.error(txt)
-        html = (
-            "<!DOCTYPE html><html><body>"
-            "<h1>DragonPy - 6809 CPU control server</h1>"
-            "<h2>404 - Error:</h2>"
-            "<p>%s</p>"
-            "</body></html>"
-        ) % txt
-        self.response(html, status_code=404)
-
-    def response_500(self, err, tb_txt):
-        log.error(err, tb_txt)
-        html = (
-            "<!DOCTYPE html><html><body>"
-            "<h1>DragonPy - 6809 CPU control server</h1>"
-            "<h2>500 - Error:</h2>"
-            "<p>%s</p>"
-            "<pre>%s</pre>"
-            "</body></html>"
-        ) % (err, tb_txt)
-        self.response(html, status_code=500)
-
-    def do_GET(self):
-        log.critical("do_GET(): %r", self.path)
-        self.dispatch(self.get_urls)
-
-    def do_POST(self):
-        log.critical("do_POST(): %r", self.path)
-        self.dispatch(self.post_urls)
-
-    def get_index(self, m):
-        self.response_html(
+        return error_response(404, txt)
+
+    #---------------------------------------------------------------------------
+
+    def get_state(self):
+        """
+        The CPU state for the WebSocket stream.
+        """
+        state = get_registers(self.cpu)
+        state["instruction_count"] = self.cpu.instruction_count
+        state["running"] = self.cpu.running
+        state["paused"] = self.commands.paused
+        return state
+
+    async def handle_websocket(self, request, reader, writer):
+        if request.path != "/ws/":
+            writer.write(error_response(404, "No WebSocket at %r" % request.path).encode(keep_alive=False))
+            return
+        key = request.headers.get("sec-websocket-key")
+        if not key:
+            writer.write(error_response(400, "Sec-WebSocket-Key is missing").encode(keep_alive=False))
+            return
+        response = Response(status_code=101, headers={
+            "Upgrade": "websocket",
+            "Connection": "Upgrade",
+            "Sec-WebSocket-Accept": websocket.get_accept_key(key),
+        })
+        writer.write(response.encode())
+        await writer.drain()
+
+        sender = asyncio.ensure_future(self.send_state_deltas(writer))
+        self.websocket_tasks.add(sender)
+        try:
+            while True:
+                # The client sends nothing, but ping and close frames:
+                opcode, payload = await websocket.read_message(reader, writer)
+                if opcode == websocket.OP_CLOSE:
+                    writer.write(websocket.encode_close_frame())
+                    break
+        except websocket.WebSocketError as err:
+            log.error("WebSocket error: %s", err)
+            writer.write(websocket.encode_close_frame(err.close_code))
+        finally:
+            sender.cancel()
+            self.websocket_tasks.discard(sender)
+
+    async def send_state_deltas(self, writer):
+        """
+        Send the complete CPU state and then only the changed values.
+        """
+        last_state = {}
+        while True:
+            try:
+                state = await self.execute(self.get_state)
+            except HttpError as err:
+                # The CPU loop doesn't respond: Try it later again
+                log.error("WebSocket state: %s", err)
+            else:
+                delta = dict(
+                    (key, value) for key, value in state.items()
+                    if last_state.get(key) != value
+                )
+                last_state = state
+                if delta:
+                    writer.write(websocket.encode_frame(json.dumps(delta)))
+                    await writer.drain()
+            await asyncio.sleep(self.state_interval)
+
+    #---------------------------------------------------------------------------
+
+    async def get_index(self, request, m):
+        return html_response(
             headline="DragonPy - 6809 CPU control server",
             text=(
             "<p>Example urls:"
             "<ul>"
             '<li>CPU status:<a href="/status/">/status/</a></li>'
+            '<li>CPU registers:<a href="/registers/">/registers/</a></li>'
+            '<li>Prometheus metrics:<a href="/metrics">/metrics</a></li>'
+            '<li>Health check:<a href="/health">/health</a></li>'
+            '<li>Disassemble 20 instructions:'
+            '<a href="/disassemble/8000/">/disassemble/8000/</a></li>'
             '<li>6809 interrupt vectors memory dump:'
             '<a href="/memory/fff0-ffff/">/memory/fff0-ffff/</a></li>'
+            '<li>WebSocket with the CPU state changes: /ws/</li>'
             '</ul>'
+            '<form action="/pause/" method="post">'
+            '<input type="submit" value="Pause CPU">'
+            '</form>'
+            '<form action="/resume/" method="post">'
+            '<input type="submit" value="Resume CPU">'
+            '</form>'
             '<form action="/quit/" method="post">'
             '<input type="submit" value="Quit CPU">'
             '</form>'
         ))
 
-    def get_disassemble(self, m):
-        addr = int(m.group(1))
-        r = []
-        n = 20
-        while n > 0:
-            dis, length = self.disassemble.disasm(addr)
-            r.append(dis)
-            addr += length
-            n -= 1
-        self.response(json.dumps(r))
-
-    def get_memory_raw(self, m):
-        addr = int(m.group(1))
-        e = m.group(3)
-        if e is not None:
-            end = int(e)
-        else:
-            end = addr
-        self.response("".join([chr(self.cpu.read_byte(x)) for x in range(addr, end + 1)]))
-
-    def get_memory(self, m):
+    async def get_disassemble(self, request, m):
+        """
+        Disassemble ?count=n instructions (default: 20) as text lines
+        """
         addr = int(m.group(1), 16)
-        e = m.group(3)
-        if e is not None:
-            end = int(e, 16)
+        try:
+            count = int(request.query.get("count", ["20"])[0])
+        except ValueError:
+            raise HttpError(400, "Bad count: %r" % request.query["count"])
+        lines = await self.execute(self.disassembler.format_lines, addr, None, count)
+        return json_response(lines)
+
+    # The memory endpoints use the block access of the memory: No CPU cycles
+    # are counted and no read/write callbacks of the devices are called.
+
+    def _read_memory(self, start, end):
+        return bytes(self.cpu.memory.get_block(start, end + 1))
+
+    async def binary_response(self, request, start, size):
+        """
+        size bytes memory from start as application/octet-stream,
+        with support for a single byte range or gzip.
+        """
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept-Encoding",
+        }
+        byte_range = None
+        if "range" in request.headers:
+            byte_range = parse_byte_range(request.headers["range"], size)
+        if byte_range is None:
+            status_code = 200
+            first, last = 0, size - 1
         else:
-            end = addr
-        self.response(json.dumps(list(map(self.cpu.read_byte, list(range(addr, end + 1))))))
-
-    def get_status(self, m):
-        data = {
+            status_code = 206
+            first, last = byte_range
+            headers["Content-Range"] = "bytes %i-%i/%i" % (first, last, size)
+
+        data = await self.execute(self._read_memory, start + first, start + last)
+        # The byte range would refer to the gzip body, so send partial content uncompressed:
+        if status_code == 200 and accepts_gzip(request.headers.get("accept-encoding", "")):
+            data = gzip.compress(data, GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return Response(data, status_code, content_type="application/octet-stream", headers=headers)
+
+    async def get_memory_raw(self, request, m):
+        start, end = parse_range(m)
+        return await self.binary_response(request, start, end - start + 1)
+
+    async def get_memory_bin(self, request, m):
+        """
+        The complete 64KB memory, e.g. parts of it with: "Range: bytes=1024-2047"
+        """
+        return await self.binary_response(request, 0, MEMORY_SIZE)
+
+    async def get_memory(self, request, m):
+        start, end = parse_range(m)
+        data = await self.execute(self._read_memory, start, end)
+        return json_response(list(bytearray(data)))
+
+    def _write_memory(self, start, end, data):
+        if len(data) != end - start + 1:
+            raise HttpError(400, "Got %i bytes for $%04x-$%04x" % (len(data), start, end))
+        if end >= MEMORY_SIZE: # e.g. from a Content-Range header
+            raise HttpError(400, "$%04x-$%04x is outside the memory" % (start, end))
+        self.cpu.memory.load(start, data)
+
+    async def post_memory(self, request, m):
+        start, end = parse_range(m)
+        data = json.loads(request.body.decode("utf-8"))
+        await self.execute(self._write_memory, start, end, data)
+        return Response("")
+
+    async def post_memory_raw(self, request, m):
+        start, end = parse_range(m)
+        await self.execute(self._write_memory, start, end, bytearray(decode_body(request)))
+        return Response("")
+
+    async def put_memory_bin(self, request, m):
+        """
+        Write the body into the memory, from address 0 or at the
+        position of a "Content-Range: bytes 1024-2047/65536" header.
+        """
+        data = bytearray(decode_body(request))
+        if "content-range" in request.headers:
+            start, end = parse_content_range(request.headers["content-range"])
+        else:
+            start, end = 0, len(data) - 1
+        await self.execute(self._write_memory, start, end, data)
+        return Response("")
+
+    async def get_registers(self, request, m):
+        return json_response(await self.execute(get_registers, self.cpu))
+
+    async def post_registers(self, request, m):
+        """
+        Set the registers from a JSON dict, e.g.: {"PC": 16384, "A": 1}
+        """
+        registers = json.loads(request.body.decode("utf-8"))
+        if not isinstance(registers, dict):
+            raise HttpError(400, "Registers must be a JSON object, not: %r" % registers)
+        await self.execute(set_registers, self.cpu, registers)
+        return json_response(await self.execute(get_registers, self.cpu))
+
+    def _get_status(self):
+        return {
             "cpu": self.cpu.get_info,
             "cc": self.cpu.cc.get_info,
             "pc": self.cpu.program_counter.get(),
             "cycle_count": self.cpu.cycles,
+            "running": self.cpu.running,
+            "paused": self.commands.paused,
         }
-        log.critical("status dict: %s", repr(data))
-        json_string = json.dumps(data)
-        self.response(json_string)
-
-    def post_memory(self, m):
-        addr = int(m.group(1))
-        e = m.group(3)
-        if e is not None:
-            end = int(e)
-        else:
-            end = addr
-        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
-        for i, a in enumerate(range(addr, end + 1)):
-            self.cpu.write_byte(a, data[i])
-        self.response("")
-
-    def post_memory_raw(self, m):
-        addr = int(m.group(1))
-        e = m.group(3)
-        if e is not None:
-            end = int(e)
-        else:
-            end = addr
-        data = self.rfile.read(int(self.headers["Content-Length"]))
-        for i, a in enumerate(range(addr, end + 1)):
-            self.cpu.write_byte(a, data[i])
-        self.response("")
 
-    def post_debug(self, m):
+    async def get_status(self, request, m):
+        data = await self.execute(self._get_status)
+        log.debug("status dict: %s", repr(data))
+        return json_response(data)
+
+    async def get_metrics(self, request, m):
+        # Only reads a snapshot, so no need to wait for the CPU loop:
+        metrics = self.cpu.get_metrics()
+        return Response(prometheus_text(metrics), content_type="text/plain; version=0.0.4")
+
+    async def get_health(self, request, m):
+        metrics = self.cpu.get_metrics()
+        data = {
+            "running": self.cpu.running,
+            "below_realtime": metrics["below_realtime"],
+            "realtime_ratio": metrics["realtime_ratio"],
+            "cycles": metrics["cycles"],
+        }
+        if self.cpu.running:
+            return json_response(data)
+        return json_response(data, status_code=503)
+
+    def _set_paused(self, paused):
+        self.commands.paused = paused
+        return self._get_status()
+
+    async def post_pause(self, request, m):
+        return json_response(await self.execute(self._set_paused, True))
+
+    async def post_resume(self, request, m):
+        return json_response(await self.execute(self._set_paused, False))
+
+    def _step(self, count):
+        cpu = self.cpu
+        for __ in range(count):
+            cpu.get_and_call_next_op()
+            cpu.call_sync_callbacks()
+        cpu.instruction_count += count
+        return self._get_status()
+
+    async def post_step(self, request, m):
+        """
+        Execute ?count=n instructions (default: 1, max. MAX_STEP_COUNT),
+        mainly for a paused CPU.
+        """
+        try:
+            count = int(request.query.get("count", ["1"])[0])
+        except ValueError:
+            raise HttpError(400, "Bad count: %r" % request.query["count"])
+        if not 1 <= count <= MAX_STEP_COUNT:
+            raise HttpError(400, "Count %i is not in 1..%i" % (count, MAX_STEP_COUNT))
+        return json_response(await self.execute(self._step, count))
+
+    async def post_debug(self, request, m):
         handler = logging.StreamHandler()
         handler.level = 5
         log.handlers = (handler,)
         log.critical("Activate full debug logging in %s!", __file__)
-        self.response("")
+        return Response("")
 
-    def post_quit(self, m):
+    async def post_quit(self, request, m):
         log.critical("Quit CPU from controller server.")
-        self.cpu.quit()
-        self.response_html(headline="CPU running")
-
-    def post_reset(self, m):
-        self.cpu.reset()
-        self.response_html(headline="CPU reset")
-
-
-class ControlHandlerFactory:
-    def __init__(self, cpu):
-        self.cpu = cpu
-    def __call__(self, request, client_address, server):
-        return ControlHandler(request, client_address, server, self.cpu)
+        await self.execute(self.cpu.quit)
+        return html_response(headline="CPU quit")
 
+    async def post_reset(self, request, m):
+        await self.execute(self.cpu.reset)
+        return html_response(headline="CPU reset")
 
-def control_server_thread(cpu, cfg, control_server):
-    # FIXME: Refactor this!
-    timeout = 1
-
-    sockets = [control_server]
-    rs, _, _ = select.select(sockets, [], [], timeout)
-    for s in rs:
-        if s is control_server:
-            control_server._handle_request_noblock()
-        else:
-            pass
-
-    if cpu.running:
-        threading.Timer(interval=0.5,
-            function=control_server_thread,
-            args=(cpu, cfg, control_server)
-        ).start()
-    else:
-        log.critical("Quit control server thread, because CPU doesn't run.")
 
 def start_http_control_server(cpu, cfg):
-    log.critical("TODO: What's with CPU control server???")
-    return
-
-    if not cfg.cfg_dict["use_bus"]:
+    """
+    Start the control http server with a own event loop in a daemon
+    thread, if activated via cfg.CPU_CONTROL_SERVER. CPU.run() executes
+    the commands. Returns the ControlServer instance or None.
+    Use stop_http_control_server() to shutdown the server.
+    """
+    if not getattr(cfg, "CPU_CONTROL_SERVER", False):
         log.info("Don't init CPU control server, ok.")
         return None
 
-    control_handler = ControlHandlerFactory(cpu)
-    server_address = (cfg.CPU_CONTROL_ADDR, cfg.CPU_CONTROL_PORT)
+    if cfg.CPU_CONTROL_ADDR not in LOOPBACK_ADDRESSES:
+        raise RuntimeError(
+            "CPU control server must listen on a loopback address, not on: %r" % cfg.CPU_CONTROL_ADDR
+        )
+
+    control_server = ControlServer(cpu)
+    loop = asyncio.new_event_loop()
     try:
-        control_server = http.server.HTTPServer(server_address, control_handler)
+        loop.run_until_complete(control_server.start(cfg.CPU_CONTROL_ADDR, cfg.CPU_CONTROL_PORT))
     except:
+        loop.close()
         cpu.running = False
         raise
-    url = "http://%s:%s" % server_address
-    log.error("Start http control server on: %s", url)
-
-    control_server_thread(cpu, cfg, control_server)
+    cpu.control_commands = control_server.commands
+
+    control_server.loop = loop
+    control_server.thread = threading.Thread(
+        target=loop.run_forever,
+        name="CPU-Control-Server-Thread"
+    )
+    control_server.thread.daemon = True
+    control_server.thread.start()
+    return control_server
+
+
+def stop_http_control_server(control_server):
+    loop = control_server.loop
+    future = asyncio.run_coroutine_threadsafe(control_server.close(), loop)
+    future.result(STOP_TIMEOUT)
+    loop.call_soon_threadsafe(loop.stop)
+    control_server.thread.join(STOP_TIMEOUT)
+    loop.close()
+    if control_server.cpu.control_commands is control_server.commands:
+        control_server.cpu.control_commands = None
 
 
 def test_run():
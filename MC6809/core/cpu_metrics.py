@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - CPU performance metrics
+    ================================
+
+    Cheap counters that will be updated by the CPU once per burst run.
+    The snapshot() is a plain dict, so it can be send via the
+    cpu_metrics_queue or as JSON.
+
+    "irq_count" are only the taken IRQs: FIRQ and NMI are not emulated.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+
+class CPUMetrics(object):
+    # Below this ratio of the target speed, the CPU is "below real-time"
+    REALTIME_TOLERANCE = 0.95
+
+    def __init__(self):
+        self.start_time = time.time()
+
+        self.bursts = 0 # count of CPU.run() calls
+
+        # values of the last burst run:
+        self.burst_cycles = 0
+        self.burst_instructions = 0
+        self.burst_duration = 0.0 # host time incl. the speed limit sleep
+        self.burst_sleep = 0.0 # time.sleep() in delayed_burst_run()
+
+        self.total_run_duration = 0.0
+        self.total_sleep_duration = 0.0
+
+        # Host time between two burst runs, in which the CPU was not scheduled:
+        self.scheduler_lag = 0.0
+        self.max_scheduler_lag = 0.0
+
+        self.target_cycles_per_sec = None
+        self._last_burst_end = None
+
+    def add_burst(self, start_time, end_time, cycles, instructions, sleep_duration, target_cycles_per_sec):
+        self.bursts += 1
+
+        if self._last_burst_end is not None:
+            self.scheduler_lag = start_time - self._last_burst_end
+            if self.scheduler_lag > self.max_scheduler_lag:
+                self.max_scheduler_lag = self.scheduler_lag
+        self._last_burst_end = end_time
+
+        duration = end_time - start_time
+        self.burst_cycles = cycles
+        self.burst_instructions = instructions
+        self.burst_duration = duration
+        self.burst_sleep = sleep_duration
+
+        self.total_run_duration += duration
+        self.total_sleep_duration += sleep_duration
+
+        self.target_cycles_per_sec = target_cycles_per_sec
+
+    def snapshot(self, cpu):
+        """
+        Create a dict with the current values.
+        Only plain attribute reads, so it's usable from other threads.
+        """
+        burst_duration = self.burst_duration
+        if burst_duration > 0:
+            cycles_per_sec = self.burst_cycles / burst_duration
+            instructions_per_sec = self.burst_instructions / burst_duration
+        else:
+            cycles_per_sec = 0.0
+            instructions_per_sec = 0.0
+
+        target_cycles_per_sec = self.target_cycles_per_sec
+        if target_cycles_per_sec:
+            target_mhz = target_cycles_per_sec / 1000000
+            realtime_ratio = cycles_per_sec / target_cycles_per_sec
+            below_realtime = self.bursts > 0 and realtime_ratio < self.REALTIME_TOLERANCE
+        else:
+            target_mhz = None
+            realtime_ratio = None
+            below_realtime = False
+
+        return {
+            "cycles": cpu.cycles,
+            "instructions": cpu.instruction_count,
+            "irq_count": cpu.irq_count,
+            "memory_callbacks": cpu.memory.get_callback_counts(),
+
+            "bursts": self.bursts,
+            "burst_cycles": self.burst_cycles,
+            "burst_instructions": self.burst_instructions,
+            "burst_duration": burst_duration,
+            "burst_sleep": self.burst_sleep,
+            "total_run_duration": self.total_run_duration,
+            "total_sleep_duration": self.total_sleep_duration,
+            "scheduler_lag": self.scheduler_lag,
+            "max_scheduler_lag": self.max_scheduler_lag,
+
+            "cycles_per_sec": cycles_per_sec,
+            "instructions_per_sec": instructions_per_sec,
+            "emulated_mhz": cycles_per_sec / 1000000,
+            "target_mhz": target_mhz,
+            "realtime_ratio": realtime_ratio,
+            "below_realtime": below_realtime,
+
+            "uptime": time.time() - self.start_time,
+        }
+
+
+# (metric name, snapshot key, type, help text)
+PROMETHEUS_METRICS = (
+    ("mc6809_cycles_total", "cycles", "counter", "Emulated CPU cycles."),
+    ("mc6809_instructions_total", "instructions", "counter", "Retired CPU instructions."),
+    ("mc6809_irq_total", "irq_count", "counter", "Taken IRQs (FIRQ and NMI are not emulated)."),
+    ("mc6809_bursts_total", "bursts", "counter", "CPU burst runs."),
+    ("mc6809_run_seconds_total", "total_run_duration", "counter", "Host time in burst runs."),
+    ("mc6809_sleep_seconds_total", "total_sleep_duration", "counter", "Host time slept by the speed limit."),
+    ("mc6809_burst_seconds", "burst_duration", "gauge", "Host time of the last burst run."),
+    ("mc6809_scheduler_lag_seconds", "scheduler_lag", "gauge", "Host time between the last two burst runs."),
+    ("mc6809_cycles_per_second", "cycles_per_sec", "gauge", "Emulated CPU cycles per second."),
+    ("mc6809_instructions_per_second", "instructions_per_sec", "gauge", "Emulated instructions per second."),
+    ("mc6809_emulated_mhz", "emulated_mhz", "gauge", "Emulated CPU speed in MHz."),
+    ("mc6809_target_mhz", "target_mhz", "gauge", "Target CPU speed in MHz."),
+    ("mc6809_realtime_ratio", "realtime_ratio", "gauge", "Emulated speed / target speed."),
+    ("mc6809_below_realtime", "below_realtime", "gauge", "1 if the CPU is below real-time speed."),
+    ("mc6809_uptime_seconds", "uptime", "gauge", "Seconds since CPU creation."),
+)
+
+
+def prometheus_text(metrics):
+    """
+    Format a CPUMetrics.snapshot() dict in the Prometheus text format.
+    Values that are None (e.g. target_mhz without speed limit) will be skipped.
+
+    >>> print(prometheus_text({"cycles": 10, "target_mhz": None}), end="")
+    # HELP mc6809_cycles_total Emulated CPU cycles.
+    # TYPE mc6809_cycles_total counter
+    mc6809_cycles_total 10
+    """
+    lines = []
+    for name, key, metric_type, help_text in PROMETHEUS_METRICS:
+        value = metrics.get(key)
+        if value is None:
+            continue
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s %s" % (name, metric_type))
+        lines.append("%s %s" % (name, float(value) if isinstance(value, float) else int(value)))
+
+    callback_counts = metrics.get("memory_callbacks")
+    if callback_counts:
+        name = "mc6809_memory_callback_calls_total"
+        lines.append("# HELP %s Calls of memory callbacks and middlewares." % name)
+        lines.append("# TYPE %s counter" % name)
+        for kind, count in sorted(callback_counts.items()):
+            lines.append('%s{kind="%s"} %i' % (name, kind, count))
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - CPU registers as a dict
+    ================================
+
+    Get and set the CPU state without the memory as a plain dict, e.g.
+    for the record/replay and the CPU control server.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from MC6809.components.MC6809data.MC6809_op_data_flat import REG_A, REG_B, \
+    REG_CC, REG_DP, REG_PC, REG_S, REG_U, REG_X, REG_Y
+
+
+REGISTERS = (REG_X, REG_Y, REG_U, REG_S, REG_PC, REG_A, REG_B, REG_DP, REG_CC)
+
+
+def get_registers(cpu):
+    """
+    The CPU state without the memory, as a dict.
+    """
+    registers = dict(
+        (register, cpu.register_str2object[register].get())
+        for register in REGISTERS
+    )
+    registers["cycles"] = cpu.cycles
+    registers["irq_enabled"] = cpu.irq_enabled
+    registers["irq_count"] = cpu.irq_count
+    return registers
+
+
+def set_registers(cpu, registers):
+    """
+    Set the CPU state from a dict, missing values are not changed.
+    """
+    for register in REGISTERS:
+        if register in registers:
+            cpu.register_str2object[register].set(registers[register])
+    if "cycles" in registers:
+        cpu.cycles = registers["cycles"]
+    if "irq_enabled" in registers:
+        cpu.irq_enabled = registers["irq_enabled"]
+    if "irq_count" in registers:
+        cpu.irq_count = registers["irq_count"]
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - table driven disassembler
+    ==================================
+
+    Disassemble the memory without changing the emulation: The memory is
+    read with get_block(), so no CPU cycles are counted and no callbacks
+    are called.
+
+        disassembler = Disassembler(cpu.memory, symbols={0xa000: "POLCAT"})
+        text, length = disassembler.disasm(0x8000)
+        for address, raw, text in disassembler.disassemble(0x8000, count=20):
+            ...
+
+    The decode tables for the opcode pages 0/2/3 and all 256 indexed
+    postbytes are build once from MC6809OP_DATA_DICT, so decoding is
+    only a few table lookups per instruction.
+
+    The decoded instructions are cached per address, together with all
+    bytes the decoder has examined (for illegal opcodes also the page
+    byte or postbyte after the "FCB"). A cached instruction is only used
+    if the memory still contains the same bytes, so every write
+    invalidates it:
+    Self-modifying code, loaded programs, bank switching etc. No write
+    hook is needed, so the CPU isn't slowed down by the disassembler.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+MEMORY_SIZE = 0x10000
+MAX_INSTRUCTION_SIZE = 5 # e.g.: page 2 opcode + postbyte + 16 bit offset
+
+# The operand kinds of the decode tables:
+INHERENT = 0
+IMMEDIATE = 1
+IMMEDIATE_WORD = 2
+DIRECT = 3
+EXTENDED = 4
+INDEXED = 5
+RELATIVE = 6
+RELATIVE_WORD = 7
+REGISTER_PAIR = 8 # TFR/EXG
+REGISTER_LIST_S = 9 # PSHS/PULS
+REGISTER_LIST_U = 10 # PSHU/PULU
+
+ADDR_MODE2KIND = {
+    None: INHERENT, # e.g.: the undocumented RESET $3e
+    "INHERENT": INHERENT,
+    "IMMEDIATE": IMMEDIATE,
+    "IMMEDIATE_WORD": IMMEDIATE_WORD,
+    "DIRECT": DIRECT,
+    "DIRECT_WORD": DIRECT,
+    "EXTENDED": EXTENDED,
+    "EXTENDED_WORD": EXTENDED,
+    "INDEXED": INDEXED,
+    "INDEXED_WORD": INDEXED,
+    "RELATIVE": RELATIVE,
+    "RELATIVE_WORD": RELATIVE_WORD,
+}
+MNEMONIC2KIND = {
+    "TFR": REGISTER_PAIR,
+    "EXG": REGISTER_PAIR,
+    "PSHS": REGISTER_LIST_S,
+    "PULS": REGISTER_LIST_S,
+    "PSHU": REGISTER_LIST_U,
+    "PULU": REGISTER_LIST_U,
+}
+# Operand bytes, without the indexed extra bytes:
+OPERAND_SIZE = {
+    INHERENT: 0,
+    IMMEDIATE: 1,
+    IMMEDIATE_WORD: 2,
+    DIRECT: 1,
+    EXTENDED: 2,
+    INDEXED: 1, # the postbyte
+    RELATIVE: 1,
+    RELATIVE_WORD: 2,
+    REGISTER_PAIR: 1,
+    REGISTER_LIST_S: 1,
+    REGISTER_LIST_U: 1,
+}
+
+PAGE2 = 0x10
+PAGE3 = 0x11
+
+# TFR/EXG register codes:
+REGISTER_CODES = {
+    0x0: "D", 0x1: "X", 0x2: "Y", 0x3: "U", 0x4: "S", 0x5: "PC",
+    0x8: "A", 0x9: "B", 0xa: "CC", 0xb: "DP",
+}
+
+# PSH/PUL postbyte bits, in the order of the assembler source:
+STACK_BITS_S = ((0x01, "CC"), (0x02, "A"), (0x04, "B"), (0x08, "DP"),
+    (0x10, "X"), (0x20, "Y"), (0x40, "U"), (0x80, "PC"))
+STACK_BITS_U = STACK_BITS_S[:6] + ((0x40, "S"), (0x80, "PC"))
+
+# The extra bytes of the indexed postbyte forms:
+IDX_NONE = 0
+IDX_OFFSET8 = 1
+IDX_OFFSET16 = 2
+IDX_PCR8 = 3
+IDX_PCR16 = 4
+IDX_EXTENDED = 5
+IDX_ILLEGAL = 6
+
+INDEX_REGISTERS = ("X", "Y", "U", "S")
+
+
+def signed_hex(value):
+    """
+    >>> signed_hex(5), signed_hex(-16), signed_hex(0)
+    ('$05', '-$10', '$00')
+    """
+    if value < 0:
+        return "-$%02x" % -value
+    return "$%02x" % value
+
+
+def build_page_tables(op_data=MC6809OP_DATA_DICT):
+    """
+    Returns the decode tables for the opcode pages 0, 2 and 3: A list of
+    256 entries (mnemonic, operand kind, instruction size) or None.
+
+    >>> page0, page2, page3 = build_page_tables()
+    >>> page0[0x86], page2[0x8e], page3[0x3f]
+    (('LDA', 1, 2), ('LDY', 2, 4), ('SWI3', 0, 2))
+    >>> page0[0x01] is None
+    True
+    """
+    tables = {
+        0x00: [None] * 256,
+        PAGE2: [None] * 256,
+        PAGE3: [None] * 256,
+    }
+    for opcode, data in op_data.items():
+        if opcode in (PAGE2, PAGE3):
+            continue # the page prefixes self
+        page, opcode_size = opcode >> 8, 2
+        if not page:
+            opcode_size = 1
+
+        mnemonic = data["mnemonic"]
+        kind = MNEMONIC2KIND.get(mnemonic, ADDR_MODE2KIND[data["addr_mode"]])
+        size = opcode_size + OPERAND_SIZE[kind]
+        assert size == data["bytes"], "$%04x %s: %i bytes != %i bytes" % (
+            opcode, mnemonic, size, data["bytes"]
+        )
+        tables[page][opcode & 0xff] = (mnemonic, kind, size)
+    return tables[0x00], tables[PAGE2], tables[PAGE3]
+
+
+def build_indexed_table():
+    """
+    Returns the decode table of the 256 indexed postbytes: A list of
+    (operand template, extra bytes kind). The template contains "%s" for
+    the offset, if there are extra bytes.
+
+    >>> table = build_indexed_table()
+    >>> table[0x04], table[0x1f], table[0x84], table[0x8b], table[0x91]
+    (('$04,X', 0), ('-$01,X', 0), (',X', 0), ('D,X', 0), ('[,X++]', 0))
+    >>> table[0xa8], table[0x8d], table[0x9f], table[0x87]
+    (('%s,Y', 1), ('%s,PCR', 4), ('[%s]', 5), (None, 6))
+    """
+    table = []
+    for postbyte in range(256):
+        register = INDEX_REGISTERS[(postbyte >> 5) & 0x03]
+        if not postbyte & 0x80:
+            # 5 bit offset, no indirect form:
+            offset = postbyte & 0x1f
+            if offset > 15:
+                offset -= 32
+            table.append(("%s,%s" % (signed_hex(offset), register), IDX_NONE))
+            continue
+
+        indirect = postbyte & 0x10
+        mode = postbyte & 0x0f
+        if mode == 0x0 and not indirect:
+            template, extra = ",%s+" % register, IDX_NONE
+        elif mode == 0x1:
+            template, extra = ",%s++" % register, IDX_NONE
+        elif mode == 0x2 and not indirect:
+            template, extra = ",-%s" % register, IDX_NONE
+        elif mode == 0x3:
+            template, extra = ",--%s" % register, IDX_NONE
+        elif mode == 0x4:
+            template, extra = ",%s" % register, IDX_NONE
+        elif mode == 0x5:
+            template, extra = "B,%s" % register, IDX_NONE
+        elif mode == 0x6:
+            template, extra = "A,%s" % register, IDX_NONE
+        elif mode == 0x8:
+            template, extra = "%%s,%s" % register, IDX_OFFSET8
+        elif mode == 0x9:
+            template, extra = "%%s,%s" % register, IDX_OFFSET16
+        elif mode == 0xb:
+            template, extra = "D,%s" % register, IDX_NONE
+        elif mode == 0xc:
+            template, extra = "%s,PCR", IDX_PCR8
+        elif mode == 0xd:
+            template, extra = "%s,PCR", IDX_PCR16
+        elif mode == 0xf and indirect: # the register bits are ignored
+            template, extra = "%s", IDX_EXTENDED
+        else:
+            table.append((None, IDX_ILLEGAL))
+            continue
+
+        if indirect:
+            template = "[%s]" % template
+        table.append((template, extra))
+    return table
+
+
+PAGE0_TABLE, PAGE2_TABLE, PAGE3_TABLE = build_page_tables()
+INDEXED_TABLE = build_indexed_table()
+
+
+class Disassembler(object):
+    def __init__(self, memory, symbols=None):
+        self.memory = memory
+        self.symbols = symbols or {}
+        self._cache = {} # address -> (examined bytes, raw bytes, text)
+
+    def set_symbols(self, symbols):
+        self.symbols = symbols
+        self._cache.clear()
+
+    def invalidate(self, start=0x0000, end=MEMORY_SIZE):
+        """
+        Remove the cached instructions from start to end (exclusive).
+        Not needed after writes, only for e.g. changed symbols.
+        """
+        if start == 0x0000 and end >= MEMORY_SIZE:
+            self._cache.clear()
+            return
+        cache = self._cache
+        for address in list(cache):
+            # A instruction can start up to 4 bytes before start:
+            if start - MAX_INSTRUCTION_SIZE < address < end:
+                del cache[address]
+
+    def _get_data(self, start, end):
+        """
+        The memory from start to end, with wrap around at $FFFF.
+        A bytearray, so indexing returns ints under Python 2, too.
+        """
+        if end <= MEMORY_SIZE:
+            return self.memory.get_block(start, end)
+        return self.memory.get_block(start, MEMORY_SIZE) + self.memory.get_block(0, end - MEMORY_SIZE)
+
+    def _format_address(self, address):
+        try:
+            return self.symbols[address]
+        except KeyError:
+            return "$%04x" % address
+
+    def _decode(self, data, pos, address):
+        """
+        Decode the instruction at data[pos] from the memory address.
+        Returns (examined size, raw bytes, text). The examined size
+        is greater than the raw bytes for illegal opcodes, because the
+        page byte or postbyte was read, too.
+        """
+        opcode = data[pos]
+        if opcode == PAGE2:
+            entry = PAGE2_TABLE[data[pos + 1]]
+        elif opcode == PAGE3:
+            entry = PAGE3_TABLE[data[pos + 1]]
+        else:
+            entry = PAGE0_TABLE[opcode]
+        if entry is None:
+            examined = 2 if opcode == PAGE2 or opcode == PAGE3 else 1
+            return examined, data[pos:pos + 1], "FCB $%02x" % opcode
+
+        mnemonic, kind, size = entry
+        operand_pos = pos + size - OPERAND_SIZE[kind]
+
+        if kind == INHERENT:
+            return size, data[pos:pos + size], mnemonic
+        elif kind == IMMEDIATE:
+            operand = "#$%02x" % data[operand_pos]
+        elif kind == IMMEDIATE_WORD:
+            operand = "#$%04x" % (data[operand_pos] << 8 | data[operand_pos + 1])
+        elif kind == DIRECT:
+            operand = "<$%02x" % data[operand_pos]
+        elif kind == EXTENDED:
+            operand = self._format_address(data[operand_pos] << 8 | data[operand_pos + 1])
+        elif kind == RELATIVE:
+            offset = data[operand_pos]
+            if offset > 0x7f:
+                offset -= 0x100
+            operand = self._format_address((address + size + offset) & 0xffff)
+        elif kind == RELATIVE_WORD:
+            target = address + size + (data[operand_pos] << 8 | data[operand_pos + 1])
+            operand = self._format_address(target & 0xffff)
+        elif kind == INDEXED:
+            template, extra = INDEXED_TABLE[data[operand_pos]]
+            if extra == IDX_ILLEGAL:
+                return size, data[pos:pos + 1], "FCB $%02x" % opcode
+            if extra != IDX_NONE:
+                value_pos = operand_pos + 1
+                if extra == IDX_OFFSET8 or extra == IDX_PCR8:
+                    value = data[value_pos]
+                    if value > 0x7f:
+                        value -= 0x100
+                    size += 1
+                else:
+                    value = data[value_pos] << 8 | data[value_pos + 1]
+                    if extra != IDX_EXTENDED and value > 0x7fff:
+                        value -= 0x10000
+                    size += 2
+
+                if extra == IDX_PCR8 or extra == IDX_PCR16:
+                    template %= self._format_address((address + size + value) & 0xffff)
+                elif extra == IDX_EXTENDED:
+                    template %= self._format_address(value)
+                else:
+                    template %= signed_hex(value)
+            operand = template
+        elif kind == REGISTER_PAIR:
+            postbyte = data[operand_pos]
+            operand = "%s,%s" % (
+                REGISTER_CODES.get(postbyte >> 4, "?"), REGISTER_CODES.get(postbyte & 0x0f, "?")
+            )
+        else: # REGISTER_LIST_S or REGISTER_LIST_U
+            postbyte = data[operand_pos]
+            bits = STACK_BITS_S if kind == REGISTER_LIST_S else STACK_BITS_U
+            operand = ",".join([name for bit, name in bits if postbyte & bit])
+
+        return size, data[pos:pos + size], "%s %s" % (mnemonic, operand)
+
+    def _get(self, data, pos, address):
+        """
+        The cached instruction, if the memory contains still the same bytes.
+        """
+        try:
+            examined, raw, text = self._cache[address]
+        except KeyError:
+            pass
+        else:
+            if data[pos:pos + len(examined)] == examined:
+                return raw, text
+        size, raw, text = self._decode(data, pos, address)
+        raw = bytes(raw)
+        self._cache[address] = (data[pos:pos + size], raw, text)
+        return raw, text
+
+    def disasm(self, address):
+        """
+        Returns the (text, length) of the instruction at address.
+        """
+        data = self._get_data(address, address + MAX_INSTRUCTION_SIZE)
+        raw, text = self._get(data, 0, address)
+        return text, len(raw)
+
+    def disassemble(self, start, end=MEMORY_SIZE, count=None):
+        """
+        Returns a list of (address, raw bytes, text) from start to end
+        (exclusive) or only count instructions.
+        """
+        if count is not None:
+            # Enough memory for count instructions, but not more than one wrap around:
+            end = start + min(count * MAX_INSTRUCTION_SIZE, MEMORY_SIZE)
+        # All instructions from one memory snapshot, plus the bytes of the
+        # last instruction:
+        data = self._get_data(start, end + MAX_INSTRUCTION_SIZE)
+        get = self._get
+
+        result = []
+        address = start
+        while address < end:
+            raw, text = get(data, address - start, address & 0xffff)
+            result.append((address & 0xffff, raw, text))
+            if count is not None and len(result) >= count:
+                break
+            address += len(raw)
+        return result
+
+    def format_lines(self, start, end=MEMORY_SIZE, count=None):
+        """
+        Like disassemble(), but returns text lines, e.g.:
+
+            8000| 8e 00 00    LDX #$0000
+        """
+        return [
+            "%04x| %-11s %s" % (address, " ".join(["%02x" % byte for byte in bytearray(raw)]), text)
+            for address, raw, text in self.disassemble(start, end, count)
+        ]
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - fork() based CPU cloning
+    =================================
+
+    Clone the current CPU with os.fork() into child processes, e.g. to
+    try different inputs from the same state:
+
+        def try_input(cpu, data):
+            cpu.memory.load(0x1000, data)
+            cpu.test_run(0x4000, 0x4020)
+            return cpu.accu_a.get()
+
+        results = cpu.fork_children(len(inputs), try_input, inputs)
+
+    The children share the memory of the parent copy-on-write at the OS
+    level, so there is nothing to serialize: only the pages that a child
+    changes are copied. Every child calls fn(cpu, input) and sends the
+    pickled return value back over a pipe. The CPU in the parent process
+    is not changed.
+
+    Needs os.fork(), so it's only available on Unix systems. Don't fork
+    while other threads are running, e.g. the CPU control server.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import errno
+import os
+import pickle
+import select
+import signal
+import sys
+import time
+import traceback
+
+
+class ForkChildError(Exception):
+    """
+    The function raised a error in the child process, or the child
+    was killed. Contains the traceback of the child.
+    """
+    def __init__(self, index, msg):
+        super(ForkChildError, self).__init__("Child %i: %s" % (index, msg))
+        self.index = index
+
+
+def _run_child(write_fd, cpu, fn, child_input):
+    """
+    Runs in the child process: never returns.
+    """
+    exit_code = 0
+    try:
+        try:
+            result = (True, fn(cpu, child_input))
+        except BaseException as err:
+            result = (False, "%s\n%s" % (err, traceback.format_exc()))
+        try:
+            data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except Exception as err:
+            data = pickle.dumps((False, "Can't pickle the result: %s" % err), pickle.HIGHEST_PROTOCOL)
+        with os.fdopen(write_fd, "wb") as f:
+            f.write(data)
+    except BaseException:
+        exit_code = 1
+    finally:
+        # Don't run the cleanup of the parent process, e.g.: atexit handlers
+        os._exit(exit_code)
+
+
+def _read_results(children, timeout):
+    """
+    Read the pipes of all children at the same time, so no child blocks
+    on a full pipe. Returns the data per read file descriptor.
+    """
+    if timeout is None:
+        deadline = None
+    else:
+        deadline = time.time() + timeout
+
+    data = dict((read_fd, []) for pid, read_fd in children)
+    open_fds = set(data)
+    while open_fds:
+        if deadline is None:
+            wait = None
+        else:
+            wait = deadline - time.time()
+            if wait <= 0:
+                break
+        try:
+            readable, __, __ = select.select(list(open_fds), [], [], wait)
+        except select.error as err:
+            if err.args[0] == errno.EINTR:
+                continue
+            raise
+        for read_fd in readable:
+            chunk = os.read(read_fd, 65536)
+            if chunk:
+                data[read_fd].append(chunk)
+            else:
+                open_fds.remove(read_fd)
+    return data, open_fds
+
+
+def fork_children(cpu, n, fn, inputs=None, timeout=None, raise_errors=True):
+    """
+    Fork n child processes and call fn(cpu, inputs[i]) in child i.
+    Returns the results in the order of the children.
+
+    inputs defaults to range(n). Children that need more than timeout
+    seconds will be killed. A failed child raises ForkChildError, or its
+    ForkChildError instance is the result if raise_errors is False.
+    """
+    if not hasattr(os, "fork"):
+        raise NotImplementedError("fork_children() needs os.fork()")
+    if inputs is None:
+        inputs = range(n)
+    inputs = list(inputs)
+    if len(inputs) != n:
+        raise ValueError("Got %i inputs for %i children" % (len(inputs), n))
+
+    # Don't write the buffered output in every child again:
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    children = []
+    data = timed_out_fds = None
+    try:
+        for child_input in inputs:
+            read_fd, write_fd = os.pipe()
+            try:
+                pid = os.fork()
+            except OSError:
+                # e.g. EAGAIN or ENOMEM: the started children are killed below
+                os.close(read_fd)
+                os.close(write_fd)
+                raise
+            if pid == 0:
+                os.close(read_fd)
+                for __, other_read_fd in children:
+                    os.close(other_read_fd)
+                _run_child(write_fd, cpu, fn, child_input)
+            os.close(write_fd)
+            children.append((pid, read_fd))
+
+        data, timed_out_fds = _read_results(children, timeout)
+    finally:
+        for pid, read_fd in children:
+            if timed_out_fds is None or read_fd in timed_out_fds:
+                # timeout or a error in the parent (e.g. fork failed): kill the child
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            os.close(read_fd)
+            os.waitpid(pid, 0)
+
+    results = []
+    for index, (pid, read_fd) in enumerate(children):
+        if read_fd in timed_out_fds:
+            result = ForkChildError(index, "timeout after %s sec." % timeout)
+        else:
+            try:
+                ok, value = pickle.loads(b"".join(data[read_fd]))
+            except Exception as err:
+                result = ForkChildError(index, "No result: %s" % err)
+            else:
+                if ok:
+                    result = value
+                else:
+                    result = ForkChildError(index, value)
+
+        if raise_errors and isinstance(result, ForkChildError):
+            raise result
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - hot path profiler
+    ==========================
+
+    Attribute the host time to the emulator subsystems, e.g.:
+
+        profiler = HotPathProfiler(cpu)
+        with profiler:
+            cpu.test_run(start, end)
+        profiler.print_report()
+
+    cProfile instruments every function call and its overhead distorts the
+    tiny emulator functions. Here only the entry points of the subsystems
+    are wrapped with instance attributes, so nothing is changed if the
+    profiler is not installed.
+
+    The time is measured "exclusive": if e.g. a ALU function reads memory,
+    the time in read_byte() is accounted to the memory subsystem and not
+    to the ALU. The calibrated overhead of the wrappers is subtracted.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+try:
+    perf_counter_ns = time.perf_counter_ns # Python >= 3.7
+except AttributeError:
+    try:
+        _perf_counter = time.perf_counter # Python >= 3.3
+    except AttributeError:
+        _perf_counter = time.time
+
+    def perf_counter_ns():
+        return int(_perf_counter() * 1000000000)
+
+
+# Subsystems:
+OUTSIDE = "outside" # Time outside of the emulator, e.g.: the test_run() loop
+DISPATCH = "decode/dispatch"
+ADDRESSING = "addressing mode"
+ALU = "ALU/CC update"
+MEMORY = "memory fast path"
+MEMORY_CALLBACKS = "memory callbacks/middlewares"
+SYNC_CALLBACKS = "sync callbacks"
+
+SUBSYSTEMS = (DISPATCH, ADDRESSING, ALU, MEMORY, MEMORY_CALLBACKS, SYNC_CALLBACKS)
+
+CPU_METHODS = (
+    ("get_and_call_next_op", DISPATCH),
+    ("call_sync_callbacks", SYNC_CALLBACKS),
+)
+ADDRESSING_METHOD_PREFIXES = ("get_ea_", "get_m_")
+MEMORY_METHODS = ("read_byte", "read_word", "write_byte", "write_word")
+MEMORY_CALLBACK_DICTS = (
+    "_read_byte_callbacks", "_read_word_callbacks",
+    "_write_byte_callbacks", "_write_word_callbacks",
+    "_read_byte_middleware", "_write_byte_middleware",
+    "_read_word_middleware", "_write_word_middleware",
+)
+
+
+class HotPathProfiler(object):
+    CALIBRATION_ROUNDS = 5
+    CALIBRATION_LOOPS = 5000
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.installed = False
+
+        # The wrappers holds references to these objects,
+        # so they will be only cleared in reset()
+        self.totals = {}
+        self.calls_into = {}
+        self.calls_from = {}
+        self._stack = []
+        self._state = [OUTSIDE, 0] # current subsystem, last timestamp
+
+        self.reset()
+        self.inner_overhead, self.outer_overhead = self.calibrate()
+
+    def reset(self):
+        for subsystem in SUBSYSTEMS + (OUTSIDE,):
+            self.totals[subsystem] = 0
+            self.calls_into[subsystem] = 0
+            self.calls_from[subsystem] = 0
+        del self._stack[:]
+        self._state[:] = [OUTSIDE, perf_counter_ns()]
+        self.start_instruction_count = self.cpu.instruction_count
+        self.instruction_count = 0
+
+    def _wrap(self, func, subsystem):
+        totals = self.totals
+        calls_into = self.calls_into
+        calls_from = self.calls_from
+        stack = self._stack
+        state = self._state
+
+        def wrapper(*args, **kwargs):
+            now = perf_counter_ns()
+            current = state[0]
+            totals[current] += now - state[1]
+            calls_from[current] += 1
+            calls_into[subsystem] += 1
+            stack.append(current)
+            state[0] = subsystem
+            state[1] = now
+            try:
+                return func(*args, **kwargs)
+            finally:
+                now = perf_counter_ns()
+                totals[subsystem] += now - state[1]
+                state[0] = stack.pop()
+                state[1] = now
+
+        wrapper.__name__ = getattr(func, "__name__", "wrapper")
+        return wrapper
+
+    def calibrate(self):
+        """
+        Measure the wrapper overhead per call:
+            inner: time accounted to the called subsystem
+            outer: time accounted to the calling subsystem
+        Use the minimum of some rounds, to reduce the noise.
+        """
+        def noop():
+            pass
+        wrapped = self._wrap(noop, DISPATCH)
+
+        loops = self.CALIBRATION_LOOPS
+        inner = outer = None
+        for __ in range(self.CALIBRATION_ROUNDS):
+            self.reset()
+
+            start = perf_counter_ns()
+            for __ in range(loops):
+                noop()
+            bare_loop = perf_counter_ns() - start
+
+            self._state[1] = perf_counter_ns()
+            for __ in range(loops):
+                wrapped()
+            self.totals[OUTSIDE] += perf_counter_ns() - self._state[1]
+
+            round_inner = self.totals[DISPATCH] / loops
+            round_outer = max(self.totals[OUTSIDE] - bare_loop, 0) / loops
+            if inner is None or round_inner < inner:
+                inner = round_inner
+            if outer is None or round_outer < outer:
+                outer = round_outer
+
+        self.reset()
+        return inner, outer
+
+    #--------------------------------------------------------------------------
+
+    def install(self):
+        assert not self.installed, "Profiler is already installed!"
+        cpu = self.cpu
+        memory = cpu.memory
+
+        self._cpu_attributes = []
+        for name, subsystem in CPU_METHODS:
+            self._set_cpu_attribute(name, self._wrap(getattr(cpu, name), subsystem))
+        for name in dir(type(cpu)):
+            if name.startswith(ADDRESSING_METHOD_PREFIXES):
+                self._set_cpu_attribute(name, self._wrap(getattr(cpu, name), ADDRESSING))
+
+        self._memory_attributes = []
+        for name in MEMORY_METHODS:
+            setattr(memory, name, self._wrap(getattr(memory, name), MEMORY))
+            self._memory_attributes.append(name)
+
+        self._callback_dicts = {}
+        wrappers = {}
+        for dict_name in MEMORY_CALLBACK_DICTS:
+            callbacks = getattr(memory, dict_name)
+            self._callback_dicts[dict_name] = callbacks
+            wrapped_callbacks = {}
+            for addr, func in callbacks.items():
+                if func not in wrappers:
+                    wrappers[func] = self._wrap(func, MEMORY_CALLBACKS)
+                wrapped_callbacks[addr] = wrappers[func]
+            setattr(memory, dict_name, wrapped_callbacks)
+
+        # The instruction methods are bound to the PrepagedInstructions
+        # instances in the opcode dict:
+        self._instructions = {}
+        for cycles, func in cpu.opcode_dict.values():
+            instruction = func.__self__
+            if id(instruction) in self._instructions:
+                continue
+            self._instructions[id(instruction)] = (instruction, instruction.instr_func)
+            instruction.instr_func = self._wrap(instruction.instr_func, ALU)
+
+        self.installed = True
+        self.reset()
+
+    def _set_cpu_attribute(self, name, value):
+        setattr(self.cpu, name, value)
+        self._cpu_attributes.append(name)
+
+    def uninstall(self):
+        assert self.installed, "Profiler is not installed!"
+        self._stop()
+
+        for name in self._cpu_attributes:
+            delattr(self.cpu, name)
+        for name in self._memory_attributes:
+            delattr(self.cpu.memory, name)
+        for dict_name, callbacks in self._callback_dicts.items():
+            setattr(self.cpu.memory, dict_name, callbacks)
+        for instruction, instr_func in self._instructions.values():
+            instruction.instr_func = instr_func
+
+        self.installed = False
+
+    def _stop(self):
+        now = perf_counter_ns()
+        self.totals[self._state[0]] += now - self._state[1]
+        self._state[1] = now
+        self.instruction_count = self.cpu.instruction_count - self.start_instruction_count
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.uninstall()
+
+    #--------------------------------------------------------------------------
+
+    def get_report(self):
+        """
+        Returns a list of (subsystem, corrected ns total, ns per instruction, calls)
+        sorted by the subsystem time.
+        """
+        instruction_count = self.instruction_count
+        report = []
+        for subsystem in SUBSYSTEMS:
+            ns_total = self.totals[subsystem]
+            ns_total -= self.calls_into[subsystem] * self.inner_overhead
+            ns_total -= self.calls_from[subsystem] * self.outer_overhead
+            ns_total = max(ns_total, 0)
+            if instruction_count:
+                ns_per_instruction = ns_total / instruction_count
+            else:
+                ns_per_instruction = 0
+            report.append((subsystem, ns_total, ns_per_instruction, self.calls_into[subsystem]))
+        report.sort(key=lambda item: item[1], reverse=True)
+        return report
+
+    def print_report(self):
+        report = self.get_report()
+        total_per_instruction = sum([item[2] for item in report])
+        print("Hot path time attribution for %i instructions:" % self.instruction_count)
+        print("(wrapper overhead per call: inner %.1fns outer %.1fns - subtracted)" % (
+            self.inner_overhead, self.outer_overhead
+        ))
+        print()
+        print("%-30s %12s %8s %12s" % ("subsystem", "ns/instr.", "percent", "calls"))
+        print("-" * 65)
+        for subsystem, ns_total, ns_per_instruction, calls in report:
+            if total_per_instruction:
+                percent = ns_per_instruction / total_per_instruction * 100
+            else:
+                percent = 0
+            print("%-30s %12.1f %7.1f%% %12i" % (subsystem, ns_per_instruction, percent, calls))
+        print("-" * 65)
+        print("%-30s %12.1f" % ("total", total_per_instruction))
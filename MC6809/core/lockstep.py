@@ -0,0 +1,782 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - experimental lockstep engine
+    =====================================
+
+    Run the same program on many CPU instances at once: The registers
+    and the memory of K instances are NumPy arrays with the shape
+    (K, registers) and (K, 65536) and every instruction is executed
+    for all instances with the same program counter in one go, e.g.:
+
+        engine = LockstepCPUs(1000)
+        engine.load(0x0100, program) # same program for all instances
+        for index, data in enumerate(buffers):
+            engine.load(0x1000, data, index) # different data
+        engine.run(start=0x0100, end=0x0147)
+        d = engine.get_register("D")
+
+    Only a subset of the instruction set is vectorized: loads, stores,
+    logical ops, compares, shifts/rotates on accumulators, LEA, EXG/TFR,
+    PSHS/PSHU and the branches. That's enough for e.g. the CRC routines.
+
+    If the instances take different branches, they get different program
+    counters: The group with the lowest PC will be executed, all other
+    instances are masked and wait, until the others arrived. Instances
+    that hit a not vectorized instruction, or waited more than max_wait
+    steps, fall back to the scalar CPU and will run to the end there.
+
+    The memory layout is the same as in the workloads: The CPU can't write
+    into the ROM area $8000-$FFFF. Memory callbacks, middlewares and
+    interrupts are not supported.
+
+    The cycles are counted in the same way as the scalar CPU does it:
+    cycles from the op table, plus one cycle per memory access plus
+    the extra cycles of the indexed addressing modes.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+from MC6809.components.MC6809data.MC6809_op_data_flat import REG_A, REG_B, \
+    REG_CC, REG_D, REG_DP, REG_PC, REG_S, REG_U, REG_X, REG_Y
+from MC6809.workloads.base import WorkloadCfg
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+# Columns of the register array:
+REGISTER_COLUMNS = (REG_PC, REG_A, REG_B, REG_X, REG_Y, REG_U, REG_S, REG_DP, REG_CC)
+PC, A, B, X, Y, U, S, DP, CC = range(len(REGISTER_COLUMNS))
+COLUMN = dict((name, column) for column, name in enumerate(REGISTER_COLUMNS))
+
+REGISTER_WIDTH = {
+    REG_PC: 16, REG_X: 16, REG_Y: 16, REG_U: 16, REG_S: 16, REG_D: 16,
+    REG_A: 8, REG_B: 8, REG_DP: 8, REG_CC: 8,
+}
+
+# CC bits:
+CC_N = 0x08
+CC_Z = 0x04
+CC_V = 0x02
+CC_C = 0x01
+
+# EXG/TFR postbyte nibble -> register, without PC and CC
+EXG_REGISTERS = {
+    0x0: REG_D, 0x1: REG_X, 0x2: REG_Y, 0x3: REG_U, 0x4: REG_S,
+    0x8: REG_A, 0x9: REG_B, 0xb: REG_DP,
+}
+
+# indexed addressing: postbyte bits 5+6 -> register
+INDEX_REGISTERS = (X, Y, U, S)
+
+# instance states:
+RUNNING = 0
+DONE = 1 # end address reached
+MAX_OPS = 2 # max ops reached
+SCALAR = 3 # completed by the scalar CPU
+
+
+class NotVectorized(Exception):
+    """
+    The instruction can't be executed by the lockstep engine.
+    """
+    pass
+
+
+def _get_mnemonic_handlers():
+    handlers = {}
+
+    def add(method_name, *mnemonics):
+        for mnemonic in mnemonics:
+            handlers[mnemonic] = method_name
+
+    add("op_LD8", "LDA", "LDB")
+    add("op_LD16", "LDD", "LDX", "LDY", "LDU", "LDS")
+    add("op_ST8", "STA", "STB")
+    add("op_ST16", "STD", "STX", "STY", "STU", "STS")
+    add("op_AND", "ANDA", "ANDB")
+    add("op_EOR", "EORA", "EORB")
+    add("op_OR", "ORA", "ORB")
+    add("op_CMP8", "CMPA", "CMPB")
+    add("op_CMP16", "CMPD", "CMPX", "CMPY", "CMPU", "CMPS")
+    add("op_CLR", "CLRA", "CLRB")
+    add("op_LSL", "LSLA", "LSLB")
+    add("op_LSR", "LSRA", "LSRB")
+    add("op_ASR", "ASRA", "ASRB")
+    add("op_ROL", "ROLA", "ROLB")
+    add("op_ROR", "RORA", "RORB")
+    add("op_LEA_register", "LEAX", "LEAY")
+    add("op_LEA_pointer", "LEAU", "LEAS")
+    add("op_EXG", "EXG")
+    add("op_TFR", "TFR")
+    add("op_PSH", "PSHS", "PSHU")
+    add("op_ABX", "ABX")
+    add("op_NOP", "NOP")
+    add("op_branch",
+        "BRA", "BRN", "BEQ", "BNE", "BMI", "BPL", "BVS", "BVC", "BLO", "BCC",
+        "BHI", "BLS", "BGE", "BLT", "BGT", "BLE",
+        "LBRA", "LBRN", "LBEQ", "LBNE", "LBMI", "LBPL", "LBVS", "LBVC", "LBCS", "LBCC",
+        "LBHI", "LBLS", "LBGE", "LBLT", "LBGT", "LBLE",
+    )
+    return handlers
+
+MNEMONIC_HANDLERS = _get_mnemonic_handlers()
+
+
+def get_vectorized_ops():
+    """
+    Returns the op codes, that the lockstep engine can execute.
+    """
+    return sorted([
+        op_code for op_code, op_data in MC6809OP_DATA_DICT.items()
+        if op_data["mnemonic"] in MNEMONIC_HANDLERS
+    ])
+
+
+class LockstepCPUs(object):
+    def __init__(self, count, max_wait=10000, cfg=None):
+        if numpy is None:
+            raise ImportError("The lockstep engine needs NumPy, please install it.")
+        if cfg is None:
+            cfg = WorkloadCfg({"verbosity":None, "trace":None})
+        self.cfg = cfg
+        self.rom_start = cfg.ROM_START
+
+        self.count = count
+        self.max_wait = max_wait
+
+        self.regs = numpy.zeros((count, len(REGISTER_COLUMNS)), dtype=numpy.int64)
+        self.memory = numpy.zeros((count, 0x10000), dtype=numpy.uint8)
+        self.cycles = numpy.zeros(count, dtype=numpy.int64)
+        self.instruction_count = numpy.zeros(count, dtype=numpy.int64)
+        self.state = numpy.zeros(count, dtype=numpy.int8)
+        self.waiting = numpy.zeros(count, dtype=numpy.int64)
+        self.op_limit = numpy.zeros(count, dtype=numpy.int64) # instruction_count limit of the current run
+
+        # statistics:
+        self.steps = 0 # vector steps
+        self.fallback_count = 0 # instances completed by the scalar CPU
+
+        self._handlers = {}
+        for op_code, op_data in MC6809OP_DATA_DICT.items():
+            method_name = MNEMONIC_HANDLERS.get(op_data["mnemonic"])
+            if method_name is not None:
+                self._handlers[op_code] = (getattr(self, method_name), op_data)
+
+    #---------------------------------------------------------------------------
+
+    def _instances(self, index):
+        if index is None:
+            return slice(None)
+        return index
+
+    def load(self, address, data, index=None):
+        """
+        Load the data into all instances or only into the instance(s) index.
+        """
+        data = bytearray(data)
+        if address + len(data) > 0x10000:
+            raise OverflowError("load outside memory area: $%04x - data length: %iBytes" % (
+                address, len(data)
+            ))
+        self.memory[self._instances(index), address:address + len(data)] = \
+            numpy.frombuffer(bytes(data), dtype=numpy.uint8)
+
+    def get_block(self, start, end, index):
+        return bytearray(self.memory[index, start:end].tobytes())
+
+    def set_register(self, name, value, index=None):
+        """
+        Set a register in all instances or only in the instance(s) index.
+        value can be a number or a array with one value per instance.
+        """
+        index = self._instances(index)
+        if name == REG_D:
+            value = numpy.asarray(value, dtype=numpy.int64)
+            self.regs[index, A] = (value >> 8) & 0xff
+            self.regs[index, B] = value & 0xff
+        else:
+            mask = (1 << REGISTER_WIDTH[name]) - 1
+            self.regs[index, COLUMN[name]] = numpy.asarray(value, dtype=numpy.int64) & mask
+
+    def get_register(self, name, index=None):
+        index = self._instances(index)
+        if name == REG_D:
+            return self.regs[index, A] << 8 | self.regs[index, B]
+        return self.regs[index, COLUMN[name]].copy()
+
+    #---------------------------------------------------------------------------
+
+    def run(self, start, end, max_ops=1000000):
+        """
+        Run all instances from start until the program counter is end.
+        Same as CPU.test_run(), but for all instances.
+        """
+        self.regs[:, PC] = start
+        self.state[:] = RUNNING
+        self.waiting[:] = 0
+        self.op_limit[:] = self.instruction_count + max_ops
+
+        state = self.state
+        regs = self.regs
+        waiting = self.waiting
+
+        while True:
+            running = numpy.flatnonzero(state == RUNNING)
+            if len(running) == 0:
+                break
+
+            pcs = regs[running, PC]
+            stopped = (pcs == end) | (self.instruction_count[running] >= self.op_limit[running])
+            if stopped.any():
+                stopped_instances = running[stopped]
+                state[stopped_instances] = numpy.where(pcs[stopped] == end, DONE, MAX_OPS)
+                running = running[~stopped]
+                if len(running) == 0:
+                    break
+                pcs = pcs[~stopped]
+
+            lead_pc = int(pcs.min())
+            group = running[pcs == lead_pc]
+
+            waiting[running] += 1
+            waiting[group] = 0
+
+            try:
+                self._execute(group, lead_pc)
+            except NotVectorized as err:
+                log.info("Lockstep $%04x: %s - fall back to scalar CPU", lead_pc, err)
+                self.run_scalar(group, end)
+            self.steps += 1
+
+            if len(group) < len(running):
+                # some instances are waiting
+                waited = running[waiting[running] > self.max_wait]
+                if len(waited):
+                    log.info("Lockstep: %i instances waited too long - fall back to scalar CPU", len(waited))
+                    self.run_scalar(waited, end)
+
+        if (state == MAX_OPS).any():
+            raise RuntimeError("Max ops %i arrived in %i instances!" % (
+                max_ops, (state == MAX_OPS).sum()
+            ))
+
+    def run_scalar(self, instances, end):
+        """
+        Complete the given instances with the scalar CPU.
+        """
+        # import here, because it's not needed, if all instances run in lockstep
+        from MC6809.components.cpu6809 import CPU
+        from MC6809.components.memory import Memory
+
+        for index in instances:
+            memory = Memory(self.cfg)
+            cpu = CPU(memory, self.cfg)
+            memory.load(0x0000, self.memory[index].tolist())
+            for name in (REG_X, REG_Y, REG_U, REG_S, REG_A, REG_B, REG_DP, REG_CC):
+                cpu.register_str2object[name].set(int(self.regs[index, COLUMN[name]]))
+            cpu.cycles = int(self.cycles[index])
+
+            max_ops = int(self.op_limit[index] - self.instruction_count[index])
+            try:
+                cpu.test_run(int(self.regs[index, PC]), end, max(max_ops, 0))
+            except RuntimeError:
+                self.state[index] = MAX_OPS
+            else:
+                self.state[index] = SCALAR
+
+            self.memory[index] = numpy.frombuffer(bytes(memory.get_block(0x0000, 0x10000)), dtype=numpy.uint8)
+            for name in REGISTER_COLUMNS:
+                self.regs[index, COLUMN[name]] = cpu.register_str2object[name].get()
+            self.cycles[index] = cpu.cycles
+            self.instruction_count[index] += cpu.instruction_count
+            self.fallback_count += 1
+
+    #---------------------------------------------------------------------------
+
+    def _read_byte(self, group, ea):
+        return self.memory[group, ea].astype(numpy.int64)
+
+    def _read_word(self, group, ea):
+        return self._read_byte(group, ea) << 8 | self._read_byte(group, (ea + 1) & 0xffff)
+
+    def _write_byte(self, group, ea, value):
+        ea = numpy.broadcast_to(ea, group.shape)
+        value = numpy.broadcast_to(value, group.shape)
+        writable = ea < self.rom_start # writes into ROM are ignored
+        self.memory[group[writable], ea[writable]] = value[writable] & 0xff
+
+    def _write_word(self, group, ea, value):
+        self._write_byte(group, ea, value >> 8)
+        self._write_byte(group, ea + 1, value & 0xff)
+
+    def _get(self, group, name):
+        if name == REG_D:
+            return self.regs[group, A] << 8 | self.regs[group, B]
+        return self.regs[group, COLUMN[name]]
+
+    def _set(self, group, name, value):
+        if name == REG_D:
+            self.regs[group, A] = (value >> 8) & 0xff
+            self.regs[group, B] = value & 0xff
+        elif REGISTER_WIDTH[name] == 8:
+            self.regs[group, COLUMN[name]] = value & 0xff
+        else:
+            self.regs[group, COLUMN[name]] = value & 0xffff
+
+    def _set_cc(self, group, clear, flags):
+        """
+        Clear the bits in clear and set the new flags.
+        """
+        self.regs[group, CC] = (self.regs[group, CC] & ~clear) | flags
+
+    #---------------------------------------------------------------------------
+
+    def _get_ea_indexed(self, group, pc, postbyte):
+        """
+        Returns the effective address, the new PC and the extra cycles.
+        Same as CPU.get_ea_indexed() for all instances in group.
+        """
+        column = INDEX_REGISTERS[(postbyte >> 5) & 3]
+        register_value = self.regs[group, column]
+
+        if not postbyte & 0x80:
+            # EA = n, R - use 5-bit offset from post-byte
+            offset = postbyte & 0x1f
+            if offset > 0xf:
+                offset -= 0x20
+            return (register_value + offset) & 0xffff, pc, 0
+
+        if postbyte & 0x10:
+            raise NotVectorized("indirect indexed addressing")
+
+        addr_mode = postbyte & 0x0f
+        first = group[0]
+        extra_cycles = 1
+        if addr_mode == 0x0: # ,R+
+            ea = register_value.copy()
+            self.regs[group, column] = (register_value + 1) & 0xffff
+        elif addr_mode == 0x1: # ,R++
+            ea = register_value.copy()
+            self.regs[group, column] = (register_value + 2) & 0xffff
+            extra_cycles += 1
+        elif addr_mode == 0x2: # ,-R
+            ea = (register_value - 1) & 0xffff
+            self.regs[group, column] = ea
+        elif addr_mode == 0x3: # ,--R
+            ea = (register_value - 2) & 0xffff
+            self.regs[group, column] = ea
+            extra_cycles += 1
+        elif addr_mode == 0x4: # ,R
+            ea = register_value
+        elif addr_mode == 0x5: # B,R
+            offset = self.regs[group, B]
+            ea = (register_value + numpy.where(offset > 0x7f, offset - 0x100, offset)) & 0xffff
+        elif addr_mode == 0x6: # A,R
+            offset = self.regs[group, A]
+            ea = (register_value + numpy.where(offset > 0x7f, offset - 0x100, offset)) & 0xffff
+        elif addr_mode == 0x8: # n,R 8 bit offset
+            offset = int(self.memory[first, pc])
+            if offset > 0x7f:
+                offset -= 0x100
+            ea = (register_value + offset) & 0xffff
+            pc += 1
+            extra_cycles += 1 # read the offset byte
+        elif addr_mode == 0x9: # n,R 16 bit offset
+            offset = int(self.memory[first, pc]) << 8 | int(self.memory[first, (pc + 1) & 0xffff])
+            ea = (register_value + offset) & 0xffff
+            pc += 2
+            extra_cycles += 3 # read the offset word
+        elif addr_mode == 0xb: # D,R
+            ea = (register_value + self._get(group, REG_D)) & 0xffff
+            extra_cycles += 1
+        else:
+            raise NotVectorized("indexed addressing mode $%x" % addr_mode)
+        return ea, pc & 0xffff, extra_cycles
+
+    def _execute(self, group, pc):
+        """
+        Execute the instruction at pc for all instances in group.
+        """
+        memory = self.memory
+        first = group[0]
+
+        op_code = int(memory[first, pc])
+        page_cycles = 0
+        pc2 = (pc + 1) & 0xffff
+        if op_code in (0x10, 0x11):
+            op_code = op_code << 8 | int(memory[first, pc2])
+            page_cycles = 1 + 1 # cycles of the PAGE op + read of the second byte
+            pc2 = (pc2 + 1) & 0xffff
+
+        try:
+            handler, op_data = self._handlers[op_code]
+        except KeyError:
+            raise NotVectorized("op $%02x is not vectorized" % op_code)
+
+        # All instances must have the same code, including a indexed offset:
+        code_end = min(pc + op_data["bytes"] + 2, 0x10000)
+        if len(group) > 1:
+            code = memory[group, pc:code_end]
+            if not (code == code[0]).all():
+                raise NotVectorized("different code at $%04x" % pc)
+
+        cycles = op_data["cycles"] + page_cycles + 1 # +1 read of the op code
+        addr_mode = op_data["addr_mode"]
+        read_from_memory = op_data["read_from_memory"]
+        ea = None
+        m = None
+
+        if addr_mode == "INHERENT":
+            pass
+        elif addr_mode in ("IMMEDIATE", "IMMEDIATE_WORD"):
+            if addr_mode == "IMMEDIATE":
+                m = int(memory[first, pc2])
+                pc2 += 1
+                cycles += 1
+            else:
+                m = int(memory[first, pc2]) << 8 | int(memory[first, (pc2 + 1) & 0xffff])
+                pc2 += 2
+                cycles += 2
+        elif addr_mode in ("RELATIVE", "RELATIVE_WORD"):
+            if addr_mode == "RELATIVE":
+                offset = int(memory[first, pc2])
+                if offset > 0x7f:
+                    offset -= 0x100
+                pc2 += 1
+                cycles += 1
+            else:
+                offset = int(memory[first, pc2]) << 8 | int(memory[first, (pc2 + 1) & 0xffff])
+                pc2 += 2
+                cycles += 2
+            ea = (pc2 + offset) & 0xffff
+        else:
+            if addr_mode in ("DIRECT", "DIRECT_WORD"):
+                ea = self.regs[group, DP] << 8 | int(memory[first, pc2])
+                pc2 += 1
+                cycles += 1
+            elif addr_mode in ("EXTENDED", "EXTENDED_WORD"):
+                ea = int(memory[first, pc2]) << 8 | int(memory[first, (pc2 + 1) & 0xffff])
+                pc2 += 2
+                cycles += 2
+            elif addr_mode in ("INDEXED", "INDEXED_WORD"):
+                postbyte = int(memory[first, pc2])
+                cycles += 1
+                ea, pc2, extra_cycles = self._get_ea_indexed(group, (pc2 + 1) & 0xffff, postbyte)
+                cycles += extra_cycles
+            else:
+                raise NotVectorized("addressing mode %s" % addr_mode)
+
+            if read_from_memory == "8":
+                m = self._read_byte(group, ea)
+                cycles += 1
+            elif read_from_memory == "16":
+                m = self._read_word(group, ea)
+                cycles += 2
+
+        self.regs[group, PC] = pc2 & 0xffff
+        try:
+            cycles += handler(group, op_data, ea, m)
+        except NotVectorized:
+            self.regs[group, PC] = pc # the scalar CPU should execute this op again
+            raise
+
+        self.cycles[group] += cycles
+        self.instruction_count[group] += 1
+
+    #---------------------------------------------------------------------------
+    # The instruction handlers returns the cycles of the memory writes.
+
+    def _update_NZ0_8(self, group, r):
+        flags = numpy.where(r & 0x80, CC_N, 0) | numpy.where(r & 0xff, 0, CC_Z)
+        self._set_cc(group, CC_N | CC_Z | CC_V, flags)
+
+    def _update_NZ0_16(self, group, r):
+        flags = numpy.where(r & 0x8000, CC_N, 0) | numpy.where(r & 0xffff, 0, CC_Z)
+        self._set_cc(group, CC_N | CC_Z | CC_V, flags)
+
+    def _update_NZVC_8(self, group, a, b, r):
+        flags = numpy.where(r & 0x80, CC_N, 0) | numpy.where(r & 0xff, 0, CC_Z) | \
+            numpy.where((a ^ b ^ r ^ (r >> 1)) & 0x80, CC_V, 0) | numpy.where(r & 0x100, CC_C, 0)
+        self._set_cc(group, CC_N | CC_Z | CC_V | CC_C, flags)
+
+    def _update_NZVC_16(self, group, a, b, r):
+        flags = numpy.where(r & 0x8000, CC_N, 0) | numpy.where(r & 0xffff, 0, CC_Z) | \
+            numpy.where((a ^ b ^ r ^ (r >> 1)) & 0x8000, CC_V, 0) | numpy.where(r & 0x10000, CC_C, 0)
+        self._set_cc(group, CC_N | CC_Z | CC_V | CC_C, flags)
+
+    def op_NOP(self, group, op_data, ea, m):
+        return 0
+
+    def op_LD8(self, group, op_data, ea, m):
+        m = numpy.broadcast_to(m, group.shape)
+        self._set(group, op_data["register"], m)
+        self._update_NZ0_8(group, m)
+        return 0
+
+    def op_LD16(self, group, op_data, ea, m):
+        m = numpy.broadcast_to(m, group.shape)
+        self._set(group, op_data["register"], m)
+        self._update_NZ0_16(group, m)
+        return 0
+
+    def op_ST8(self, group, op_data, ea, m):
+        value = self._get(group, op_data["register"])
+        self._update_NZ0_8(group, value)
+        self._write_byte(group, ea, value)
+        return 1
+
+    def op_ST16(self, group, op_data, ea, m):
+        value = self._get(group, op_data["register"])
+        self._update_NZ0_16(group, value)
+        self._write_word(group, ea, value)
+        return 2
+
+    def _logical(self, group, op_data, r):
+        self._set(group, op_data["register"], r)
+        self._update_NZ0_8(group, r)
+        return 0
+
+    def op_AND(self, group, op_data, ea, m):
+        return self._logical(group, op_data, self._get(group, op_data["register"]) & m)
+
+    def op_EOR(self, group, op_data, ea, m):
+        return self._logical(group, op_data, self._get(group, op_data["register"]) ^ m)
+
+    def op_OR(self, group, op_data, ea, m):
+        return self._logical(group, op_data, self._get(group, op_data["register"]) | m)
+
+    def op_CMP8(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        self._update_NZVC_8(group, a, m, a - m)
+        return 0
+
+    def op_CMP16(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        self._update_NZVC_16(group, a, m, a - m)
+        return 0
+
+    def op_CLR(self, group, op_data, ea, m):
+        self._set(group, op_data["register"], 0)
+        self._set_cc(group, CC_N | CC_Z | CC_V | CC_C, CC_Z)
+        return 0
+
+    def op_LSL(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        r = a << 1
+        self._update_NZVC_8(group, a, a, r)
+        self._set(group, op_data["register"], r)
+        return 0
+
+    def op_ROL(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        r = (a << 1) | (self.regs[group, CC] & CC_C)
+        self._update_NZVC_8(group, a, a, r)
+        self._set(group, op_data["register"], r)
+        return 0
+
+    def op_LSR(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        r = a >> 1
+        flags = numpy.where(r & 0xff, 0, CC_Z) | (a & 1)
+        self._set_cc(group, CC_N | CC_Z | CC_C, flags)
+        self._set(group, op_data["register"], r)
+        return 0
+
+    def op_ASR(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        r = (a >> 1) | (a & 0x80)
+        flags = numpy.where(r & 0x80, CC_N, 0) | numpy.where(r & 0xff, 0, CC_Z) | (a & 1)
+        self._set_cc(group, CC_N | CC_Z | CC_C, flags)
+        self._set(group, op_data["register"], r)
+        return 0
+
+    def op_ROR(self, group, op_data, ea, m):
+        a = self._get(group, op_data["register"])
+        r = (a >> 1) | ((self.regs[group, CC] & CC_C) << 7)
+        flags = numpy.where(r & 0x80, CC_N, 0) | numpy.where(r & 0xff, 0, CC_Z) | (a & 1)
+        self._set_cc(group, CC_N | CC_Z | CC_C, flags)
+        self._set(group, op_data["register"], r)
+        return 0
+
+    def op_LEA_register(self, group, op_data, ea, m):
+        self._set(group, op_data["register"], ea)
+        self._set_cc(group, CC_Z, numpy.where(ea & 0xffff, 0, CC_Z))
+        return 0
+
+    def op_LEA_pointer(self, group, op_data, ea, m):
+        self._set(group, op_data["register"], ea)
+        return 0
+
+    def _get_exg_registers(self, m):
+        high, low = divmod(m, 0x10)
+        try:
+            reg1 = EXG_REGISTERS[high]
+            reg2 = EXG_REGISTERS[low]
+        except KeyError:
+            raise NotVectorized("EXG/TFR with postbyte $%02x" % m)
+        if REGISTER_WIDTH[reg1] != REGISTER_WIDTH[reg2]:
+            raise NotVectorized("EXG/TFR between different register widths")
+        return reg1, reg2
+
+    def op_EXG(self, group, op_data, ea, m):
+        reg1, reg2 = self._get_exg_registers(m)
+        value1 = self._get(group, reg1).copy()
+        value2 = self._get(group, reg2).copy()
+        self._set(group, reg1, value2)
+        self._set(group, reg2, value1)
+        return 0
+
+    def op_TFR(self, group, op_data, ea, m):
+        reg1, reg2 = self._get_exg_registers(m)
+        self._set(group, reg2, self._get(group, reg1).copy())
+        return 0
+
+    def op_ABX(self, group, op_data, ea, m):
+        self.regs[group, X] = (self.regs[group, X] + self.regs[group, B]) & 0xffff
+        return 0
+
+    PUSH_ORDER = (
+        (0x80, REG_PC), (0x40, REG_U), (0x20, REG_Y), (0x10, REG_X),
+        (0x08, REG_DP), (0x04, REG_B), (0x02, REG_A), (0x01, REG_CC),
+    )
+
+    def op_PSH(self, group, op_data, ea, m):
+        stack = COLUMN[op_data["register"]]
+        if m & 0x40 and stack == U:
+            raise NotVectorized("PSHU U")
+        cycles = 0
+        for bit, register in self.PUSH_ORDER:
+            if not m & bit:
+                continue
+            value = self._get(group, register)
+            if REGISTER_WIDTH[register] == 8:
+                self.regs[group, stack] = (self.regs[group, stack] - 1) & 0xffff
+                self._write_byte(group, self.regs[group, stack], value)
+                cycles += 1
+            else:
+                self.regs[group, stack] = (self.regs[group, stack] - 2) & 0xffff
+                self._write_word(group, self.regs[group, stack], value)
+                cycles += 2
+        return cycles
+
+    BRANCH_CONDITIONS = {
+        "BRA": lambda cc: numpy.ones(cc.shape, dtype=bool),
+        "BRN": lambda cc: numpy.zeros(cc.shape, dtype=bool),
+        "BEQ": lambda cc: (cc & CC_Z) != 0,
+        "BNE": lambda cc: (cc & CC_Z) == 0,
+        "BMI": lambda cc: (cc & CC_N) != 0,
+        "BPL": lambda cc: (cc & CC_N) == 0,
+        "BVS": lambda cc: (cc & CC_V) != 0,
+        "BVC": lambda cc: (cc & CC_V) == 0,
+        "BLO": lambda cc: (cc & CC_C) != 0,
+        "BCS": lambda cc: (cc & CC_C) != 0,
+        "BCC": lambda cc: (cc & CC_C) == 0,
+        "BHI": lambda cc: (cc & (CC_C | CC_Z)) == 0,
+        "BLS": lambda cc: (cc & (CC_C | CC_Z)) != 0,
+        "BGE": lambda cc: ((cc >> 3) & 1) == ((cc >> 1) & 1),
+        "BLT": lambda cc: ((cc >> 3) & 1) != ((cc >> 1) & 1),
+        "BGT": lambda cc: (((cc >> 3) & 1) == ((cc >> 1) & 1)) & ((cc & CC_Z) == 0),
+        "BLE": lambda cc: (((cc >> 3) & 1) != ((cc >> 1) & 1)) | ((cc & CC_Z) != 0),
+    }
+
+    def op_branch(self, group, op_data, ea, m):
+        mnemonic = op_data["mnemonic"]
+        if mnemonic.startswith("LB"):
+            mnemonic = mnemonic[1:]
+        taken = self.BRANCH_CONDITIONS[mnemonic](self.regs[group, CC])
+        self.regs[group[taken], PC] = ea
+        return 0
+
+
+def run_lockstep_benchmark(count=1000, size=64, scalar_count=None):
+    """
+    CRC32 over count random buffers with size bytes:
+    Compare the scalar CPU with the lockstep engine.
+    The scalar CPU runs only scalar_count buffers (default: all).
+    """
+    # import here, because the benchmark is not needed to use the engine
+    import binascii
+    import random
+    from timeit import default_timer
+
+    from MC6809.workloads import create_cpu, CRC32Workload
+
+    workload = CRC32Workload()
+    rnd = random.Random(0x6809)
+    buffers = [
+        bytearray([rnd.randint(0, 0xFF) for __ in range(size)])
+        for __ in range(count)
+    ]
+    end_address = workload.DATA + size
+    if scalar_count is None:
+        scalar_count = count
+
+    def expected(data):
+        return binascii.crc32(bytes(data)) & 0xffffffff
+
+    print("\nCRC32 over %i buffers with %i Bytes" % (count, size))
+
+    start_time = default_timer()
+    for data in buffers[:scalar_count]:
+        cpu = create_cpu()
+        cpu.memory.load(workload.START, workload.PROGRAM)
+        cpu.memory.load(workload.DATA, data)
+        cpu.system_stack_pointer.set(workload.STACK)
+        cpu.index_x.set(end_address)
+        cpu.test_run(workload.START, workload.end, max_ops=workload.MAX_OPS)
+        crc32 = (cpu.index_x.get() * 0x10000 + cpu.accu_d.get()) ^ 0xFFFFFFFF
+        assert crc32 == expected(data)
+    scalar_duration = (default_timer() - start_time) / scalar_count
+
+    start_time = default_timer()
+    engine = LockstepCPUs(count)
+    engine.load(workload.START, workload.PROGRAM)
+    for index, data in enumerate(buffers):
+        engine.load(workload.DATA, data, index)
+    engine.set_register(REG_S, workload.STACK)
+    engine.set_register(REG_X, end_address)
+    engine.run(workload.START, workload.end, max_ops=workload.MAX_OPS)
+    x = engine.get_register(REG_X)
+    d = engine.get_register(REG_D)
+    for index, data in enumerate(buffers):
+        crc32 = (int(x[index]) * 0x10000 + int(d[index])) ^ 0xFFFFFFFF
+        assert crc32 == expected(data)
+    lockstep_duration = (default_timer() - start_time) / count
+
+    print("\tscalar CPU: %8.2f ms per buffer (%i buffers)" % (scalar_duration * 1000, scalar_count))
+    print("\tlockstep  : %8.2f ms per buffer (%i steps, %i scalar fallbacks)" % (
+        lockstep_duration * 1000, engine.steps, engine.fallback_count
+    ))
+    print("\tspeedup   : %8.1fx" % (scalar_duration / lockstep_duration))
+    return {
+        "count": count,
+        "size": size,
+        "scalar": scalar_duration,
+        "lockstep": lockstep_duration,
+        "steps": engine.steps,
+        "fallbacks": engine.fallback_count,
+    }
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
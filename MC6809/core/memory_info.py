@@ -12,24 +12,142 @@
 from __future__ import absolute_import, division, print_function
 
 
+import array
 import sys
 
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class AddressRegionIndex(object):
+    """
+    Resolve the address area for a address with a single table lookup.
+
+    The 64K lookup table stores only a index into the area tuple, so
+    overlapping areas are no problem and there is no string per address.
+    The table will be build on the first lookup.
+
+    prefer_shortest=True:
+        The shortest area wins, if areas overlap. If there are more areas
+        with the same size, the first one wins.
+    prefer_shortest=False:
+        The last added area wins, if areas overlap.
+
+    >>> index = AddressRegionIndex([(0x0, 0xff, "page 0"), (0x10, 0x1f, "vars")])
+    >>> index.get(0x5)
+    (0, 255, 'page 0')
+    >>> index.get(0x15)
+    (16, 31, 'vars')
+    >>> index.get(0x100) is None
+    True
+    """
+    TABLE_SIZE = 0x10000
+
+    def __init__(self, areas=(), prefer_shortest=True):
+        self.areas = []
+        self.prefer_shortest = prefer_shortest
+        self._table = None
+        for start_addr, end_addr, txt in areas:
+            self.add_area(start_addr, end_addr, txt)
+
+    def add_area(self, start_addr, end_addr, txt):
+        self.areas.append((start_addr, end_addr, txt))
+        self._table = None # build again on next lookup
+
+    def _paint_order(self):
+        indexes = range(len(self.areas))
+        if not self.prefer_shortest:
+            return indexes
+        # Paint the biggest areas first, so smaller ones will overwrite them.
+        # With the same size, the first area must be painted at last.
+        return sorted(indexes,
+            key=lambda index: (abs(self.areas[index][1] - self.areas[index][0]), index),
+            reverse=True
+        )
+
+    def _build_table(self):
+        if len(self.areas) < 0xffff:
+            typecode = "H"
+        else:
+            typecode = "L"
+        table = array.array(typecode, [0]) * self.TABLE_SIZE
+        for index in self._paint_order():
+            start_addr, end_addr, txt = self.areas[index]
+            start_addr = max(start_addr, 0)
+            end_addr = min(end_addr, self.TABLE_SIZE - 1)
+            if start_addr > end_addr:
+                continue
+            # index 0 is used for "unknown"
+            table[start_addr:end_addr + 1] = array.array(typecode, [index + 1]) * (end_addr - start_addr + 1)
+        self._table = table
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._build_table()
+        return self._table
+
+    def get_index(self, addr):
+        """
+        returns the area index + 1 or 0 for unknown addresses
+
+        >>> index = AddressRegionIndex([(0xff00, 0xffff, "I/O")])
+        >>> index.get_index(0xffff)
+        1
+        >>> index.get_index(-1)
+        Traceback (most recent call last):
+            ...
+        IndexError: Address -1 is not in $0000-$ffff
+        """
+        if not 0 <= addr < self.TABLE_SIZE:
+            raise IndexError("Address %r is not in $0000-$%04x" % (addr, self.TABLE_SIZE - 1))
+        return self.table[addr]
+
+    def get(self, addr):
+        """
+        returns (start, end, txt) or None
+        """
+        index = self.get_index(addr)
+        if index == 0:
+            return None
+        return self.areas[index - 1]
+
+
+_REGION_INDEX_CACHE = {}
+
+def get_region_index(areas, prefer_shortest=True):
+    """
+    Returns a shared AddressRegionIndex instance for the given areas,
+    so all debug, trace and dump tools use the same lookup table.
+    """
+    key = (tuple(areas), prefer_shortest)
+    try:
+        return _REGION_INDEX_CACHE[key]
+    except KeyError:
+        region_index = AddressRegionIndex(areas, prefer_shortest)
+        _REGION_INDEX_CACHE[key] = region_index
+        return region_index
+
+
 class BaseMemoryInfo(object):
+    _region_index = None
+
     def __init__(self, out_func):
         self.out_func = out_func
 
-    def get_shortest(self, addr):
-        shortest = None
-        size = sys.maxsize
-        for start, end, txt in self.MEM_INFO:
-            if not start <= addr <= end:
-                continue
-
-            current_size = abs(end - start)
-            if current_size < size:
-                size = current_size
-                shortest = start, end, txt
+    @property
+    def region_index(self):
+        if self._region_index is None:
+            self._region_index = get_region_index(self.MEM_INFO)
+        return self._region_index
 
+    def get_shortest(self, addr):
+        try:
+            shortest = self.region_index.get(addr)
+        except IndexError:
+            # e.g. write_word($FFFF) logs the access to $10000
+            shortest = None
         if shortest is None:
             return "$%x: UNKNOWN" % addr
 
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - per opcode micro benchmark
+    ===================================
+
+    Time every opcode handler from the opcode dict in isolation.
+
+    For every opcode and addressing mode (for indexed: every postbyte
+    form) a synthetic instruction stream will be created: the same
+    instruction COPIES times in a row. The registers will be reset before
+    every stream run, so all instructions work on the same addresses.
+
+    The time of the same loop with a empty function instead of the CPU
+    (the "harness overhead") will be subtracted.
+
+    Control flow instructions get operands that point to the next
+    instruction (branches: offset 0, JMP/JSR: next address, RTS/RTI:
+    prepared stack). SWI, CWAI, SYNC and RESET are skipped.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+import sys
+from timeit import default_timer
+
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+# Addressing modes, without the _WORD suffix:
+IMMEDIATE = "IMMEDIATE"
+DIRECT = "DIRECT"
+INDEXED = "INDEXED"
+EXTENDED = "EXTENDED"
+RELATIVE = "RELATIVE"
+INHERENT = "INHERENT"
+ADDR_MODES = (INHERENT, IMMEDIATE, DIRECT, INDEXED, EXTENDED, RELATIVE)
+
+SKIP_MNEMONICS = ("SWI", "SWI2", "SWI3", "CWAI", "SYNC", "RESET", "PAGE 1", "PAGE 2")
+FLOW_MNEMONICS = ("JMP", "JSR")
+
+# Memory layout of the synthetic instruction streams:
+STREAM_START = 0x0100
+DIRECT_PAGE = 0x20 # direct page used by the streams
+DATA_FILL = 0x20 # all data bytes: so all pointers are $2020
+INDEX_BASE = 0x2000 # X, Y and U
+STACK_BASE = 0x3000 # S
+
+# Indexed postbyte forms, with X as base register.
+# All effective addresses are in the RAM after the stream.
+INDEXED_FORMS = (
+    (",R", [0x84]),
+    ("n,R 5-bit", [0x01]),
+    ("n,R 8-bit", [0x88, 0x10]),
+    ("n,R 16-bit", [0x89, 0x1F, 0x00]),
+    ("A,R", [0x86]),
+    ("B,R", [0x85]),
+    ("D,R", [0x8B]),
+    (",R+", [0x80]),
+    (",R++", [0x81]),
+    (",-R", [0x82]),
+    (",--R", [0x83]),
+    ("n,PCR 8-bit", [0x8C, 0x7F]),
+    ("n,PCR 16-bit", [0x8D, 0x1F, 0x00]),
+    ("[,R]", [0x94]),
+    ("[n,R 8-bit]", [0x98, 0x10]),
+    ("[n,R 16-bit]", [0x99, 0x1F, 0x00]),
+    ("[A,R]", [0x96]),
+    ("[B,R]", [0x95]),
+    ("[D,R]", [0x9B]),
+    ("[,R++]", [0x91]),
+    ("[,--R]", [0x93]),
+    ("[n,PCR 8-bit]", [0x9C, 0x7F]),
+    ("[n,PCR 16-bit]", [0x9D, 0x1F, 0x00]),
+    ("[n]", [0x9F, 0x20, 0x00]),
+)
+
+# Immediate operand of instructions that needs special values:
+IMMEDIATE_OPERANDS = {
+    "EXG": 0x89, # A,B
+    "TFR": 0x89, # A,B
+    "PSHS": 0x7F, # all registers, but not PC
+    "PSHU": 0x7F,
+    "PULS": 0x7F,
+    "PULU": 0x7F,
+    "ANDCC": 0xFF,
+    "ORCC": 0x00,
+}
+
+
+def opcode_bytes(opcode):
+    if opcode > 0xff:
+        return [opcode >> 8, opcode & 0xff]
+    return [opcode]
+
+
+class MicroBenchCase(object):
+    """
+    One opcode in one addressing mode (+ indexed form)
+    """
+    def __init__(self, opcode, form=None, postbyte=None):
+        self.opcode = opcode
+        op_data = MC6809OP_DATA_DICT[opcode]
+        self.mnemonic = op_data["mnemonic"]
+        self.addr_mode = op_data["addr_mode"].replace("_WORD", "")
+        self.word = op_data["addr_mode"].endswith("_WORD")
+        self.form = form
+        self.postbyte = postbyte
+
+    @property
+    def description(self):
+        if self.form is None:
+            return self.addr_mode
+        return "%s %s" % (self.addr_mode, self.form)
+
+    def __repr__(self):
+        return "<%s $%02x %s %s>" % (
+            self.__class__.__name__, self.opcode, self.mnemonic, self.description
+        )
+
+    def get_instruction(self, address):
+        """
+        Returns the bytes of one instruction at the given address.
+        """
+        instruction = opcode_bytes(self.opcode)
+        addr_mode = self.addr_mode
+        if addr_mode == INHERENT:
+            return instruction
+
+        if addr_mode == RELATIVE:
+            # branch to the next instruction, taken or not
+            if self.word:
+                return instruction + [0x00, 0x00]
+            return instruction + [0x00]
+
+        if addr_mode == IMMEDIATE:
+            if self.word:
+                return instruction + [0x12, 0x34]
+            return instruction + [IMMEDIATE_OPERANDS.get(self.mnemonic, 0x12)]
+
+        if addr_mode == INDEXED:
+            return instruction + self.postbyte
+
+        next_address = address + len(instruction)
+        if addr_mode == DIRECT:
+            next_address += 1
+            if self.mnemonic in FLOW_MNEMONICS:
+                # The stream is in the page STREAM_START >> 8
+                return instruction + [next_address & 0xff]
+            return instruction + [0x80]
+
+        if addr_mode == EXTENDED:
+            next_address += 2
+            if self.mnemonic in FLOW_MNEMONICS:
+                return instruction + [next_address >> 8, next_address & 0xff]
+            return instruction + [INDEX_BASE >> 8, 0x80]
+
+        raise RuntimeError("Unknown addressing mode %r" % addr_mode)
+
+    def get_direct_page(self):
+        if self.addr_mode == DIRECT and self.mnemonic in FLOW_MNEMONICS:
+            return STREAM_START >> 8
+        return DIRECT_PAGE
+
+    def create_stream(self, copies):
+        """
+        Returns the stream bytes and the start addresses of all instructions
+        """
+        stream = []
+        addresses = []
+        address = STREAM_START
+        for __ in range(copies):
+            addresses.append(address)
+            instruction = self.get_instruction(address)
+            stream += instruction
+            address += len(instruction)
+        return stream, addresses
+
+    def create_stack(self, addresses):
+        """
+        Returns the prepared stack content for RTS/RTI
+        """
+        next_addresses = addresses[1:] + [addresses[-1] + len(self.get_instruction(addresses[-1]))]
+        stack = []
+        for address in next_addresses:
+            if self.mnemonic == "RTI":
+                stack.append(0x00) # CC with E=0: only PC will be pulled
+            stack += [address >> 8, address & 0xff]
+        return stack
+
+
+def iter_cases(mnemonics=None, addr_modes=None, opcodes=None):
+    """
+    Yield a MicroBenchCase for every opcode and addressing mode variant.
+    """
+    if opcodes is None:
+        opcodes = MC6809OP_DATA_DICT.keys()
+    for opcode in sorted(opcodes):
+        op_data = MC6809OP_DATA_DICT[opcode]
+        mnemonic = op_data["mnemonic"]
+        if mnemonic in SKIP_MNEMONICS or op_data["addr_mode"] is None:
+            continue
+        if mnemonics is not None and mnemonic not in mnemonics:
+            continue
+        addr_mode = op_data["addr_mode"].replace("_WORD", "")
+        if addr_modes is not None and addr_mode not in addr_modes:
+            continue
+
+        if addr_mode != INDEXED:
+            yield MicroBenchCase(opcode)
+        elif mnemonic in FLOW_MNEMONICS:
+            # EA must be the next instruction
+            yield MicroBenchCase(opcode, form="n,PCR 8-bit", postbyte=[0x8C, 0x00])
+        else:
+            for form, postbyte in INDEXED_FORMS:
+                yield MicroBenchCase(opcode, form, postbyte)
+
+
+class OpcodeMicroBenchmark(object):
+    COPIES = 16 # instructions per stream
+    ITERATIONS = 50 # stream runs per round
+    ROUNDS = 3 # the fastest round will be used
+
+    def __init__(self, cpu, copies=None, iterations=None, rounds=None):
+        self.cpu = cpu
+        if copies is not None:
+            self.COPIES = copies
+        if iterations is not None:
+            self.ITERATIONS = iterations
+        if rounds is not None:
+            self.ROUNDS = rounds
+
+        self.overhead = self.measure_overhead()
+
+    def _run_loop(self, call, direct_page):
+        cpu = self.cpu
+        set_pc = cpu.program_counter.set
+        set_s = cpu.system_stack_pointer.set
+        set_u = cpu.user_stack_pointer.set
+        set_x = cpu.index_x.set
+        set_y = cpu.index_y.set
+        set_dp = cpu.direct_page.set
+        set_d = cpu.accu_d.set
+        set_cc = cpu.cc.set
+        copies = range(self.COPIES)
+
+        best = None
+        for __ in range(self.ROUNDS):
+            start_time = default_timer()
+            for __ in range(self.ITERATIONS):
+                set_pc(STREAM_START)
+                set_s(STACK_BASE)
+                set_u(INDEX_BASE)
+                set_x(INDEX_BASE)
+                set_y(INDEX_BASE)
+                set_dp(direct_page)
+                set_d(0)
+                set_cc(0)
+                for __ in copies:
+                    call()
+            duration = default_timer() - start_time
+            if best is None or duration < best:
+                best = duration
+        return best
+
+    def measure_overhead(self):
+        def noop():
+            pass
+        return self._run_loop(noop, DIRECT_PAGE)
+
+    def prepare_memory(self, case):
+        memory = self.cpu.memory
+        cfg = self.cpu.cfg
+        memory.load(cfg.RAM_START, [DATA_FILL] * (cfg.RAM_END - cfg.RAM_START + 1))
+
+        stream, addresses = case.create_stream(self.COPIES)
+        memory.load(STREAM_START, stream)
+        if case.mnemonic in ("RTS", "RTI"):
+            memory.load(STACK_BASE, case.create_stack(addresses))
+
+    def run_case(self, case):
+        """
+        Returns the host nanoseconds per instruction.
+        """
+        self.prepare_memory(case)
+        duration = self._run_loop(self.cpu.get_and_call_next_op, case.get_direct_page())
+        duration -= self.overhead
+        return max(duration, 0) / (self.ITERATIONS * self.COPIES) * 1000000000
+
+    def run(self, cases, verbose=False):
+        """
+        Returns a list of result dicts, sorted by cost.
+        """
+        opcode_dict = self.cpu.opcode_dict
+        results = []
+        for case in cases:
+            if case.opcode not in opcode_dict:
+                log.info("Skip not implemented %r", case)
+                continue
+            if verbose:
+                print("\t%r" % case)
+            try:
+                ns_per_instruction = self.run_case(case)
+            except Exception as err:
+                log.error("Error in %r: %s", case, err)
+                continue
+
+            func = opcode_dict[case.opcode][1]
+            results.append({
+                "opcode": case.opcode,
+                "mnemonic": case.mnemonic,
+                "addr_mode": case.description,
+                "ns": ns_per_instruction,
+                "handler": func.__self__.instr_func.__name__,
+                "access": func.__name__,
+            })
+        results.sort(key=lambda result: result["ns"], reverse=True)
+        return results
+
+
+def print_results(results, limit=None):
+    print("%-6s %-6s %-28s %9s  %-28s %s" % (
+        "opcode", "mnem.", "addressing mode", "ns/instr", "handler", "access"
+    ))
+    print("-" * 110)
+    if limit:
+        results = results[:limit]
+    for result in results:
+        print("$%-5s %-6s %-28s %9.1f  %-28s %s" % (
+            "%02x" % result["opcode"], result["mnemonic"], result["addr_mode"],
+            result["ns"], result["handler"], result["access"]
+        ))
+
+
+def run_microbench(mnemonics=None, addr_modes=None, iterations=None, limit=None, json_file=None):
+    from MC6809.workloads import create_cpu
+
+    cpu = create_cpu()
+    cases = list(iter_cases(mnemonics, addr_modes))
+    print("\nMicro benchmark of %i opcode/addressing mode variants..." % len(cases))
+    benchmark = OpcodeMicroBenchmark(cpu, iterations=iterations)
+    print("(%i instructions per stream, %i iterations, best of %i rounds, harness overhead subtracted)" % (
+        benchmark.COPIES, benchmark.ITERATIONS, benchmark.ROUNDS
+    ))
+    results = benchmark.run(cases)
+    print()
+    print_results(results, limit)
+
+    if json_file is not None:
+        with open(json_file, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print("\nResults saved to %r" % json_file)
+    return results
@@ -0,0 +1,588 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - deterministic record/replay
+    ====================================
+
+    The emulation itself is deterministic. Only the inputs from the
+    outside are not, and these are recorded with the CPU cycle count:
+
+        * the values returned by the read byte/word callbacks
+        * the IRQs that were taken
+        * the side effects of the sync callbacks (register and memory changes)
+
+    Record a run, e.g.:
+
+        with Recorder(cpu, snapshot_cycles=1000000) as recorder:
+            cpu.run()
+        recorder.recording.save(f)
+
+    and replay it bit-exact on a CPU with the same memory configuration,
+    e.g. offline without the devices:
+
+        replayer = Replayer(cpu, Recording.load(f))
+        replayer.seek(123456789) # restore the nearest snapshot and replay the rest
+        replayer.run()
+        replayer.check_end_state()
+
+    The recorder wraps the callbacks that exist on install(), so install
+    it after the machine is set up. The IRQs must be triggered between
+    two instructions, e.g. by a sync callback, like a real device does.
+    The read middlewares are not recorded, they must be deterministic.
+
+    The snapshots are taken by a sync callback every snapshot_cycles,
+    so there is only the initial snapshot if the run loop doesn't call
+    the sync callbacks (e.g. cpu.test_run()).
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import binascii
+import bisect
+import hashlib
+import json
+import logging
+
+from MC6809.core.cpu_registers import get_registers, set_registers
+
+
+log = logging.getLogger("MC6809")
+
+
+RECORDING_FORMAT_VERSION = 1
+
+# The memory diff of the sync callbacks compares only the changed pages:
+DIFF_PAGE_SIZE = 0x100
+
+# Event types:
+READ_BYTE = "read_byte"
+READ_WORD = "read_word"
+IRQ = "irq"
+SYNC = "sync"
+
+# Events that happen between two instructions:
+BOUNDARY_EVENTS = (IRQ, SYNC)
+
+DEFAULT_SNAPSHOT_CYCLES = 1000000
+
+
+class ReplayError(Exception):
+    """
+    The replay doesn't match the recording.
+    """
+    pass
+
+
+def get_memory(cpu):
+    return bytes(cpu.memory.get_block(0x0000, 0x10000))
+
+
+def get_memory_diff(old, new):
+    """
+    Returns [address, new value] of all changed bytes. Only the
+    changed pages are compared byte by byte.
+
+    >>> get_memory_diff(b"\\x00\\x01\\x02", b"\\x00\\xff\\x02")
+    [[1, 255]]
+    >>> get_memory_diff(bytes(0x10000), bytes(0x10000))
+    []
+    """
+    if old == new:
+        return []
+    diff = []
+    for start in range(0, len(new), DIFF_PAGE_SIZE):
+        end = start + DIFF_PAGE_SIZE
+        old_page = old[start:end]
+        new_page = new[start:end]
+        if old_page != new_page:
+            diff += [
+                [address, new_value]
+                for address, (old_value, new_value) in enumerate(
+                    zip(bytearray(old_page), bytearray(new_page)), start
+                )
+                if old_value != new_value
+            ]
+    return diff
+
+
+def get_end_state(cpu):
+    state = get_registers(cpu)
+    state["memory_sha1"] = hashlib.sha1(get_memory(cpu)).hexdigest()
+    return state
+
+
+class Snapshot(object):
+    """
+    The complete CPU state at a instruction boundary. position is the
+    number of events recorded before the snapshot was taken.
+    """
+    def __init__(self, position, registers, memory):
+        self.position = position
+        self.registers = registers
+        self.memory = memory
+
+    def __repr__(self):
+        return "<Snapshot cycles:%i position:%i>" % (self.cycles, self.position)
+
+    @property
+    def cycles(self):
+        return self.registers["cycles"]
+
+    @classmethod
+    def from_cpu(cls, cpu, position):
+        return cls(position, get_registers(cpu), get_memory(cpu))
+
+    def restore(self, cpu):
+        cpu.memory.load(0x0000, bytearray(self.memory))
+        set_registers(cpu, self.registers)
+
+    def to_dict(self):
+        return {
+            "position": self.position,
+            "registers": self.registers,
+            "memory": binascii.hexlify(self.memory).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot_dict):
+        return cls(
+            snapshot_dict["position"],
+            snapshot_dict["registers"],
+            binascii.unhexlify(snapshot_dict["memory"]),
+        )
+
+
+class Recording(object):
+    """
+    The event log of a recorded run, with the snapshots.
+    Every event is a list of: cycles, event type, address, value
+    """
+    def __init__(self):
+        self.events = []
+        self.snapshots = []
+        self.callback_addresses = {
+            READ_BYTE: [],
+            READ_WORD: [],
+            "write_byte": [],
+            "write_word": [],
+        }
+        self.end_state = None
+
+    def __repr__(self):
+        return "<Recording events:%i snapshots:%i>" % (len(self.events), len(self.snapshots))
+
+    @property
+    def start_cycles(self):
+        return self.snapshots[0].cycles
+
+    @property
+    def end_cycles(self):
+        return self.end_state["cycles"]
+
+    def get_snapshot(self, cycles):
+        """
+        Returns the last snapshot taken at or before the given cycles.
+        """
+        snapshot_cycles = [snapshot.cycles for snapshot in self.snapshots]
+        index = bisect.bisect_right(snapshot_cycles, cycles) - 1
+        if index < 0:
+            raise ReplayError("No snapshot before cycle %i (recording starts at %i)" % (
+                cycles, self.start_cycles
+            ))
+        return self.snapshots[index]
+
+    def to_dict(self):
+        return {
+            "format_version": RECORDING_FORMAT_VERSION,
+            "events": self.events,
+            "snapshots": [snapshot.to_dict() for snapshot in self.snapshots],
+            "callback_addresses": self.callback_addresses,
+            "end_state": self.end_state,
+        }
+
+    @classmethod
+    def from_dict(cls, recording_dict):
+        format_version = recording_dict.get("format_version")
+        if format_version != RECORDING_FORMAT_VERSION:
+            raise ReplayError("Unsupported recording format version: %r" % format_version)
+        recording = cls()
+        recording.events = recording_dict["events"]
+        recording.snapshots = [
+            Snapshot.from_dict(snapshot_dict)
+            for snapshot_dict in recording_dict["snapshots"]
+        ]
+        recording.callback_addresses = recording_dict["callback_addresses"]
+        recording.end_state = recording_dict["end_state"]
+        return recording
+
+    def save(self, f):
+        json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, f):
+        return cls.from_dict(json.load(f))
+
+
+class Recorder(object):
+    """
+    Record all non-deterministic inputs of the CPU.
+    A existing recording will be continued, the CPU must be
+    at the end of it.
+    """
+    CALLBACK_DICTS = (
+        ("_read_byte_callbacks", READ_BYTE),
+        ("_read_word_callbacks", READ_WORD),
+    )
+
+    def __init__(self, cpu, snapshot_cycles=DEFAULT_SNAPSHOT_CYCLES, recording=None):
+        self.cpu = cpu
+        self.snapshot_cycles = snapshot_cycles
+        self.installed = False
+        self.recording = recording
+
+    def _wrap_read_callback(self, func, event_type):
+        events = self.recording.events
+
+        def wrapper(cycles, last_op_address, address):
+            value = func(cycles, last_op_address, address)
+            events.append([cycles, event_type, address, value])
+            return value
+
+        wrapper.__name__ = getattr(func, "__name__", "wrapper")
+        return wrapper
+
+    def _wrap_sync_callback(self, func):
+        cpu = self.cpu
+        events = self.recording.events
+
+        def wrapper(cycles):
+            old_registers = get_registers(cpu)
+            old_memory = get_memory(cpu)
+            self._in_sync_callback = True
+            try:
+                func(cycles)
+            finally:
+                self._in_sync_callback = False
+
+            registers = get_registers(cpu)
+            registers = dict(
+                (key, value) for key, value in registers.items()
+                if old_registers[key] != value
+            )
+            memory = get_memory_diff(old_memory, get_memory(cpu))
+            if registers or memory:
+                events.append([old_registers["cycles"], SYNC, None, {
+                    "registers": registers,
+                    "memory": memory,
+                }])
+
+        return wrapper
+
+    def irq(self):
+        """
+        Replaces cpu.irq() while recording.
+        """
+        cpu = self.cpu
+        irq_count = cpu.irq_count
+        cycles = cpu.cycles
+        self._cpu_irq()
+        if cpu.irq_count != irq_count and not self._in_sync_callback:
+            # The IRQ was taken. In a sync callback, it's part of the sync event.
+            self.recording.events.append([cycles, IRQ, None, None])
+
+    def take_snapshot(self, cycles=None):
+        """
+        Store a snapshot of the current state.
+        Must be called between two instructions.
+        """
+        self.recording.snapshots.append(
+            Snapshot.from_cpu(self.cpu, position=len(self.recording.events))
+        )
+
+    #--------------------------------------------------------------------------
+
+    def install(self):
+        assert not self.installed, "Recorder is already installed!"
+        cpu = self.cpu
+        memory = cpu.memory
+        recording = self.recording
+        new_recording = recording is None
+        if new_recording:
+            self.recording = recording = Recording()
+        else:
+            assert cpu.cycles == recording.end_cycles, "CPU is not at the end of the recording!"
+        self._in_sync_callback = False
+
+        self._callback_dicts = {}
+        for dict_name, event_type in self.CALLBACK_DICTS:
+            callbacks = getattr(memory, dict_name)
+            self._callback_dicts[dict_name] = callbacks
+            wrappers = {}
+            wrapped_callbacks = {}
+            for address, func in callbacks.items():
+                if func not in wrappers:
+                    wrappers[func] = self._wrap_read_callback(func, event_type)
+                wrapped_callbacks[address] = wrappers[func]
+            setattr(memory, dict_name, wrapped_callbacks)
+            recording.callback_addresses[event_type] = sorted(callbacks)
+        recording.callback_addresses["write_byte"] = sorted(memory._write_byte_callbacks)
+        recording.callback_addresses["write_word"] = sorted(memory._write_word_callbacks)
+
+        self._sync_callbacks = cpu.sync_callbacks
+        self._sync_callbacks_cyles = cpu.sync_callbacks_cyles
+        self._quickest_sync_callback_cycles = cpu.quickest_sync_callback_cycles
+        cpu.sync_callbacks = []
+        cpu.sync_callbacks_cyles = {}
+        for callback_cycles, callback in self._sync_callbacks:
+            wrapper = self._wrap_sync_callback(callback)
+            cpu.sync_callbacks.append([callback_cycles, wrapper])
+            cpu.sync_callbacks_cyles[wrapper] = self._sync_callbacks_cyles[callback]
+
+        # Added as last one, so the snapshot contains the changes of the other ones:
+        if self.snapshot_cycles:
+            cpu.add_sync_callback(self.snapshot_cycles, self.take_snapshot)
+
+        self._cpu_irq = cpu.irq
+        cpu.irq = self.irq
+
+        if new_recording:
+            self.take_snapshot()
+        self.installed = True
+
+    def uninstall(self):
+        assert self.installed, "Recorder is not installed!"
+        cpu = self.cpu
+        self.recording.end_state = get_end_state(cpu)
+
+        for dict_name, callbacks in self._callback_dicts.items():
+            setattr(cpu.memory, dict_name, callbacks)
+
+        # Transfer the cycles of the last calls, so the callbacks will
+        # not be called earlier/later than without the recorder:
+        for (__, callback), (__, wrapper) in zip(self._sync_callbacks, cpu.sync_callbacks):
+            self._sync_callbacks_cyles[callback] = cpu.sync_callbacks_cyles[wrapper]
+        cpu.sync_callbacks = self._sync_callbacks
+        cpu.sync_callbacks_cyles = self._sync_callbacks_cyles
+        cpu.quickest_sync_callback_cycles = self._quickest_sync_callback_cycles
+
+        del cpu.irq
+        self.installed = False
+        return self.recording
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.uninstall()
+
+
+class Replayer(object):
+    """
+    Replay a recording on a CPU with the same memory configuration.
+    The read callbacks are replaced by the recorded values, the sync
+    callbacks of the CPU are not called and cpu.irq() calls are ignored:
+    All inputs are coming from the recording.
+
+    The replayer is installed on init and starts with the first snapshot.
+    uninstall() restores the callbacks of the CPU.
+    """
+    CALLBACK_DICTS = (
+        "_read_byte_callbacks", "_read_word_callbacks",
+        "_write_byte_callbacks", "_write_word_callbacks",
+    )
+
+    def __init__(self, cpu, recording):
+        self.cpu = cpu
+        self.recording = recording
+        self.position = 0
+        self.last_op_cycles = None # see: run()
+
+        events = recording.events
+        self._boundary_positions = [
+            position for position, event in enumerate(events)
+            if event[1] in BOUNDARY_EVENTS
+        ]
+        self._boundary_index = 0
+
+        self.install()
+        self.restore_snapshot(recording.snapshots[0])
+
+    def install(self):
+        memory = self.cpu.memory
+        self._callback_dicts = {}
+        for dict_name in self.CALLBACK_DICTS:
+            callbacks = getattr(memory, dict_name)
+            self._callback_dicts[dict_name] = callbacks
+            setattr(memory, dict_name, dict(callbacks))
+
+        callback_addresses = self.recording.callback_addresses
+        for address in callback_addresses[READ_BYTE]:
+            memory._read_byte_callbacks[address] = self._replay_read_byte
+        for address in callback_addresses[READ_WORD]:
+            memory._read_word_callbacks[address] = self._replay_read_word
+        # In the recorded run, these writes doesn't change the memory:
+        for address in callback_addresses["write_byte"]:
+            memory._write_byte_callbacks.setdefault(address, self._ignore_write)
+        for address in callback_addresses["write_word"]:
+            memory._write_word_callbacks.setdefault(address, self._ignore_write)
+
+        self.cpu.irq = self._ignore_irq
+
+    def uninstall(self):
+        for dict_name, callbacks in self._callback_dicts.items():
+            setattr(self.cpu.memory, dict_name, callbacks)
+        del self.cpu.irq
+
+    def _next_event(self, event_type, cycles, address):
+        try:
+            event = self.recording.events[self.position]
+        except IndexError:
+            raise ReplayError("Cycle %i: %s $%04x after the end of the recording" % (
+                cycles, event_type, address
+            ))
+        if event[0] != cycles or event[1] != event_type or event[2] != address:
+            raise ReplayError("Cycle %i: %s $%04x doesn't match the recorded event %r" % (
+                cycles, event_type, address, event
+            ))
+        self.position += 1
+        return event[3]
+
+    def _replay_read_byte(self, cycles, last_op_address, address):
+        return self._next_event(READ_BYTE, cycles, address)
+
+    def _replay_read_word(self, cycles, last_op_address, address):
+        return self._next_event(READ_WORD, cycles, address)
+
+    def _ignore_write(self, cycles, last_op_address, address, value):
+        pass
+
+    def _ignore_irq(self):
+        log.debug("Replay: ignore IRQ at cycle %i", self.cpu.cycles)
+
+    def _get_next_boundary_cycles(self):
+        try:
+            position = self._boundary_positions[self._boundary_index]
+        except IndexError:
+            return None
+        return self.recording.events[position][0]
+
+    def _apply_boundary_events(self):
+        """
+        Apply all IRQ/sync events of the current cycle.
+        """
+        cpu = self.cpu
+        events = self.recording.events
+        cycles = cpu.cycles
+        while self._boundary_index < len(self._boundary_positions):
+            position = self._boundary_positions[self._boundary_index]
+            event = events[position]
+            if event[0] != cycles:
+                if event[0] < cycles:
+                    raise ReplayError("Cycle %i: missed the recorded event %r" % (cycles, event))
+                break
+            if position != self.position:
+                raise ReplayError("Cycle %i: %i recorded read events are not replayed before %r" % (
+                    cycles, position - self.position, event
+                ))
+
+            if event[1] == IRQ:
+                irq_enabled = cpu.irq_enabled
+                cpu.irq_enabled = True
+                type(cpu).irq(cpu)
+                cpu.irq_enabled = irq_enabled
+            else:
+                diff = event[3]
+                for address, value in diff["memory"]:
+                    cpu.memory.load(address, [value])
+                set_registers(cpu, diff["registers"])
+
+            self.position += 1
+            self._boundary_index += 1
+
+    def restore_snapshot(self, snapshot):
+        snapshot.restore(self.cpu)
+        self.position = snapshot.position
+        self._boundary_index = bisect.bisect_left(self._boundary_positions, snapshot.position)
+
+    def run(self, end_cycles=None, break_addresses=None):
+        """
+        Replay until end_cycles (default: the end of the recording) are
+        reached. Stops at the first instruction boundary at or after
+        end_cycles, or before a instruction at one of the break_addresses:
+        Then True is returned.
+
+        last_op_cycles are the cycles before the last replayed instruction.
+        """
+        if end_cycles is None:
+            end_cycles = self.recording.end_cycles
+        cpu = self.cpu
+        get_and_call_next_op = cpu.get_and_call_next_op
+        program_counter = cpu.program_counter.get
+
+        next_boundary_cycles = self._get_next_boundary_cycles()
+        if next_boundary_cycles is None:
+            next_boundary_cycles = end_cycles + 1
+
+        op_count = 0
+        last_op_cycles = None
+        try:
+            while cpu.cycles < end_cycles:
+                if cpu.cycles >= next_boundary_cycles:
+                    self._apply_boundary_events()
+                    next_boundary_cycles = self._get_next_boundary_cycles()
+                    if next_boundary_cycles is None:
+                        next_boundary_cycles = end_cycles + 1
+                    continue
+                if break_addresses and program_counter() in break_addresses:
+                    return True
+                last_op_cycles = cpu.cycles
+                get_and_call_next_op()
+                op_count += 1
+            if cpu.cycles >= next_boundary_cycles:
+                self._apply_boundary_events()
+        finally:
+            cpu.instruction_count += op_count
+            self.last_op_cycles = last_op_cycles
+        return False
+
+    def step(self):
+        """
+        Replay one instruction and the IRQ/sync events after it.
+        """
+        self.cpu.get_and_call_next_op()
+        self.cpu.instruction_count += 1
+        next_boundary_cycles = self._get_next_boundary_cycles()
+        if next_boundary_cycles is not None and self.cpu.cycles >= next_boundary_cycles:
+            self._apply_boundary_events()
+
+    def seek(self, cycles):
+        """
+        Restore the nearest snapshot before the given cycles
+        and replay only the remainder.
+        """
+        self.restore_snapshot(self.recording.get_snapshot(cycles))
+        self.run(end_cycles=cycles)
+
+    def check_end_state(self):
+        """
+        Raise ReplayError if the current state is not
+        the end state of the recorded run.
+        """
+        end_state = get_end_state(self.cpu)
+        if end_state != self.recording.end_state:
+            differences = [
+                "%s: %r != %r" % (key, end_state.get(key), self.recording.end_state.get(key))
+                for key in sorted(self.recording.end_state)
+                if end_state.get(key) != self.recording.end_state.get(key)
+            ]
+            raise ReplayError("End state differs: %s" % ", ".join(differences))
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
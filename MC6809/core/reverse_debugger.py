@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - reverse debugger
+    =========================
+
+    Step and continue forwards and backwards in time, e.g.:
+
+        debugger = ReverseDebugger(cpu, memory_budget=32 * 1024 * 1024)
+        debugger.add_watchpoint(0x0600)
+        with debugger:
+            debugger.continue_(max_ops=1000000) # run until $0600 changed
+            debugger.reverse_continue() # the previous write to $0600
+            debugger.reverse_step()     # the state before that instruction
+
+    While running forwards, all inputs are recorded (see replay.py) and
+    checkpoints are taken. Going backwards restores a checkpoint and
+    replays the recorded inputs forwards at full speed, until the target
+    is reached. Stepping forwards in the past replays the recording, too.
+    At the end of the recording, the debugger continues with the devices.
+
+    The checkpoints are full snapshots. If they would need more than
+    memory_budget bytes, every second checkpoint will be dropped and the
+    checkpoint interval is doubled. So the maximal replay distance grows
+    with the length of the recorded history.
+
+    Breakpoints stop before the instruction at the address is executed.
+    Watchpoints stop after the instruction (or sync callback) that has
+    changed the memory value at the address. Without watchpoints, the
+    search backwards replays in bursts up to the next breakpoint. With
+    watchpoints it replays instruction by instruction, and a write
+    middleware collects the written watchpoint addresses.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import sys
+
+from MC6809.core.replay import SYNC, Recorder, Replayer
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024 # Bytes for the checkpoints
+DEFAULT_CHECKPOINT_CYCLES = 10000 # initial checkpoint interval
+CHECKPOINT_OVERHEAD = 1024 # Bytes per checkpoint for the registers etc.
+
+# Stop reasons:
+BREAKPOINT = "breakpoint"
+WATCHPOINT = "watchpoint"
+
+
+class ReverseDebugger(object):
+    def __init__(self, cpu, memory_budget=DEFAULT_MEMORY_BUDGET, checkpoint_cycles=DEFAULT_CHECKPOINT_CYCLES):
+        self.cpu = cpu
+        self.memory_budget = memory_budget
+        self.checkpoint_cycles = checkpoint_cycles
+
+        self.breakpoints = set()
+        self.watchpoints = set()
+
+        self.recording = None
+        self.recorder = None # Recorder, if we are at the end of the recording
+        self.replayer = None # Replayer, if we are in the past
+        self.next_checkpoint_cycles = None
+
+        # While watching: address -> value before the first write, see: _install_watch()
+        self._written = None
+        self._saved_middlewares = None
+
+    def add_breakpoint(self, address):
+        self.breakpoints.add(address)
+
+    def remove_breakpoint(self, address):
+        self.breakpoints.discard(address)
+
+    def add_watchpoint(self, address):
+        self.watchpoints.add(address)
+
+    def remove_watchpoint(self, address):
+        self.watchpoints.discard(address)
+
+    #--------------------------------------------------------------------------
+
+    def start(self):
+        assert self.recording is None, "Debugger is already started!"
+        self.recorder = Recorder(self.cpu, snapshot_cycles=None)
+        self.recorder.install()
+        self.recording = self.recorder.recording
+        self.next_checkpoint_cycles = self.cpu.cycles + self.checkpoint_cycles
+
+    def stop(self):
+        """
+        Go to the end of the recording and remove the recorder.
+        """
+        assert self.recording is not None, "Debugger is not started!"
+        self._go_to_end()
+        self.recorder.uninstall()
+        self.recorder = None
+        self.recording = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    #--------------------------------------------------------------------------
+
+    @property
+    def is_replaying(self):
+        return self.replayer is not None
+
+    def get_checkpoint_size(self):
+        """
+        The memory usage of the checkpoints in bytes.
+        """
+        return sum([
+            len(snapshot.memory) + CHECKPOINT_OVERHEAD
+            for snapshot in self.recording.snapshots
+        ])
+
+    def _take_checkpoint(self):
+        self.recorder.take_snapshot()
+        self.next_checkpoint_cycles = self.cpu.cycles + self.checkpoint_cycles
+
+        if self.get_checkpoint_size() > self.memory_budget:
+            snapshots = self.recording.snapshots
+            # The first snapshot is the start of the recording, keep it:
+            snapshots[:] = snapshots[::2]
+            self.checkpoint_cycles *= 2
+            log.info("Reverse debugger: %i checkpoints left, new interval: %i cycles",
+                len(snapshots), self.checkpoint_cycles
+            )
+
+    def _go_to_past(self):
+        """
+        Stop the recording and replay it.
+        """
+        if self.replayer is None:
+            self.recorder.uninstall()
+            self.replayer = Replayer(self.cpu, self.recording)
+
+    def _go_live(self):
+        """
+        Continue the recording with the devices.
+        """
+        self.replayer.uninstall()
+        self.replayer = None
+        self.recorder = Recorder(self.cpu, snapshot_cycles=None, recording=self.recording)
+        self.recorder.install()
+        self.next_checkpoint_cycles = self.cpu.cycles + self.checkpoint_cycles
+
+    def _go_to_end(self):
+        if self.replayer is not None:
+            self.replayer.run()
+            self._go_live()
+
+    def _get_position(self):
+        if self.replayer is not None:
+            return self.replayer.position
+        return len(self.recording.events)
+
+    def _forward_step(self):
+        """
+        Execute one instruction. Returns the changed watchpoint address or None.
+        """
+        position = self._get_position()
+
+        if self.replayer is not None:
+            if self.cpu.cycles >= self.recording.end_cycles:
+                self._go_live()
+                position = self._get_position()
+            else:
+                self.replayer.step()
+
+        if self.replayer is None:
+            cpu = self.cpu
+            cpu.get_and_call_next_op()
+            cpu.instruction_count += 1
+            cpu.call_sync_callbacks()
+            if cpu.cycles >= self.next_checkpoint_cycles:
+                self._take_checkpoint()
+
+        if self._written is None:
+            return None
+        return self._get_changed_watchpoint(position)
+
+    #--------------------------------------------------------------------------
+
+    def _install_watch(self):
+        """
+        Add a write middleware to all watchpoints, that stores the
+        value before the first write. So only the written watchpoints
+        must be compared after a instruction.
+        """
+        if not self.watchpoints:
+            return
+        middlewares = self.cpu.memory._write_byte_middleware
+        self._written = {}
+        self._saved_middlewares = {}
+        for address in self.watchpoints:
+            middleware = middlewares.get(address)
+            self._saved_middlewares[address] = middleware
+            middlewares[address] = self._get_watch_middleware(middleware)
+
+    def _get_watch_middleware(self, middleware):
+        written = self._written
+        get_block = self.cpu.memory.get_block
+
+        def watch_middleware(cycles, last_op_address, address, value):
+            if middleware is not None:
+                value = middleware(cycles, last_op_address, address, value)
+            if address not in written:
+                written[address] = get_block(address, address + 1)[0]
+            return value
+
+        return watch_middleware
+
+    def _uninstall_watch(self):
+        if self._saved_middlewares is None:
+            return
+        middlewares = self.cpu.memory._write_byte_middleware
+        for address, middleware in self._saved_middlewares.items():
+            if middleware is None:
+                del middlewares[address]
+            else:
+                middlewares[address] = middleware
+        self._written = None
+        self._saved_middlewares = None
+
+    def _get_changed_watchpoint(self, position):
+        """
+        Returns the lowest watchpoint address, that is changed by the
+        written values or by the sync events since the event position.
+        """
+        changed = set()
+        written = self._written
+        if written:
+            get_block = self.cpu.memory.get_block
+            for address, value in written.items():
+                if get_block(address, address + 1)[0] != value:
+                    changed.add(address)
+            written.clear()
+
+        # The sync callbacks may change the memory without write_byte():
+        events = self.recording.events
+        for event in events[position:self._get_position()]:
+            if event[1] == SYNC:
+                changed.update(
+                    address for address, value in event[3]["memory"]
+                    if address in self.watchpoints
+                )
+
+        if changed:
+            return min(changed)
+        return None
+
+    #--------------------------------------------------------------------------
+
+    def step(self, count=1):
+        self._install_watch()
+        try:
+            for __ in range(count):
+                self._forward_step()
+        finally:
+            self._uninstall_watch()
+
+    def continue_(self, max_ops=None):
+        """
+        Run until a breakpoint or watchpoint is hit.
+        Returns (BREAKPOINT or WATCHPOINT, address)
+        or None if max_ops instructions are executed.
+        """
+        program_counter = self.cpu.program_counter.get
+        op_count = 0
+        self._install_watch()
+        try:
+            while max_ops is None or op_count < max_ops:
+                address = self._forward_step()
+                op_count += 1
+                if address is not None:
+                    return WATCHPOINT, address
+                if program_counter() in self.breakpoints:
+                    return BREAKPOINT, program_counter()
+        finally:
+            self._uninstall_watch()
+        return None
+
+    def _scan(self, snapshot, end_cycles, all_boundaries=False):
+        """
+        Replay from the snapshot to end_cycles and return the last stop
+        point before end_cycles as (cycles, reason, address) or None.
+        With all_boundaries every instruction boundary is a stop point.
+        """
+        cpu = self.cpu
+        replayer = self.replayer
+        program_counter = cpu.program_counter.get
+        breakpoints = self.breakpoints
+
+        replayer.restore_snapshot(snapshot)
+
+        if all_boundaries:
+            replayer.run(end_cycles)
+            if replayer.last_op_cycles is None:
+                return None
+            return replayer.last_op_cycles, None, None
+
+        last_hit = None
+        if not self.watchpoints:
+            # Replay in bursts from breakpoint to breakpoint:
+            while replayer.run(end_cycles, break_addresses=breakpoints):
+                last_hit = (cpu.cycles, BREAKPOINT, program_counter())
+                replayer.step()
+            return last_hit
+
+        self._install_watch()
+        try:
+            while cpu.cycles < end_cycles:
+                if program_counter() in breakpoints:
+                    last_hit = (cpu.cycles, BREAKPOINT, program_counter())
+
+                position = replayer.position
+                replayer.step()
+                address = self._get_changed_watchpoint(position)
+                if address is not None and cpu.cycles < end_cycles:
+                    last_hit = (cpu.cycles, WATCHPOINT, address)
+        finally:
+            self._uninstall_watch()
+        return last_hit
+
+    def _reverse_search(self, all_boundaries=False):
+        end_cycles = self.cpu.cycles
+        if end_cycles <= self.recording.start_cycles:
+            return None
+        self._go_to_past() # the CPU is at the start of the recording after this
+        snapshots = self.recording.snapshots
+
+        index = snapshots.index(self.recording.get_snapshot(end_cycles - 1))
+        segment_end = end_cycles
+        for snapshot in reversed(snapshots[:index + 1]):
+            hit = self._scan(snapshot, segment_end, all_boundaries)
+            if hit is not None:
+                self.replayer.seek(hit[0])
+                return hit
+            segment_end = snapshot.cycles
+
+        self.replayer.restore_snapshot(snapshots[0])
+        return None
+
+    def reverse_step(self, count=1):
+        """
+        Go back to the state before the previous instruction.
+        Returns False if the start of the recording is reached.
+        """
+        for __ in range(count):
+            if self._reverse_search(all_boundaries=True) is None:
+                return False
+        return True
+
+    def reverse_continue(self):
+        """
+        Go back to the previous breakpoint or watchpoint hit.
+        Returns (BREAKPOINT or WATCHPOINT, address) or None, if the
+        start of the recording is reached.
+        """
+        hit = self._reverse_search()
+        if hit is None:
+            return None
+        return hit[1:]
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
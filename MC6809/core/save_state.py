@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - binary save state
+    ==========================
+
+    A compact and versioned binary format for the complete CPU state, e.g.:
+
+        with open("state.bin", "wb") as f:
+            cpu.save_state(f, compression="zlib")
+
+        with open("state.bin", "rb") as f:
+            device_state = cpu.load_state(f)
+
+    cpu.get_state() returns the RAM as a tuple of 64K Python ints, that's
+    slow to pickle and huge as JSON. Here the memory is stored as raw
+    bytes in 256 byte pages and pages that contains only zeros are not
+    stored at all.
+
+    File layout, all values are big-endian:
+
+        header:  magic "MC6809SS", format version (uint16),
+                 compression (uint8), payload length (uint32),
+                 CRC32 of the uncompressed payload (uint32)
+        payload: registers X, Y, U, S, PC (uint16) A, B, DP, CC (uint8)
+                 cycles, instruction count, IRQ count (uint64),
+                 IRQ enabled (uint8), last op address (uint16)
+                 sync callbacks: count (uint16) and for every callback:
+                     callback cycles and cycles of the last call (uint64)
+                 device state: length (uint32) and JSON (UTF-8)
+                 memory: bitmap of the stored pages (32 bytes)
+                     and the stored pages
+
+    The sync callbacks itself can't be stored: Their state will be
+    restored in the order of cpu.sync_callbacks, so load the state into
+    a machine that is set up in the same way. The device state is a
+    JSON serializable object, that is given to save_state() and returned
+    by load_state().
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+import struct
+import zlib
+
+try:
+    import lzma # Python 3.3+
+except ImportError:
+    lzma = None
+
+from MC6809.components.MC6809data.MC6809_op_data_flat import REG_A, REG_B, \
+    REG_CC, REG_DP, REG_PC, REG_S, REG_U, REG_X, REG_Y
+
+
+MAGIC = b"MC6809SS"
+FORMAT_VERSION = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSIONS = {
+    None: COMPRESSION_NONE,
+    "zlib": COMPRESSION_ZLIB,
+    "lzma": COMPRESSION_LZMA,
+}
+
+HEADER = struct.Struct(">8sHBII")
+REGISTERS_16 = (REG_X, REG_Y, REG_U, REG_S, REG_PC)
+REGISTERS_8 = (REG_A, REG_B, REG_DP, REG_CC)
+REGISTERS = struct.Struct(">5H4B")
+COUNTERS = struct.Struct(">QQQBH")
+COUNT = struct.Struct(">H")
+SYNC_CALLBACK = struct.Struct(">QQ")
+LENGTH = struct.Struct(">I")
+
+MEMORY_SIZE = 0x10000
+PAGE_SIZE = 0x100
+PAGE_COUNT = MEMORY_SIZE // PAGE_SIZE
+ZERO_PAGE = bytes(bytearray(PAGE_SIZE))
+
+
+class SaveStateError(ValueError):
+    pass
+
+
+def _compress(payload, compression):
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(payload, 6)
+    elif compression == COMPRESSION_LZMA:
+        if lzma is None:
+            raise SaveStateError("lzma compression is not available")
+        return lzma.compress(payload)
+    return payload
+
+
+def _decompress(data, compression):
+    if compression == COMPRESSION_NONE:
+        return data
+    elif compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    elif compression == COMPRESSION_LZMA:
+        if lzma is None:
+            raise SaveStateError("lzma compression is not available")
+        return lzma.decompress(data)
+    raise SaveStateError("Unknown compression: %r" % compression)
+
+
+def pack_pages(memory):
+    """
+    Returns the page bitmap and the non-zero pages.
+
+    >>> bitmap, pages = pack_pages(bytearray(0x10000))
+    >>> len(bitmap), len(pages)
+    (32, 0)
+    """
+    memory = bytes(memory)
+    bitmap = bytearray(PAGE_COUNT // 8)
+    pages = []
+    for page in range(PAGE_COUNT):
+        start = page * PAGE_SIZE
+        data = memory[start:start + PAGE_SIZE]
+        if data != ZERO_PAGE:
+            bitmap[page // 8] |= 0x80 >> (page % 8)
+            pages.append(data)
+    return bytes(bitmap), b"".join(pages)
+
+
+def unpack_pages(bitmap, pages):
+    """
+    >>> memory = bytearray(0x10000)
+    >>> memory[0x1234] = 0x56
+    >>> bitmap, pages = pack_pages(memory)
+    >>> len(pages)
+    256
+    >>> unpack_pages(bitmap, pages) == memory
+    True
+    """
+    bitmap = bytearray(bitmap)
+    memory = bytearray(MEMORY_SIZE)
+    offset = 0
+    for page in range(PAGE_COUNT):
+        if bitmap[page // 8] & (0x80 >> (page % 8)):
+            start = page * PAGE_SIZE
+            memory[start:start + PAGE_SIZE] = pages[offset:offset + PAGE_SIZE]
+            offset += PAGE_SIZE
+    if offset != len(pages):
+        raise SaveStateError("Memory pages doesn't match the page bitmap")
+    return memory
+
+
+def dumps(cpu, compression="zlib", device_state=None):
+    """
+    Returns the CPU state in the binary format.
+    """
+    try:
+        compression = COMPRESSIONS[compression]
+    except KeyError:
+        raise SaveStateError("Unknown compression %r (existing: zlib, lzma or None)" % compression)
+
+    payload = io.BytesIO()
+    payload.write(REGISTERS.pack(*[
+        cpu.register_str2object[register].get()
+        for register in REGISTERS_16 + REGISTERS_8
+    ]))
+    payload.write(COUNTERS.pack(
+        cpu.cycles, cpu.instruction_count, cpu.irq_count,
+        int(bool(cpu.irq_enabled)), cpu.last_op_address,
+    ))
+
+    payload.write(COUNT.pack(len(cpu.sync_callbacks)))
+    for callback_cycles, callback in cpu.sync_callbacks:
+        payload.write(SYNC_CALLBACK.pack(callback_cycles, cpu.sync_callbacks_cyles[callback]))
+
+    device_data = json.dumps(device_state).encode("utf-8")
+    payload.write(LENGTH.pack(len(device_data)))
+    payload.write(device_data)
+
+    bitmap, pages = pack_pages(cpu.memory.get_block(0x0000, MEMORY_SIZE))
+    payload.write(bitmap)
+    payload.write(pages)
+
+    payload = payload.getvalue()
+    data = _compress(payload, compression)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, compression, len(data), zlib.crc32(payload) & 0xffffffff)
+    return header + data
+
+
+def loads(cpu, data):
+    """
+    Restore the CPU state from the binary format.
+    Returns the device state.
+    """
+    if len(data) < HEADER.size:
+        raise SaveStateError("Save state is too short")
+    magic, version, compression, length, crc32 = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC:
+        raise SaveStateError("No MC6809 save state (magic: %r)" % magic)
+    if version != FORMAT_VERSION:
+        raise SaveStateError("Unsupported save state version %i (supported: %i)" % (version, FORMAT_VERSION))
+    data = data[HEADER.size:]
+    if len(data) != length:
+        raise SaveStateError("Save state is truncated: %i Bytes instead of %i" % (len(data), length))
+    payload = _decompress(data, compression)
+    if zlib.crc32(payload) & 0xffffffff != crc32:
+        raise SaveStateError("CRC32 error")
+
+    offset = 0
+
+    def check_length(size):
+        # A payload with a valid CRC32 may be written truncated
+        if offset + size > len(payload):
+            raise SaveStateError("truncated save state")
+
+    def unpack(struct_obj):
+        check_length(struct_obj.size)
+        values = struct_obj.unpack_from(payload, offset)
+        return offset + struct_obj.size, values
+
+    offset, registers = unpack(REGISTERS)
+    offset, (cycles, instruction_count, irq_count, irq_enabled, last_op_address) = unpack(COUNTERS)
+
+    offset, (sync_callback_count,) = unpack(COUNT)
+    if sync_callback_count != len(cpu.sync_callbacks):
+        raise SaveStateError("Save state has %i sync callbacks, the CPU has %i" % (
+            sync_callback_count, len(cpu.sync_callbacks)
+        ))
+    sync_callbacks = []
+    for __ in range(sync_callback_count):
+        offset, values = unpack(SYNC_CALLBACK)
+        sync_callbacks.append(values)
+
+    offset, (device_length,) = unpack(LENGTH)
+    check_length(device_length)
+    device_state = json.loads(payload[offset:offset + device_length].decode("utf-8"))
+    offset += device_length
+
+    bitmap_size = PAGE_COUNT // 8
+    check_length(bitmap_size)
+    memory = unpack_pages(payload[offset:offset + bitmap_size], payload[offset + bitmap_size:])
+
+    # Everything is unpacked, change the CPU:
+    for register, value in zip(REGISTERS_16 + REGISTERS_8, registers):
+        cpu.register_str2object[register].set(value)
+    cpu.cycles = cycles
+    cpu.instruction_count = instruction_count
+    cpu.irq_count = irq_count
+    cpu.irq_enabled = bool(irq_enabled)
+    cpu.last_op_address = last_op_address
+    for (callback_cycles, callback), (__, last_call_cycles) in zip(cpu.sync_callbacks, sync_callbacks):
+        cpu.sync_callbacks_cyles[callback] = last_call_cycles
+    cpu.memory.load(0x0000, memory)
+
+    return device_state
+
+
+def save_state(cpu, fileobj, compression="zlib", device_state=None):
+    fileobj.write(dumps(cpu, compression, device_state))
+
+
+def load_state(cpu, fileobj):
+    return loads(cpu, fileobj.read())
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - multi process scaling benchmark
+    ========================================
+
+    Run the workloads in 1..N worker processes at the same time.
+    Every worker creates its own CPU/Memory pair.
+
+    All workers will be started and wait until every worker is ready,
+    then all workers run the workloads concurrently. Measured:
+
+        * startup: from the process start until the worker is ready
+        * per process throughput: CPU cycles/sec in the worker
+        * aggregate throughput: all CPU cycles / wall clock time
+        * scaling efficiency: aggregate / (processes * single process)
+        * RSS: max. resident set size of the worker
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # e.g.: Windows
+    resource = None
+
+try:
+    from queue import Empty # Python 3
+except ImportError:
+    from Queue import Empty # Python 2
+
+import MC6809
+from MC6809.core.bechmark import bench, DEFAULT_WORKLOADS
+from MC6809.utils.humanize import locale_format_number
+from MC6809.utils.stats import mean
+from MC6809.workloads import create_cpu, get_workloads
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+RESULT_FORMAT_VERSION = 1
+
+# Max. seconds to wait for a worker message:
+WORKER_TIMEOUT = 600
+
+
+def get_process_counts(max_processes):
+    """
+    Double the number of processes until max_processes is reached.
+
+    >>> get_process_counts(1)
+    [1]
+    >>> get_process_counts(6)
+    [1, 2, 4, 6]
+    >>> get_process_counts(8)
+    [1, 2, 4, 8]
+    """
+    if max_processes < 1:
+        raise ValueError("max_processes must be greater than 0")
+    process_counts = []
+    count = 1
+    while count < max_processes:
+        process_counts.append(count)
+        count *= 2
+    process_counts.append(max_processes)
+    return process_counts
+
+
+def get_max_rss():
+    """
+    Returns the max. resident set size of the current process in KBytes
+    or None, if the resource module is not available.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss //= 1024 # bytes on Mac OS
+    return max_rss
+
+
+def worker(queue, start_event, spawn_time, workload_names, multiply, loops):
+    """
+    Runs in the worker process: send "ready" if the CPU is created
+    and run the workloads after the start event is set.
+    """
+    try:
+        workloads = get_workloads(workload_names, multiply)
+        create_cpu() # Every bench() call creates a fresh CPU, this one is for the startup time
+        queue.put(("ready", os.getpid(), time.time() - spawn_time))
+
+        start_event.wait()
+        duration = 0
+        cycles = 0
+        instructions = 0
+        for workload in workloads:
+            bench_duration, bench_cycles, bench_instructions = bench(workload, loops)
+            duration += bench_duration
+            cycles += bench_cycles
+            instructions += bench_instructions
+
+        queue.put(("done", os.getpid(), {
+            "duration": duration,
+            "cycles": cycles,
+            "instructions": instructions,
+            "max_rss": get_max_rss(),
+        }))
+    except Exception:
+        queue.put(("error", os.getpid(), traceback.format_exc()))
+
+
+def _get_message(queue, expected):
+    try:
+        state, pid, data = queue.get(timeout=WORKER_TIMEOUT)
+    except Empty:
+        raise RuntimeError("Worker doesn't answer in %i sec." % WORKER_TIMEOUT)
+    if state == "error":
+        raise RuntimeError("Worker %i failed:\n%s" % (pid, data))
+    assert state == expected, "%r != %r" % (state, expected)
+    return pid, data
+
+
+def run_processes(process_count, workload_names, multiply, loops):
+    """
+    Run the workloads in process_count worker processes at the same time.
+    """
+    queue = multiprocessing.Queue()
+    start_event = multiprocessing.Event()
+
+    processes = []
+    completed = False
+    try:
+        for __ in range(process_count):
+            process = multiprocessing.Process(
+                target=worker,
+                args=(queue, start_event, time.time(), workload_names, multiply, loops)
+            )
+            process.start()
+            processes.append(process)
+
+        workers = {}
+        for __ in range(process_count):
+            pid, startup = _get_message(queue, "ready")
+            workers[pid] = {"startup": startup}
+
+        start_time = time.time()
+        start_event.set()
+        for __ in range(process_count):
+            pid, data = _get_message(queue, "done")
+            workers[pid].update(data)
+        wall_duration = time.time() - start_time
+        completed = True
+    finally:
+        if not completed:
+            # The other workers may wait for the start event forever
+            for process in processes:
+                process.terminate()
+        for process in processes:
+            process.join(WORKER_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+    workers = [workers[pid] for pid in sorted(workers)]
+    total_cycles = sum([data["cycles"] for data in workers])
+    result = {
+        "processes": process_count,
+        "wall_duration": wall_duration,
+        "cycles": total_cycles,
+        "instructions": sum([data["instructions"] for data in workers]),
+        "aggregate_cycles_per_sec": total_cycles / wall_duration,
+        "process_cycles_per_sec": mean([data["cycles"] / data["duration"] for data in workers]),
+        "startup": mean([data["startup"] for data in workers]),
+        "max_startup": max([data["startup"] for data in workers]),
+        "workers": workers,
+    }
+    max_rss = [data["max_rss"] for data in workers if data["max_rss"] is not None]
+    if max_rss:
+        result["max_rss"] = max(max_rss)
+    else:
+        result["max_rss"] = None
+    return result
+
+
+def print_scaling(results):
+    print("\n%9s %15s %15s %10s %11s %12s" % (
+        "processes", "aggregate", "per process", "efficiency", "startup", "max. RSS"
+    ))
+    print("%9s %15s %15s %10s %11s %12s" % (
+        "", "cycles/sec", "cycles/sec", "", "avg./max.", "per process"
+    ))
+    print("-" * 79)
+    for result in results["scaling"]:
+        if result["max_rss"] is None:
+            max_rss = "-"
+        else:
+            max_rss = "%.1f MB" % (result["max_rss"] / 1024)
+        print("%9i %15s %15s %9.1f%% %5.0f/%-4.0fms %12s" % (
+            result["processes"],
+            locale_format_number(result["aggregate_cycles_per_sec"]),
+            locale_format_number(result["process_cycles_per_sec"]),
+            result["efficiency"] * 100,
+            result["startup"] * 1000, result["max_startup"] * 1000,
+            max_rss,
+        ))
+
+
+def run_scaling_benchmark(max_processes=None, loops=1, multiply=None, workloads=None, json_file=None):
+    """
+    Run the workloads in 1..max_processes concurrent worker processes.
+    max_processes=None will use the number of CPUs.
+    """
+    if max_processes is None:
+        max_processes = multiprocessing.cpu_count()
+    if not workloads:
+        workloads = DEFAULT_WORKLOADS
+    workloads = [workload.name for workload in get_workloads(workloads, multiply)]
+
+    results = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "mc6809_version": MC6809.__version__,
+        "python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "created": time.time(),
+        "loops": loops,
+        "multiply": multiply,
+        "workloads": workloads,
+        "scaling": [],
+    }
+
+    print("\nScaling benchmark with %s - %i loops (%i CPUs)" % (
+        ", ".join(workloads), loops, results["cpu_count"]
+    ))
+    single_process = None
+    for process_count in get_process_counts(max_processes):
+        print("\tRun %i worker processes..." % process_count)
+        result = run_processes(process_count, workloads, multiply, loops)
+        if single_process is None:
+            single_process = result["aggregate_cycles_per_sec"]
+        result["efficiency"] = result["aggregate_cycles_per_sec"] / (process_count * single_process)
+        results["scaling"].append(result)
+
+    print_scaling(results)
+
+    if json_file is not None:
+        with open(json_file, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+        print("\nResults saved to %r" % json_file)
+
+    return results
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - minimal WebSocket implementation
+    =========================================
+
+    Only the parts of RFC 6455 that the CPU control server needs: The
+    opening handshake and reading/writing of frames with asyncio streams.
+    No extensions, no sub protocols.
+
+    Only usable with Python 3.5 or newer.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+import base64
+import hashlib
+import os
+import struct
+
+
+# see: https://tools.ietf.org/html/rfc6455#section-1.3
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+MAX_PAYLOAD_SIZE = 65536
+
+
+class WebSocketError(Exception):
+    def __init__(self, msg, close_code=CLOSE_PROTOCOL_ERROR):
+        super(WebSocketError, self).__init__(msg)
+        self.close_code = close_code
+
+
+def get_accept_key(key):
+    """
+    The Sec-WebSocket-Accept value for the Sec-WebSocket-Key of the client.
+
+    >>> get_accept_key("dGhlIHNhbXBsZSBub25jZQ==")
+    's3pPLMBiTxaQ9kYGzzhZRbK+xOo='
+    """
+    digest = hashlib.sha1((key + GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def create_key():
+    """
+    A random Sec-WebSocket-Key for the handshake of a client.
+    """
+    return base64.b64encode(os.urandom(16)).decode("ascii")
+
+
+def apply_mask(payload, mask):
+    """
+    Mask/unmask the payload (it's the same operation)
+
+    >>> apply_mask(b"abcd", b"\\x01\\x02\\x03\\x04")
+    b'````'
+    >>> apply_mask(b"`````", b"\\x01\\x02\\x03\\x04")
+    b'abcda'
+    """
+    size = len(payload)
+    if not size:
+        return b""
+    # XOR all bytes at once as big integers:
+    repeated_mask = (mask * (size // 4 + 1))[:size]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(repeated_mask, "big")
+    return value.to_bytes(size, "big")
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=None):
+    """
+    A complete frame. Frames of a server are not masked, frames of a
+    client must be masked with a random 4 byte mask.
+
+    >>> encode_frame(b"Hello")
+    b'\\x81\\x05Hello'
+    >>> encode_frame(b"Hello", mask=b"\\x37\\xfa\\x21\\x3d")
+    b'\\x81\\x857\\xfa!=\\x7f\\x9fMQX'
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    header = bytearray([0x80 | opcode]) # FIN bit + opcode
+    mask_bit = 0x80 if mask is not None else 0x00
+    size = len(payload)
+    if size < 126:
+        header.append(mask_bit | size)
+    elif size < 0x10000:
+        header.append(mask_bit | 126)
+        header += struct.pack(">H", size)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack(">Q", size)
+    if mask is not None:
+        header += mask
+        payload = apply_mask(payload, mask)
+    return bytes(header) + payload
+
+
+def encode_close_frame(close_code=CLOSE_NORMAL, mask=None):
+    return encode_frame(struct.pack(">H", close_code), OP_CLOSE, mask)
+
+
+async def read_frame(reader, max_size=MAX_PAYLOAD_SIZE):
+    """
+    Read one frame from the asyncio StreamReader.
+    Returns (fin, opcode, payload) with the unmasked payload.
+    """
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    if first & 0x70:
+        raise WebSocketError("Unsupported extension bits: %02x" % first)
+    opcode = first & 0x0f
+
+    size = second & 0x7f
+    if size == 126:
+        size = struct.unpack(">H", await reader.readexactly(2))[0]
+    elif size == 127:
+        size = struct.unpack(">Q", await reader.readexactly(8))[0]
+    if size > max_size:
+        raise WebSocketError("Frame with %i bytes is too big" % size, CLOSE_TOO_BIG)
+
+    if second & 0x80:
+        mask = await reader.readexactly(4)
+        payload = apply_mask(await reader.readexactly(size), mask)
+    else:
+        payload = await reader.readexactly(size)
+    return fin, opcode, payload
+
+
+async def read_message(reader, writer, max_size=MAX_PAYLOAD_SIZE, mask=None):
+    """
+    Read the next data message and join fragmented frames.
+    Answers ping frames. Returns (opcode, payload) and
+    (OP_CLOSE, payload) if the other side closes the connection.
+    """
+    message_opcode = None
+    parts = []
+    while True:
+        fin, opcode, payload = await read_frame(reader, max_size)
+        if opcode == OP_PING:
+            writer.write(encode_frame(payload, OP_PONG, mask))
+            continue
+        elif opcode == OP_PONG:
+            continue
+        elif opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        elif opcode == OP_CONTINUATION:
+            if message_opcode is None:
+                raise WebSocketError("Continuation frame without a message")
+        elif message_opcode is not None:
+            raise WebSocketError("New message %i before the end of the last one" % opcode)
+        else:
+            message_opcode = opcode
+
+        parts.append(payload)
+        if sum(len(part) for part in parts) > max_size:
+            raise WebSocketError("Message is too big", CLOSE_TOO_BIG)
+        if fin:
+            return message_opcode, b"".join(parts)
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    The tests of CPU.run_async(), they use "async def", so this module
+    is only importable with Python 3.5 or newer: test_cpu_async.py
+    imports it only with Python 3.7 or newer (needs asyncio.run()).
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+import asyncio
+import time
+import unittest
+
+from MC6809.workloads import create_cpu
+
+
+LOOP = [
+    0x4C,       # 4000| loop  INCA
+    0x20, 0xFD, # 4001|       BRA  loop
+]
+
+
+def create_loop_cpu():
+    cpu = create_cpu()
+    cpu.memory.load(0x4000, LOOP)
+    cpu.program_counter.set(0x4000)
+    return cpu
+
+
+class RunAsyncTestCase(unittest.TestCase):
+    def test_max_cycles(self):
+        cpu = create_loop_cpu()
+        cycles = asyncio.run(cpu.run_async(cycles_per_slice=1000, max_cycles=10000))
+        self.assertEqual(cycles, cpu.cycles)
+        self.assertGreaterEqual(cpu.cycles, 10000)
+        self.assertLess(cpu.cycles, 10000 + 2000)
+        self.assertGreater(cpu.metrics.bursts, 1)
+        self.assertGreater(cpu.instruction_count, 0)
+
+    def test_yields_to_event_loop(self):
+        ticks = []
+
+        async def ticker():
+            for __ in range(5):
+                ticks.append(time.time())
+                await asyncio.sleep(0)
+
+        async def main():
+            cpus = [create_loop_cpu() for __ in range(2)]
+            await asyncio.gather(
+                ticker(),
+                *[cpu.run_async(cycles_per_slice=500, max_cycles=5000) for cpu in cpus]
+            )
+            return cpus
+
+        cpus = asyncio.run(main())
+        self.assertEqual(len(ticks), 5)
+        for cpu in cpus:
+            self.assertGreaterEqual(cpu.cycles, 5000)
+            self.assertGreater(cpu.metrics.bursts, 1)
+
+    def test_target_hz(self):
+        cpu = create_loop_cpu()
+        start_time = time.time()
+        asyncio.run(cpu.run_async(cycles_per_slice=1000, target_hz=50000, max_cycles=10000))
+        duration = time.time() - start_time
+        # 10000 cycles with 50000 Hz are 0.2 sec.
+        self.assertGreater(duration, 0.15)
+        self.assertGreater(cpu.metrics.total_sleep_duration, 0)
+        # The run duration includes the sleep, like in CPU.run():
+        self.assertGreaterEqual(cpu.metrics.total_run_duration, cpu.metrics.total_sleep_duration)
+        self.assertLess(cpu.metrics.snapshot(cpu)["cycles_per_sec"], 50000 * 1.5)
+
+    def test_quit(self):
+        async def main(cpu):
+            task = asyncio.ensure_future(cpu.run_async(cycles_per_slice=100))
+            await asyncio.sleep(0.05)
+            cpu.quit()
+            return await task
+
+        cpu = create_loop_cpu()
+        cycles = asyncio.run(main(cpu))
+        self.assertGreater(cycles, 0)
+        self.assertFalse(cpu.running)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    The tests of the control server in a asyncio event loop, they use
+    "async def", so this module is only importable with Python 3.5 or
+    newer: test_cpu_control_server.py imports it only with Python 3.7
+    or newer (needs asyncio.run()).
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+import asyncio
+import json
+from urllib.request import urlopen
+
+from MC6809.tests.test_base import BaseCPUTestCase
+
+
+LOOP = [
+    0x4C,       # 0100| loop  INCA
+    0x20, 0xFD, # 0101|       BRA  loop
+]
+
+
+class AsyncControlServerTestCase(BaseCPUTestCase):
+    def setUp(self):
+        super(AsyncControlServerTestCase, self).setUp()
+        self.cpu.memory.load(0x0100, LOOP)
+        self.cpu.program_counter.set(0x0100)
+
+    def run_with_client(self, client):
+        from MC6809.core.cpu_control_server import ControlServer
+
+        server = ControlServer(self.cpu, state_interval=0.01)
+
+        async def main():
+            await server.start("127.0.0.1", 0)
+            cpu_task = asyncio.ensure_future(server.run_cpu(cycles_per_slice=1000))
+            try:
+                await client(server)
+            finally:
+                self.cpu.quit()
+                await cpu_task
+                await server.close()
+
+        asyncio.run(main())
+
+    async def request(self, server, path, data=None):
+        url = "http://%s:%s%s" % (server.server_address[:2] + (path,))
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(None, lambda: urlopen(url, data=data, timeout=5))
+        try:
+            return json.loads(response.read().decode("utf-8"))
+        finally:
+            response.close()
+
+    def test_pause_step_resume(self):
+        async def client(server):
+            await asyncio.sleep(0.05)
+            data = await self.request(server, "/pause/", data=b"")
+            self.assertGreater(data["cycle_count"], 0)
+            await asyncio.sleep(0.05)
+            status = await self.request(server, "/status/")
+            self.assertEqual(status["cycle_count"], data["cycle_count"])
+
+            pc = status["pc"]
+            data = await self.request(server, "/step/", data=b"")
+            self.assertNotEqual(data["pc"], pc)
+
+            await self.request(server, "/resume/", data=b"")
+            await asyncio.sleep(0.05)
+            status = await self.request(server, "/status/")
+            self.assertGreater(status["cycle_count"], data["cycle_count"])
+
+        self.run_with_client(client)
+
+    def test_websocket_state_deltas(self):
+        from MC6809.core import websocket
+
+        async def client(server):
+            reader, writer = await asyncio.open_connection(*server.server_address[:2])
+            key = websocket.create_key()
+            request = (
+                "GET /ws/ HTTP/1.1\r\n"
+                "Host: localhost\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                "Sec-WebSocket-Key: %s\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+                "\r\n"
+            ) % key
+            writer.write(request.encode("ascii"))
+            head = await reader.readuntil(b"\r\n\r\n")
+            self.assertTrue(head.startswith(b"HTTP/1.1 101 "))
+            accept = "Sec-WebSocket-Accept: %s" % websocket.get_accept_key(key)
+            self.assertIn(accept.encode("ascii"), head)
+
+            fin, opcode, payload = await websocket.read_frame(reader)
+            state = json.loads(payload.decode("utf-8"))
+            self.assertEqual(state["running"], True)
+            self.assertEqual(state["paused"], False)
+            self.assertIn(state["PC"], (0x0100, 0x0101))
+
+            fin, opcode, payload = await websocket.read_frame(reader)
+            delta = json.loads(payload.decode("utf-8"))
+            self.assertGreater(delta["cycles"], state["cycles"])
+            self.assertNotIn("running", delta)
+
+            writer.write(websocket.encode_close_frame(mask=b"\x01\x02\x03\x04"))
+            while True:
+                fin, opcode, payload = await websocket.read_frame(reader)
+                if opcode == websocket.OP_CLOSE:
+                    break
+            writer.close()
+
+        self.run_with_client(client)
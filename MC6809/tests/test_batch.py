@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from MC6809.batch import BatchJob, run_job, run_batch, result_to_dict, \
+    STATUS_END, STATUS_CYCLES, STATUS_MAX_OPS, STATUS_TIMEOUT, STATUS_ERROR
+from MC6809.cli import cli
+from MC6809.workloads import create_cpu
+
+
+SUM_CODE = [
+    0x8E, 0x10, 0x00, # 4000|       LDX  #$1000
+    0x4F,             # 4003|       CLRA
+    0xAB, 0x80,       # 4004| loop  ADDA ,X+
+    0x8C, 0x10, 0x04, # 4006|       CMPX #$1004
+    0x26, 0xF9,       # 4009|       BNE  loop
+    0xB7, 0x20, 0x00, # 400B|       STA  $2000
+]                     # 400E|
+SUM_END = 0x400E
+
+LOOP_CODE = [
+    0x20, 0xFE,       # 4000| loop  BRA  loop
+]
+
+
+def sum_job(data, job_id=None, **kwargs):
+    return BatchJob(
+        program=[(0x4000, SUM_CODE)], data=[(0x1000, data)],
+        start=0x4000, end=SUM_END, read_ranges=[(0x2000, 0x2001)],
+        job_id=job_id, **kwargs
+    )
+
+
+class KillWorkerJob(BatchJob):
+    def __setstate__(self, state):
+        os._exit(1) # unpickled in the worker process: kill it
+
+
+class BatchJobTestCase(unittest.TestCase):
+    def test_run_job(self):
+        result = run_job(sum_job([1, 2, 3, 4], job_id="sum"))
+        self.assertEqual(result["job_id"], "sum")
+        self.assertEqual(result["status"], STATUS_END)
+        self.assertEqual(result["error"], None)
+        self.assertEqual(result["registers"]["A"], 10)
+        self.assertEqual(result["registers"]["PC"], SUM_END)
+        self.assertEqual(result["registers"]["X"], 0x1004)
+        self.assertEqual(result["memory"], [(0x2000, 0x2001, bytearray([10]))])
+        self.assertGreater(result["cycles"], 0)
+        self.assertEqual(result["instructions"], 2 + 3 * 4 + 1)
+
+    def test_reused_cpu_is_reset(self):
+        cpu = create_cpu()
+        run_job(sum_job([0xFF, 0x01, 0x00, 0x00]), cpu)
+        job = BatchJob(
+            program=[(0x4000, [0x12])], # NOP
+            start=0x4000, end=0x4001, read_ranges=[(0x1000, 0x1004), (0x2000, 0x2001)],
+        )
+        result = run_job(job, cpu)
+        self.assertEqual(result["status"], STATUS_END)
+        self.assertEqual(result["registers"]["A"], 0)
+        self.assertEqual(result["registers"]["X"], 0)
+        self.assertEqual(result["registers"]["CC"], 0)
+        self.assertEqual(result["instructions"], 1)
+        self.assertEqual(result["memory"][0][2], bytearray(4))
+        self.assertEqual(result["memory"][1][2], bytearray(1))
+
+    def test_initial_registers(self):
+        job = BatchJob(
+            program=[(0x4000, [0x3A])], # ABX
+            registers={"X": 0x1000, "B": 0x22}, start=0x4000, end=0x4001,
+        )
+        result = run_job(job)
+        self.assertEqual(result["registers"]["X"], 0x1022)
+        self.assertRaises(ValueError, BatchJob, registers={"Z": 1})
+
+    def test_stop_conditions(self):
+        job = BatchJob(program=[(0x4000, LOOP_CODE)], start=0x4000, max_cycles=100)
+        result = run_job(job)
+        self.assertEqual(result["status"], STATUS_CYCLES)
+        self.assertGreaterEqual(result["cycles"], 100)
+
+        job = BatchJob(program=[(0x4000, LOOP_CODE)], start=0x4000, max_ops=10)
+        result = run_job(job)
+        self.assertEqual(result["status"], STATUS_MAX_OPS)
+        self.assertEqual(result["instructions"], 10)
+
+        job = BatchJob(program=[(0x4000, LOOP_CODE)], start=0x4000, timeout=0.05)
+        result = run_job(job)
+        self.assertEqual(result["status"], STATUS_TIMEOUT)
+
+    def test_error(self):
+        job = BatchJob(program=[(0x4000, [0x01])], start=0x4000, end=0x4001) # illegal opcode
+        result = run_job(job)
+        self.assertEqual(result["status"], STATUS_ERROR)
+        self.assertIn("UNKNOWN OP", result["error"])
+
+    def test_result_to_dict(self):
+        result = result_to_dict(run_job(sum_job([1, 2, 3, 4])))
+        self.assertEqual(result["memory"], [[0x2000, 0x2001, "0a"]])
+        json.dumps(result)
+
+
+class RunBatchTestCase(unittest.TestCase):
+    def test_run_batch(self):
+        jobs = [sum_job([no, no, no, no], job_id=no) for no in range(6)]
+        jobs.append(BatchJob(program=[(0x4000, LOOP_CODE)], start=0x4000, timeout=0.05, job_id="loop"))
+        results = dict(
+            (result["job_id"], result) for result in run_batch(jobs, max_workers=2)
+        )
+        self.assertEqual(len(results), 7)
+        for no in range(6):
+            self.assertEqual(results[no]["status"], STATUS_END)
+            self.assertEqual(results[no]["registers"]["A"], no * 4)
+        self.assertEqual(results["loop"]["status"], STATUS_TIMEOUT)
+
+    def test_worker_crash(self):
+        jobs = [sum_job([no, no, no, no], job_id=no) for no in range(6)]
+        jobs.insert(2, KillWorkerJob(job_id="crash"))
+        results = dict(
+            (result["job_id"], result) for result in run_batch(jobs, max_workers=2)
+        )
+        self.assertEqual(len(results), 7)
+        for no in range(6):
+            self.assertEqual(results[no]["status"], STATUS_END)
+            self.assertEqual(results[no]["registers"]["A"], no * 4)
+        self.assertEqual(results["crash"]["status"], STATUS_ERROR)
+        self.assertIn("BrokenProcessPool", results["crash"]["error"])
+        json.dumps(result_to_dict(results["crash"]))
+
+    def test_cli(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            jobs_file = os.path.join(temp_dir, "jobs.jsonl")
+            with open(jobs_file, "w") as f:
+                for no in range(3):
+                    f.write(json.dumps({
+                        "program": [[0x4000, "".join(["%02x" % byte for byte in SUM_CODE])]],
+                        "data": [[0x1000, "01020304"]],
+                        "start": 0x4000, "end": SUM_END,
+                        "read": [[0x2000, 0x2001]],
+                    }) + "\n")
+            output_file = os.path.join(temp_dir, "results.jsonl")
+            result = CliRunner().invoke(cli, ["batch",
+                jobs_file, "--workers", "2", "--output", output_file
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(output_file) as f:
+                results = [json.loads(line) for line in f]
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(sorted([item["job_id"] for item in results]), [1, 2, 3])
+        for item in results:
+            self.assertEqual(item["status"], STATUS_END)
+            self.assertEqual(item["memory"], [[0x2000, 0x2001, "0a"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
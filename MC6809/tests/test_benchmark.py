@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from click.testing import CliRunner
+
+from MC6809.cli import cli
+from MC6809.core.bechmark import compare_results, measure_import, RESULT_FORMAT_VERSION
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT, get_flat_opdata
+from MC6809.core import scaling_benchmark
+from MC6809.core.scaling_benchmark import get_process_counts
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.cpu_utils.instruction_caller import get_dispatch_description
+from MC6809.workloads import create_cpu
+from MC6809.utils.stats import summary, welch_t_test, student_t_two_sided_p
+
+
+def make_results(**samples):
+    benchmarks = {}
+    for name, values in samples.items():
+        benchmarks[name] = {
+            "samples": {
+                "cycles_per_sec": values,
+                "instructions_per_sec": [value / 4 for value in values],
+            },
+            "cycles_per_sec": summary(values),
+            "instructions_per_sec": summary([value / 4 for value in values]),
+        }
+    return {"format_version": RESULT_FORMAT_VERSION, "benchmarks": benchmarks}
+
+
+class StatsTestCase(unittest.TestCase):
+    def test_summary(self):
+        data = summary([5, 1, 4, 2, 3])
+        self.assertEqual(data["median"], 3)
+        self.assertEqual(data["min"], 1)
+        self.assertEqual(data["max"], 5)
+        self.assertAlmostEqual(data["stdev"], 1.5811, places=4)
+
+    def test_welch_t_test(self):
+        t, df, p = welch_t_test([27.5, 21.0, 19.0, 23.6, 17.0, 17.9], [27.1, 22.0, 20.8, 23.4, 23.4, 23.5])
+        self.assertAlmostEqual(t, -1.2896, places=4)
+        self.assertAlmostEqual(df, 7.6366, places=4)
+        self.assertAlmostEqual(p, 0.2349, places=4)
+
+    def test_student_t(self):
+        # Critical values from the t-distribution table:
+        self.assertAlmostEqual(student_t_two_sided_p(2.228, 10), 0.05, places=3)
+        self.assertAlmostEqual(student_t_two_sided_p(2.776, 4), 0.05, places=3)
+        self.assertAlmostEqual(student_t_two_sided_p(4.604, 4), 0.01, places=3)
+
+
+class CompareResultsTestCase(unittest.TestCase):
+    def test_regression(self):
+        baseline = make_results(CRC16=[100, 101, 99, 100, 100])
+        results = make_results(CRC16=[90, 91, 89, 90, 90])
+        comparison = compare_results(baseline, results)
+        self.assertEqual(len(comparison), 2)
+        name, metric, baseline_median, median, change, p, regression = comparison[0]
+        self.assertEqual((name, metric, baseline_median, median), ("CRC16", "cycles_per_sec", 100, 90))
+        self.assertAlmostEqual(change, -0.1)
+        self.assertLess(p, 0.001)
+        self.assertTrue(regression)
+
+    def test_faster_is_no_regression(self):
+        baseline = make_results(CRC16=[100, 101, 99, 100, 100])
+        results = make_results(CRC16=[110, 111, 109, 110, 110])
+        for item in compare_results(baseline, results):
+            self.assertFalse(item[-1])
+
+    def test_noise_is_no_regression(self):
+        # 5% slower median, but not significant:
+        baseline = make_results(CRC16=[100, 60, 140, 100, 100])
+        results = make_results(CRC16=[95, 140, 60, 95, 95])
+        for item in compare_results(baseline, results):
+            self.assertFalse(item[-1])
+
+    def test_below_threshold_is_no_regression(self):
+        baseline = make_results(CRC16=[100, 100.1, 99.9, 100, 100])
+        results = make_results(CRC16=[99, 99.1, 98.9, 99, 99])
+        comparison = compare_results(baseline, results, threshold=0.02)
+        for item in comparison:
+            self.assertLess(item[5], 0.05) # significant
+            self.assertFalse(item[-1]) # ...but only 1% slower
+
+    def test_missing_in_baseline(self):
+        baseline = make_results(CRC16=[100, 101, 99])
+        results = make_results(CRC16=[100, 101, 99], CRC32=[100, 101, 99])
+        comparison = compare_results(baseline, results)
+        self.assertEqual(set([item[0] for item in comparison]), set(["CRC16"]))
+
+
+class BenchmarkCLITestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _invoke(self, *args):
+        return CliRunner().invoke(cli, ("benchmark", "--loops", "1", "--multiply", "1") + args)
+
+    def test_json_and_compare(self):
+        json_file = os.path.join(self.temp_dir, "baseline.json")
+        result = self._invoke("--warmup", "0", "--repeat", "3", "--json", json_file)
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        with open(json_file) as f:
+            data = json.load(f)
+        self.assertEqual(data["repeat"], 3)
+        self.assertEqual(sorted(data["benchmarks"]), ["crc16", "crc32"])
+        for name, result_data in data["benchmarks"].items():
+            self.assertEqual(len(result_data["samples"]["cycles_per_sec"]), 3)
+            self.assertGreater(result_data["instructions_per_sec"]["median"], 0)
+
+        # A much faster baseline must fail:
+        for result_data in data["benchmarks"].values():
+            for metric in ("cycles_per_sec", "instructions_per_sec"):
+                result_data["samples"][metric] = [value * 10 for value in result_data["samples"][metric]]
+                result_data[metric] = summary(result_data["samples"][metric])
+        with open(json_file, "w") as f:
+            json.dump(data, f)
+
+        result = self._invoke("--warmup", "0", "--repeat", "3", "--compare", json_file)
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn("*** REGRESSION ***", result.output)
+        self.assertIn("significant regression(s) found!", result.output)
+
+    def test_invalid_baseline(self):
+        json_file = os.path.join(self.temp_dir, "baseline.json")
+        with open(json_file, "w") as f:
+            json.dump({"foo": "bar"}, f)
+        result = self._invoke("--compare", json_file)
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIsInstance(result.exception, ValueError)
+
+    def test_compare_needs_two_rounds(self):
+        json_file = os.path.join(self.temp_dir, "baseline.json")
+        with open(json_file, "w") as f:
+            json.dump(make_results(crc16=[100, 101, 99]), f)
+        result = self._invoke("--repeat", "1", "--compare", json_file)
+        self.assertEqual(result.exit_code, 2, result.output)
+        self.assertIn("must be at least 2 with --compare", result.output)
+
+
+class ScalingBenchmarkTestCase(unittest.TestCase):
+    def test_get_process_counts(self):
+        self.assertEqual(get_process_counts(3), [1, 2, 3])
+        self.assertEqual(get_process_counts(16), [1, 2, 4, 8, 16])
+        self.assertRaises(ValueError, get_process_counts, 0)
+
+    def test_cli(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            json_file = os.path.join(temp_dir, "scaling.json")
+            result = CliRunner().invoke(cli, ["scaling",
+                "--processes", "2", "--multiply", "1", "--workload", "crc16", "--json", json_file
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("efficiency", result.output)
+            with open(json_file) as f:
+                data = json.load(f)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(data["workloads"], ["crc16"])
+        self.assertEqual([item["processes"] for item in data["scaling"]], [1, 2])
+        self.assertEqual(data["scaling"][0]["efficiency"], 1.0)
+        for item in data["scaling"]:
+            self.assertEqual(len(item["workers"]), item["processes"])
+            self.assertGreater(item["aggregate_cycles_per_sec"], 0)
+            self.assertGreater(item["startup"], 0)
+            # every worker runs the same workload:
+            self.assertEqual(item["cycles"], data["scaling"][0]["cycles"] * item["processes"])
+
+    def test_error_before_start(self):
+        get_message = scaling_benchmark._get_message
+        def fail(queue, expected):
+            raise RuntimeError("no message")
+        scaling_benchmark._get_message = fail
+        start_time = time.time()
+        try:
+            self.assertRaises(RuntimeError,
+                scaling_benchmark.run_processes, 2, ["crc16"], 1, 1
+            )
+        finally:
+            scaling_benchmark._get_message = get_message
+        # The workers waiting for the start event are terminated:
+        self.assertLess(time.time() - start_time, 10)
+
+
+class ConstructionTestCase(unittest.TestCase):
+    def test_dispatch_description_is_cached(self):
+        self.assertIs(get_dispatch_description(CPU), get_dispatch_description(CPU))
+        cpu1 = create_cpu()
+        cpu2 = create_cpu()
+        self.assertIs(cpu1.op_collection.dispatch_description, cpu2.op_collection.dispatch_description)
+
+    def test_opcode_dict(self):
+        cpu = create_cpu()
+        self.assertEqual(len(cpu.opcode_dict), 271)
+
+        # One instance per instruction method, shared by its op codes:
+        cycles, lda_immediate = cpu.opcode_dict[0x86]
+        cycles, lda_extended = cpu.opcode_dict[0xB6]
+        self.assertIs(lda_immediate.__self__, lda_extended.__self__)
+        self.assertEqual(lda_immediate.__self__.instr_func.__name__, "instruction_LD8")
+        self.assertEqual(lda_immediate.__name__, "immediate_A_read8")
+        self.assertEqual(lda_extended.__name__, "extended_A_read8")
+
+        # Bound to the right CPU instance:
+        other_cpu = create_cpu()
+        self.assertIs(lda_immediate.__self__.cpu, cpu)
+        self.assertIs(other_cpu.opcode_dict[0x86][1].__self__.cpu, other_cpu)
+
+    def test_cli(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            json_file = os.path.join(temp_dir, "construct.json")
+            result = CliRunner().invoke(cli, ["construct",
+                "--count", "10", "--repeat", "2", "--json", json_file
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(json_file) as f:
+                data = json.load(f)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(len(data["samples"]["total"]), 2)
+        self.assertGreater(data["total"]["median"], 0)
+
+    def test_shared_rom(self):
+        result = CliRunner().invoke(cli, ["construct",
+            "--count", "10", "--repeat", "1", "--shared-rom"
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("SharedROMMemory/CPU instances", result.output)
+
+
+class ImportTestCase(unittest.TestCase):
+    def test_flat_opdata_is_up_to_date(self):
+        from MC6809.components.MC6809data.MC6809_op_data import OP_DATA
+        self.assertEqual(MC6809OP_DATA_DICT, get_flat_opdata(OP_DATA))
+
+    def test_lazy_imports(self):
+        result = measure_import("MC6809.components.cpu6809")
+        self.assertEqual(result["lazy_loaded"], [])
+        self.assertGreater(result["process_duration"], result["duration"])
+
+    def test_cli(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            json_file = os.path.join(temp_dir, "imports.json")
+            result = CliRunner().invoke(cli, ["imports",
+                "--module", "MC6809.components.memory", "--repeat", "1", "--json", json_file
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(json_file) as f:
+                data = json.load(f)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(list(data["imports"]), ["MC6809.components.memory"])
+        self.assertGreater(data["imports"]["MC6809.components.memory"]["duration"]["median"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from MC6809.core.boot_cache import BootCache, get_boot_key
+from MC6809.core.replay import get_end_state
+from MC6809.workloads import create_cpu
+
+
+BOOT_ROM = [
+    0x8E, 0x00, 0x00, # 8000|       LDX  #$0000
+    0x86, 0xAA,       # 8003|       LDA  #$AA
+    0xA7, 0x80,       # 8005| loop  STA  ,X+    ; "clear" the RAM
+    0x8C, 0x20, 0x00, # 8007|       CMPX #$2000
+    0x26, 0xF9,       # 800A|       BNE  loop
+    0x20, 0xFE,       # 800C| done  BRA  done
+]
+BOOT_CYCLES = 300000
+
+
+def create_machine(rom=BOOT_ROM):
+    cpu = create_cpu()
+    cpu.memory.load(0x8000, rom)
+    cpu.memory.load(0xFFFE, [0x80, 0x00]) # reset vector
+    return cpu
+
+
+class BootCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="MC6809_boot_cache_")
+        self.boot_cache = BootCache(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_boot(self):
+        cpu = create_machine()
+        self.assertFalse(self.boot_cache.boot(cpu, BOOT_CYCLES))
+        self.assertGreaterEqual(cpu.cycles, BOOT_CYCLES)
+        self.assertEqual(cpu.program_counter.get(), 0x800C)
+        self.assertEqual(cpu.memory.get_block(0x1FFF, 0x2001), bytearray([0xAA, 0x00]))
+        self.assertEqual(len(os.listdir(self.temp_dir)), 1)
+
+        cached_cpu = create_machine()
+        self.assertTrue(self.boot_cache.boot(cached_cpu, BOOT_CYCLES))
+        self.assertEqual(get_end_state(cached_cpu), get_end_state(cpu))
+        self.assertEqual(cached_cpu.instruction_count, cpu.instruction_count)
+
+    def test_invalidation(self):
+        self.assertFalse(self.boot_cache.boot(create_machine(), BOOT_CYCLES))
+
+        rom = list(BOOT_ROM)
+        rom[4] = 0x55 # LDA #$55
+        cpu = create_machine(rom)
+        self.assertFalse(self.boot_cache.boot(cpu, BOOT_CYCLES))
+        self.assertEqual(cpu.memory.get_block(0x0000, 0x0001), bytearray([0x55]))
+
+        self.assertFalse(self.boot_cache.boot(create_machine(), BOOT_CYCLES + 1))
+        self.assertEqual(len(os.listdir(self.temp_dir)), 3)
+
+        self.assertNotEqual(
+            get_boot_key(create_machine(), BOOT_CYCLES),
+            get_boot_key(create_machine(rom), BOOT_CYCLES),
+        )
+
+    def test_device_state(self):
+        devices = {"counter": 1}
+
+        def get_device_state():
+            return devices
+
+        def set_device_state(state):
+            devices.update(state)
+
+        self.boot_cache.boot(create_machine(), BOOT_CYCLES, get_device_state, set_device_state)
+        devices["counter"] = 0
+        self.assertTrue(self.boot_cache.boot(
+            create_machine(), BOOT_CYCLES, get_device_state, set_device_state
+        ))
+        self.assertEqual(devices, {"counter": 1})
+
+    def test_broken_file(self):
+        self.boot_cache.boot(create_machine(), BOOT_CYCLES)
+        filename = os.listdir(self.temp_dir)[0]
+        with open(os.path.join(self.temp_dir, filename), "wb") as f:
+            f.write(b"broken")
+        self.assertFalse(self.boot_cache.boot(create_machine(), BOOT_CYCLES))
+        self.assertTrue(self.boot_cache.boot(create_machine(), BOOT_CYCLES))
+
+    def test_clear(self):
+        self.boot_cache.boot(create_machine(), BOOT_CYCLES)
+        self.boot_cache.clear()
+        self.assertEqual(os.listdir(self.temp_dir), [])
+        BootCache(os.path.join(self.temp_dir, "not existing")).clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
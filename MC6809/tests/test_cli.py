@@ -90,3 +90,15 @@ class CLITestCase(unittest.TestCase):
 
         errors = ["Error", "Traceback"]
         self.assert_not_contains_members(errors, result.output)
+
+    def test_hotpath(self):
+        result = self._invoke("hotpath", "--loops", "1", "--multiply", "1")
+        self.assert_contains_members([
+            "Profile 1 CRC32 loops",
+            "Hot path time attribution for",
+            "decode/dispatch",
+            "memory fast path",
+        ], result.output)
+
+        errors = ["Error", "Traceback"]
+        self.assert_not_contains_members(errors, result.output)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import unittest
+
+
+if sys.version_info >= (3, 7):
+    # "async def" is a SyntaxError under Python 2, so the tests are in a own module:
+    from MC6809.tests.py3_cpu_async import RunAsyncTestCase
+else:
+    @unittest.skip("Needs Python 3.7 or newer")
+    class RunAsyncTestCase(unittest.TestCase):
+        def test_run_async(self):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
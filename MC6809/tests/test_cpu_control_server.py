@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import gzip
+import json
+import sys
+import threading
+import time
+import unittest
+
+try:
+    from urllib.request import Request, urlopen # Python 3
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import Request, urlopen, HTTPError # Python 2
+
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.memory import Memory
+from MC6809.tests.test_base import BaseCPUTestCase
+from MC6809.tests.test_config import TestCfg
+
+if sys.version_info >= (3, 5):
+    from MC6809.core.cpu_control_server import COMMAND_TIMEOUT, MAX_STEP_COUNT, \
+        stop_http_control_server
+
+
+LOOP = [
+    0x4C,       # 0100| loop  INCA
+    0x20, 0xFD, # 0101|       BRA  loop
+]
+
+
+class ControlServerTestCfg(TestCfg):
+    CPU_CONTROL_SERVER = True
+    CPU_CONTROL_PORT = 0 # use a free port
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "The control server needs Python 3.5 or newer")
+class ControlServerTestCase(BaseCPUTestCase):
+    def setUp(self):
+        cfg = ControlServerTestCfg(self.UNITTEST_CFG_DICT)
+        memory = Memory(cfg)
+        self.cpu = CPU(memory, cfg)
+        self.base_url = "http://%s:%s" % self.cpu.control_server.server_address[:2]
+        # Without a CPU loop the commands are only executed for a stopped CPU:
+        self.cpu.running = False
+
+    def tearDown(self):
+        stop_http_control_server(self.cpu.control_server)
+
+    def get(self, path, data=None, headers=None, method=None):
+        request = Request(self.base_url + path, data=data, headers=headers or {})
+        if method is not None:
+            request.get_method = lambda: method
+        response = urlopen(request, timeout=5)
+        try:
+            return response.getcode(), response.info(), response.read()
+        finally:
+            response.close()
+
+    def test_not_started_by_default(self):
+        cfg = TestCfg(self.UNITTEST_CFG_DICT)
+        cpu = CPU(Memory(cfg), cfg)
+        self.assertEqual(cpu.control_server, None)
+
+    def test_loopback_only(self):
+        class PublicCfg(ControlServerTestCfg):
+            CPU_CONTROL_ADDR = "0.0.0.0"
+        cfg = PublicCfg(self.UNITTEST_CFG_DICT)
+        self.assertRaises(RuntimeError, CPU, Memory(cfg), cfg)
+
+    def test_metrics(self):
+        self.cpu_test_run(start=0x0100, end=None, mem=[
+            0x86, 0x03, #       LDA   #3
+            0x4A,       # LOOP: DECA
+            0x26, 0xFD, #       BNE   LOOP
+        ])
+        status_code, headers, content = self.get("/metrics")
+        self.assertEqual(status_code, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain"))
+        content = content.decode("utf-8")
+        self.assertIn("# TYPE mc6809_cycles_total counter\n", content)
+        self.assertIn("mc6809_cycles_total %i\n" % self.cpu.cycles, content)
+        self.assertIn("mc6809_instructions_total 7\n", content)
+        self.assertIn("mc6809_irq_total 0\n", content)
+        self.assertIn('mc6809_memory_callback_calls_total{kind="read_callback"} 0\n', content)
+        self.assertNotIn("mc6809_target_mhz", content)
+
+    def test_health(self):
+        self.cpu.running = True
+        status_code, headers, content = self.get("/health")
+        self.assertEqual(status_code, 200)
+        data = json.loads(content.decode("utf-8"))
+        self.assertEqual(data["running"], True)
+
+        self.cpu.running = False
+        try:
+            self.get("/health")
+        except HTTPError as err:
+            self.assertEqual(err.code, 503)
+        else:
+            self.fail("No 503 response")
+
+    def test_status(self):
+        self.cpu.program_counter.set(0x1234)
+        status_code, headers, content = self.get("/status/")
+        data = json.loads(content.decode("utf-8"))
+        self.assertEqual(data["pc"], 0x1234)
+
+    def test_memory(self):
+        self.cpu.memory.load(0x0400, [0x01, 0x02, 0x03])
+        status_code, headers, content = self.get("/memory/0400-0402/")
+        self.assertEqual(json.loads(content.decode("utf-8")), [1, 2, 3])
+
+        self.get("/memory/0400-0401/", data=b"[4, 5]")
+        self.assertEqual(self.cpu.memory.get_block(0x0400, 0x0403), bytearray([4, 5, 3]))
+
+    def test_memory_raw(self):
+        self.cpu.memory.load(0x0400, [0x01, 0x02, 0x03])
+        cycles = self.cpu.cycles
+        status_code, headers, content = self.get("/memory/0400-0402/raw/")
+        self.assertEqual(headers["Content-Type"], "application/octet-stream")
+        self.assertEqual(content, b"\x01\x02\x03")
+        self.assertEqual(self.cpu.cycles, cycles) # block access without CPU cycles
+
+        self.get("/memory/0400-0401/raw/", data=b"\x04\x05")
+        self.assertEqual(self.cpu.memory.get_block(0x0400, 0x0403), bytearray([4, 5, 3]))
+        try:
+            self.get("/memory/0400-0401/raw/", data=b"\x04")
+        except HTTPError as err:
+            self.assertEqual(err.code, 400)
+        else:
+            self.fail("No 400 response")
+
+    def test_memory_outside_range(self):
+        for path in ("/memory/fff0-1000f/raw/", "/memory/fff0-1000f/",
+                "/memory/10000/", "/memory/0402-0400/raw/"):
+            try:
+                self.get(path)
+            except HTTPError as err:
+                self.assertEqual(err.code, 400, path)
+            else:
+                self.fail("No 400 response for %s" % path)
+
+        status_code, headers, content = self.get("/memory/fff0-ffff/raw/")
+        self.assertEqual(len(content), 16)
+
+    def test_memory_bin(self):
+        self.cpu.memory.load(0x1000, list(range(256)))
+        status_code, headers, content = self.get("/memory.bin")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        self.assertEqual(len(content), 0x10000)
+        self.assertEqual(content, bytes(self.cpu.memory.get_block(0x0000, 0x10000)))
+
+    def test_memory_bin_range(self):
+        self.cpu.memory.load(0x1000, list(range(256)))
+        status_code, headers, content = self.get("/memory.bin", headers={"Range": "bytes=4097-4099"})
+        self.assertEqual(status_code, 206)
+        self.assertEqual(headers["Content-Range"], "bytes 4097-4099/65536")
+        self.assertEqual(content, b"\x01\x02\x03")
+
+        status_code, headers, content = self.get("/memory.bin", headers={"Range": "bytes=-2"})
+        self.assertEqual(headers["Content-Range"], "bytes 65534-65535/65536")
+        self.assertEqual(len(content), 2)
+
+        try:
+            self.get("/memory.bin", headers={"Range": "bytes=65536-"})
+        except HTTPError as err:
+            self.assertEqual(err.code, 416)
+            self.assertEqual(err.headers["Content-Range"], "bytes */65536")
+        else:
+            self.fail("No 416 response")
+
+    def test_memory_bin_gzip(self):
+        self.cpu.memory.load(0x1000, list(range(256)))
+        status_code, headers, content = self.get("/memory.bin", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertLess(len(content), 0x10000)
+        self.assertEqual(gzip.decompress(content), bytes(self.cpu.memory.get_block(0x0000, 0x10000)))
+
+    def test_memory_bin_range_not_gzipped(self):
+        self.cpu.memory.load(0x1000, list(range(256)))
+        status_code, headers, content = self.get("/memory.bin",
+            headers={"Range": "bytes=4097-4099", "Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(status_code, 206)
+        self.assertEqual(headers["Content-Range"], "bytes 4097-4099/65536")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(content, b"\x01\x02\x03")
+
+    def test_put_memory_bin(self):
+        self.get("/memory.bin", data=b"\x01\x02", method="PUT",
+            headers={"Content-Range": "bytes 1024-1025/65536"}
+        )
+        self.assertEqual(self.cpu.memory.get_block(0x0400, 0x0402), bytearray([1, 2]))
+
+        self.get("/memory.bin", data=gzip.compress(b"\x03\x04"), method="PUT",
+            headers={"Content-Encoding": "gzip"}
+        )
+        self.assertEqual(self.cpu.memory.get_block(0x0000, 0x0002), bytearray([3, 4]))
+
+    def test_disassemble(self):
+        self.cpu.memory.load(0x4000, [
+            0x86, 0x12, # LDA #$12
+            0x20, 0xfc, # BRA $4000
+        ])
+        status_code, headers, content = self.get("/disassemble/4000/?count=2")
+        self.assertEqual(json.loads(content.decode("utf-8")), [
+            "4000| 86 12       LDA #$12",
+            "4002| 20 fc       BRA $4000",
+        ])
+
+    def test_registers(self):
+        status_code, headers, content = self.get("/registers/", data=b'{"PC": 4660, "A": 1}')
+        self.assertEqual(json.loads(content.decode("utf-8"))["PC"], 0x1234)
+        self.assertEqual(self.cpu.accu_a.get(), 1)
+
+        status_code, headers, content = self.get("/registers/")
+        data = json.loads(content.decode("utf-8"))
+        self.assertEqual(data["PC"], 0x1234)
+        self.assertEqual(data["A"], 1)
+
+    def test_not_found(self):
+        try:
+            self.get("/foo/")
+        except HTTPError as err:
+            self.assertEqual(err.code, 404)
+        else:
+            self.fail("No 404 response")
+
+    def test_commands_between_bursts(self):
+        self.cpu.running = True
+        self.cpu.memory.load(0x0100, LOOP)
+        self.cpu.program_counter.set(0x0100)
+
+        def run_cpu():
+            while self.cpu.running:
+                self.cpu.run(max_run_time=0.01)
+
+        cpu_thread = threading.Thread(target=run_cpu)
+        cpu_thread.start()
+        try:
+            data = json.loads(self.get("/pause/", data=b"")[2].decode("utf-8"))
+            self.assertEqual(data["paused"], True)
+            cycles = data["cycle_count"]
+            data = json.loads(self.get("/status/")[2].decode("utf-8"))
+            self.assertEqual(data["cycle_count"], cycles)
+
+            pc = data["pc"]
+            data = json.loads(self.get("/step/?count=3", data=b"")[2].decode("utf-8"))
+            self.assertEqual(data["pc"], {0x0100: 0x0101, 0x0101: 0x0100}[pc])
+            self.assertGreater(data["cycle_count"], cycles)
+            cycles = data["cycle_count"]
+
+            data = json.loads(self.get("/resume/", data=b"")[2].decode("utf-8"))
+            self.assertEqual(data["paused"], False)
+            self.get("/quit/", data=b"")
+        finally:
+            self.cpu.quit()
+            cpu_thread.join(5)
+        self.assertFalse(cpu_thread.is_alive())
+        self.assertGreater(self.cpu.cycles, cycles)
+
+        # The CPU loop has ended: Fail without waiting for the timeout
+        start_time = time.time()
+        try:
+            self.get("/status/")
+        except HTTPError as err:
+            self.assertEqual(err.code, 503)
+            self.assertIn(b"CPU not running", err.read())
+        else:
+            self.fail("No 503 response")
+        self.assertLess(time.time() - start_time, COMMAND_TIMEOUT)
+
+    def test_step_count(self):
+        self.cpu.memory.load(0x0100, LOOP)
+        self.cpu.program_counter.set(0x0100)
+        data = json.loads(self.get("/step/?count=3", data=b"")[2].decode("utf-8"))
+        self.assertEqual(data["pc"], 0x0101)
+
+        cycles = self.cpu.cycles
+        for count in (0, -1, MAX_STEP_COUNT + 1):
+            try:
+                self.get("/step/?count=%i" % count, data=b"")
+            except HTTPError as err:
+                self.assertEqual(err.code, 400)
+            else:
+                self.fail("No 400 response for count %i" % count)
+        self.assertEqual(self.cpu.cycles, cycles)
+
+    def test_running_cpu_without_loop(self):
+        # e.g.: The CPU runs via burst_run() in a other thread
+        self.cpu.running = True
+        start_time = time.time()
+        try:
+            self.get("/memory/0400-0402/", data=b"[1, 2, 3]")
+        except HTTPError as err:
+            self.assertEqual(err.code, 503)
+        else:
+            self.fail("No 503 response")
+        self.assertLess(time.time() - start_time, COMMAND_TIMEOUT)
+        self.assertEqual(self.cpu.memory.get_block(0x0400, 0x0403), bytearray([0, 0, 0]))
+
+    def test_error_is_escaped(self):
+        try:
+            self.get("/<script>/")
+        except HTTPError as err:
+            self.assertEqual(err.code, 404)
+            content = err.read()
+            self.assertNotIn(b"<script>", content)
+            self.assertIn(b"&lt;script&gt;", content)
+        else:
+            self.fail("No 404 response")
+
+
+if sys.version_info >= (3, 7):
+    # "async def" is a SyntaxError under Python 2, so the tests are in a own module:
+    from MC6809.tests.py3_cpu_control_server import AsyncControlServerTestCase
+else:
+    @unittest.skip("Needs Python 3.7 or newer")
+    class AsyncControlServerTestCase(unittest.TestCase):
+        def test_control_server(self):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from MC6809.components.cpu6809 import CPUStatusThread
+from MC6809.tests.test_base import BaseCPUTestCase
+
+
+class CPUMetricsTestCase(BaseCPUTestCase):
+    def setUp(self):
+        super(CPUMetricsTestCase, self).setUp()
+        self.cpu.memory.load(0x0100, [
+            0x12,       # NOP
+            0x20, 0xFD, # BRA to NOP
+        ])
+        self.cpu.program_counter.set(0x0100)
+
+    def test_initial_snapshot(self):
+        metrics = self.cpu.get_metrics()
+        self.assertEqual(metrics["cycles"], 0)
+        self.assertEqual(metrics["instructions"], 0)
+        self.assertEqual(metrics["irq_count"], 0)
+        self.assertEqual(metrics["bursts"], 0)
+        self.assertEqual(metrics["cycles_per_sec"], 0)
+        self.assertEqual(metrics["realtime_ratio"], None)
+        self.assertFalse(metrics["below_realtime"])
+
+    def test_run(self):
+        self.cpu.outer_burst_op_count = 10
+        self.cpu.run(max_run_time=0.01)
+        metrics = self.cpu.get_metrics()
+        self.assertEqual(metrics["bursts"], 1)
+        self.assertEqual(metrics["instructions"], 10 * self.cpu.inner_burst_op_count)
+        self.assertEqual(metrics["burst_instructions"], metrics["instructions"])
+        self.assertEqual(metrics["cycles"], self.cpu.cycles)
+        self.assertEqual(metrics["burst_cycles"], self.cpu.cycles)
+        self.assertGreater(metrics["cycles_per_sec"], 0)
+        self.assertGreater(metrics["instructions_per_sec"], 0)
+        self.assertEqual(metrics["target_mhz"], None)
+
+        self.cpu.run(max_run_time=0.01)
+        metrics = self.cpu.get_metrics()
+        self.assertEqual(metrics["bursts"], 2)
+        self.assertGreaterEqual(metrics["scheduler_lag"], 0)
+
+    def test_speed_limited_run(self):
+        self.cpu.outer_burst_op_count = 10
+        self.cpu.run(max_run_time=0.01, target_cycles_per_sec=1000)
+        metrics = self.cpu.get_metrics()
+        self.assertEqual(metrics["target_mhz"], 0.001)
+        self.assertGreater(metrics["burst_sleep"], 0)
+        self.assertEqual(metrics["total_sleep_duration"], metrics["burst_sleep"])
+        self.assertFalse(metrics["below_realtime"])
+
+    def test_below_realtime(self):
+        self.cpu.outer_burst_op_count = 10
+        self.cpu.run(max_run_time=0.01, target_cycles_per_sec=100 * 1000 * 1000 * 1000)
+        metrics = self.cpu.get_metrics()
+        self.assertLess(metrics["realtime_ratio"], 1)
+        self.assertTrue(metrics["below_realtime"])
+
+    def test_test_run_count_instructions(self):
+        self.cpu_test_run(start=0x2000, end=None, mem=[
+            0x86, 0x03, #       LDA   #3
+            0x4A,       # LOOP: DECA
+            0x26, 0xFD, #       BNE   LOOP
+        ])
+        self.assertEqual(self.cpu.instruction_count, 1 + 3 * 2)
+
+    def test_irq_count(self):
+        self.cpu.irq_enabled = True
+        self.cpu.cc.I = 0
+        self.cpu.system_stack_pointer.set(0x4000)
+        self.cpu.irq()
+        self.assertEqual(self.cpu.get_metrics()["irq_count"], 1)
+
+        self.cpu.cc.I = 1 # IRQ masked -> not counted
+        self.cpu.irq()
+        self.assertEqual(self.cpu.get_metrics()["irq_count"], 1)
+
+    def test_status_thread(self):
+        status_queue = queue.Queue()
+        metrics_queue = queue.Queue()
+        status_thread = CPUStatusThread(self.cpu, status_queue, metrics_queue)
+        status_thread.daemon = True
+        status_thread.start()
+        try:
+            cycles = status_queue.get(timeout=5)
+            metrics = metrics_queue.get(timeout=5)
+        finally:
+            self.cpu.running = False
+        self.assertEqual(cycles, 0) # the int payload of the GUI status bars
+        self.assertIsInstance(metrics, dict)
+        self.assertEqual(metrics["cycles"], 0)
+        status_thread.join(timeout=5)
+
+    def test_status_thread_without_metrics_queue(self):
+        status_queue = queue.Queue()
+        status_thread = CPUStatusThread(self.cpu, status_queue)
+        status_thread.daemon = True
+        status_thread.start()
+        try:
+            self.assertEqual(status_queue.get(timeout=5), 0)
+        finally:
+            self.cpu.running = False
+        status_thread.join(timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+from MC6809.core.disassembler import Disassembler
+from MC6809.workloads import create_cpu
+
+
+class DisassemblerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cpu = create_cpu()
+        self.disassembler = Disassembler(self.cpu.memory)
+
+    def assertDisassemble(self, address, data, text):
+        self.cpu.memory.load(address, data)
+        self.assertEqual(self.disassembler.disasm(address), (text, len(data)))
+
+    def test_addressing_modes(self):
+        self.assertDisassemble(0x4000, [0x12], "NOP")
+        self.assertDisassemble(0x4000, [0x86, 0x12], "LDA #$12")
+        self.assertDisassemble(0x4000, [0x10, 0x8e, 0x12, 0x34], "LDY #$1234")
+        self.assertDisassemble(0x4000, [0x96, 0x12], "LDA <$12")
+        self.assertDisassemble(0x4000, [0xbd, 0xa0, 0x00], "JSR $a000")
+        self.assertDisassemble(0x4000, [0x26, 0xfe], "BNE $4000")
+        self.assertDisassemble(0x4000, [0x17, 0x00, 0x10], "LBSR $4013")
+        self.assertDisassemble(0x4000, [0x10, 0x27, 0xff, 0xfc], "LBEQ $4000")
+        self.assertDisassemble(0x4000, [0x11, 0x3f], "SWI3")
+
+    def test_register_postbytes(self):
+        self.assertDisassemble(0x4000, [0x1f, 0x89], "TFR A,B")
+        self.assertDisassemble(0x4000, [0x1e, 0x12], "EXG X,Y")
+        self.assertDisassemble(0x4000, [0x34, 0x76], "PSHS A,B,X,Y,U")
+        self.assertDisassemble(0x4000, [0x36, 0xc0], "PSHU S,PC")
+        self.assertDisassemble(0x4000, [0x35, 0x81], "PULS CC,PC")
+
+    def test_indexed(self):
+        self.assertDisassemble(0x4000, [0xa6, 0x04], "LDA $04,X")
+        self.assertDisassemble(0x4000, [0xa6, 0x3f], "LDA -$01,Y")
+        self.assertDisassemble(0x4000, [0xa6, 0xc0], "LDA ,U+")
+        self.assertDisassemble(0x4000, [0xa6, 0xe2], "LDA ,-S")
+        self.assertDisassemble(0x4000, [0xa6, 0xd1], "LDA [,U++]")
+        self.assertDisassemble(0x4000, [0xa6, 0x86], "LDA A,X")
+        self.assertDisassemble(0x4000, [0xa6, 0x88, 0xf0], "LDA -$10,X")
+        self.assertDisassemble(0x4000, [0xed, 0xa9, 0x12, 0x34], "STD $1234,Y")
+        self.assertDisassemble(0x4000, [0xe6, 0x8c, 0x10], "LDB $4013,PCR")
+        self.assertDisassemble(0x4000, [0x30, 0x8d, 0xff, 0xfc], "LEAX $4000,PCR")
+        self.assertDisassemble(0x4000, [0xa6, 0x9f, 0xc0, 0x00], "LDA [$c000]")
+        self.assertDisassemble(0x4000, [0x10, 0xae, 0x98, 0x02], "LDY [$02,X]")
+
+    def test_illegal(self):
+        self.assertDisassemble(0x4000, [0x01], "FCB $01")
+        self.assertDisassemble(0x4000, [0x10], "FCB $10") # followed by $00
+        self.cpu.memory.load(0x4000, [0xa6, 0x87]) # illegal postbyte
+        self.assertEqual(self.disassembler.disasm(0x4000), ("FCB $a6", 1))
+
+    def test_all_opcodes(self):
+        for opcode, op_data in MC6809OP_DATA_DICT.items():
+            if opcode in (0x10, 0x11):
+                continue
+            if opcode > 0xff:
+                data = [opcode >> 8, opcode & 0xff]
+            else:
+                data = [opcode]
+            data += [0x84, 0x00, 0x00] # ,X postbyte for the indexed ops
+            self.cpu.memory.load(0x4000, data)
+            text, length = self.disassembler.disasm(0x4000)
+            self.assertTrue(text.startswith(op_data["mnemonic"]), "$%04x: %r" % (opcode, text))
+            self.assertEqual(length, op_data["bytes"], "$%04x: %r" % (opcode, text))
+
+    def test_symbols(self):
+        self.disassembler.set_symbols({0xa000: "POLCAT", 0x4000: "LOOP"})
+        self.assertDisassemble(0x4000, [0xbd, 0xa0, 0x00], "JSR POLCAT")
+        self.assertDisassemble(0x4000, [0x20, 0xfe], "BRA LOOP")
+
+    def test_disassemble(self):
+        self.cpu.memory.load(0x4000, [
+            0x8e, 0x00, 0x00, # LDX #$0000
+            0xa7, 0x80,       # STA ,X+
+            0x20, 0xfc,       # BRA $4003
+        ])
+        self.assertEqual(self.disassembler.disassemble(0x4000, count=3), [
+            (0x4000, b"\x8e\x00\x00", "LDX #$0000"),
+            (0x4003, b"\xa7\x80", "STA ,X+"),
+            (0x4005, b"\x20\xfc", "BRA $4003"),
+        ])
+        self.assertEqual(self.disassembler.format_lines(0x4003, 0x4005), [
+            "4003| a7 80       STA ,X+",
+        ])
+
+    def test_wrap_around(self):
+        self.cpu.memory.load(0x0000, [0x34, 0x12])
+        self.cpu.memory.load(0xffff, [0x8e])
+        self.assertEqual(self.disassembler.disasm(0xffff), ("LDX #$3412", 3))
+        self.assertEqual(
+            [address for address, raw, text in self.disassembler.disassemble(0xffff, count=2)],
+            [0xffff, 0x0002]
+        )
+
+    def test_cache_invalidation_on_write(self):
+        self.assertDisassemble(0x4000, [0x86, 0x12], "LDA #$12")
+        self.assertIn(0x4000, self.disassembler._cache)
+
+        self.cpu.memory.write_byte(0x4001, 0x34)
+        self.assertEqual(self.disassembler.disasm(0x4000), ("LDA #$34", 2))
+
+        self.cpu.memory.load(0x4000, [0x10, 0x8e, 0x12, 0x34])
+        self.assertEqual(self.disassembler.disasm(0x4000), ("LDY #$1234", 4))
+
+        self.disassembler.invalidate(0x4001, 0x4002)
+        self.assertNotIn(0x4000, self.disassembler._cache)
+
+    def test_cache_invalidation_after_illegal_page_byte(self):
+        self.assertDisassemble(0x4000, [0x10], "FCB $10") # followed by $00
+        self.cpu.memory.load(0x4000, [0x10, 0x8e, 0x12, 0x34])
+        self.assertEqual(self.disassembler.disasm(0x4000), ("LDY #$1234", 4))
+
+    def test_cache_invalidation_after_illegal_postbyte(self):
+        self.cpu.memory.load(0x4000, [0xa6, 0x87])
+        self.assertEqual(self.disassembler.disasm(0x4000), ("FCB $a6", 1))
+        self.cpu.memory.load(0x4001, [0x84])
+        self.assertEqual(self.disassembler.disasm(0x4000), ("LDA ,X", 2))
+
+    def test_no_side_effects(self):
+        calls = []
+        self.cpu.memory.add_read_byte_callback(lambda *args: calls.append(args) or 0, 0x4000, 0x4010)
+        cycles = self.cpu.cycles
+        self.disassembler.disassemble(0x0000)
+        self.assertEqual(self.cpu.cycles, cycles)
+        self.assertEqual(calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
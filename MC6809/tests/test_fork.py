@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import errno
+import os
+import time
+import unittest
+
+from MC6809.core.fork import ForkChildError
+from MC6809.workloads import create_cpu
+
+
+SUM_CODE = [
+    0x8E, 0x10, 0x00, # 4000|       LDX  #$1000
+    0x4F,             # 4003|       CLRA
+    0xAB, 0x80,       # 4004| loop  ADDA ,X+
+    0x8C, 0x10, 0x04, # 4006|       CMPX #$1004
+    0x26, 0xF9,       # 4009|       BNE  loop
+]                     # 400B|
+
+
+def run_sum(cpu, data):
+    cpu.memory.load(0x1000, data)
+    cpu.test_run(0x4000, 0x400B)
+    return cpu.accu_a.get(), os.getpid()
+
+
+def fail(cpu, child_input):
+    if child_input == 1:
+        raise ValueError("child input 1")
+    return child_input
+
+
+def sleep(cpu, child_input):
+    if child_input == 1:
+        time.sleep(30)
+    return child_input
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "Needs os.fork()")
+class ForkChildrenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cpu = create_cpu()
+        self.cpu.memory.load(0x4000, SUM_CODE)
+        self.cpu.memory.load(0x1000, [0xFF] * 4)
+
+    def test_fork_children(self):
+        inputs = [[1, 2, 3, 4], [10, 20, 30, 40], [0, 0, 0, 0x7F]]
+        results = self.cpu.fork_children(len(inputs), run_sum, inputs)
+        self.assertEqual([result[0] for result in results], [10, 100, 0x7F])
+        pids = [result[1] for result in results]
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(len(set(pids)), 3)
+
+        # The parent is not changed:
+        self.assertEqual(self.cpu.memory.get_block(0x1000, 0x1004), bytearray([0xFF] * 4))
+        self.assertEqual(self.cpu.cycles, 0)
+
+    def test_default_inputs(self):
+        results = self.cpu.fork_children(4, lambda cpu, index: index * 2)
+        self.assertEqual(results, [0, 2, 4, 6])
+
+    def test_big_result(self):
+        results = self.cpu.fork_children(3,
+            lambda cpu, index: bytes(cpu.memory.get_block(0x0000, 0x10000))
+        )
+        self.assertEqual([len(result) for result in results], [0x10000] * 3)
+
+    def test_errors(self):
+        self.assertRaises(ForkChildError, self.cpu.fork_children, 3, fail)
+
+        results = self.cpu.fork_children(3, fail, raise_errors=False)
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], ForkChildError)
+        self.assertIn("child input 1", str(results[1]))
+        self.assertEqual(results[2], 2)
+
+        self.assertRaises(ValueError, self.cpu.fork_children, 2, fail, [1])
+
+    def test_timeout(self):
+        start_time = time.time()
+        results = self.cpu.fork_children(3, sleep, timeout=1, raise_errors=False)
+        self.assertLess(time.time() - start_time, 10)
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], ForkChildError)
+        self.assertIn("timeout", str(results[1]))
+        self.assertEqual(results[2], 2)
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "Needs /proc/self/fd")
+    def test_fork_error(self):
+        pids = []
+        fork = os.fork
+        def failing_fork():
+            if len(pids) == 2:
+                raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+            pid = fork()
+            if pid:
+                pids.append(pid)
+            return pid
+
+        open_fds = sorted(os.listdir("/proc/self/fd"))
+        os.fork = failing_fork
+        try:
+            self.assertRaises(OSError, self.cpu.fork_children, 4, sleep)
+        finally:
+            os.fork = fork
+
+        self.assertEqual(sorted(os.listdir("/proc/self/fd")), open_fds)
+        self.assertEqual(len(pids), 2)
+        for pid in pids: # all started children are reaped
+            with self.assertRaises(OSError) as context:
+                os.waitpid(pid, os.WNOHANG)
+            self.assertEqual(context.exception.errno, errno.ECHILD)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.core.hot_path_profiler import (
+    HotPathProfiler, SUBSYSTEMS, DISPATCH, ADDRESSING, ALU, MEMORY,
+    MEMORY_CALLBACKS, SYNC_CALLBACKS
+)
+from MC6809.tests.test_base import BaseCPUTestCase
+
+
+class HotPathProfilerTestCase(BaseCPUTestCase):
+    PROGRAM = [
+        0x86, 0x03,       #       LDA   #3
+        0xB7, 0x04, 0x00, # LOOP: STA   $0400
+        0x4A,             #       DECA
+        0x26, 0xFA,       #       BNE   LOOP
+    ]
+
+    def test_install_uninstall(self):
+        opcode_dict = self.cpu.opcode_dict
+        profiler = HotPathProfiler(self.cpu)
+        with profiler:
+            self.assertIn("get_and_call_next_op", self.cpu.__dict__)
+            self.assertIn("get_ea_extended", self.cpu.__dict__)
+            self.assertIn("read_byte", self.cpu.memory.__dict__)
+
+        self.assertNotIn("get_and_call_next_op", self.cpu.__dict__)
+        self.assertNotIn("get_ea_extended", self.cpu.__dict__)
+        self.assertNotIn("read_byte", self.cpu.memory.__dict__)
+        self.assertIs(self.cpu.opcode_dict, opcode_dict)
+        for cycles, func in opcode_dict.values():
+            self.assertEqual(func.__self__.instr_func.__name__.startswith("instruction_"), True)
+
+    def test_attribution(self):
+        profiler = HotPathProfiler(self.cpu)
+        with profiler:
+            self.cpu_test_run(start=0x0100, end=None, mem=self.PROGRAM)
+
+        self.assertEqual(self.cpu.memory.read_byte(0x0400), 1)
+        self.assertEqual(profiler.instruction_count, 1 + 3 * 3)
+        self.assertEqual(profiler.calls_into[DISPATCH], 10)
+        self.assertEqual(profiler.calls_into[ALU], 10)
+        self.assertEqual(profiler.calls_into[ADDRESSING], 1 + 3 + 3) # LDA immediate + STA extended + BNE relative
+        self.assertGreater(profiler.calls_into[MEMORY], 10)
+        self.assertEqual(profiler.calls_into[MEMORY_CALLBACKS], 0)
+        self.assertEqual(profiler.calls_into[SYNC_CALLBACKS], 0)
+
+        report = profiler.get_report()
+        self.assertEqual(sorted([item[0] for item in report]), sorted(SUBSYSTEMS))
+        for subsystem, ns_total, ns_per_instruction, calls in report:
+            self.assertGreaterEqual(ns_total, 0)
+            self.assertEqual(ns_per_instruction, ns_total / 10)
+
+    def test_callbacks(self):
+        calls = []
+        def write_callback(cycles, last_op_address, address, value):
+            calls.append(value)
+        self.cpu.memory.add_write_byte_callback(write_callback, 0x0400)
+
+        profiler = HotPathProfiler(self.cpu)
+        with profiler:
+            self.cpu_test_run2(start=0x0100, count=10, mem=self.PROGRAM + [
+                0x20, 0xFE, # BRA *
+            ])
+
+        self.assertEqual(calls, [3, 2, 1])
+        self.assertEqual(profiler.calls_into[MEMORY_CALLBACKS], 3)
+        self.assertEqual(profiler.calls_into[SYNC_CALLBACKS], 10)
+
+        # The origin callback is restored:
+        self.assertIs(self.cpu.memory._write_byte_callbacks[0x0400], write_callback)
+
+
+if __name__ == '__main__':
+    unittest.main()
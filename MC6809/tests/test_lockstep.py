@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import binascii
+import random
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from click.testing import CliRunner
+
+from MC6809.cli import cli
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+from MC6809.workloads import create_cpu, CRC16Workload, CRC32Workload
+from MC6809.workloads.crc import crc16
+
+if numpy is not None:
+    from MC6809.core.lockstep import LockstepCPUs, get_vectorized_ops, \
+        DONE, SCALAR, REGISTER_COLUMNS
+
+
+CODE = 0x7F00 # program address in the op tests
+DATA = 0x2000 # the registers and addresses points into $2000-$20FF
+DATA_START = 0x1F00
+DATA_END = 0x2200
+
+INDEXED_POSTBYTES = (
+    0x84, # ,X
+    0x80, # ,X+
+    0x81, # ,X++
+    0x82, # ,-X
+    0x83, # ,--X
+    0x25, # 5,Y
+    0x5F, # -1,U
+    0x88, # n,X (8 bit offset)
+    0x89, # n,X (16 bit offset)
+    0x85, # B,X
+    0x86, # A,X
+    0x8B, # D,X
+    0xE4, # ,S
+)
+EXG_POSTBYTES = (0x01, 0x12, 0x34, 0x89, 0x98, 0x8B, 0x10)
+
+
+def get_op_codes(op_code):
+    """
+    Returns the machine code variants to test one op code.
+    """
+    op_data = MC6809OP_DATA_DICT[op_code]
+    if op_code > 0xff:
+        prefix = [op_code >> 8, op_code & 0xff]
+    else:
+        prefix = [op_code]
+
+    addr_mode = op_data["addr_mode"]
+    if addr_mode == "INHERENT":
+        return [prefix]
+    if addr_mode in ("INDEXED", "INDEXED_WORD"):
+        return [prefix + [postbyte, 0x00, 0x10] for postbyte in INDEXED_POSTBYTES]
+    if op_data["mnemonic"] in ("EXG", "TFR"):
+        return [prefix + [postbyte] for postbyte in EXG_POSTBYTES]
+    if op_data["mnemonic"] in ("PSHS", "PSHU"):
+        return [prefix + [0xBF], prefix + [0x06], prefix + [0x31]]
+    if addr_mode in ("IMMEDIATE", "RELATIVE"):
+        return [prefix + [0x42], prefix + [0xF0]]
+    if addr_mode in ("IMMEDIATE_WORD", "RELATIVE_WORD"):
+        return [prefix + [0x80, 0x01], prefix + [0x00, 0x20]]
+    if addr_mode in ("DIRECT", "DIRECT_WORD"):
+        return [prefix + [0x40]]
+    if addr_mode in ("EXTENDED", "EXTENDED_WORD"):
+        return [prefix + [0x20, 0x40]]
+    raise AssertionError("Untested addressing mode: %s" % addr_mode)
+
+
+@unittest.skipIf(numpy is None, "NumPy not installed")
+class LockstepOpsTestCase(unittest.TestCase):
+    """
+    Execute every vectorized op in many random states and
+    compare the results with the scalar CPU.
+    """
+    INSTANCES = 8
+
+    def setUp(self):
+        self.random = random.Random(0x6809)
+
+    def random_state(self):
+        return {
+            "X": DATA + self.random.randint(0x10, 0xF0),
+            "Y": DATA + self.random.randint(0x10, 0xF0),
+            "U": DATA + self.random.randint(0x40, 0xF0),
+            "S": DATA + self.random.randint(0x40, 0xF0),
+            "A": self.random.randint(0, 0xFF),
+            "B": self.random.choice((0x00, 0x01, 0x7F, 0x80, 0xFF, self.random.randint(0, 0xFF))),
+            "DP": DATA >> 8,
+            "CC": self.random.randint(0, 0xFF),
+            "data": [self.random.randint(0, 0xFF) for __ in range(DATA_END - DATA_START)],
+        }
+
+    def run_scalar(self, code, state):
+        cpu = create_cpu()
+        cpu.memory.load(DATA_START, state["data"])
+        cpu.memory.load(CODE, code)
+        for name in ("X", "Y", "U", "S", "A", "B", "DP", "CC"):
+            cpu.register_str2object[name].set(state[name])
+        cpu.program_counter.set(CODE)
+        cpu.get_and_call_next_op()
+        return cpu
+
+    def assert_op(self, code):
+        states = [self.random_state() for __ in range(self.INSTANCES)]
+        engine = LockstepCPUs(self.INSTANCES)
+        engine.load(CODE, code)
+        for index, state in enumerate(states):
+            engine.load(DATA_START, state["data"], index)
+            for name in ("X", "Y", "U", "S", "A", "B", "DP", "CC"):
+                engine.set_register(name, state[name], index)
+        engine.regs[:, 0] = CODE
+        engine._execute(numpy.arange(self.INSTANCES), CODE)
+
+        msg = " ".join(["%02x" % byte for byte in code])
+        for index, state in enumerate(states):
+            cpu = self.run_scalar(code, state)
+            for name in REGISTER_COLUMNS:
+                self.assertEqual(
+                    "$%04x" % engine.get_register(name, index),
+                    "$%04x" % cpu.register_str2object[name].get(),
+                    "%s: register %s" % (msg, name)
+                )
+            self.assertEqual(engine.cycles[index], cpu.cycles, "%s: cycles" % msg)
+            self.assertEqual(
+                engine.get_block(DATA_START, DATA_END, index),
+                cpu.memory.get_block(DATA_START, DATA_END),
+                "%s: memory" % msg
+            )
+
+    def test_all_vectorized_ops(self):
+        op_codes = get_vectorized_ops()
+        self.assertGreater(len(op_codes), 100)
+        for op_code in op_codes:
+            for code in get_op_codes(op_code):
+                self.assert_op(code)
+
+
+@unittest.skipIf(numpy is None, "NumPy not installed")
+class LockstepRunTestCase(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(0x6809)
+
+    def create_buffers(self, count, size):
+        return [
+            bytearray([self.random.randint(0, 0xFF) for __ in range(size)])
+            for __ in range(count)
+        ]
+
+    def test_crc32(self):
+        workload = CRC32Workload()
+        buffers = self.create_buffers(count=20, size=16)
+
+        engine = LockstepCPUs(len(buffers))
+        engine.load(workload.START, workload.PROGRAM)
+        for index, data in enumerate(buffers):
+            engine.load(workload.DATA, data, index)
+        engine.set_register("S", workload.STACK)
+        engine.set_register("X", workload.DATA + 16)
+        engine.run(workload.START, workload.end)
+
+        self.assertEqual(engine.fallback_count, 0)
+        self.assertTrue((engine.state == DONE).all())
+        x = engine.get_register("X")
+        d = engine.get_register("D")
+        for index, data in enumerate(buffers):
+            crc32 = (int(x[index]) * 0x10000 + int(d[index])) ^ 0xFFFFFFFF
+            self.assertEqual(crc32, binascii.crc32(bytes(data)) & 0xffffffff)
+
+        # Same cycles as the scalar CPU:
+        cpu = create_cpu()
+        cpu.memory.load(workload.START, workload.PROGRAM)
+        cpu.memory.load(workload.DATA, buffers[0])
+        cpu.system_stack_pointer.set(workload.STACK)
+        cpu.index_x.set(workload.DATA + 16)
+        cpu.test_run(workload.START, workload.end)
+        self.assertEqual(engine.cycles[0], cpu.cycles)
+        self.assertEqual(engine.instruction_count[0], cpu.instruction_count)
+
+    def test_crc16_different_lengths(self):
+        workload = CRC16Workload()
+        buffers = self.create_buffers(count=10, size=16)
+        engine = LockstepCPUs(len(buffers), max_wait=1)
+        engine.load(workload.START, workload.PROGRAM)
+        for index, data in enumerate(buffers):
+            engine.load(workload.DATA, data, index)
+        engine.set_register("U", workload.DATA)
+        engine.set_register("X", [4 + index for index in range(len(buffers))])
+        engine.set_register("D", 0)
+        engine.run(workload.START, workload.end)
+
+        # Some instances waited at BCC too long:
+        self.assertGreater(engine.fallback_count, 0)
+        self.assertTrue((engine.state == SCALAR).any())
+        d = engine.get_register("D")
+        for index, data in enumerate(buffers):
+            self.assertEqual(int(d[index]), crc16(data[:4 + index]))
+
+    def test_not_vectorized_op(self):
+        engine = LockstepCPUs(3)
+        engine.load(0x4000, [
+            0x86, 0x05, # LDA #$05
+            0x3D,       # MUL - not vectorized
+            0x12,       # NOP
+        ])
+        engine.set_register("B", [1, 2, 3])
+        engine.run(0x4000, 0x4004)
+        self.assertEqual(engine.fallback_count, 3)
+        self.assertEqual(list(engine.get_register("D")), [5, 10, 15])
+
+    def test_max_ops(self):
+        engine = LockstepCPUs(2)
+        engine.load(0x4000, [0x20, 0xFE]) # BRA *
+        self.assertRaises(RuntimeError, engine.run, 0x4000, 0x4002, max_ops=100)
+
+
+    def test_cli(self):
+        result = CliRunner().invoke(cli, ["lockstep",
+            "--count", "5", "--size", "4", "--scalar-count", "2"
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("speedup", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.memory import Memory, SharedROMMemory, clear_shared_roms
+from MC6809.workloads import create_cpu, get_workloads, IRQTimerWorkload
+from MC6809.workloads.base import WorkloadCfg, CFG_DICT
+
+
+class RomFile(object):
+    def __init__(self, address, data):
+        self.address = address
+        self.data = data
+        self.filepath = "test-rom-$%04x.bin" % address
+
+    def get_data(self):
+        return self.data
+
+
+ROM_DATA = [(i * 7) & 0xff for i in range(0x100)]
+
+
+class RomCfg(WorkloadCfg):
+    DEFAULT_ROMS = (
+        RomFile(0xA000, ROM_DATA),
+        RomFile(0xFFFE, [0xA0, 0x00]), # reset vector
+    )
+
+
+class OtherRomCfg(WorkloadCfg):
+    DEFAULT_ROMS = (
+        RomFile(0xA000, list(reversed(ROM_DATA))),
+    )
+
+
+class DragonRomCfg(WorkloadCfg):
+    # ROM window with I/O and vectors above it, like Dragon/CoCo:
+    ROM_START = 0x8000
+    ROM_END = 0xBFFF
+    DEFAULT_ROMS = (
+        RomFile(0xA000, ROM_DATA),
+    )
+
+
+def create_shared_rom_cpu(cfg_class=RomCfg):
+    cfg = cfg_class(CFG_DICT)
+    memory = SharedROMMemory(cfg)
+    CPU(memory, cfg)
+    return memory
+
+
+class SharedROMMemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        clear_shared_roms()
+
+    def test_same_rom_is_shared(self):
+        memory1 = create_shared_rom_cpu()
+        memory2 = create_shared_rom_cpu()
+        self.assertIs(memory1._rom, memory2._rom)
+        self.assertTrue(memory1.is_rom_shared())
+
+        other = create_shared_rom_cpu(OtherRomCfg)
+        self.assertIsNot(memory1._rom, other._rom)
+
+    def test_only_ram_in_instance(self):
+        memory = create_shared_rom_cpu()
+        self.assertEqual(len(memory._mem), 0x8000)
+
+    def test_same_content_as_memory(self):
+        cfg = RomCfg(CFG_DICT)
+        memory = Memory(cfg)
+        CPU(memory, cfg)
+        shared_memory = create_shared_rom_cpu()
+
+        self.assertEqual(shared_memory.get_block(0x0000, 0x10000), memory.get_block(0x0000, 0x10000))
+        self.assertEqual(shared_memory.get_block(0x7FF0, 0x8010), memory.get_block(0x7FF0, 0x8010))
+        self.assertEqual(shared_memory.get_block(0xA010, 0xA020), bytearray(ROM_DATA[0x10:0x20]))
+        self.assertEqual(shared_memory.get(0xA000, 0xA100), ROM_DATA)
+        self.assertEqual(shared_memory.read_word(0xFFFE), 0xA000)
+
+    def test_write_into_rom_ignored(self):
+        memory1 = create_shared_rom_cpu()
+        memory2 = create_shared_rom_cpu()
+        memory1.write_byte(0xA001, 0xFF)
+        memory1.write_byte(0x1000, 0xFF)
+        self.assertEqual(memory1.read_byte(0xA001), ROM_DATA[1])
+        self.assertEqual(memory1.read_byte(0x1000), 0xFF)
+        self.assertEqual(memory2.read_byte(0x1000), 0x00)
+        self.assertTrue(memory1.is_rom_shared())
+
+    def test_load_into_rom_makes_private_copy(self):
+        memory1 = create_shared_rom_cpu()
+        memory2 = create_shared_rom_cpu()
+
+        # The same content doesn't need a copy:
+        memory1.load(0xA000, ROM_DATA[:0x10])
+        self.assertTrue(memory1.is_rom_shared())
+
+        memory1.load(0x7FFF, [0x01, 0x02, 0x03])
+        self.assertFalse(memory1.is_rom_shared())
+        self.assertEqual(memory1.get_block(0x7FFF, 0x8002), bytearray([0x01, 0x02, 0x03]))
+        self.assertEqual(memory2.get_block(0x7FFF, 0x8002), bytearray([0x00, 0x00, 0x00]))
+        self.assertTrue(memory2.is_rom_shared())
+
+    def test_load_outside_memory(self):
+        memory = create_shared_rom_cpu()
+        self.assertRaises(OverflowError, memory.load, 0xFFFF, [0x01, 0x02])
+
+    def test_rom_window_below_top(self):
+        memory1 = create_shared_rom_cpu(DragonRomCfg)
+        memory2 = create_shared_rom_cpu(DragonRomCfg)
+        self.assertIs(memory1._rom, memory2._rom)
+        self.assertEqual(len(memory1._rom), 0x4000)
+
+        memory1.load(0xFFFE, [0xA0, 0x00]) # reset vector above the ROM
+        memory1.write_byte(0xC000, 0x12)
+        memory1.write_byte(0xA001, 0xFF) # ignored ROM write
+        self.assertEqual(memory1.read_word(0xFFFE), 0xA000)
+        self.assertEqual(memory1.read_byte(0xC000), 0x12)
+        self.assertEqual(memory1.read_byte(0xA001), ROM_DATA[1])
+        self.assertEqual(memory2.read_byte(0xC000), 0x00)
+        self.assertTrue(memory1.is_rom_shared())
+
+        self.assertEqual(memory1.get_block(0xBFFF, 0xC001), bytearray([0x00, 0x12]))
+        self.assertEqual(memory1.get_block(0xA000, 0xA100), bytearray(ROM_DATA))
+        state = memory1.cpu.get_state()
+        memory2.cpu.set_state(state)
+        self.assertEqual(memory2.get_block(0x0000, 0x10000), memory1.get_block(0x0000, 0x10000))
+        self.assertTrue(memory2.is_rom_shared())
+
+    def test_bad_rom_area(self):
+        class BadRomCfg(WorkloadCfg):
+            ROM_START = 0xC000
+            ROM_END = 0xBFFF
+        self.assertRaises(ValueError, create_shared_rom_cpu, BadRomCfg)
+
+    def test_read_callback_and_middleware(self):
+        memory = create_shared_rom_cpu()
+        memory.add_read_byte_callback(lambda cycles, last_op_address, address: 0x12, 0xA000)
+        memory.add_read_byte_middleware(
+            lambda cycles, last_op_address, address, byte: byte ^ 0xFF, 0xA001
+        )
+        self.assertEqual(memory.read_byte(0xA000), 0x12)
+        self.assertEqual(memory.read_byte(0xA001), ROM_DATA[1] ^ 0xFF)
+        self.assertEqual(memory.get_callback_counts()["read_middleware"], 1)
+
+    def test_cpu_state(self):
+        memory = create_shared_rom_cpu()
+        memory.load(0x0100, [0x12, 0x34])
+        state = memory.cpu.get_state()
+        self.assertEqual(len(state["RAM"]), 0x10000)
+
+        memory2 = create_shared_rom_cpu()
+        memory2.cpu.set_state(state)
+        self.assertEqual(memory2.get_block(0x0100, 0x0102), bytearray([0x12, 0x34]))
+        self.assertTrue(memory2.is_rom_shared())
+
+    def test_workloads(self):
+        for workload in get_workloads(multiply=1):
+            cpu = create_cpu(memory_class=SharedROMMemory)
+            workload.run(cpu)
+            self.assertGreater(cpu.cycles, 0, workload.name)
+
+    def test_irq_workload(self):
+        workload = IRQTimerWorkload(multiply=2)
+        cpu = create_cpu(memory_class=SharedROMMemory)
+        workload.run(cpu)
+        self.assertEqual(cpu.irq_count, workload.IRQ_COUNT * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
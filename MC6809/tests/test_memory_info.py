@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""
+    MC6809 - 6809 CPU emulator in Python
+    =======================================
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import random
+import sys
+import unittest
+
+from MC6809.core.configs import AddressAreas
+from MC6809.core.memory_info import BaseMemoryInfo, get_region_index
+
+
+class MemoryInfo(BaseMemoryInfo):
+    MEM_INFO = (
+        (0x0000, 0x7fff, "RAM"),
+        (0x0000, 0x00ff, "direct page"),
+        (0x0010, 0x001f, "vars"),
+        (0x0010, 0x001f, "same size as vars"),
+        (0x0400, 0x05ff, "text screen"),
+        (0x0500, 0x0500, "single byte"),
+        (0xfff2, 0xfffe, "Interrupt vectors"),
+    )
+
+
+def linear_get_shortest(areas, addr):
+    """ The origin BaseMemoryInfo.get_shortest() algorithm """
+    shortest = None
+    size = sys.maxsize
+    for start, end, txt in areas:
+        if not start <= addr <= end:
+            continue
+        current_size = abs(end - start)
+        if current_size < size:
+            size = current_size
+            shortest = start, end, txt
+    return shortest
+
+
+class BaseMemoryInfoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.output = []
+        self.mem_info = MemoryInfo(self.output.append)
+
+    def test_get_shortest(self):
+        self.assertEqual(self.mem_info.get_shortest(0x1000), "$1000: $0-$7fff - RAM")
+        self.assertEqual(self.mem_info.get_shortest(0x20), "$20: $0-$ff - direct page")
+        self.assertEqual(self.mem_info.get_shortest(0x10), "$10: $10-$1f - vars")
+        self.assertEqual(self.mem_info.get_shortest(0x500), "$500: single byte")
+        self.assertEqual(self.mem_info.get_shortest(0x8000), "$8000: UNKNOWN")
+
+    def test_same_as_linear_scan(self):
+        for addr in range(0x10000):
+            self.assertEqual(
+                self.mem_info.region_index.get(addr),
+                linear_get_shortest(MemoryInfo.MEM_INFO, addr)
+            )
+
+    def test_random_overlapping_areas(self):
+        rnd = random.Random(6809)
+        areas = []
+        for no in range(50):
+            start = rnd.randint(0, 0xffff)
+            end = min(start + rnd.choice((0, 1, 0x10, 0x100, 0x1000)), 0xffff)
+            areas.append((start, end, "area %i" % no))
+        region_index = get_region_index(areas)
+        for addr in range(0, 0x10000, 7):
+            self.assertEqual(region_index.get(addr), linear_get_shortest(areas, addr))
+
+    def test_shared_index(self):
+        other = MemoryInfo(self.output.append)
+        self.assertIs(self.mem_info.region_index, other.region_index)
+
+    def test_address_out_of_range(self):
+        region_index = self.mem_info.region_index
+        self.assertEqual(region_index.get(0x0), (0x0, 0xff, "direct page"))
+        for addr in (-1, -0x10000, 0x10000):
+            self.assertRaises(IndexError, region_index.get_index, addr)
+            self.assertRaises(IndexError, region_index.get, addr)
+
+    def test_get_shortest_out_of_range(self):
+        self.assertEqual(self.mem_info.get_shortest(-1), "$-1: UNKNOWN")
+        self.assertEqual(self.mem_info.get_shortest(0x10000), "$10000: UNKNOWN")
+        self.mem_info(0x10000, info="outside")
+        self.assertEqual(self.output, ["outside: $10000: UNKNOWN"])
+
+    def test_call(self):
+        self.mem_info(0x10, info="test")
+        self.assertEqual(self.output, ["test: $10: $10-$1f - vars"])
+
+
+class AddressAreasTestCase(unittest.TestCase):
+    def test_dict_access(self):
+        areas = AddressAreas((
+            (0xff00, 0xff03, "PIA 0"),
+            (0xff20, 0xff23, "PIA 1"),
+        ))
+        self.assertEqual(areas[0xff00], "PIA 0")
+        self.assertEqual(areas.get(0xff23), "PIA 1")
+        self.assertIn(0xff03, areas)
+        self.assertNotIn(0xff04, areas)
+        self.assertEqual(areas.get(0xff04), None)
+        self.assertRaises(KeyError, areas.__getitem__, 0xff04)
+        self.assertNotIn(-1, areas)
+        self.assertRaises(KeyError, areas.__getitem__, -1)
+        self.assertEqual(len(areas), 8)
+        self.assertEqual(sorted(areas.keys())[:2], [0xff00, 0xff01])
+
+    def test_last_added_wins(self):
+        areas = AddressAreas(((0x0, 0xff, "page"),))
+        areas.add_area(0x80, 0x8f, "overwritten")
+        areas.add_area(0x00, 0xff, "page again")
+        self.assertEqual(areas[0x85], "page again")
+
+
+if __name__ == '__main__':
+    unittest.main()
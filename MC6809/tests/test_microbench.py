@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from MC6809.cli import cli
+from MC6809.core.microbench import (
+    iter_cases, OpcodeMicroBenchmark, INDEXED_FORMS, STREAM_START
+)
+from MC6809.workloads import create_cpu
+
+
+class MicroBenchCasesTestCase(unittest.TestCase):
+    def test_indexed_forms(self):
+        cases = list(iter_cases(mnemonics=["LDA"], addr_modes=["INDEXED"]))
+        self.assertEqual(len(cases), len(INDEXED_FORMS))
+        self.assertEqual(cases[0].get_instruction(STREAM_START), [0xA6, 0x84])
+
+        # JMP/JSR only with the form that jumps to the next instruction:
+        cases = list(iter_cases(mnemonics=["JSR"], addr_modes=["INDEXED"]))
+        self.assertEqual([case.form for case in cases], ["n,PCR 8-bit"])
+
+    def test_skipped(self):
+        mnemonics = set([case.mnemonic for case in iter_cases()])
+        for mnemonic in ("SWI", "SWI2", "SWI3", "CWAI", "SYNC", "RESET"):
+            self.assertNotIn(mnemonic, mnemonics)
+        self.assertIn("RTI", mnemonics)
+        self.assertIn("LBRA", mnemonics)
+
+    def test_flow_streams(self):
+        cpu = create_cpu()
+        benchmark = OpcodeMicroBenchmark(cpu, copies=4, iterations=1, rounds=1)
+        # JSR, JSR, JSR, JMP, JMP, LBRA, RTS, RTI
+        for case in iter_cases(opcodes=(0xBD, 0x9D, 0xAD, 0x0E, 0x7E, 0x16, 0x39, 0x3B)):
+            stream, addresses = case.create_stream(benchmark.COPIES)
+            end = STREAM_START + len(stream)
+            benchmark.prepare_memory(case)
+            benchmark.run_case(case)
+            self.assertEqual(cpu.program_counter.get(), end, "%r" % case)
+
+
+class MicroBenchCLITestCase(unittest.TestCase):
+    def test_cli(self):
+        json_file = os.path.join(tempfile.mkdtemp(), "microbench.json")
+        runner = CliRunner()
+        result = runner.invoke(cli, ["opbench",
+            "--mnemonic", "lda", "--mnemonic", "BNE", "--iterations", "1",
+            "--limit", "5", "--json", json_file,
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("instruction_LD8", result.output)
+
+        with open(json_file, "r") as f:
+            results = json.load(f)
+        # LDA: immediate, direct, extended + all indexed forms and BNE:
+        self.assertEqual(len(results), 3 + len(INDEXED_FORMS) + 1)
+        ns = [result["ns"] for result in results]
+        self.assertEqual(ns, sorted(ns, reverse=True))
+        self.assertEqual(
+            set([result["handler"] for result in results]),
+            set(["instruction_LD8", "instruction_BNE"])
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.memory import Memory
+from MC6809.components.remote_bus import RemoteBus, SharedSlot, REQUEST_SIZE, RESPONSE_SIZE
+from MC6809.workloads.base import CFG_DICT, WorkloadCfg
+
+
+CODE = [
+    0x86, 0x11,       # 4000| LDA  #$11
+    0xB7, 0xFF, 0x00, # 4002| STA  $FF00
+    0xCC, 0x22, 0x33, # 4005| LDD  #$2233
+    0xFD, 0xFF, 0x01, # 4008| STD  $FF01   ; one word write
+    0xB6, 0xFF, 0x00, # 400B| LDA  $FF00
+    0xB7, 0x00, 0x10, # 400E| STA  $0010
+    0xFC, 0xFF, 0x01, # 4011| LDD  $FF01   ; one word read
+    0xFD, 0x00, 0x11, # 4014| STD  $0011
+    0xB6, 0xFF, 0x3F, # 4017| LDA  $FF3F   ; write count
+    0xB7, 0x00, 0x13, # 401A| STA  $0013
+]                     # 401D|
+
+
+class CountingDevice(object):
+    """
+    Stores the written values, $FF3F returns the number of writes.
+    """
+    def __init__(self):
+        self.values = {}
+        self.writes = 0
+
+    def read_byte(self, cycles, address):
+        if address == 0xFF3F:
+            return self.writes & 0xff
+        return self.values.get(address, 0x00)
+
+    def write_byte(self, cycles, address, value):
+        self.writes += 1
+        self.values[address] = value
+
+
+class RemoteBusTestCase(unittest.TestCase):
+    shared_memory = True
+
+    def setUp(self):
+        self.bus = RemoteBus(shared_memory=self.shared_memory)
+        self.bus.start(CountingDevice)
+
+        cfg = WorkloadCfg(CFG_DICT)
+        self.memory = Memory(cfg, **self.bus.get_queues())
+        self.memory.add_remote_bus_area(0xFF00, 0xFF3F)
+        self.cpu = CPU(self.memory, cfg)
+
+    def tearDown(self):
+        if self.bus.process is not None:
+            self.bus.stop(self.memory)
+
+    def test_program(self):
+        self.memory.load(0x4000, CODE)
+        self.cpu.test_run(0x4000, 0x401D)
+        self.assertEqual(
+            self.memory.get_block(0x0010, 0x0014),
+            bytearray([0x11, 0x22, 0x33, 3]) # 3 writes: STA + STD split into two bytes
+        )
+        # Only the remote reads are callbacks, the RAM stays local:
+        self.assertEqual(self.memory.read_callback_count, 3)
+
+    def test_write_batches(self):
+        for value in range(200):
+            self.memory.write_byte(0xFF10, value)
+        self.assertEqual(len(self.memory._write_bus_buffer), 200 - 3 * Memory.WRITE_BUS_BATCH_SIZE)
+        # A read sends the pending writes first:
+        self.assertEqual(self.memory.read_byte(0xFF10), 199)
+        self.assertEqual(self.memory.read_byte(0xFF3F), 200)
+        self.assertEqual(self.memory._write_bus_buffer, [])
+
+    def test_stop(self):
+        self.memory.write_byte(0xFF00, 0x01)
+        process = self.bus.process
+        self.bus.stop(self.memory)
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.exitcode, 0)
+
+
+class RemoteBusQueueTestCase(RemoteBusTestCase):
+    shared_memory = False
+
+
+class RemoteBusErrorTestCase(unittest.TestCase):
+    def test_no_device_server(self):
+        cfg = WorkloadCfg(CFG_DICT)
+        memory = Memory(cfg,
+            read_bus_request_queue=SharedSlot(REQUEST_SIZE),
+            read_bus_response_queue=SharedSlot(RESPONSE_SIZE),
+            write_bus_queue=SharedSlot(RESPONSE_SIZE),
+        )
+        memory.BUS_TIMEOUT = 0.1
+        memory.add_remote_bus_area(0xFF00, 0xFF00)
+        CPU(memory, cfg)
+        self.assertRaises(RuntimeError, memory.read_byte, 0xFF00)
+
+    def test_needs_queues(self):
+        memory = Memory(WorkloadCfg(CFG_DICT))
+        self.assertRaises(AssertionError, memory.add_remote_bus_area, 0xFF00, 0xFF3F)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import unittest
+
+from MC6809.core.replay import Recorder, Recording, Replayer, ReplayError, \
+    get_end_state, IRQ, READ_BYTE, SYNC
+from MC6809.workloads import create_cpu
+from MC6809.workloads.base import pseudo_random_bytes, words2bytes
+
+
+CODE = [
+    0x10, 0xCE, 0x7F, 0x00, # 4000|       LDS   #$7F00
+    0x1C, 0xEF,             # 4004|       ANDCC #$EF    ; enable IRQ
+    0xB6, 0xFF, 0x00,       # 4006| loop  LDA   $FF00   ; "random" device
+    0xBB, 0x01, 0x00,       # 4009|       ADDA  $0100
+    0xB7, 0x01, 0x00,       # 400C|       STA   $0100
+    0x7C, 0x01, 0x01,       # 400F|       INC   $0101
+    0x20, 0xF2,             # 4012|       BRA   loop
+]
+ISR = 0x4020
+ISR_CODE = [
+    0x7C, 0x01, 0x02,       # 4020|       INC   $0102
+    0x3B,                   # 4023|       RTI
+]
+
+
+class Device(object):
+    def __init__(self):
+        self.values = pseudo_random_bytes(100000)
+        self.index = 0
+
+    def read_byte(self, cycles, last_op_address, address):
+        self.index += 1
+        return self.values[self.index % len(self.values)]
+
+    def write_byte(self, cycles, last_op_address, address, value):
+        pass
+
+
+def create_machine(with_devices=True):
+    cpu = create_cpu()
+    cpu.irq_enabled = True
+    cpu.memory.load(0x4000, CODE)
+    cpu.memory.load(ISR, ISR_CODE)
+    cpu.memory.load(cpu.IRQ_VECTOR, words2bytes([ISR]))
+    cpu.program_counter.set(0x4000)
+
+    if with_devices:
+        device = Device()
+        cpu.memory.add_read_byte_callback(device.read_byte, 0xFF00)
+        cpu.memory.add_write_byte_callback(device.write_byte, 0xFF01)
+
+        def sync_callback(cycles):
+            # IRQ + memory change, like a timer and a DMA device:
+            cpu.irq()
+            cpu.memory.load(0x0103, [cpu.cycles & 0xff])
+        cpu.add_sync_callback(500, sync_callback)
+    return cpu
+
+
+def record(snapshot_cycles=2000):
+    cpu = create_machine()
+    with Recorder(cpu, snapshot_cycles=snapshot_cycles) as recorder:
+        for __ in range(5):
+            cpu.cycle_burst_run(3000)
+            cpu.irq() # IRQ outside of the sync callbacks
+    return cpu, recorder.recording
+
+
+class RecordReplayTestCase(unittest.TestCase):
+    def test_record(self):
+        cpu, recording = record()
+        event_types = set(event[1] for event in recording.events)
+        self.assertEqual(event_types, set([READ_BYTE, IRQ, SYNC]))
+        self.assertGreater(len(recording.snapshots), 5)
+        self.assertEqual(recording.start_cycles, 0)
+        self.assertEqual(recording.end_cycles, cpu.cycles)
+        self.assertGreater(cpu.irq_count, 10)
+
+        # uninstalled:
+        self.assertNotIn("irq", cpu.__dict__)
+        self.assertEqual(len(cpu.sync_callbacks), 1)
+        self.assertEqual(cpu.memory._read_byte_callbacks[0xFF00].__name__, "read_byte")
+
+    def test_replay_without_devices(self):
+        cpu, recording = record()
+        replay_cpu = create_machine(with_devices=False)
+        replayer = Replayer(replay_cpu, recording)
+        replayer.run()
+        replayer.check_end_state()
+        self.assertEqual(get_end_state(replay_cpu), get_end_state(cpu))
+        self.assertEqual(replayer.position, len(recording.events))
+
+    def test_seek(self):
+        cpu, recording = record()
+        seek_cycles = recording.end_cycles * 2 // 3
+
+        replayer = Replayer(create_machine(with_devices=False), recording)
+        replayer.run(end_cycles=seek_cycles)
+        expected = get_end_state(replayer.cpu)
+
+        replayer = Replayer(create_machine(with_devices=False), recording)
+        replayer.seek(seek_cycles)
+        self.assertEqual(get_end_state(replayer.cpu), expected)
+        self.assertGreater(recording.get_snapshot(seek_cycles).cycles, 0)
+
+        # backwards and to the end:
+        replayer.seek(100)
+        self.assertLess(replayer.cpu.cycles, 200)
+        replayer.run()
+        replayer.check_end_state()
+
+    def test_save_load(self):
+        cpu, recording = record()
+        recording = Recording.from_dict(json.loads(json.dumps(recording.to_dict())))
+
+        replayer = Replayer(create_machine(with_devices=False), recording)
+        replayer.seek(recording.end_cycles // 2)
+        replayer.run()
+        replayer.check_end_state()
+
+    def test_divergence(self):
+        cpu, recording = record()
+        # The first snapshot restores the code, so change the recording:
+        position = [event[1] for event in recording.events].index(READ_BYTE)
+        del recording.events[position]
+        replayer = Replayer(create_machine(with_devices=False), recording)
+        self.assertRaises(ReplayError, replayer.run)
+
+    def test_unsupported_format(self):
+        recording_dict = json.loads(json.dumps(Recording().to_dict()))
+        recording_dict["format_version"] = 0
+        self.assertRaises(ReplayError, Recording.from_dict, recording_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.core.replay import Replayer, get_end_state
+from MC6809.core.reverse_debugger import ReverseDebugger, BREAKPOINT, WATCHPOINT
+from MC6809.tests.test_replay import create_machine
+
+
+class ReverseDebuggerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cpu = create_machine()
+        self.debugger = ReverseDebugger(self.cpu, checkpoint_cycles=1000)
+        self.debugger.start()
+
+    def tearDown(self):
+        if self.debugger.recording is not None:
+            self.debugger.stop()
+
+    def test_reverse_step(self):
+        states = []
+        for __ in range(1000):
+            states.append(get_end_state(self.cpu))
+            self.debugger.step()
+        self.assertGreater(len(self.debugger.recording.snapshots), 5)
+        self.assertGreater(self.cpu.irq_count, 5)
+
+        for state in reversed(states[-300:]):
+            self.assertTrue(self.debugger.reverse_step())
+            self.assertTrue(self.debugger.is_replaying)
+            self.assertEqual(get_end_state(self.cpu), state)
+
+        self.debugger.reverse_step(count=700)
+        self.assertEqual(get_end_state(self.cpu), states[0])
+        self.assertFalse(self.debugger.reverse_step())
+
+        # forwards in the past:
+        self.debugger.step(count=500)
+        self.assertEqual(get_end_state(self.cpu), states[500])
+
+    def test_back_and_forth(self):
+        """
+        Going back and replaying must end in the same state
+        as only running forwards.
+        """
+        self.debugger.step(count=3000)
+        self.debugger.reverse_step(count=10)
+        self.debugger.step(count=1000)
+        self.assertFalse(self.debugger.is_replaying)
+        self.debugger.stop()
+
+        cpu = create_machine()
+        with ReverseDebugger(cpu) as debugger:
+            debugger.step(count=3990)
+        self.assertEqual(get_end_state(self.cpu), get_end_state(cpu))
+
+    def test_watchpoint(self):
+        self.debugger.add_watchpoint(0x0102) # incremented by the ISR
+        hits = []
+        for __ in range(3):
+            self.assertEqual(self.debugger.continue_(max_ops=10000), (WATCHPOINT, 0x0102))
+            hits.append(get_end_state(self.cpu))
+        self.assertEqual(
+            [state["irq_count"] for state in hits],
+            [1, 2, 3]
+        )
+
+        self.assertEqual(self.debugger.reverse_continue(), (WATCHPOINT, 0x0102))
+        self.assertEqual(get_end_state(self.cpu), hits[1])
+        self.assertEqual(self.debugger.reverse_continue(), (WATCHPOINT, 0x0102))
+        self.assertEqual(get_end_state(self.cpu), hits[0])
+        self.assertEqual(self.debugger.reverse_continue(), None)
+        self.assertEqual(self.cpu.cycles, 0)
+
+        self.assertEqual(self.debugger.continue_(max_ops=10000), (WATCHPOINT, 0x0102))
+        self.assertEqual(get_end_state(self.cpu), hits[0])
+
+    def test_breakpoint(self):
+        self.debugger.add_breakpoint(0x4020) # ISR
+        hits = []
+        for __ in range(3):
+            self.assertEqual(self.debugger.continue_(max_ops=10000), (BREAKPOINT, 0x4020))
+            hits.append(get_end_state(self.cpu))
+        self.debugger.step(count=2) # INC $0102 + RTI
+
+        self.assertEqual(self.debugger.reverse_continue(), (BREAKPOINT, 0x4020))
+        self.assertEqual(get_end_state(self.cpu), hits[2])
+        self.assertEqual(self.debugger.reverse_continue(), (BREAKPOINT, 0x4020))
+        self.assertEqual(get_end_state(self.cpu), hits[1])
+        self.assertEqual(self.debugger.reverse_continue(), (BREAKPOINT, 0x4020))
+        self.assertEqual(get_end_state(self.cpu), hits[0])
+        self.assertEqual(self.cpu.program_counter.get(), 0x4020)
+
+        self.debugger.remove_breakpoint(0x4020)
+        self.assertEqual(self.debugger.continue_(max_ops=100), None)
+
+    def test_watchpoint_changed_by_sync_callback(self):
+        self.debugger.add_watchpoint(0x0103) # set by the sync callback
+        middlewares = dict(self.cpu.memory._write_byte_middleware)
+        hits = []
+        for __ in range(2):
+            self.assertEqual(self.debugger.continue_(max_ops=10000), (WATCHPOINT, 0x0103))
+            hits.append(get_end_state(self.cpu))
+        self.assertEqual(self.cpu.memory._write_byte_middleware, middlewares)
+
+        self.debugger.step()
+        self.assertEqual(self.debugger.reverse_continue(), (WATCHPOINT, 0x0103))
+        self.assertEqual(get_end_state(self.cpu), hits[1])
+        self.assertEqual(self.cpu.memory._write_byte_middleware, middlewares)
+
+    def test_reverse_continue_in_bursts(self):
+        self.debugger.add_breakpoint(0x4020) # ISR
+        self.debugger.continue_(max_ops=10000)
+        self.debugger.step(count=2000)
+
+        replayer_steps = []
+        step = Replayer.step
+        def count_step(replayer):
+            replayer_steps.append(replayer.cpu.cycles)
+            step(replayer)
+        Replayer.step = count_step
+        try:
+            self.assertEqual(self.debugger.reverse_continue(), (BREAKPOINT, 0x4020))
+        finally:
+            Replayer.step = step
+        # Only one single step behind every breakpoint hit:
+        self.assertLessEqual(len(replayer_steps), self.cpu.irq_count + 1)
+
+    def test_memory_budget(self):
+        self.debugger.stop()
+        self.debugger = ReverseDebugger(self.cpu,
+            memory_budget=10 * (0x10000 + 1024), checkpoint_cycles=100
+        )
+        self.debugger.start()
+        states = []
+        for __ in range(2000):
+            states.append(get_end_state(self.cpu))
+            self.debugger.step()
+
+        self.assertLessEqual(self.debugger.get_checkpoint_size(), self.debugger.memory_budget)
+        self.assertGreater(self.debugger.checkpoint_cycles, 100)
+
+        self.debugger.reverse_step(count=1500)
+        self.assertEqual(get_end_state(self.cpu), states[500])
+
+
+if __name__ == '__main__':
+    unittest.main()
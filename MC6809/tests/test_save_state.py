@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import pickle
+import unittest
+import zlib
+
+from MC6809.components.memory import SharedROMMemory
+from MC6809.core import save_state
+from MC6809.core.save_state import SaveStateError, dumps, loads
+from MC6809.workloads import create_cpu
+from MC6809.workloads.base import pseudo_random_bytes
+
+
+def create_used_cpu(memory_class=None):
+    if memory_class is None:
+        cpu = create_cpu()
+    else:
+        cpu = create_cpu(memory_class=memory_class)
+    cpu.add_sync_callback(1000, lambda cycles: None)
+    cpu.add_sync_callback(5000, lambda cycles: None)
+    cpu.memory.load(0x1000, pseudo_random_bytes(0x1000))
+    cpu.memory.load(0x7F00, [0xFF] * 0x100)
+    cpu.memory.load(0xFFFE, [0x40, 0x00])
+    for register, value in (("X", 0x1234), ("Y", 0xFFFF), ("U", 0x7F00), ("S", 0x7E00),
+            ("PC", 0x4000), ("A", 0x12), ("B", 0xFF), ("DP", 0x10), ("CC", 0xA5)):
+        cpu.register_str2object[register].set(value)
+    cpu.cycles = 2 ** 40
+    cpu.instruction_count = 123456
+    cpu.irq_count = 7
+    cpu.irq_enabled = True
+    cpu.last_op_address = 0x4000
+    cpu.sync_callbacks_cyles[cpu.sync_callbacks[0][1]] = 2 ** 40 - 10
+    return cpu
+
+
+def get_full_state(cpu):
+    state = cpu.get_state()
+    state.update({
+        "instruction_count": cpu.instruction_count,
+        "irq_count": cpu.irq_count,
+        "irq_enabled": cpu.irq_enabled,
+        "last_op_address": cpu.last_op_address,
+        "sync_callbacks": [
+            (callback_cycles, cpu.sync_callbacks_cyles[callback])
+            for callback_cycles, callback in cpu.sync_callbacks
+        ],
+    })
+    return state
+
+
+class SaveStateTestCase(unittest.TestCase):
+    def assert_roundtrip(self, compression, memory_class=None):
+        cpu = create_used_cpu(memory_class)
+        f = io.BytesIO()
+        cpu.save_state(f, compression=compression, device_state={"pia": [1, 2, 3]})
+
+        new_cpu = create_used_cpu(memory_class)
+        new_cpu.reset()
+        new_cpu.memory.reset()
+        f.seek(0)
+        device_state = new_cpu.load_state(f)
+        self.assertEqual(device_state, {"pia": [1, 2, 3]})
+        self.assertEqual(get_full_state(new_cpu), get_full_state(cpu))
+        return f.getvalue()
+
+    def test_no_compression(self):
+        data = self.assert_roundtrip(None)
+        # Only the 18 non-zero pages are stored:
+        self.assertLess(len(data), 18 * 0x100 + 200)
+        self.assertTrue(data.startswith(save_state.MAGIC))
+
+    def test_zlib(self):
+        self.assertLess(len(self.assert_roundtrip("zlib")), 0x1000 + 200)
+
+    @unittest.skipIf(save_state.lzma is None, "lzma not available")
+    def test_lzma(self):
+        self.assert_roundtrip("lzma")
+
+    def test_shared_rom(self):
+        self.assert_roundtrip("zlib", memory_class=SharedROMMemory)
+
+    def test_smaller_than_pickle(self):
+        cpu = create_used_cpu()
+        pickled = pickle.dumps(cpu.get_state(), pickle.HIGHEST_PROTOCOL)
+        self.assertLess(len(dumps(cpu)) * 10, len(pickled))
+
+    def test_errors(self):
+        cpu = create_used_cpu()
+        data = dumps(cpu, compression=None)
+
+        self.assertRaises(SaveStateError, loads, cpu, b"")
+        self.assertRaises(SaveStateError, loads, cpu, b"X" + data[1:])
+        self.assertRaises(SaveStateError, loads, cpu, data[:-1])
+
+        broken = bytearray(data)
+        broken[-1] ^= 0xff
+        self.assertRaises(SaveStateError, loads, cpu, bytes(broken))
+
+        header = save_state.HEADER.unpack_from(data)
+        newer = save_state.HEADER.pack(header[0], save_state.FORMAT_VERSION + 1, *header[2:])
+        self.assertRaises(SaveStateError, loads, cpu, newer + data[save_state.HEADER.size:])
+
+        self.assertRaises(SaveStateError, dumps, cpu, compression="foo")
+
+        other_cpu = create_cpu()
+        self.assertRaises(SaveStateError, loads, other_cpu, data)
+
+    def test_truncated(self):
+        cpu = create_used_cpu()
+        data = dumps(cpu, compression=None)
+        self.assertRaises(SaveStateError, loads, cpu, data[:save_state.HEADER.size + 5])
+
+        # A truncated payload with matching length and CRC32 in the header:
+        payload = data[save_state.HEADER.size:]
+        device_offset = save_state.REGISTERS.size + save_state.COUNTERS.size + \
+            save_state.COUNT.size + save_state.SYNC_CALLBACK.size * len(cpu.sync_callbacks)
+        for length in (0, 5, save_state.REGISTERS.size + 3, device_offset + 2, device_offset + 6):
+            truncated = payload[:length]
+            header = save_state.HEADER.pack(
+                save_state.MAGIC, save_state.FORMAT_VERSION, save_state.COMPRESSION_NONE,
+                len(truncated), zlib.crc32(truncated) & 0xffffffff
+            )
+            with self.assertRaises(SaveStateError) as context:
+                loads(cpu, header + truncated)
+            self.assertEqual(str(context.exception), "truncated save state")
+
+
+if __name__ == '__main__':
+    unittest.main()
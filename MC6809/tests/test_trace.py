@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    Test the runtime activation of the instruction trace.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import unittest
+
+try:
+    from StringIO import StringIO # Python 2: the trace writes str, not unicode
+except ImportError:
+    from io import StringIO # Python 3
+
+from MC6809.components.cpu6809_trace import TraceFilter
+from MC6809.tests.test_base import BaseCPUTestCase
+
+
+class TraceFilterTestCase(unittest.TestCase):
+    def test_no_limits(self):
+        trace_filter = TraceFilter()
+        self.assertTrue(trace_filter.match_mnemonic("LDA"))
+        self.assertTrue(trace_filter.match(0x1234, 0))
+
+    def test_mnemonics(self):
+        trace_filter = TraceFilter(mnemonics=("lda", "BNE"))
+        self.assertTrue(trace_filter.match_mnemonic("LDA"))
+        self.assertTrue(trace_filter.match_mnemonic("BNE"))
+        self.assertFalse(trace_filter.match_mnemonic("LDB"))
+
+    def test_address_ranges(self):
+        trace_filter = TraceFilter(address_ranges=((0x100, 0x1ff), (0x400, 0x400)))
+        self.assertTrue(trace_filter.match(0x100, 0))
+        self.assertTrue(trace_filter.match(0x1ff, 0))
+        self.assertTrue(trace_filter.match(0x400, 0))
+        self.assertFalse(trace_filter.match(0x200, 0))
+
+    def test_cycle_window(self):
+        trace_filter = TraceFilter(start_cycle=10, end_cycle=20)
+        self.assertFalse(trace_filter.match(0x100, 9))
+        self.assertTrue(trace_filter.match(0x100, 10))
+        self.assertTrue(trace_filter.match(0x100, 20))
+        self.assertFalse(trace_filter.match(0x100, 21))
+
+
+class CPUTraceTestCase(BaseCPUTestCase):
+    PROGRAM = [
+        0x86, 0x03, #       LDA   #3
+        0x4A,       # LOOP: DECA
+        0x26, 0xFD, #       BNE   LOOP
+        0x12,       #       NOP
+    ]
+
+    def run_traced(self):
+        origin_stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.cpu_test_run(start=0x0100, end=None, mem=self.PROGRAM)
+            return sys.stdout.getvalue()
+        finally:
+            sys.stdout = origin_stdout
+
+    def test_untraced_by_default(self):
+        self.assertIs(self.cpu.opcode_dict, self.cpu.op_collection.get_plain_opcode_dict())
+        self.assertEqual(self.run_traced(), "")
+
+    def test_activate_and_deactivate(self):
+        plain_opcode_dict = self.cpu.opcode_dict
+
+        self.cpu.activate_trace()
+        self.assertIsNot(self.cpu.opcode_dict, plain_opcode_dict)
+        output = self.run_traced()
+        self.assertEqual(output.count("DECA"), 3)
+        self.assertEqual(output.count("BNE"), 3)
+
+        self.cpu.deactivate_trace()
+        self.assertIs(self.cpu.opcode_dict, plain_opcode_dict)
+        self.assertEqual(self.run_traced(), "")
+
+    def test_mnemonic_filter_reuse_plain_entries(self):
+        plain_opcode_dict = self.cpu.opcode_dict
+        self.cpu.activate_trace(TraceFilter(mnemonics=("DECA",)))
+        self.assertIs(self.cpu.opcode_dict[0x86], plain_opcode_dict[0x86]) # LDA
+        self.assertIsNot(self.cpu.opcode_dict[0x4a], plain_opcode_dict[0x4a]) # DECA
+
+        output = self.run_traced()
+        self.assertEqual(output.count("DECA"), 3)
+        self.assertNotIn("BNE", output)
+        self.assertNotIn("LDA", output)
+
+    def test_address_filter(self):
+        self.cpu.activate_trace(TraceFilter(address_ranges=((0x0105, 0x0105),)))
+        output = self.run_traced()
+        self.assertEqual(output.strip().splitlines(), [output.strip()])
+        self.assertTrue(output.startswith("0105| 12"), output)
+
+    def test_trace_does_not_change_cycles(self):
+        self.cpu_test_run(start=0x0100, end=None, mem=self.PROGRAM)
+        untraced_cycles = self.cpu.cycles
+
+        self.setUp()
+        self.cpu.activate_trace()
+        self.run_traced()
+        self.assertEqual(self.cpu.cycles, untraced_cycles)
+
+    def test_op_bytes_wrap_around(self):
+        self.cpu.memory.load(0xFFFF, [0x86]) # LDA #$42 at $FFFF, the operand at $0000
+        self.cpu.memory.load(0x0000, [0x42, 0x12]) # NOP
+        self.assertEqual(self.cpu.memory.get_block(0xFFFF, 0x10001), bytearray([0x86]))
+
+        self.cpu.activate_trace()
+        origin_stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.cpu.test_run(0xFFFF, 0x0001)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = origin_stdout
+        self.assertTrue(output.startswith("ffff| 8642 "), output)
+        self.assertEqual(self.cpu.accu_a.get(), 0x42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""
+    6809 unittests
+    ~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from click.testing import CliRunner
+
+from MC6809.cli import cli
+from MC6809.workloads import get_workloads, create_cpu, WorkloadError, \
+    WORKLOAD_NAMES, SortWorkload, CRC32Workload, IRQTimerWorkload, \
+    get_scenarios, SCENARIO_NAMES, IRQ60Scenario, MachineScenario
+
+
+class WorkloadsTestCase(unittest.TestCase):
+    def test_all_workloads(self):
+        for workload in get_workloads(multiply=2):
+            cpu = create_cpu()
+            workload.run(cpu)
+            self.assertGreater(cpu.cycles, 0, workload.name)
+            self.assertGreater(cpu.instruction_count, 0, workload.name)
+
+    def test_repeated_run(self):
+        cpu = create_cpu()
+        for workload in get_workloads(multiply=1):
+            workload.run(cpu)
+            workload.run(cpu)
+
+    def test_detect_wrong_results(self):
+        workload = SortWorkload(multiply=1)
+        cpu = create_cpu()
+        workload.run(cpu)
+        cpu.memory.load(workload.DATA + 10, [0x00])
+        self.assertRaises(WorkloadError, workload.check, cpu)
+
+        workload = CRC32Workload(multiply=1)
+        cpu = create_cpu()
+        workload.run(cpu)
+        cpu.accu_d.set(cpu.accu_d.get() ^ 1)
+        self.assertRaises(WorkloadError, workload.check, cpu)
+
+    def test_irq(self):
+        workload = IRQTimerWorkload(multiply=3)
+        cpu = create_cpu()
+        workload.run(cpu)
+        self.assertEqual(cpu.irq_count, workload.IRQ_COUNT * 3)
+        self.assertFalse(cpu.irq_enabled)
+
+    def test_multiply_too_big(self):
+        workload = CRC32Workload(multiply=1000)
+        self.assertRaises(ValueError, workload.setup, create_cpu())
+
+    def test_get_workloads(self):
+        workloads = get_workloads(["sort", "crc16"], multiply=3)
+        self.assertEqual([workload.name for workload in workloads], ["sort", "crc16"])
+        self.assertEqual([workload.multiply for workload in workloads], [3, 3])
+
+        workloads = get_workloads(["all"])
+        self.assertEqual(tuple(workload.name for workload in workloads), WORKLOAD_NAMES)
+        self.assertEqual(workloads[0].multiply, workloads[0].DEFAULT_MULTIPLY)
+
+        self.assertRaises(KeyError, get_workloads, ["unknown"])
+
+    def test_cli(self):
+        result = CliRunner().invoke(cli, [
+            "benchmark", "--loops", "1", "--multiply", "1", "--warmup", "0", "--repeat", "1",
+            "--workload", "recursion", "--workload", "tables",
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Recursion benchmark", result.output)
+        self.assertIn("Table walks benchmark", result.output)
+        self.assertNotIn("CRC16", result.output)
+
+
+class ScenariosTestCase(unittest.TestCase):
+    def _run(self, scenario, workload):
+        cpu = create_cpu()
+        scenario.install(cpu, workload)
+        workload.setup(cpu)
+        scenario.execute(cpu, workload)
+        workload.check(cpu)
+        return scenario.get_counts(cpu)
+
+    def test_all_scenarios(self):
+        for workload in get_workloads(multiply=1):
+            for scenario in get_scenarios():
+                self._run(scenario, workload)
+
+    def test_machine(self):
+        workload = CRC32Workload(multiply=1)
+        counts = self._run(MachineScenario(), workload)
+        self.assertGreater(counts["irq"], 0)
+        # The ISR reads the PIA:
+        self.assertEqual(counts["pia_reads"], counts["irq"])
+        self.assertEqual(counts["read_callback"], counts["irq"])
+        self.assertEqual(counts["read_middleware"], len(workload.data))
+
+    def test_sync_callbacks_per_cpu(self):
+        cpu = create_cpu()
+        IRQ60Scenario().install(cpu, CRC32Workload())
+        self.assertEqual(len(cpu.sync_callbacks), 1)
+        self.assertEqual(create_cpu().sync_callbacks, [])
+
+        # test_run() is restored:
+        workload = CRC32Workload(multiply=1)
+        workload.setup(cpu)
+        IRQ60Scenario().execute(cpu, workload)
+        self.assertNotIn("test_run", cpu.__dict__)
+
+    def test_get_scenarios(self):
+        scenarios = get_scenarios(["irq60"])
+        self.assertEqual([scenario.name for scenario in scenarios], ["bare", "irq60"])
+        scenarios = get_scenarios(["all"])
+        self.assertEqual(tuple(scenario.name for scenario in scenarios), SCENARIO_NAMES)
+        self.assertRaises(KeyError, get_scenarios, ["unknown"])
+
+    def test_cli(self):
+        result = CliRunner().invoke(cli, [
+            "benchmark", "--loops", "1", "--multiply", "1", "--warmup", "0", "--repeat", "1",
+            "--workload", "crc32", "--scenario", "middleware",
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("scenario: middleware", result.output)
+        self.assertIn("crc32+middleware", result.output)
+        self.assertIn("penalty", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
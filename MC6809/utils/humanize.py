@@ -13,7 +13,6 @@ from __future__ import absolute_import, division, print_function
 
 import locale
 import sys
-import platform
 
 
 def locale_format_number(val):
@@ -83,6 +82,7 @@ def cc_value2txt(status):
 
 
 def get_python_info():
+    import platform # only needed here, so import it lazy
     implementation = platform.python_implementation()
     if implementation == "CPython":
         return "%s v%s [%s]" % (
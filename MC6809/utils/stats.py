@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - statistic helpers
+    ==========================
+
+    Simple statistic functions for the benchmarks.
+    No dependency on scipy or numpy.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import math
+
+
+def mean(values):
+    """
+    >>> mean([1, 2, 3, 4])
+    2.5
+    """
+    return sum(values) / len(values)
+
+
+def median(values):
+    """
+    >>> median([3, 1, 2])
+    2
+    >>> median([4, 1, 3, 2])
+    2.5
+    """
+    values = sorted(values)
+    count = len(values)
+    middle = count // 2
+    if count % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def variance(values):
+    """
+    sample variance
+
+    >>> variance([1, 2, 3, 4])
+    1.6666666666666667
+    >>> variance([1])
+    0.0
+    """
+    count = len(values)
+    if count < 2:
+        return 0.0
+    values_mean = mean(values)
+    return sum([(value - values_mean) ** 2 for value in values]) / (count - 1)
+
+
+def stdev(values):
+    """
+    sample standard deviation
+
+    >>> round(stdev([1, 2, 3, 4]), 4)
+    1.291
+    """
+    return math.sqrt(variance(values))
+
+
+def summary(values):
+    """
+    >>> summary([1, 2, 3]) == {"median": 2, "mean": 2.0, "stdev": 1.0, "min": 1, "max": 3}
+    True
+    """
+    return {
+        "median": median(values),
+        "mean": mean(values),
+        "stdev": stdev(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def _betacf(a, b, x):
+    """ continued fraction for the incomplete beta function """
+    max_iterations = 200
+    epsilon = 3.0e-14
+    fpmin = 1.0e-300
+
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    if abs(d) < fpmin:
+        d = fpmin
+    d = 1.0 / d
+    h = d
+    for m in range(1, max_iterations + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        if abs(d) < fpmin:
+            d = fpmin
+        c = 1.0 + aa / c
+        if abs(c) < fpmin:
+            c = fpmin
+        d = 1.0 / d
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        if abs(d) < fpmin:
+            d = fpmin
+        c = 1.0 + aa / c
+        if abs(c) < fpmin:
+            c = fpmin
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < epsilon:
+            break
+    return h
+
+
+def incomplete_beta(a, b, x):
+    """
+    regularized incomplete beta function I_x(a, b)
+
+    >>> round(incomplete_beta(2, 3, 0.5), 6)
+    0.6875
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    ln_beta = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+    front = math.exp(ln_beta + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def student_t_two_sided_p(t, df):
+    """
+    two sided p-value of the Student's t-distribution
+
+    >>> round(student_t_two_sided_p(2.228, 10), 3)
+    0.05
+    >>> student_t_two_sided_p(0, 10)
+    1.0
+    """
+    if df <= 0:
+        return 1.0
+    x = df / (df + t * t)
+    return incomplete_beta(df / 2.0, 0.5, x)
+
+
+def welch_t_test(values1, values2):
+    """
+    Welch's t-test for two samples with possibly unequal variances.
+    Returns (t, degrees of freedom, two sided p-value)
+
+    >>> t, df, p = welch_t_test([10, 11, 10, 11, 10], [20, 21, 20, 21, 20])
+    >>> p < 0.001
+    True
+    >>> t, df, p = welch_t_test([10, 11, 10, 11], [10, 11, 11, 10])
+    >>> p
+    1.0
+    """
+    count1 = len(values1)
+    count2 = len(values2)
+    if count1 < 2 or count2 < 2:
+        return 0.0, 0.0, 1.0
+
+    se1 = variance(values1) / count1
+    se2 = variance(values2) / count2
+    se = se1 + se2
+    diff = mean(values1) - mean(values2)
+    if se == 0:
+        if diff == 0:
+            return 0.0, 0.0, 1.0
+        return math.copysign(float("inf"), diff), 0.0, 0.0
+
+    t = diff / math.sqrt(se)
+    df = se ** 2 / ((se1 ** 2) / (count1 - 1) + (se2 ** 2) / (count2 - 1))
+    return t, df, student_t_two_sided_p(t, df)
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,65 @@
+# coding: utf-8
+
+"""
+    MC6809 - benchmark workloads
+    ============================
+
+    Self-validating 6809 programs for benchmarking, e.g.:
+
+        from MC6809.workloads import get_workloads, create_cpu
+
+        for workload in get_workloads(["sort", "crc32"]):
+            workload.run(create_cpu())
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from MC6809.workloads.base import Workload, WorkloadError, create_cpu
+from MC6809.workloads.crc import CRC16Workload, CRC32Workload
+from MC6809.workloads.sort import SortWorkload
+from MC6809.workloads.memory_blocks import MemsetWorkload, MemcpyWorkload
+from MC6809.workloads.arithmetic import MulDiv16Workload
+from MC6809.workloads.string_search import StringSearchWorkload
+from MC6809.workloads.interrupts import IRQTimerWorkload
+from MC6809.workloads.recursion import RecursionWorkload
+from MC6809.workloads.tables import TableWalkWorkload
+from MC6809.workloads.scenarios import (
+    Scenario, PIAScenario, MiddlewareScenario, IRQ60Scenario, MachineScenario,
+    SCENARIOS, SCENARIO_NAMES, get_scenarios
+)
+
+
+WORKLOAD_CLASSES = (
+    CRC16Workload,
+    CRC32Workload,
+    SortWorkload,
+    MemsetWorkload,
+    MemcpyWorkload,
+    MulDiv16Workload,
+    StringSearchWorkload,
+    IRQTimerWorkload,
+    RecursionWorkload,
+    TableWalkWorkload,
+)
+WORKLOADS = dict((workload_class.name, workload_class) for workload_class in WORKLOAD_CLASSES)
+WORKLOAD_NAMES = tuple(workload_class.name for workload_class in WORKLOAD_CLASSES)
+
+
+def get_workloads(names=None, multiply=None):
+    """
+    Create workload instances by name, in the given order.
+    All workloads, if names is None or contains "all".
+    """
+    if names is None or "all" in names:
+        names = WORKLOAD_NAMES
+    workloads = []
+    for name in names:
+        try:
+            workload_class = WORKLOADS[name]
+        except KeyError:
+            raise KeyError("Unknown workload %r (existing: %s)" % (name, ", ".join(WORKLOAD_NAMES)))
+        workloads.append(workload_class(multiply))
+    return workloads
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - 16-bit multiply/divide workload
+    ========================================
+
+    16x16 bit multiply with MUL and a 16/16 bit shift-and-subtract division
+    over a table of word pairs. Subroutine calls, 16-bit arithmetic and
+    read-modify-write instructions on indexed memory.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import Workload, pseudo_random_bytes, words2bytes
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class MulDiv16Workload(Workload):
+    name = "muldiv16"
+    title = "MUL/DIV 16"
+    description = "16-bit multiply and divide subroutines over a table"
+
+    DEFAULT_MULTIPLY = 10
+    PAIR_COUNT = 32
+    RESULTS = 0x2000
+
+    PROGRAM = [
+                                    #0100|                           ; X = table of (a, b) word pairs, Y = end of the table
+                                    #0100|                           ; U = result table: (a*b 32 bit, a/b, a%b) per pair
+        0x34, 0x20,                 #0100|         PSHS  Y          ; end address to TOS
+        0xAC, 0xE4,                 #0102|   LOOP: CMPX  ,S         ; end of table reached?
+        0x24, 0x0B,                 #0104|         BHS   DONE
+        0xBD, 0x01, 0x15,           #0106|         JSR   MUL16
+        0x8D, 0x33,                 #0109|         BSR   DIV16
+        0x30, 0x04,                 #010B|         LEAX  4,X        ; next pair
+        0x33, 0x48,                 #010D|         LEAU  8,U        ; next result
+        0x20, 0xF1,                 #010F|         BRA   LOOP
+        0x32, 0x62,                 #0111|   DONE: LEAS  2,S
+        0x20, 0x4B,                 #0113|         BRA   EXIT
+                                    #0115|                           ; 16x16 bit unsigned multiply: 0,U..3,U = 0,X * 2,X
+        0xA6, 0x01,                 #0115|  MUL16: LDA   1,X        ; al * bl
+        0xE6, 0x03,                 #0117|         LDB   3,X
+        0x3D,                       #0119|         MUL
+        0xED, 0x42,                 #011A|         STD   2,U
+        0xA6, 0x84,                 #011C|         LDA   ,X         ; ah * bh
+        0xE6, 0x02,                 #011E|         LDB   2,X
+        0x3D,                       #0120|         MUL
+        0xED, 0xC4,                 #0121|         STD   ,U
+        0xA6, 0x01,                 #0123|         LDA   1,X        ; al * bh
+        0xE6, 0x02,                 #0125|         LDB   2,X
+        0x3D,                       #0127|         MUL
+        0xE3, 0x41,                 #0128|         ADDD  1,U
+        0xED, 0x41,                 #012A|         STD   1,U
+        0x24, 0x02,                 #012C|         BCC   M1
+        0x6C, 0xC4,                 #012E|         INC   ,U
+        0xA6, 0x84,                 #0130|     M1: LDA   ,X         ; ah * bl
+        0xE6, 0x03,                 #0132|         LDB   3,X
+        0x3D,                       #0134|         MUL
+        0xE3, 0x41,                 #0135|         ADDD  1,U
+        0xED, 0x41,                 #0137|         STD   1,U
+        0x24, 0x02,                 #0139|         BCC   M2
+        0x6C, 0xC4,                 #013B|         INC   ,U
+        0x39,                       #013D|     M2: RTS
+                                    #013E|                           ; 16/16 bit unsigned divide: 4,U = 0,X / 2,X and 6,U = 0,X % 2,X
+        0xEC, 0x84,                 #013E|  DIV16: LDD   ,X
+        0xED, 0x44,                 #0140|         STD   4,U        ; dividend will be shifted into the quotient
+        0x4F,                       #0142|         CLRA
+        0x5F,                       #0143|         CLRB             ; D = remainder
+        0x10, 0x8E, 0x00, 0x10,     #0144|         LDY   #16        ; bit counter
+        0x68, 0x45,                 #0148|     D1: LSL   5,U        ; shift dividend/quotient left
+        0x69, 0x44,                 #014A|         ROL   4,U
+        0x59,                       #014C|         ROLB             ; shift the bit into the remainder
+        0x49,                       #014D|         ROLA
+        0x25, 0x05,                 #014E|         BCS   D2         ; 17 bit remainder is always >= divisor
+        0x10, 0xA3, 0x02,           #0150|         CMPD  2,X
+        0x25, 0x04,                 #0153|         BLO   D3
+        0xA3, 0x02,                 #0155|     D2: SUBD  2,X
+        0x6C, 0x45,                 #0157|         INC   5,U        ; set quotient bit
+        0x31, 0x3F,                 #0159|     D3: LEAY  -1,Y
+        0x26, 0xEB,                 #015B|         BNE   D1
+        0xED, 0x46,                 #015D|         STD   6,U
+        0x39,                       #015F|         RTS
+                                    #0160|   EXIT:
+    ]
+    END = 0x0160
+
+    def setup(self, cpu):
+        super(MulDiv16Workload, self).setup(cpu)
+        data = pseudo_random_bytes(self.PAIR_COUNT * 4)
+        self.pairs = []
+        for index in range(0, len(data), 4):
+            a = data[index] << 8 | data[index + 1]
+            b = data[index + 2] << 8 | data[index + 3]
+            if index % 8:
+                b >>= 8 # test small divisors, too
+            b = max(b, 1)
+            self.pairs.append((a, b))
+        self.load_data(cpu, words2bytes([value for pair in self.pairs for value in pair]))
+
+    def prepare(self, cpu, pass_no):
+        super(MulDiv16Workload, self).prepare(cpu, pass_no)
+        cpu.index_x.set(self.DATA)
+        cpu.index_y.set(self.DATA + self.PAIR_COUNT * 4)
+        cpu.user_stack_pointer.set(self.RESULTS)
+
+    def check(self, cpu):
+        expected = []
+        for a, b in self.pairs:
+            product = a * b
+            expected += words2bytes([product >> 16, product & 0xffff, a // b, a % b])
+        self.assert_memory(cpu, self.RESULTS, expected, "results")
+        self.check_stack(cpu)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - workload base
+    ======================
+
+    A workload is a small 6809 program as machine code with the data and
+    the expected results. A workload is "self-validating": after the run
+    the results in the emulated memory/registers will be compared with
+    results calculated in Python.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import sys
+
+from MC6809.components.cpu6809 import CPU
+from MC6809.components.memory import Memory
+from MC6809.core.configs import BaseConfig
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+log = logging.getLogger("MC6809")
+
+
+CFG_DICT = {
+    "verbosity":None,
+    "trace":None,
+}
+
+
+class WorkloadCfg(BaseConfig):
+    RAM_START = 0x0000
+    RAM_END = 0x7FFF
+
+    ROM_START = 0x8000
+    ROM_END = 0xFFFF
+
+    BUS_ADDR_AREAS = (
+        (0xFFF2, 0xFFFE, "Interrupt vectors"),
+    )
+
+    DEFAULT_ROMS = None
+
+
+def create_cpu(cfg_dict=None, memory_class=Memory):
+    if cfg_dict is None:
+        cfg_dict = CFG_DICT
+    cfg = WorkloadCfg(cfg_dict)
+    memory = memory_class(cfg)
+    return CPU(memory, cfg)
+
+
+def pseudo_random_bytes(count, seed=0x6809):
+    """
+    Reproducible "random" test data, without the random module,
+    because the sequence must be the same in every Python version.
+
+    >>> pseudo_random_bytes(8)
+    [213, 78, 25, 62, 174, 155, 71, 144]
+    """
+    data = []
+    value = seed
+    for __ in range(count):
+        value = (value * 1103515245 + 12345) & 0x7fffffff
+        data.append((value >> 16) & 0xff)
+    return data
+
+
+def words2bytes(words):
+    """
+    >>> words2bytes([0x1234, 0xabcd])
+    [18, 52, 171, 205]
+    """
+    data = []
+    for word in words:
+        data.append(word >> 8)
+        data.append(word & 0xff)
+    return data
+
+
+class WorkloadError(AssertionError):
+    """
+    The emulated program doesn't create the expected results.
+    """
+    pass
+
+
+class Workload(object):
+    """
+    Base class for all workloads.
+
+    PROGRAM is the machine code that will be loaded at START.
+    A pass ends, if the program counter reached END.
+    Without END: the first address after the program.
+
+    "multiply" scales the work: By default the program runs
+    multiply passes over the same data.
+    """
+    name = None # used on the command line and in the benchmark results
+    title = None
+    description = None
+
+    START = 0x0100
+    END = None
+    PROGRAM = None
+
+    STACK = 0x7F00 # initial system stack pointer
+    DATA = 0x1000 # start of the test data area
+    DATA_END = 0x4000 # (exclusive)
+
+    DEFAULT_MULTIPLY = 1
+    MAX_OPS = 10000000 # per pass
+
+    def __init__(self, multiply=None):
+        if multiply is None:
+            multiply = self.DEFAULT_MULTIPLY
+        if multiply < 1:
+            raise ValueError("multiply must be greater than 0")
+        self.multiply = multiply
+
+    def __repr__(self):
+        return "<%s multiply=%i>" % (self.__class__.__name__, self.multiply)
+
+    @property
+    def end(self):
+        if self.END is None:
+            return self.START + len(self.PROGRAM)
+        return self.END
+
+    @property
+    def passes(self):
+        return self.multiply
+
+    def load_data(self, cpu, data, address=None):
+        if address is None:
+            address = self.DATA
+        if address + len(data) > self.DATA_END:
+            raise ValueError("%s: %i Bytes test data doesn't fit into $%04x-$%04x (multiply too big?)" % (
+                self.name, len(data), address, self.DATA_END
+            ))
+        cpu.memory.load(address, data)
+
+    def setup(self, cpu):
+        """
+        Load the program and the test data.
+        """
+        cpu.memory.load(self.START, self.PROGRAM)
+
+    def prepare(self, cpu, pass_no):
+        """
+        Set the registers for one pass.
+        """
+        cpu.system_stack_pointer.set(self.STACK)
+
+    def pass_done(self, cpu, pass_no):
+        """
+        Called after every pass, e.g. to collect pass results.
+        """
+        pass
+
+    def execute(self, cpu):
+        for pass_no in range(self.passes):
+            self.prepare(cpu, pass_no)
+            cpu.test_run(self.START, self.end, max_ops=self.MAX_OPS)
+            self.pass_done(cpu, pass_no)
+
+    def get_word(self, cpu, address):
+        """
+        Read a word without side effects (no CPU cycles, no callbacks)
+        """
+        hi, lo = cpu.memory.get_block(address, address + 2)
+        return hi << 8 | lo
+
+    def check(self, cpu):
+        """
+        Compare the results with the expected values.
+        Must raise WorkloadError on a mismatch.
+        """
+        raise NotImplementedError
+
+    def check_stack(self, cpu):
+        stack_pointer = cpu.system_stack_pointer.get()
+        if stack_pointer != self.STACK:
+            raise WorkloadError("%s: stack pointer is $%04x and not $%04x" % (
+                self.name, stack_pointer, self.STACK
+            ))
+
+    def assert_equal(self, first, second, msg):
+        if first != second:
+            raise WorkloadError("%s: %s: %r != %r" % (self.name, msg, first, second))
+
+    def assert_memory(self, cpu, address, expected, msg):
+        current = list(cpu.memory.get_block(address, address + len(expected)))
+        if current != list(expected):
+            for index, (current_byte, expected_byte) in enumerate(zip(current, expected)):
+                if current_byte != expected_byte:
+                    break
+            raise WorkloadError("%s: %s: $%02x is not $%02x at $%04x" % (
+                self.name, msg, current_byte, expected_byte, address + index
+            ))
+
+    def run(self, cpu):
+        """
+        Setup, execute and check the workload on the given CPU.
+        """
+        self.setup(cpu)
+        self.execute(cpu)
+        self.check(cpu)
+
+
+if __name__ == "__main__":
+    import doctest
+    print(doctest.testmod(verbose=0))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - CRC workloads
+    ======================
+
+    CRC16 and CRC32 over a test string.
+    Origin code by Johann E. Klasek, j AT klasek at
+    (see also: MC6809/tests/test_6809_program.py)
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import binascii
+import string
+import sys
+
+from MC6809.workloads.base import Workload
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+def get_test_string(multiply):
+    txt = string.printable
+    if not PY2:
+        txt = bytes(txt, encoding="UTF-8")
+    return txt * multiply
+
+
+def crc16(data, crc=0):
+    """
+    CRC16 with polynom $1021 (XMODEM), like the 6809 code.
+
+    >>> hex(crc16(b"DragonPy works?!?"))
+    '0xa30d'
+    """
+    for byte in bytearray(data):
+        crc ^= byte << 8
+        for __ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xffff
+            else:
+                crc = (crc << 1) & 0xffff
+    return crc
+
+
+class CRC16Workload(Workload):
+    name = "crc16"
+    title = "CRC16"
+    description = "CRC16 over a test string: shift/rotate and XOR"
+
+    DEFAULT_MULTIPLY = 15
+    passes = 1 # the test data grows with multiply
+
+    PROGRAM = [
+        #                                    .ORG  $100
+        #                              CRCH: EQU   $10
+        #                              CRCL: EQU   $21
+        #                             CRC16:
+        #                                BL:
+        0xA8, 0xC0, #                        EORA  ,u+        ; fetch byte and XOR into CRC high byte
+        0x10, 0x8E, 0x00, 0x08, #            LDY   #8         ; rotate loop counter
+        0x58, #                          RL: ASLB             ; shift CRC left, first low
+        0x49, #                              ROLA             ; and than high byte
+        0x24, 0x04, #                        BCC   cl         ; Justify or ...
+        0x88, 0x10, #                        EORA  #CRCH      ; CRC=CRC XOR polynomic, high
+        0xC8, 0x21, #                        EORB  #CRCL      ; and low byte
+        0x31, 0x3F, #                    CL: LEAY  -1,y       ; shift loop (8 bits)
+        0x26, 0xF4, #                        BNE   rl
+        0x30, 0x1F, #                        LEAX  -1,x       ; byte loop
+        0x26, 0xEA, #                        BNE   bl
+    ]
+
+    def setup(self, cpu):
+        super(CRC16Workload, self).setup(cpu)
+        self.data = get_test_string(self.multiply)
+        self.load_data(cpu, self.data)
+
+    def prepare(self, cpu, pass_no):
+        super(CRC16Workload, self).prepare(cpu, pass_no)
+        cpu.user_stack_pointer.set(self.DATA) # start address of data
+        cpu.index_x.set(len(self.data)) # number of bytes
+        cpu.accu_d.set(0x0000) # CRC start value
+
+    def check(self, cpu):
+        self.assert_equal(cpu.accu_d.get(), crc16(self.data), "CRC16")
+
+
+class CRC32Workload(Workload):
+    name = "crc32"
+    title = "CRC32"
+    description = "ZIP 32-bit CRC over a test string: EXG, shift/rotate and XOR"
+
+    DEFAULT_MULTIPLY = 15
+    passes = 1 # the test data grows with multiply
+    DATA_END = 0x3F00 # the program set the stack to $4000
+
+    PROGRAM = [
+        #                              0100|           .ORG  $100
+        0x10, 0xCE, 0x40, 0x00, #      0100|           LDS   #$4000
+        #                              0104|    CRCHH: EQU   $ED
+        #                              0104|    CRCHL: EQU   $B8
+        #                              0104|    CRCLH: EQU   $83
+        #                              0104|    CRCLL: EQU   $20
+        #                              0104| CRCINITH: EQU   $FFFF
+        #                              0104| CRCINITL: EQU   $FFFF
+        #                              0104|                            ; CRC 32 bit in DP (4 bytes)
+        #                              0104|      CRC: EQU   $80
+        0xCE, 0x10, 0x00, #            0104|           LDU   #$1000     ; start address in u
+        0x34, 0x10, #                  010C|           PSHS  x          ; end address +1 to TOS
+        0xCC, 0xFF, 0xFF, #            010E|           LDD   #CRCINITL
+        0xDD, 0x82, #                  0111|           STD   crc+2
+        0x8E, 0xFF, 0xFF, #            0113|           LDX   #CRCINITH
+        0x9F, 0x80, #                  0116|           STX   crc
+        #                              0118|                            ; d/x contains the CRC
+        #                              0118|       BL:
+        0xE8, 0xC0, #                  0118|           EORB  ,u+        ; XOR with lowest byte
+        0x10, 0x8E, 0x00, 0x08, #      011A|           LDY   #8         ; bit counter
+        #                              011E|       RL:
+        0x1E, 0x01, #                  011E|           EXG   d,x
+        #                              0120|      RL1:
+        0x44, #                        0120|           LSRA             ; shift CRC right, beginning with high word
+        0x56, #                        0121|           RORB
+        0x1E, 0x01, #                  0122|           EXG   d,x
+        0x46, #                        0124|           RORA             ; low word
+        0x56, #                        0125|           RORB
+        0x24, 0x12, #                  0126|           BCC   cl
+        #                              0128|                            ; CRC=CRC XOR polynomic
+        0x88, 0x83, #                  0128|           EORA  #CRCLH     ; apply CRC polynomic low word
+        0xC8, 0x20, #                  012A|           EORB  #CRCLL
+        0x1E, 0x01, #                  012C|           EXG   d,x
+        0x88, 0xED, #                  012E|           EORA  #CRCHH     ; apply CRC polynomic high word
+        0xC8, 0xB8, #                  0130|           EORB  #CRCHL
+        0x31, 0x3F, #                  0132|           LEAY  -1,y       ; bit count down
+        0x26, 0xEA, #                  0134|           BNE   rl1
+        0x1E, 0x01, #                  0136|           EXG   d,x        ; CRC: restore correct order
+        0x27, 0x04, #                  0138|           BEQ   el         ; leave bit loop
+        #                              013A|       CL:
+        0x31, 0x3F, #                  013A|           LEAY  -1,y       ; bit count down
+        0x26, 0xE0, #                  013C|           BNE   rl         ; bit loop
+        #                              013E|       EL:
+        0x11, 0xA3, 0xE4, #            013E|           CMPU  ,s         ; end address reached?
+        0x26, 0xD5, #                  0141|           BNE   bl         ; byte loop
+        0xDD, 0x82, #                  0143|           STD   crc+2      ; CRC low word
+        0x9F, 0x80, #                  0145|           STX   crc        ; CRC high word
+    ]
+
+    def setup(self, cpu):
+        super(CRC32Workload, self).setup(cpu)
+        self.data = get_test_string(self.multiply)
+        self.load_data(cpu, self.data)
+
+    def prepare(self, cpu, pass_no):
+        super(CRC32Workload, self).prepare(cpu, pass_no)
+        cpu.index_x.set(self.DATA + len(self.data)) # end address
+
+    def check(self, cpu):
+        crc32 = cpu.index_x.get() * 0x10000 + cpu.accu_d.get()
+        crc32 ^= 0xFFFFFFFF
+        expected = binascii.crc32(self.data) & 0xffffffff
+        self.assert_equal("$%08x" % crc32, "$%08x" % expected, "CRC32")
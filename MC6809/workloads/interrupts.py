@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - interrupt workload
+    ===========================
+
+    A main loop waits for a number of timer interrupts. The "timer" is
+    emulated here: cpu.irq() will be called every IRQ_CYCLES CPU cycles.
+    The interrupt service routine counts the IRQs. So the IRQ entry
+    (push all registers) and RTI are a big part of this workload.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import Workload, WorkloadError, words2bytes
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class IRQTimerWorkload(Workload):
+    name = "irq"
+    title = "IRQ timer"
+    description = "Busy main loop with a frequent timer IRQ"
+
+    DEFAULT_MULTIPLY = 40
+    IRQ_COUNT = 64 # IRQs per pass
+    IRQ_CYCLES = 100 # must be greater than the ISR run time
+    IRQ_COUNTER = 0x0080
+    LOOP_COUNTER = 0x0082
+
+    PROGRAM = [
+                                    #0100|                           ; Y = IRQ count to wait for
+                                    #0100|                           ; $0080 = IRQ counter, $0082 = main loop counter
+        0x4F,                       #0100|         CLRA
+        0x1F, 0x8B,                 #0101|         TFR   A,DP
+        0x5F,                       #0103|         CLRB
+        0xDD, 0x80,                 #0104|         STD   <$80
+        0xDD, 0x82,                 #0106|         STD   <$82
+        0x1C, 0xEF,                 #0108|         ANDCC #$EF       ; enable IRQ
+        0xDC, 0x82,                 #010A|   WAIT: LDD   <$82       ; count the main loops
+        0xC3, 0x00, 0x01,           #010C|         ADDD  #1
+        0xDD, 0x82,                 #010F|         STD   <$82
+        0x10, 0x9C, 0x80,           #0111|         CMPY  <$80       ; all IRQs arrived?
+        0x26, 0xF4,                 #0114|         BNE   WAIT
+        0x1A, 0x10,                 #0116|         ORCC  #$10       ; disable IRQ
+        0x20, 0x08,                 #0118|         BRA   EXIT
+        0xDC, 0x80,                 #011A|    ISR: LDD   <$80       ; count the IRQs
+        0xC3, 0x00, 0x01,           #011C|         ADDD  #1
+        0xDD, 0x80,                 #011F|         STD   <$80
+        0x3B,                       #0121|         RTI
+                                    #0122|   EXIT:
+    ]
+    ISR = 0x011A
+    END = 0x0122
+
+    def setup(self, cpu):
+        super(IRQTimerWorkload, self).setup(cpu)
+        cpu.memory.load(cpu.IRQ_VECTOR, words2bytes([self.ISR]))
+        self.irq_count = cpu.irq_count
+        self.main_loops = []
+
+    def prepare(self, cpu, pass_no):
+        super(IRQTimerWorkload, self).prepare(cpu, pass_no)
+        cpu.cc.E = 1 # stack the entire register set
+        cpu.index_y.set(self.IRQ_COUNT)
+
+    def execute(self, cpu):
+        irq_enabled = cpu.irq_enabled
+        cpu.irq_enabled = True
+        try:
+            for pass_no in range(self.passes):
+                self.prepare(cpu, pass_no)
+                self.run_with_timer(cpu)
+                self.pass_done(cpu, pass_no)
+        finally:
+            cpu.irq_enabled = irq_enabled
+
+    def run_with_timer(self, cpu):
+        end = self.end
+        get_and_call_next_op = cpu.get_and_call_next_op
+        program_counter = cpu.program_counter.get
+        irq = cpu.irq
+
+        cpu.program_counter.set(self.START)
+        next_irq = cpu.cycles + self.IRQ_CYCLES
+        for op_count in range(self.MAX_OPS):
+            if program_counter() == end:
+                cpu.instruction_count += op_count
+                return
+            get_and_call_next_op()
+            if cpu.cycles >= next_irq:
+                next_irq += self.IRQ_CYCLES
+                irq()
+        raise WorkloadError("%s: Max ops %i arrived!" % (self.name, self.MAX_OPS))
+
+    def pass_done(self, cpu, pass_no):
+        self.main_loops.append(self.get_word(cpu, self.LOOP_COUNTER))
+
+    def check(self, cpu):
+        self.assert_equal(self.get_word(cpu, self.IRQ_COUNTER), self.IRQ_COUNT, "IRQ counter")
+        self.assert_equal(cpu.irq_count - self.irq_count, self.IRQ_COUNT * self.passes, "taken IRQs")
+        for loops in self.main_loops:
+            if not loops:
+                raise WorkloadError("%s: main loop not running" % self.name)
+        self.assert_equal(cpu.cc.I, 1, "IRQ disabled at the end")
+        self.check_stack(cpu)
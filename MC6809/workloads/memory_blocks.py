@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - memset/memcpy workloads
+    ================================
+
+    Fill and copy memory blocks: 16-bit loads/stores with
+    auto increment and a odd byte at the end.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from MC6809.workloads.base import Workload, pseudo_random_bytes
+
+
+class MemsetWorkload(Workload):
+    name = "memset"
+    title = "memset"
+    description = "Fill a memory block with STD ,X++"
+
+    DEFAULT_MULTIPLY = 32
+    BLOCK_SIZE = 1023 # odd size: fill the last byte with STA, too
+
+    PROGRAM = [
+                                    #0100|                           ; X = destination, Y = byte count, A = fill value
+        0x1F, 0x89,                 #0100|         TFR   A,B        ; D = fill value in both bytes
+        0x1E, 0x02,                 #0102|         EXG   D,Y        ; D = byte count, Y = fill value
+        0x44,                       #0104|         LSRA
+        0x56,                       #0105|         RORB             ; D = word count, C = odd byte left
+        0x34, 0x01,                 #0106|         PSHS  CC
+        0x1E, 0x02,                 #0108|         EXG   D,Y        ; D = fill value, Y = word count
+        0x31, 0xA4,                 #010A|         LEAY  ,Y         ; set Z if no words
+        0x27, 0x06,                 #010C|         BEQ   TAIL
+        0xED, 0x81,                 #010E|  WORDS: STD   ,X++       ; fill one word
+        0x31, 0x3F,                 #0110|         LEAY  -1,Y
+        0x26, 0xFA,                 #0112|         BNE   WORDS
+        0x35, 0x01,                 #0114|   TAIL: PULS  CC
+        0x24, 0x02,                 #0116|         BCC   DONE
+        0xA7, 0x80,                 #0118|         STA   ,X+        ; fill the odd byte
+                                    #011A|   DONE:
+    ]
+
+    def get_fill_byte(self, pass_no):
+        return (0xA5 + pass_no) & 0xff
+
+    def prepare(self, cpu, pass_no):
+        super(MemsetWorkload, self).prepare(cpu, pass_no)
+        cpu.index_x.set(self.DATA)
+        cpu.index_y.set(self.BLOCK_SIZE)
+        cpu.accu_a.set(self.get_fill_byte(pass_no))
+
+    def check(self, cpu):
+        fill_byte = self.get_fill_byte(self.passes - 1)
+        self.assert_memory(cpu, self.DATA, [fill_byte] * self.BLOCK_SIZE, "fill")
+        self.assert_memory(cpu, self.DATA + self.BLOCK_SIZE, [0x00], "fill end")
+        self.assert_equal(cpu.index_x.get(), self.DATA + self.BLOCK_SIZE, "X end address")
+        self.check_stack(cpu)
+
+
+class MemcpyWorkload(Workload):
+    name = "memcpy"
+    title = "memcpy"
+    description = "Copy a memory block with LDD ,X++ / STD ,U++"
+
+    DEFAULT_MULTIPLY = 24
+    BLOCK_SIZE = 1023 # odd size: copy the last byte with LDA/STA, too
+    DESTINATION = 0x2000
+
+    PROGRAM = [
+                                    #0100|                           ; X = source, U = destination, Y = byte count
+        0x1F, 0x20,                 #0100|         TFR   Y,D
+        0x44,                       #0102|         LSRA
+        0x56,                       #0103|         RORB             ; D = word count, C = odd byte left
+        0x34, 0x01,                 #0104|         PSHS  CC
+        0x1F, 0x02,                 #0106|         TFR   D,Y        ; Y = word count
+        0x31, 0xA4,                 #0108|         LEAY  ,Y         ; set Z if no words
+        0x27, 0x08,                 #010A|         BEQ   TAIL
+        0xEC, 0x81,                 #010C|  WORDS: LDD   ,X++       ; copy one word
+        0xED, 0xC1,                 #010E|         STD   ,U++
+        0x31, 0x3F,                 #0110|         LEAY  -1,Y
+        0x26, 0xF8,                 #0112|         BNE   WORDS
+        0x35, 0x01,                 #0114|   TAIL: PULS  CC
+        0x24, 0x04,                 #0116|         BCC   DONE
+        0xA6, 0x80,                 #0118|         LDA   ,X+        ; copy the odd byte
+        0xA7, 0xC0,                 #011A|         STA   ,U+
+                                    #011C|   DONE:
+    ]
+
+    def setup(self, cpu):
+        super(MemcpyWorkload, self).setup(cpu)
+        self.data = pseudo_random_bytes(self.BLOCK_SIZE)
+        self.load_data(cpu, self.data)
+
+    def prepare(self, cpu, pass_no):
+        super(MemcpyWorkload, self).prepare(cpu, pass_no)
+        cpu.index_x.set(self.DATA)
+        cpu.user_stack_pointer.set(self.DESTINATION)
+        cpu.index_y.set(self.BLOCK_SIZE)
+
+    def check(self, cpu):
+        self.assert_memory(cpu, self.DESTINATION, self.data, "copy")
+        self.assert_memory(cpu, self.DESTINATION + self.BLOCK_SIZE, [0x00], "copy end")
+        self.assert_equal(cpu.user_stack_pointer.get(), self.DESTINATION + self.BLOCK_SIZE, "U end address")
+        self.check_stack(cpu)
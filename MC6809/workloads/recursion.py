@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - recursion workload
+    ===========================
+
+    Recursive subroutines: fibonacci with two calls per level and a
+    deep recursive sum. Many JSR/BSR/RTS and stack accesses.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from MC6809.workloads.base import Workload
+
+
+def fibonacci(n):
+    """
+    >>> [fibonacci(n) for n in range(10)]
+    [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    """
+    a, b = 0, 1
+    for __ in range(n):
+        a, b = b, a + b
+    return a
+
+
+class RecursionWorkload(Workload):
+    name = "recursion"
+    title = "Recursion"
+    description = "Recursive fibonacci and a deep recursive sum"
+
+    DEFAULT_MULTIPLY = 2
+    FIBONACCI_N = 15
+    SUM_DEPTH = 200 # 3 Bytes stack per level
+    FIBONACCI_RESULT = 0x0080
+    SUM_RESULT = 0x0082
+
+    PROGRAM = [
+                                    #0100|                           ; A = n for fib(n), B = depth of the recursive sum, Y = repeat count
+                                    #0100|                           ; results: $0080 = fib(n), $0082 = sum(depth)
+        0x34, 0x06,                 #0100|         PSHS  B,A
+        0xE6, 0xE4,                 #0102|   LOOP: LDB   ,S         ; n
+        0xBD, 0x01, 0x1A,           #0104|         JSR   FIB
+        0xFD, 0x00, 0x80,           #0107|         STD   $0080
+        0xE6, 0x61,                 #010A|         LDB   1,S        ; depth
+        0xBD, 0x01, 0x34,           #010C|         JSR   SUM
+        0xFD, 0x00, 0x82,           #010F|         STD   $0082
+        0x31, 0x3F,                 #0112|         LEAY  -1,Y
+        0x26, 0xEC,                 #0114|         BNE   LOOP
+        0x35, 0x06,                 #0116|         PULS  A,B
+        0x20, 0x29,                 #0118|         BRA   EXIT
+                                    #011A|                           ; D = fib(B)
+        0xC1, 0x02,                 #011A|    FIB: CMPB  #2
+        0x24, 0x02,                 #011C|         BHS   F1
+        0x4F,                       #011E|         CLRA             ; fib(0) = 0, fib(1) = 1
+        0x39,                       #011F|         RTS
+        0x32, 0x7D,                 #0120|     F1: LEAS  -3,S       ; 0,S = n-1, 1,S = fib(n-1)
+        0x5A,                       #0122|         DECB
+        0xE7, 0xE4,                 #0123|         STB   ,S
+        0xBD, 0x01, 0x1A,           #0125|         JSR   FIB
+        0xED, 0x61,                 #0128|         STD   1,S
+        0xE6, 0xE4,                 #012A|         LDB   ,S
+        0x5A,                       #012C|         DECB
+        0x8D, 0xEB,                 #012D|         BSR   FIB        ; D = fib(n-2)
+        0xE3, 0x61,                 #012F|         ADDD  1,S
+        0x32, 0x63,                 #0131|         LEAS  3,S
+        0x39,                       #0133|         RTS
+                                    #0134|                           ; D = B + (B-1) + ... + 1
+        0x5D,                       #0134|    SUM: TSTB
+        0x26, 0x02,                 #0135|         BNE   S1
+        0x4F,                       #0137|         CLRA
+        0x39,                       #0138|         RTS
+        0x34, 0x04,                 #0139|     S1: PSHS  B
+        0x5A,                       #013B|         DECB
+        0x8D, 0xF6,                 #013C|         BSR   SUM
+        0xEB, 0xE0,                 #013E|         ADDB  ,S+
+        0x89, 0x00,                 #0140|         ADCA  #0
+        0x39,                       #0142|         RTS
+                                    #0143|   EXIT:
+    ]
+    END = 0x0143
+
+    passes = 1 # The program has a own repeat loop
+
+    def prepare(self, cpu, pass_no):
+        super(RecursionWorkload, self).prepare(cpu, pass_no)
+        cpu.accu_a.set(self.FIBONACCI_N)
+        cpu.accu_b.set(self.SUM_DEPTH)
+        cpu.index_y.set(self.multiply)
+
+    def check(self, cpu):
+        self.assert_equal(self.get_word(cpu, self.FIBONACCI_RESULT), fibonacci(self.FIBONACCI_N), "fibonacci")
+        self.assert_equal(self.get_word(cpu, self.SUM_RESULT), sum(range(self.SUM_DEPTH + 1)), "sum")
+        self.check_stack(cpu)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - benchmark scenarios
+    ============================
+
+    A scenario configures the machine around a workload, like a real
+    machine would do it: I/O callbacks, memory middlewares and a periodic
+    IRQ. Running the same workload with different scenarios shows the
+    throughput penalty of the device integration.
+
+        bare       - empty callback/middleware dicts, no IRQs
+        pia        - PIA-like I/O pages $FF00-$FF3F as read/write callbacks
+        middleware - pass through read/write middlewares over the workload data
+        irq60      - 60 Hz IRQ via a sync callback, the ISR reads the PIA
+        machine    - all together
+
+    The PIA pages are not used by the workloads, so "pia" alone measures
+    only the cost of populated callback dicts. The middlewares are called
+    on every data access of the workload.
+
+    The 60 Hz IRQ needs the sync callbacks, but Workload.execute() uses
+    cpu.test_run() without them: The irq60 scenario replaces test_run()
+    on the CPU instance with a variant that calls the sync callbacks after
+    every cpu.inner_burst_op_count ops, like cpu.burst_run() does.
+    Workloads with a own run loop (e.g. the "irq" workload) will get no
+    60 Hz IRQs.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import words2bytes
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class PIA(object):
+    """
+    Very simple PIA-like device: 4 registers mirrored over the address range.
+    It only stores the written values and counts the accesses.
+    """
+    def __init__(self):
+        self.registers = [0x00] * 4
+        self.reads = 0
+        self.writes = 0
+
+    def read_byte(self, cycles, last_op_address, address):
+        self.reads += 1
+        return self.registers[address & 0x03]
+
+    def write_byte(self, cycles, last_op_address, address, value):
+        self.writes += 1
+        self.registers[address & 0x03] = value
+
+
+def read_byte_middleware(cycles, last_op_address, address, byte):
+    return byte
+
+
+def write_byte_middleware(cycles, last_op_address, address, value):
+    return value
+
+
+def sync_test_run(cpu, start, end, max_ops=1000000):
+    """
+    Same as cpu.test_run() but calls the sync callbacks
+    after every cpu.inner_burst_op_count ops.
+    """
+    cpu.program_counter.set(start)
+
+    get_and_call_next_op = cpu.get_and_call_next_op
+    program_counter = cpu.program_counter.get
+    call_sync_callbacks = cpu.call_sync_callbacks
+    burst_ops = range(cpu.inner_burst_op_count)
+
+    op_count = 0
+    while op_count < max_ops:
+        for burst_op_count in burst_ops:
+            if program_counter() == end:
+                cpu.instruction_count += op_count + burst_op_count
+                return
+            get_and_call_next_op()
+        op_count += cpu.inner_burst_op_count
+        call_sync_callbacks()
+
+    cpu.instruction_count += op_count
+    raise RuntimeError("Max ops %i arrived!" % max_ops)
+
+
+class Scenario(object):
+    """
+    The bare scenario: nothing registered.
+    """
+    name = "bare"
+    title = "bare"
+    description = "no callbacks, no middlewares, no IRQs"
+
+    def __init__(self):
+        self.counts = None
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.name)
+
+    def install(self, cpu, workload):
+        """
+        Register the callbacks etc. on a fresh CPU
+        """
+        pass
+
+    def execute(self, cpu, workload):
+        workload.execute(cpu)
+
+    def get_counts(self, cpu):
+        counts = cpu.memory.get_callback_counts()
+        counts["irq"] = cpu.irq_count
+        return counts
+
+
+class PIAScenario(Scenario):
+    name = "pia"
+    title = "PIA"
+    description = "PIA-like I/O pages as memory callbacks"
+
+    PIA_RANGES = (
+        (0xFF00, 0xFF1F), # PIA 0
+        (0xFF20, 0xFF3F), # PIA 1
+    )
+
+    def install(self, cpu, workload):
+        self.pias = []
+        for start_addr, end_addr in self.PIA_RANGES:
+            pia = PIA()
+            cpu.memory.add_read_byte_callback(pia.read_byte, start_addr, end_addr)
+            cpu.memory.add_write_byte_callback(pia.write_byte, start_addr, end_addr)
+            self.pias.append(pia)
+
+    def get_counts(self, cpu):
+        counts = super(PIAScenario, self).get_counts(cpu)
+        counts["pia_reads"] = sum([pia.reads for pia in self.pias])
+        return counts
+
+
+class MiddlewareScenario(Scenario):
+    name = "middleware"
+    title = "middleware"
+    description = "read/write byte middlewares over the workload data"
+
+    def install(self, cpu, workload):
+        start_addr = workload.DATA
+        end_addr = workload.DATA_END - 1
+        cpu.memory.add_read_byte_middleware(read_byte_middleware, start_addr, end_addr)
+        cpu.memory.add_write_byte_middleware(write_byte_middleware, start_addr, end_addr)
+
+
+class IRQ60Scenario(Scenario):
+    name = "irq60"
+    title = "60 Hz IRQ"
+    description = "periodic 60 Hz IRQ via a sync callback"
+
+    CPU_FREQUENCY = 894886 # Hz: Dragon 32 / CoCo
+    IRQ_CYCLES = CPU_FREQUENCY // 60
+
+    ISR = 0xFE00
+    ISR_CODE = [
+        0x7D, 0xFF, 0x03, # TST  $FF03 ; clear the PIA interrupt flag
+        0x3B,             # RTI
+    ]
+
+    def install(self, cpu, workload):
+        cpu.memory.load(self.ISR, self.ISR_CODE)
+        cpu.memory.load(cpu.IRQ_VECTOR, words2bytes([self.ISR]))
+
+        def irq_callback(cycles):
+            cpu.irq()
+        cpu.add_sync_callback(self.IRQ_CYCLES, irq_callback)
+
+    def execute(self, cpu, workload):
+        irq_enabled = cpu.irq_enabled
+        cpu.irq_enabled = True
+        cpu.test_run = lambda start, end, max_ops=1000000: sync_test_run(cpu, start, end, max_ops)
+        try:
+            workload.execute(cpu)
+        finally:
+            del cpu.test_run
+            cpu.irq_enabled = irq_enabled
+
+
+class MachineScenario(Scenario):
+    name = "machine"
+    title = "machine"
+    description = "PIA, middlewares and 60 Hz IRQ"
+
+    def __init__(self):
+        super(MachineScenario, self).__init__()
+        self.pia = PIAScenario()
+        self.middleware = MiddlewareScenario()
+        self.irq60 = IRQ60Scenario()
+
+    def install(self, cpu, workload):
+        for scenario in (self.pia, self.middleware, self.irq60):
+            scenario.install(cpu, workload)
+
+    def execute(self, cpu, workload):
+        self.irq60.execute(cpu, workload)
+
+    def get_counts(self, cpu):
+        return self.pia.get_counts(cpu)
+
+
+SCENARIO_CLASSES = (
+    Scenario,
+    PIAScenario,
+    MiddlewareScenario,
+    IRQ60Scenario,
+    MachineScenario,
+)
+SCENARIOS = dict((scenario_class.name, scenario_class) for scenario_class in SCENARIO_CLASSES)
+SCENARIO_NAMES = tuple(scenario_class.name for scenario_class in SCENARIO_CLASSES)
+
+
+def get_scenarios(names=None):
+    """
+    Create scenario instances by name. The bare scenario is always the
+    first one, because it's the reference for the penalty.
+    All scenarios, if names is None or contains "all".
+    """
+    if names is None or "all" in names:
+        names = SCENARIO_NAMES
+    scenarios = [Scenario()]
+    for name in names:
+        if name == Scenario.name:
+            continue
+        try:
+            scenario_class = SCENARIOS[name]
+        except KeyError:
+            raise KeyError("Unknown scenario %r (existing: %s)" % (name, ", ".join(SCENARIO_NAMES)))
+        scenarios.append(scenario_class())
+    return scenarios
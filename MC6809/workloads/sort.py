@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - sort workload
+    ======================
+
+    Insertion sort of unsigned bytes.
+    Many compares, conditional branches and indexed byte moves.
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import Workload, pseudo_random_bytes
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class SortWorkload(Workload):
+    name = "sort"
+    title = "Sort"
+    description = "Insertion sort of unsigned bytes"
+
+    DEFAULT_MULTIPLY = 8
+    BLOCK_SIZE = 64 # Every pass sorts a own block with random bytes
+
+    PROGRAM = [
+                                    #0100|                           ; X = start address, U = end address (+1) of the unsigned bytes
+        0x34, 0x50,                 #0100|         PSHS  U,X        ; 0,S = start, 2,S = end
+        0x31, 0x01,                 #0102|         LEAY  1,X        ; i = start + 1
+        0x10, 0xAC, 0x62,           #0104|  OUTER: CMPY  2,S        ; end reached?
+        0x24, 0x1B,                 #0107|         BHS   DONE
+        0xA6, 0xA4,                 #0109|         LDA   ,Y         ; key = a[i]
+        0x33, 0xA4,                 #010B|         LEAU  ,Y         ; j = i
+        0x11, 0xA3, 0xE4,           #010D|  INNER: CMPU  ,S         ; j == start?
+        0x27, 0x0C,                 #0110|         BEQ   INSERT
+        0xA1, 0x5F,                 #0112|         CMPA  -1,U       ; key >= a[j-1] ?
+        0x24, 0x08,                 #0114|         BHS   INSERT
+        0xE6, 0x5F,                 #0116|         LDB   -1,U       ; a[j] = a[j-1]
+        0xE7, 0xC4,                 #0118|         STB   ,U
+        0x33, 0x5F,                 #011A|         LEAU  -1,U       ; j = j - 1
+        0x20, 0xEF,                 #011C|         BRA   INNER
+        0xA7, 0xC4,                 #011E| INSERT: STA   ,U         ; a[j] = key
+        0x31, 0x21,                 #0120|         LEAY  1,Y        ; i = i + 1
+        0x20, 0xE0,                 #0122|         BRA   OUTER
+        0x35, 0x50,                 #0124|   DONE: PULS  X,U
+    ]
+
+    def get_block_address(self, pass_no):
+        return self.DATA + pass_no * self.BLOCK_SIZE
+
+    def setup(self, cpu):
+        super(SortWorkload, self).setup(cpu)
+        self.blocks = []
+        for pass_no in range(self.passes):
+            data = pseudo_random_bytes(self.BLOCK_SIZE, seed=pass_no)
+            self.blocks.append(data)
+            self.load_data(cpu, data, self.get_block_address(pass_no))
+
+    def prepare(self, cpu, pass_no):
+        super(SortWorkload, self).prepare(cpu, pass_no)
+        start = self.get_block_address(pass_no)
+        cpu.index_x.set(start)
+        cpu.user_stack_pointer.set(start + self.BLOCK_SIZE)
+
+    def check(self, cpu):
+        for pass_no, data in enumerate(self.blocks):
+            self.assert_memory(cpu,
+                self.get_block_address(pass_no), sorted(data),
+                "block %i not sorted" % pass_no
+            )
+        self.check_stack(cpu)
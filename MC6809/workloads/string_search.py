@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - string search workload
+    ===============================
+
+    Naive search: count all occurrences of a pattern in a text.
+    Uses the accumulator offset indexed mode: B,X and B,U
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import Workload
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+TEXT = (
+    "The MC6809 is an 8-bit microprocessor with some 16-bit features. "
+    "The 6809 was used in the Dragon 32 and the Tandy TRS-80 Color Computer. "
+    "The 6809 has two 8-bit accumulators and two 16-bit index registers. "
+)
+
+
+def count_matches(text, pattern):
+    """
+    >>> count_matches("aaaa", "aa")
+    3
+    """
+    count = 0
+    for index in range(len(text) - len(pattern) + 1):
+        if text[index:index + len(pattern)] == pattern:
+            count += 1
+    return count
+
+
+class StringSearchWorkload(Workload):
+    name = "strsearch"
+    title = "String search"
+    description = "Count the occurrences of a pattern in a text"
+
+    DEFAULT_MULTIPLY = 20
+    PATTERNS = ("6809", "The ", "bit ", "-bit", "xyz")
+    PATTERN_ADDRESS = 0x0F00 # zero terminated
+    COUNTER = 0x0080
+
+    PROGRAM = [
+                                    #0100|                           ; X = text, Y = last start address +1, U = zero terminated pattern
+                                    #0100|                           ; count the matches in the word at $0080
+        0x4F,                       #0100|         CLRA
+        0x1F, 0x8B,                 #0101|         TFR   A,DP
+        0x5F,                       #0103|         CLRB
+        0xDD, 0x80,                 #0104|         STD   <$80       ; clear the counter
+        0x34, 0x20,                 #0106|         PSHS  Y          ; end address to TOS
+        0xAC, 0xE4,                 #0108|  OUTER: CMPX  ,S         ; end of text reached?
+        0x24, 0x17,                 #010A|         BHS   DONE
+        0x5F,                       #010C|         CLRB             ; offset into pattern and text
+        0xA6, 0xC5,                 #010D|    CMP: LDA   B,U        ; pattern character
+        0x27, 0x07,                 #010F|         BEQ   FOUND      ; end of pattern -> match
+        0xA1, 0x85,                 #0111|         CMPA  B,X
+        0x26, 0x0A,                 #0113|         BNE   NEXT
+        0x5C,                       #0115|         INCB
+        0x20, 0xF5,                 #0116|         BRA   CMP
+        0xDC, 0x80,                 #0118|  FOUND: LDD   <$80       ; count the match
+        0xC3, 0x00, 0x01,           #011A|         ADDD  #1
+        0xDD, 0x80,                 #011D|         STD   <$80
+        0x30, 0x01,                 #011F|   NEXT: LEAX  1,X        ; next text position
+        0x20, 0xE5,                 #0121|         BRA   OUTER
+        0x32, 0x62,                 #0123|   DONE: LEAS  2,S
+    ]
+
+    def setup(self, cpu):
+        super(StringSearchWorkload, self).setup(cpu)
+        self.load_data(cpu, TEXT)
+        self.counts = []
+
+    def get_pattern(self, pass_no):
+        return self.PATTERNS[pass_no % len(self.PATTERNS)]
+
+    def prepare(self, cpu, pass_no):
+        super(StringSearchWorkload, self).prepare(cpu, pass_no)
+        pattern = self.get_pattern(pass_no)
+        cpu.memory.load(self.PATTERN_ADDRESS, pattern + "\x00")
+        cpu.index_x.set(self.DATA)
+        cpu.index_y.set(self.DATA + len(TEXT) - len(pattern) + 1)
+        cpu.user_stack_pointer.set(self.PATTERN_ADDRESS)
+
+    def pass_done(self, cpu, pass_no):
+        self.counts.append(self.get_word(cpu, self.COUNTER))
+
+    def check(self, cpu):
+        expected = [
+            count_matches(TEXT, self.get_pattern(pass_no))
+            for pass_no in range(self.passes)
+        ]
+        self.assert_equal(self.counts, expected, "match counts")
+        self.check_stack(cpu)
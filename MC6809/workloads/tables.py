@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+    MC6809 - table walk workload
+    ============================
+
+    Indexed addressing heavy table walks:
+        * translate bytes via a 256 byte table (D,Y offset)
+        * follow a linked list (LDX ,X)
+        * sum words via a pointer table (indirect [,Y++])
+
+    :copyleft: 2015 by the MC6809 team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+from MC6809.workloads.base import Workload, pseudo_random_bytes, words2bytes
+
+PY2 = sys.version_info[0] == 2
+if PY2:
+    range = xrange
+
+
+class TableWalkWorkload(Workload):
+    name = "tables"
+    title = "Table walks"
+    description = "Translate table, linked list and pointer table walks"
+
+    DEFAULT_MULTIPLY = 16
+    SOURCE_SIZE = 256
+    NODE_COUNT = 64
+    POINTER_COUNT = 64
+
+    SOURCE = 0x1000
+    DESTINATION = 0x1100
+    TRANSLATE_TABLE = 0x1200
+    NODES = 0x1300 # 4 Bytes per node: next node, value
+    POINTERS = 0x1400
+
+    # direct page variables:
+    SOURCE_END = 0x0080
+    LIST_HEAD = 0x0082
+    POINTERS_START = 0x0084
+    POINTERS_END = 0x0086
+    LIST_SUM = 0x0088
+    POINTER_SUM = 0x008A
+
+    PROGRAM = [
+                                    #0100|                           ; X = source bytes, U = destination, Y = translate table
+                                    #0100|                           ; $0080 = source end, $0082 = linked list head
+                                    #0100|                           ; $0084 = pointer table start, $0086 = pointer table end
+                                    #0100|                           ; results: $0088 = sum of the list values, $008A = sum of the pointed words
+        0x4F,                       #0100|         CLRA
+        0x1F, 0x8B,                 #0101|         TFR   A,DP
+        0x9C, 0x80,                 #0103|   XLAT: CMPX  <$80       ; end of source reached?
+        0x24, 0x09,                 #0105|         BHS   LIST
+        0x4F,                       #0107|         CLRA
+        0xE6, 0x80,                 #0108|         LDB   ,X+        ; D = source byte
+        0xE6, 0xAB,                 #010A|         LDB   D,Y        ; translate
+        0xE7, 0xC0,                 #010C|         STB   ,U+
+        0x20, 0xF3,                 #010E|         BRA   XLAT
+        0x4F,                       #0110|   LIST: CLRA
+        0x5F,                       #0111|         CLRB
+        0x9E, 0x82,                 #0112|         LDX   <$82       ; list head
+        0x27, 0x06,                 #0114|         BEQ   LDONE
+        0xE3, 0x02,                 #0116|  LNEXT: ADDD  2,X        ; add node value
+        0xAE, 0x84,                 #0118|         LDX   ,X         ; next node
+        0x26, 0xFA,                 #011A|         BNE   LNEXT
+        0xDD, 0x88,                 #011C|  LDONE: STD   <$88
+        0x10, 0x9E, 0x84,           #011E|         LDY   <$84
+        0x4F,                       #0121|         CLRA
+        0x5F,                       #0122|         CLRB
+        0x10, 0x9C, 0x86,           #0123|  PNEXT: CMPY  <$86       ; end of pointer table reached?
+        0x24, 0x04,                 #0126|         BHS   PDONE
+        0xE3, 0xB1,                 #0128|         ADDD  [,Y++]     ; add the pointed word
+        0x20, 0xF7,                 #012A|         BRA   PNEXT
+        0xDD, 0x8A,                 #012C|  PDONE: STD   <$8A
+    ]
+
+    def setup(self, cpu):
+        super(TableWalkWorkload, self).setup(cpu)
+
+        self.source = pseudo_random_bytes(self.SOURCE_SIZE, seed=1)
+        self.load_data(cpu, self.source, self.SOURCE)
+
+        # a "random" permutation as translate table:
+        self.translate_table = sorted(range(256), key=lambda value: (value * 167 + 13) & 0xff)
+        self.load_data(cpu, self.translate_table, self.TRANSLATE_TABLE)
+
+        # linked list nodes in "random" order:
+        values = [(value << 8) | (value ^ 0x5a) for value in pseudo_random_bytes(self.NODE_COUNT, seed=2)]
+        order = sorted(range(self.NODE_COUNT), key=lambda index: (index * 37) % self.NODE_COUNT)
+        nodes = [0] * (self.NODE_COUNT * 2)
+        for position, index in enumerate(order):
+            if position + 1 < len(order):
+                next_node = self.NODES + order[position + 1] * 4
+            else:
+                next_node = 0x0000 # end of list
+            nodes[index * 2] = next_node
+            nodes[index * 2 + 1] = values[index]
+        self.load_data(cpu, words2bytes(nodes), self.NODES)
+        list_head = self.NODES + order[0] * 4
+        self.list_sum = sum(values) & 0xffff
+
+        # pointer table to the node values in reverse order:
+        pointers = [self.NODES + index * 4 + 2 for index in reversed(range(self.POINTER_COUNT))]
+        self.load_data(cpu, words2bytes(pointers), self.POINTERS)
+        self.pointer_sum = sum(values[:self.POINTER_COUNT]) & 0xffff
+
+        cpu.memory.load(self.SOURCE_END, words2bytes([
+            self.SOURCE + self.SOURCE_SIZE,
+            list_head,
+            self.POINTERS,
+            self.POINTERS + self.POINTER_COUNT * 2,
+        ]))
+
+    def prepare(self, cpu, pass_no):
+        super(TableWalkWorkload, self).prepare(cpu, pass_no)
+        cpu.index_x.set(self.SOURCE)
+        cpu.user_stack_pointer.set(self.DESTINATION)
+        cpu.index_y.set(self.TRANSLATE_TABLE)
+
+    def check(self, cpu):
+        expected = [self.translate_table[value] for value in self.source]
+        self.assert_memory(cpu, self.DESTINATION, expected, "translated bytes")
+        self.assert_equal(self.get_word(cpu, self.LIST_SUM), self.list_sum, "linked list sum")
+        self.assert_equal(self.get_word(cpu, self.POINTER_SUM), self.pointer_sum, "pointer table sum")
+        self.check_stack(cpu)